@@ -6,7 +6,7 @@ from .jwt_handler import (
     decode_token,
     get_token_payload,
 )
-from .password_utils import hash_password, verify_password
+from .password_utils import hash_password, hash_password_async, verify_password, verify_password_async
 from .telegram_auth import validate_telegram_init_data, validate_telegram_login_widget
 
 
@@ -16,7 +16,9 @@ __all__ = [
     'decode_token',
     'get_token_payload',
     'hash_password',
+    'hash_password_async',
     'validate_telegram_init_data',
     'validate_telegram_login_widget',
     'verify_password',
+    'verify_password_async',
 ]
@@ -1,5 +1,6 @@
 """JWT token handling for cabinet authentication."""
 
+import secrets
 from datetime import UTC, datetime, timedelta
 from typing import Any
 
@@ -40,6 +41,8 @@ def create_access_token(
         'type': 'access',
         'exp': expires,
         'iat': datetime.now(UTC),
+        # Token id: keys the verified-principal cache (see principal_cache.py)
+        'jti': secrets.token_urlsafe(12),
     }
 
     # Добавляем telegram_id только если он есть
@@ -2,6 +2,8 @@
 
 import bcrypt
 
+from app.utils.cpu_executor import run_cpu_bound
+
 
 BCRYPT_ROUNDS = 12
 
@@ -39,3 +41,23 @@ def verify_password(password: str, password_hash: str) -> bool:
         return bcrypt.checkpw(password_bytes, hash_bytes)
     except (ValueError, TypeError):
         return False
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    Hash a password in the CPU executor without blocking the event loop.
+
+    Raises:
+        CpuExecutorOverloadedError: If too many hashes are already queued
+    """
+    return await run_cpu_bound('bcrypt', hash_password, password, shed=True)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    """
+    Verify a password in the CPU executor without blocking the event loop.
+
+    Raises:
+        CpuExecutorOverloadedError: If too many checks are already queued (login burst)
+    """
+    return await run_cpu_bound('bcrypt', verify_password, password, password_hash, shed=True)
@@ -0,0 +1,198 @@
+"""Short-lived cache of verified cabinet principals.
+
+Every authenticated cabinet request used to load the user with five selectinload
+queries, re-verify Telegram initData (HMAC over the whole payload) and re-run the
+blacklist and required-channel checks. A principal is the outcome of those checks
+for one (user_id, token jti, initData hash) triple, so read-only routes can rely
+on it without touching the ORM.
+
+Notes:
+- only successful checks are cached; every failure is re-evaluated next time;
+- the JWT itself is still decoded on every request, so token expiry is exact;
+- maintenance mode is cheap and checked per request against the cached identity;
+- status/identity changes drop the user's principals on this replica right after
+  commit (ORM listener) or via ``invalidate_user_context`` for bulk updates;
+  other replicas catch up within CABINET_PRINCIPAL_CACHE_TTL_SECONDS.
+"""
+
+import hashlib
+import itertools
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.utils.user_context_cache import add_invalidation_listener
+
+
+# User columns that affect authentication gates
+_TRACKED_COLUMNS = frozenset({'status', 'telegram_id', 'username', 'email', 'email_verified'})
+_PENDING_KEY = 'cabinet_principal_invalidations'
+
+PrincipalKey = tuple[int, str, str]
+
+
+@dataclass(frozen=True, slots=True)
+class CabinetPrincipal:
+    """Identity of a cabinet user that passed status, initData, blacklist and channel checks."""
+
+    user_id: int
+    telegram_id: int | None
+    username: str | None
+    verified_email: str | None
+
+    @classmethod
+    def from_user(cls, user) -> 'CabinetPrincipal':
+        return cls(
+            user_id=user.id,
+            telegram_id=user.telegram_id,
+            username=user.username,
+            verified_email=user.email if user.email_verified else None,
+        )
+
+    @property
+    def is_config_admin(self) -> bool:
+        return settings.is_admin(telegram_id=self.telegram_id, email=self.verified_email)
+
+
+def make_principal_key(user_id: int, payload: dict[str, Any], token: str, init_data: str | None) -> PrincipalKey:
+    """Cache key: user, token id (token hash for tokens issued before jti) and initData hash."""
+    token_id = payload.get('jti') or hashlib.sha256(token.encode()).hexdigest()
+    init_data_hash = hashlib.sha256(init_data.encode()).hexdigest() if init_data else ''
+    return user_id, token_id, init_data_hash
+
+
+class CabinetPrincipalCache:
+    """In-process TTL LRU of principals with per-user invalidation."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._entries: OrderedDict[PrincipalKey, tuple[float, CabinetPrincipal]] = OrderedDict()
+        self._keys_by_user: dict[int, set[PrincipalKey]] = {}
+        self._user_ids_by_telegram: dict[int, int] = {}
+        # Generation per user: a check started before invalidation is not cached
+        self._generations: OrderedDict[int, int] = OrderedDict()
+        self._generation_counter = itertools.count(1)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.CABINET_PRINCIPAL_CACHE_ENABLED
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def generation(self, user_id: int) -> int:
+        return self._generations.get(user_id, 0)
+
+    def get(self, key: PrincipalKey) -> CabinetPrincipal | None:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, principal = entry
+        if expires_at < time.monotonic():
+            self._discard(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return principal
+
+    def set(self, key: PrincipalKey, principal: CabinetPrincipal, generation: int | None = None) -> None:
+        if not self.enabled:
+            return
+        if generation is not None and generation != self.generation(principal.user_id):
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl, principal)
+        self._entries.move_to_end(key)
+        self._keys_by_user.setdefault(principal.user_id, set()).add(key)
+        if principal.telegram_id is not None:
+            self._user_ids_by_telegram[principal.telegram_id] = principal.user_id
+        while len(self._entries) > self.maxsize:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+
+    def _discard(self, key: PrincipalKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        principal = entry[1]
+        keys = self._keys_by_user.get(principal.user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[principal.user_id]
+                if principal.telegram_id is not None:
+                    self._user_ids_by_telegram.pop(principal.telegram_id, None)
+
+    def invalidate(self, telegram_ids=(), user_ids=()) -> None:
+        targets = {user_id for user_id in user_ids if user_id is not None}
+        for telegram_id in telegram_ids:
+            user_id = self._user_ids_by_telegram.get(telegram_id)
+            if user_id is not None:
+                targets.add(user_id)
+
+        for user_id in targets:
+            self._generations[user_id] = next(self._generation_counter)
+            self._generations.move_to_end(user_id)
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._discard(key)
+        while len(self._generations) > self.maxsize:
+            self._generations.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_user.clear()
+        self._user_ids_by_telegram.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+cabinet_principal_cache = CabinetPrincipalCache(
+    maxsize=settings.CABINET_PRINCIPAL_CACHE_MAXSIZE,
+    ttl=settings.CABINET_PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+add_invalidation_listener(cabinet_principal_cache.invalidate)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_principal_changes(session, flush_context):
+    changed = [obj for obj in session.deleted if getattr(obj, '__tablename__', None) == 'users']
+    for obj in session.dirty:
+        if getattr(obj, '__tablename__', None) != 'users':
+            continue
+        attrs = inspect(obj).attrs
+        if any(attrs[column].history.has_changes() for column in _TRACKED_COLUMNS):
+            changed.append(obj)
+    if changed:
+        pending = session.info.setdefault(_PENDING_KEY, set())
+        pending.update(obj.__dict__.get('id') for obj in changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_principals_after_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        cabinet_principal_cache.invalidate(user_ids=pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_principal_changes(session):
+    session.info.pop(_PENDING_KEY, None)
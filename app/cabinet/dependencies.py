@@ -13,6 +13,7 @@ from app.services.blacklist_service import blacklist_service
 from app.services.maintenance_service import maintenance_service
 
 from .auth.jwt_handler import get_token_payload
+from .auth.principal_cache import CabinetPrincipal, cabinet_principal_cache, make_principal_key
 from .auth.telegram_auth import validate_telegram_init_data
 
 
@@ -30,30 +31,8 @@ async def get_cabinet_db() -> AsyncSession:
             await session.close()
 
 
-async def get_current_cabinet_user(
-    request: Request,
-    credentials: HTTPAuthorizationCredentials | None = Depends(security),
-    db: AsyncSession = Depends(get_cabinet_db),
-) -> User:
-    """
-    Get current authenticated cabinet user from JWT token.
-
-    Args:
-        request: FastAPI request object (for reading X-Telegram-Init-Data header)
-        credentials: HTTP Bearer credentials
-        db: Database session
-
-    Returns:
-        Authenticated User object
-
-    Raises:
-        HTTPException: If token is invalid, expired, or user not found
-    """
-    # Check maintenance mode first (except for admins - checked later)
-    if maintenance_service.is_maintenance_active():
-        # We need to check token first to see if user is admin
-        pass  # Will check after getting user
-
+def _decode_access_token(credentials: HTTPAuthorizationCredentials | None) -> tuple[int, dict]:
+    """Verify the bearer access token and return (user_id, payload)."""
     if not credentials:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -61,8 +40,7 @@ async def get_current_cabinet_user(
             headers={'WWW-Authenticate': 'Bearer'},
         )
 
-    token = credentials.credentials
-    payload = get_token_payload(token, expected_type='access')
+    payload = get_token_payload(credentials.credentials, expected_type='access')
 
     if not payload:
         raise HTTPException(
@@ -80,14 +58,33 @@ async def get_current_cabinet_user(
             headers={'WWW-Authenticate': 'Bearer'},
         )
 
-    user = await get_user_by_id(db, user_id)
+    return user_id, payload
 
-    if not user:
+
+def _check_maintenance(principal: CabinetPrincipal) -> None:
+    """Reject non-admins while maintenance mode is active."""
+    if maintenance_service.is_maintenance_active() and not principal.is_config_admin:
+        status_info = maintenance_service.get_status_info()
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail='User not found',
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                'code': 'maintenance',
+                'message': maintenance_service.get_maintenance_message() or 'Service is under maintenance',
+                'reason': status_info.get('reason'),
+            },
         )
 
+
+async def _verify_user(user: User, init_data_raw: str | None) -> CabinetPrincipal:
+    """
+    Run all access gates for a loaded user.
+
+    Returns:
+        Principal that may be cached for this token and initData
+
+    Raises:
+        HTTPException: If any gate rejects the user
+    """
     if user.status != 'active':
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -100,7 +97,6 @@ async def get_current_cabinet_user(
     # the Telegram user ID matches the JWT user's telegram_id.
     # This prevents cross-account token reuse when Telegram WebView
     # shares localStorage across accounts on the same device.
-    init_data_raw = request.headers.get('X-Telegram-Init-Data')
     if init_data_raw and user.telegram_id is not None:
         # Use generous max_age: Telegram Desktop caches initData
         tg_user = validate_telegram_init_data(init_data_raw, max_age_seconds=86400 * 30)
@@ -134,50 +130,117 @@ async def get_current_cabinet_user(
                 },
             )
 
+    principal = CabinetPrincipal.from_user(user)
+
     # Check maintenance mode (allow admins to pass)
-    if maintenance_service.is_maintenance_active():
-        # Проверяем админа по telegram_id ИЛИ email
-        is_admin = settings.is_admin(telegram_id=user.telegram_id, email=user.email if user.email_verified else None)
-        if not is_admin:
-            status_info = maintenance_service.get_status_info()
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail={
-                    'code': 'maintenance',
-                    'message': maintenance_service.get_maintenance_message() or 'Service is under maintenance',
-                    'reason': status_info.get('reason'),
-                },
-            )
+    _check_maintenance(principal)
 
     # Check required channel subscription - Telegram users only
     if settings.CHANNEL_IS_REQUIRED_SUB:
-        # Skip for email-only users (no telegram_id)
-        if user.telegram_id is not None:
-            # Skip admin check
-            is_admin = settings.is_admin(
-                telegram_id=user.telegram_id, email=user.email if user.email_verified else None
-            )
-            if not is_admin:
-                from app.services.channel_subscription_service import channel_subscription_service
+        # Skip for email-only users (no telegram_id) and admins
+        if user.telegram_id is not None and not principal.is_config_admin:
+            from app.services.channel_subscription_service import channel_subscription_service
 
-                channels_with_status = await channel_subscription_service.get_channels_with_status(user.telegram_id)
-                is_subscribed = (
-                    all(ch['is_subscribed'] for ch in channels_with_status) if channels_with_status else True
+            channels_with_status = await channel_subscription_service.get_channels_with_status(user.telegram_id)
+            is_subscribed = all(ch['is_subscribed'] for ch in channels_with_status) if channels_with_status else True
+
+            if not is_subscribed:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail={
+                        'code': 'channel_subscription_required',
+                        'message': 'Please subscribe to the required channels to continue',
+                        'channels': channels_with_status,
+                    },
                 )
 
-                if not is_subscribed:
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail={
-                            'code': 'channel_subscription_required',
-                            'message': 'Please subscribe to the required channels to continue',
-                            'channels': channels_with_status,
-                        },
-                    )
+    return principal
+
+
+async def get_current_cabinet_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials | None = Depends(security),
+    db: AsyncSession = Depends(get_cabinet_db),
+) -> User:
+    """
+    Get current authenticated cabinet user from JWT token.
+
+    Args:
+        request: FastAPI request object (for reading X-Telegram-Init-Data header)
+        credentials: HTTP Bearer credentials
+        db: Database session
+
+    Returns:
+        Authenticated User object
+
+    Raises:
+        HTTPException: If token is invalid, expired, or user not found
+    """
+    user_id, payload = _decode_access_token(credentials)
+
+    init_data_raw = request.headers.get('X-Telegram-Init-Data')
+    key = make_principal_key(user_id, payload, credentials.credentials, init_data_raw)
+    generation = cabinet_principal_cache.generation(user_id)
+
+    user = await get_user_by_id(db, user_id)
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='User not found',
+        )
+
+    principal = cabinet_principal_cache.get(key)
+
+    # The user row is fresh here: a status change on another replica is not masked by the cache
+    if principal is None or user.status != 'active':
+        principal = await _verify_user(user, init_data_raw)
+        cabinet_principal_cache.set(key, principal, generation)
+    else:
+        _check_maintenance(principal)
 
     return user
 
 
+async def get_cabinet_principal(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials | None = Depends(security),
+    db: AsyncSession = Depends(get_cabinet_db),
+) -> CabinetPrincipal:
+    """
+    Get the verified identity of the current cabinet user without the ORM load.
+
+    Same checks as get_current_cabinet_user, but on a principal cache hit the
+    user is not loaded at all. Use it for read-only routes that only need the
+    user id (they load what they need themselves).
+
+    Raises:
+        HTTPException: If token is invalid, expired, or user not found
+    """
+    user_id, payload = _decode_access_token(credentials)
+
+    init_data_raw = request.headers.get('X-Telegram-Init-Data')
+    key = make_principal_key(user_id, payload, credentials.credentials, init_data_raw)
+    principal = cabinet_principal_cache.get(key)
+
+    if principal is not None:
+        _check_maintenance(principal)
+        return principal
+
+    generation = cabinet_principal_cache.generation(user_id)
+    user = await get_user_by_id(db, user_id)
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='User not found',
+        )
+
+    principal = await _verify_user(user, init_data_raw)
+    cabinet_principal_cache.set(key, principal, generation)
+    return principal
+
+
 async def get_optional_cabinet_user(
     request: Request,
     credentials: HTTPAuthorizationCredentials | None = Depends(security),
@@ -769,6 +769,9 @@ async def get_auto_sync_status(
         last_run_error=status_obj.last_run_error,
         last_user_stats=status_obj.last_user_stats,
         last_server_stats=status_obj.last_server_stats,
+        progress=status_obj.progress,
+        delta_enabled=status_obj.delta_enabled,
+        last_delta_stats=status_obj.last_delta_stats,
     )
 
 
@@ -2,13 +2,14 @@
 
 import structlog
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import String, func, select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.crud.server_squad import (
     count_active_users_for_squad,
     get_all_server_squads,
     get_server_squad_by_id,
+    subscription_in_squad,
     sync_with_remnawave,
     update_server_squad,
     update_server_squad_promo_groups,
@@ -259,12 +260,11 @@ async def get_server_stats(
     active_subs = await count_active_users_for_squad(db, server.squad_uuid)
 
     # Count trial subscriptions on this server
-    # Use LIKE query for JSON array since .contains() is DB-specific
     trial_result = await db.execute(
         select(func.count(Subscription.id)).where(
             Subscription.is_trial == True,
             Subscription.status == 'active',
-            func.cast(Subscription.connected_squads, String).like(f'%"{server.squad_uuid}"%'),
+            subscription_in_squad(server.squad_uuid),
         )
     )
     trial_count = trial_result.scalar() or 0
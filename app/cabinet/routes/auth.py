@@ -31,16 +31,17 @@ from app.database.models import CabinetRefreshToken, User
 from app.services.campaign_service import AdvertisingCampaignService
 from app.services.disposable_email_service import disposable_email_service
 from app.services.referral_service import process_referral_registration
+from app.utils.cpu_executor import CpuExecutorOverloadedError
 from app.utils.timezone import panel_datetime_to_utc
 
 from ..auth import (
     create_access_token,
     create_refresh_token,
     get_token_payload,
-    hash_password,
+    hash_password_async,
     validate_telegram_init_data,
     validate_telegram_login_widget,
-    verify_password,
+    verify_password_async,
 )
 from ..auth.email_verification import (
     generate_email_change_code,
@@ -81,6 +82,29 @@ logger = structlog.get_logger(__name__)
 router = APIRouter(prefix='/auth', tags=['Cabinet Auth'])
 
 
+def _password_overloaded() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail='Too many login attempts right now, please try again in a few seconds',
+        headers={'Retry-After': '2'},
+    )
+
+
+async def _hash_password(password: str) -> str:
+    """bcrypt runs in the CPU executor; bursts beyond its queue get 503."""
+    try:
+        return await hash_password_async(password)
+    except CpuExecutorOverloadedError:
+        raise _password_overloaded()
+
+
+async def _verify_password(password: str, password_hash: str) -> bool:
+    try:
+        return await verify_password_async(password, password_hash)
+    except CpuExecutorOverloadedError:
+        raise _password_overloaded()
+
+
 def _user_to_response(user: User) -> UserResponse:
     """Convert User model to UserResponse."""
     return UserResponse(
@@ -566,7 +590,7 @@ async def register_email(
     # Update user
     user.email = request.email
     user.email_verified = False
-    user.password_hash = hash_password(request.password)
+    user.password_hash = await _hash_password(request.password)
     user.email_verification_token = verification_token
     user.email_verification_expires = verification_expires
 
@@ -653,7 +677,7 @@ async def register_email_standalone(
         )
 
     # Хешировать пароль
-    password_hash = hash_password(request.password)
+    password_hash = await _hash_password(request.password)
 
     # Найти реферера по коду (если указан)
     referrer = None
@@ -888,7 +912,7 @@ async def login_email(
         # For test email - auto-create user if not exists
         if is_test_email and settings.validate_test_email_password(request.email, request.password):
             logger.info('Test email login creating new user', email=request.email)
-            password_hash = hash_password(request.password)
+            password_hash = await _hash_password(request.password)
             user = await create_user_by_email(
                 db=db,
                 email=request.email,
@@ -911,7 +935,7 @@ async def login_email(
             detail='Password login not configured for this account',
         )
 
-    if not verify_password(request.password, user.password_hash):
+    if not await _verify_password(request.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Invalid email or password',
@@ -1110,7 +1134,7 @@ async def reset_password(
         )
 
     # Update password
-    user.password_hash = hash_password(request.password)
+    user.password_hash = await _hash_password(request.password)
     user.password_reset_token = None
     user.password_reset_expires = None
 
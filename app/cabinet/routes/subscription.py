@@ -39,7 +39,8 @@ from app.utils.cache import RateLimitCache, cache, cache_key
 from app.utils.pricing_utils import format_period_description
 from app.utils.promo_offer import get_user_active_promo_discount_percent
 
-from ..dependencies import get_cabinet_db, get_current_cabinet_user
+from ..auth.principal_cache import CabinetPrincipal
+from ..dependencies import get_cabinet_db, get_cabinet_principal, get_current_cabinet_user
 from ..schemas.subscription import (
     AutopayUpdateRequest,
     DevicePurchaseRequest,
@@ -247,15 +248,15 @@ def _subscription_to_response(
 
 @router.get('', response_model=SubscriptionStatusResponse)
 async def get_subscription(
-    user: User = Depends(get_current_cabinet_user),
+    principal: CabinetPrincipal = Depends(get_cabinet_principal),
     db: AsyncSession = Depends(get_cabinet_db),
 ):
     """Get current user's subscription details."""
-    # Reload user from current session to get fresh data
-    # (user object is from different session in get_current_cabinet_user)
+    # Read-only route: authentication comes from the principal cache,
+    # the user with subscription is loaded once here
     from app.database.crud.user import get_user_by_id
 
-    fresh_user = await get_user_by_id(db, user.id)
+    fresh_user = await get_user_by_id(db, principal.user_id)
 
     if not fresh_user or not fresh_user.subscription:
         # Return 200 with has_subscription: false instead of 404
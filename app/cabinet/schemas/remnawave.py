@@ -352,6 +352,9 @@ class AutoSyncStatus(BaseModel):
     last_run_error: str | None = None
     last_user_stats: dict[str, Any] | None = None
     last_server_stats: dict[str, Any] | None = None
+    progress: dict[str, Any] | None = None
+    delta_enabled: bool = False
+    last_delta_stats: dict[str, Any] | None = None
 
 
 class AutoSyncToggleRequest(BaseModel):
@@ -80,6 +80,7 @@ class Settings(BaseSettings):
 
     SQLITE_PATH: str = './data/bot.db'
     LOCALES_PATH: str = './locales'
+    LOCALE_BUNDLES_PATH: str = './data/locale_bundles'  # Скомпилированные локали (marshal)
 
     TIMEZONE: str = Field(default_factory=lambda: os.getenv('TZ', 'UTC'))
 
@@ -88,6 +89,22 @@ class Settings(BaseSettings):
     REDIS_URL: str = 'redis://localhost:6379/0'
     CART_TTL_SECONDS: int = 3600  # Время жизни корзины пользователя в Redis (1 час)
 
+    # Кеш контекста пользователя для AuthMiddleware (LRU в памяти + Redis)
+    USER_CONTEXT_CACHE_ENABLED: bool = True
+    USER_CONTEXT_CACHE_LOCAL_MAXSIZE: int = 50000  # Максимум записей в LRU процесса
+    USER_CONTEXT_CACHE_LOCAL_TTL_SECONDS: float = 5.0  # Короткий TTL: другие реплики инвалидируют только Redis
+    USER_CONTEXT_CACHE_REDIS_TTL_SECONDS: int = 300
+    # Write-behind запись last_activity и профиля пользователей (username/имя/фамилия)
+    USER_ACTIVITY_FLUSH_INTERVAL_SECONDS: int = 15
+    # Антиспам (ThrottlingMiddleware): memory — в процессе, redis — общий для всех реплик
+    THROTTLING_BACKEND: str = 'memory'
+    THROTTLING_RATE_LIMIT_SECONDS: float = 0.5  # Минимальный интервал между апдейтами пользователя
+    THROTTLING_COMMAND_LIMITS: str = 'start:3/60'  # команда:вызовов/секунд через запятую
+    THROTTLING_MEMORY_MAXSIZE: int = 100000  # Максимум ключей в памяти процесса
+    # Пул для CPU-тяжёлой работы вне event loop (bcrypt, QR, сжатие бекапов)
+    CPU_EXECUTOR_MAX_WORKERS: int = 0  # 0 — по числу CPU, но не больше 4
+    CPU_EXECUTOR_MAX_QUEUE: int = 32  # Сверх этого ожидающие логины отклоняются с 503
+
     REMNAWAVE_API_URL: str | None = None
     REMNAWAVE_API_KEY: str | None = None
     REMNAWAVE_SECRET_KEY: str | None = None
@@ -101,6 +118,20 @@ class Settings(BaseSettings):
     REMNAWAVE_USER_DELETE_MODE: str = 'delete'  # "delete" или "disable"
     REMNAWAVE_AUTO_SYNC_ENABLED: bool = False
     REMNAWAVE_AUTO_SYNC_TIMES: str = '03:00'
+    # Дельта-синхронизация между полными прогонами (только изменённые с прошлого раза строки)
+    REMNAWAVE_DELTA_SYNC_ENABLED: bool = True
+    REMNAWAVE_DELTA_SYNC_INTERVAL_SECONDS: int = 60
+    # Адаптивный (AIMD) параллелизм отправки подписок в панель
+    REMNAWAVE_PANEL_SYNC_INITIAL_CONCURRENCY: int = 5
+    REMNAWAVE_PANEL_SYNC_MIN_CONCURRENCY: int = 1
+    REMNAWAVE_PANEL_SYNC_MAX_CONCURRENCY: int = 32
+    REMNAWAVE_PANEL_SYNC_LATENCY_TARGET_MS: int = 1000
+    # Общий пул HTTP-соединений к панели (keep-alive, лимит на хост, кеш DNS)
+    REMNAWAVE_HTTP_POOL_ENABLED: bool = True
+    REMNAWAVE_HTTP_POOL_LIMIT: int = 100
+    REMNAWAVE_HTTP_POOL_LIMIT_PER_HOST: int = 50
+    REMNAWAVE_HTTP_KEEPALIVE_SECONDS: float = 60.0
+    REMNAWAVE_HTTP_DNS_CACHE_SECONDS: int = 300
     CABINET_REMNA_SUB_CONFIG: str | None = None  # UUID конфига страницы подписки из RemnaWave
 
     # RemnaWave incoming webhooks (real-time event delivery from backend)
@@ -143,6 +174,19 @@ class Settings(BaseSettings):
     MONITORING_LOGS_RETENTION_DAYS: int = 30
     NOTIFICATION_CACHE_HOURS: int = 24
 
+    # Общий планировщик исходящих сообщений (рассылки, уведомления мониторинга и трафика)
+    TELEGRAM_SEND_RATE_PER_SECOND: float = 30.0
+    TELEGRAM_SEND_WORKERS: int = 30
+    TELEGRAM_SEND_CHAT_INTERVAL_SECONDS: float = 1.0  # Пауза между сообщениями в один личный чат
+    TELEGRAM_SEND_GROUP_INTERVAL_SECONDS: float = 3.0  # Пауза между сообщениями в одну группу
+    TELEGRAM_SEND_FLOOD_RETRIES: int = 3
+
+    # Рассылки как задания в БД: получатели сохраняются в broadcast_recipients и разбираются пачками
+    BROADCAST_CLAIM_BATCH_SIZE: int = 200
+    BROADCAST_CLAIM_LEASE_SECONDS: int = 300  # Через сколько незавершённая пачка упавшей реплики снова доступна
+    # Как часто реплика подключается к чужим рассылкам (0 — только при старте)
+    BROADCAST_JOB_POLL_INTERVAL_SECONDS: int = 30
+
     SERVER_STATUS_MODE: str = 'disabled'
     SERVER_STATUS_EXTERNAL_URL: str | None = None
     SERVER_STATUS_METRICS_URL: str | None = None
@@ -250,6 +294,7 @@ class Settings(BaseSettings):
     BLACKLIST_GITHUB_URL: str | None = None
     BLACKLIST_UPDATE_INTERVAL_HOURS: int = 24
     BLACKLIST_IGNORE_ADMINS: bool = True
+    BLACKLIST_CHECK_CACHE_MAXSIZE: int = 50000
 
     DISPOSABLE_EMAIL_CHECK_ENABLED: bool = True
 
@@ -304,6 +349,8 @@ class Settings(BaseSettings):
     SUBSCRIPTION_RENEWAL_BALANCE_THRESHOLD_KOPEKS: int = 20000
 
     MONITORING_INTERVAL: int = 60
+    MONITORING_MAX_CONCURRENT_JOBS: int = 3
+    MONITORING_JOB_TIMEOUT_SECONDS: int = 900
     INACTIVE_USER_DELETE_MONTHS: int = 3
 
     MAINTENANCE_MODE: bool = False
@@ -663,6 +710,11 @@ class Settings(BaseSettings):
     WEBHOOK_WORKERS: int = 4
     WEBHOOK_ENQUEUE_TIMEOUT: float = 0.1
     WEBHOOK_WORKER_SHUTDOWN_TIMEOUT: float = 30.0
+    WEBHOOK_INGRESS: str = 'memory'
+    WEBHOOK_STREAM_KEY_PREFIX: str = 'bot:telegram_updates'
+    WEBHOOK_STREAM_PARTITIONS: int = 16
+    WEBHOOK_STREAM_MAX_LAG: int = 10000
+    WEBHOOK_STREAM_LEASE_SECONDS: float = 15.0
     BOT_RUN_MODE: str = 'polling'
 
     WEB_API_ENABLED: bool = False
@@ -713,6 +765,10 @@ class Settings(BaseSettings):
     CABINET_EMAIL_CHANGE_CODE_EXPIRE_MINUTES: int = 15  # Email change verification code expiration
     CABINET_EMAIL_AUTH_ENABLED: bool = True  # Enable email registration/login in cabinet
     CABINET_URL: str = 'https://example.com/cabinet'  # Base URL for cabinet (used in verification emails)
+    # Short-lived cache of verified cabinet principals (JWT + initData + status/blacklist/channel gates)
+    CABINET_PRINCIPAL_CACHE_ENABLED: bool = True
+    CABINET_PRINCIPAL_CACHE_TTL_SECONDS: float = 15.0
+    CABINET_PRINCIPAL_CACHE_MAXSIZE: int = 20000
 
     # OAuth 2.0 provider settings for cabinet
     OAUTH_GOOGLE_CLIENT_ID: str = ''
@@ -2444,6 +2500,36 @@ class Settings(BaseSettings):
             timeout = 30.0
         return max(1.0, timeout)
 
+    def get_throttling_backend(self) -> str:
+        backend = (self.THROTTLING_BACKEND or 'memory').strip().lower()
+        if backend not in {'memory', 'redis'}:
+            return 'memory'
+        return backend
+
+    def get_throttling_command_limits(self) -> dict[str, tuple[int, float]]:
+        limits: dict[str, tuple[int, float]] = {}
+        for item in (self.THROTTLING_COMMAND_LIMITS or '').split(','):
+            command, _, policy = item.strip().partition(':')
+            calls, _, window = policy.partition('/')
+            try:
+                limit, seconds = int(calls), float(window)
+            except ValueError:
+                continue
+            if command and limit > 0 and seconds > 0:
+                limits[command.strip().lstrip('/').lower()] = (limit, seconds)
+        return limits
+
+    def get_cpu_executor_max_workers(self) -> int:
+        if self.CPU_EXECUTOR_MAX_WORKERS > 0:
+            return self.CPU_EXECUTOR_MAX_WORKERS
+        return max(1, min(4, os.cpu_count() or 1))
+
+    def get_webhook_ingress(self) -> str:
+        ingress = (self.WEBHOOK_INGRESS or 'memory').strip().lower()
+        if ingress not in {'memory', 'redis_stream'}:
+            return 'memory'
+        return ingress
+
     def get_telegram_webhook_url(self) -> str | None:
         base_url = (self.WEBHOOK_URL or '').strip()
         if not base_url:
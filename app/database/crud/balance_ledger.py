@@ -0,0 +1,268 @@
+"""Атомарные изменения баланса пользователя.
+
+Баланс меняется одним ``UPDATE users SET balance_kopeks = balance_kopeks + :delta
+... RETURNING balance_kopeks`` — без чтения в Python и без блокировки строки на всё
+время обработки. Списание добавляет условие ``balance_kopeks >= :amount``, так что
+баланс не уходит в минус, даже если параллельно идут пополнения и суточные списания.
+
+В PostgreSQL запись транзакции вставляется тем же запросом (data-modifying CTE),
+в SQLite — вторым запросом в той же транзакции БД.
+
+Ключ идемпотентности (уникальный индекс transactions.idempotency_key) не даёт применить
+одну операцию дважды: повтор не проходит условие NOT EXISTS, а одновременный повтор
+падает на уникальном индексе и откатывается целиком.
+
+Функции здесь не делают commit — это решает вызывающий код (см. add_user_balance).
+"""
+
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any
+
+import structlog
+from sqlalchemy import exists, insert, literal, select, true, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.database import IS_SQLITE
+from app.database.models import (
+    PaymentMethod,
+    Subscription,
+    SubscriptionStatus,
+    Tariff,
+    Transaction,
+    TransactionType,
+    User,
+)
+
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class LedgerEntry:
+    """Транзакция, которая записывается вместе с изменением баланса."""
+
+    type: TransactionType
+    description: str
+    payment_method: PaymentMethod | None = None
+    external_id: str | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class BalanceChange:
+    """Результат изменения баланса."""
+
+    applied: bool
+    balance_kopeks: int | None = None
+    transaction_id: int | None = None
+    # Операция с этим ключом идемпотентности уже была применена
+    duplicate: bool = False
+    # Есть приостановленная суточная подписка, которую новый баланс позволяет возобновить
+    resume_daily: bool = False
+
+
+def _build_update(
+    user_id: int,
+    delta: int,
+    *,
+    require_funds: bool,
+    idempotency_key: str | None,
+    user_values: dict[str, Any] | None,
+    now: datetime,
+):
+    stmt = (
+        update(User)
+        .where(User.id == user_id)
+        .values(balance_kopeks=User.balance_kopeks + delta, updated_at=now, **(user_values or {}))
+    )
+    if require_funds:
+        stmt = stmt.where(User.balance_kopeks >= -delta)
+    if idempotency_key is not None:
+        stmt = stmt.where(~exists().where(Transaction.idempotency_key == idempotency_key))
+    return stmt.returning(User.id, User.balance_kopeks)
+
+
+def _transaction_values(
+    entry: LedgerEntry, amount_kopeks: int, idempotency_key: str | None, now: datetime
+) -> dict[str, Any]:
+    return {
+        'type': entry.type.value,
+        'amount_kopeks': amount_kopeks,
+        'description': entry.description,
+        'payment_method': entry.payment_method.value if entry.payment_method else None,
+        'external_id': entry.external_id,
+        'idempotency_key': idempotency_key,
+        'is_completed': True,
+        'completed_at': now,
+        'created_at': now,
+    }
+
+
+def _daily_resume_check(user_id_column, balance_column):
+    """EXISTS: приостановленная суточная подписка, на день которой хватает баланса."""
+    return (
+        exists()
+        .where(
+            Subscription.user_id == user_id_column,
+            Subscription.status == SubscriptionStatus.DISABLED.value,
+            Tariff.id == Subscription.tariff_id,
+            Tariff.is_daily.is_(True),
+            Tariff.daily_price_kopeks > 0,
+            Tariff.daily_price_kopeks <= balance_column,
+        )
+        .label('resume_daily')
+    )
+
+
+def build_balance_change_statement(
+    user_id: int,
+    delta: int,
+    *,
+    require_funds: bool = False,
+    entry: LedgerEntry | None = None,
+    idempotency_key: str | None = None,
+    user_values: dict[str, Any] | None = None,
+    check_daily_resume: bool = False,
+    now: datetime | None = None,
+):
+    """
+    Один запрос PostgreSQL: изменение баланса, запись транзакции и (для пополнений)
+    проверка, можно ли возобновить суточную подписку.
+
+    Колонки результата: balance_kopeks, transaction_id, resume_daily.
+    """
+    now = now or datetime.now(UTC)
+    updated = _build_update(
+        user_id,
+        delta,
+        require_funds=require_funds,
+        idempotency_key=idempotency_key,
+        user_values=user_values,
+        now=now,
+    ).cte('balance_update')
+
+    columns = [updated.c.balance_kopeks]
+    source = updated
+    if entry is not None:
+        values = _transaction_values(entry, abs(delta), idempotency_key, now)
+        table = Transaction.__table__
+        inserted = (
+            insert(Transaction)
+            .from_select(
+                ['user_id', *values],
+                select(updated.c.id, *(literal(value, table.c[name].type) for name, value in values.items())),
+            )
+            .returning(Transaction.id)
+            .cte('balance_transaction')
+        )
+        source = updated.outerjoin(inserted, true())
+        columns.append(inserted.c.id.label('transaction_id'))
+    else:
+        columns.append(literal(None).label('transaction_id'))
+
+    if check_daily_resume:
+        columns.append(_daily_resume_check(updated.c.id, updated.c.balance_kopeks))
+    else:
+        columns.append(literal(False).label('resume_daily'))
+
+    return select(*columns).select_from(source)
+
+
+async def _change_balance_sqlite(
+    db: AsyncSession,
+    user_id: int,
+    delta: int,
+    *,
+    require_funds: bool,
+    entry: LedgerEntry | None,
+    idempotency_key: str | None,
+    user_values: dict[str, Any] | None,
+    check_daily_resume: bool,
+) -> tuple[int, int | None, bool] | None:
+    """SQLite не поддерживает DML внутри CTE: те же шаги отдельными запросами одной транзакции."""
+    now = datetime.now(UTC)
+    row = (
+        await db.execute(
+            _build_update(
+                user_id,
+                delta,
+                require_funds=require_funds,
+                idempotency_key=idempotency_key,
+                user_values=user_values,
+                now=now,
+            ).execution_options(synchronize_session=False)
+        )
+    ).one_or_none()
+    if row is None:
+        return None
+
+    balance_kopeks = row.balance_kopeks
+    transaction_id = None
+    if entry is not None:
+        values = _transaction_values(entry, abs(delta), idempotency_key, now)
+        transaction_id = await db.scalar(
+            insert(Transaction).values(user_id=user_id, **values).returning(Transaction.id)
+        )
+
+    resume_daily = False
+    if check_daily_resume:
+        resume_daily = bool(await db.scalar(select(_daily_resume_check(literal(user_id), literal(balance_kopeks)))))
+    return balance_kopeks, transaction_id, resume_daily
+
+
+async def change_balance(
+    db: AsyncSession,
+    user_id: int,
+    delta: int,
+    *,
+    require_funds: bool = False,
+    entry: LedgerEntry | None = None,
+    idempotency_key: str | None = None,
+    user_values: dict[str, Any] | None = None,
+    check_daily_resume: bool = False,
+) -> BalanceChange:
+    """
+    Атомарно меняет баланс на delta копеек (отрицательное — списание) и записывает entry.
+
+    Не применяется, если пользователя нет, не хватает средств (require_funds) или
+    операция с idempotency_key уже была. Commit — на вызывающем коде.
+    """
+    options = {
+        'require_funds': require_funds,
+        'entry': entry,
+        'idempotency_key': idempotency_key,
+        'user_values': user_values,
+        'check_daily_resume': check_daily_resume,
+    }
+    try:
+        if IS_SQLITE:
+            row = await _change_balance_sqlite(db, user_id, delta, **options)
+        else:
+            row = (
+                await db.execute(
+                    build_balance_change_statement(user_id, delta, **options).execution_options(
+                        synchronize_session=False
+                    )
+                )
+            ).one_or_none()
+    except IntegrityError:
+        if idempotency_key is None:
+            raise
+        # Параллельный повтор той же операции успел раньше — наш запрос откатился целиком
+        await db.rollback()
+        return BalanceChange(applied=False, duplicate=True)
+
+    if row is None:
+        duplicate = idempotency_key is not None and bool(
+            await db.scalar(select(exists().where(Transaction.idempotency_key == idempotency_key)))
+        )
+        return BalanceChange(applied=False, duplicate=duplicate)
+
+    balance_kopeks, transaction_id, resume_daily = row
+    return BalanceChange(
+        applied=True,
+        balance_kopeks=balance_kopeks,
+        transaction_id=transaction_id,
+        resume_daily=bool(resume_daily),
+    )
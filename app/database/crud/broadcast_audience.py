@@ -0,0 +1,192 @@
+"""Сегменты аудитории рассылок, скомпилированные в SQL.
+
+Каждая цель рассылки ('all', 'active', 'expired', 'tariff_3', 'custom_week', ...)
+превращается в один предикат над таблицей users. Один и тот же предикат
+используется и для предпросмотра (COUNT), и для выборки получателей, поэтому
+число в превью всегда совпадает с числом реально отправленных сообщений.
+Получатели выбираются одной колонкой telegram_id через серверный курсор —
+пользователи и их подписки в память не загружаются.
+"""
+
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime, timedelta
+
+import structlog
+from sqlalchemy import ColumnElement, and_, exists, func, not_, or_, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import Subscription, SubscriptionEvent, SubscriptionStatus, User, UserStatus
+
+
+logger = structlog.get_logger(__name__)
+
+AUDIENCE_STREAM_BATCH_SIZE = 5000
+LOW_BALANCE_THRESHOLD_KOPEKS = 10000  # 100 рублей
+
+_EXPIRED_STATUSES = (SubscriptionStatus.EXPIRED.value, SubscriptionStatus.DISABLED.value)
+_INACTIVE_DAYS = {'inactive_30d': 30, 'inactive_60d': 60, 'inactive_90d': 90}
+_EXPIRING_DAYS = {'expiring': 3, 'expiring_subscribers': 7}
+
+
+def _has_subscription(*conditions: ColumnElement) -> ColumnElement:
+    return exists().where(Subscription.user_id == User.id, *conditions)
+
+
+def _active_subscription(now: datetime) -> tuple[ColumnElement, ...]:
+    # То же, что Subscription.is_active
+    return Subscription.status == SubscriptionStatus.ACTIVE.value, Subscription.end_date > now
+
+
+def _zero_traffic() -> ColumnElement:
+    return func.coalesce(Subscription.traffic_used_gb, 0) <= 0
+
+
+def _custom_filter(criteria: str, now: datetime) -> ColumnElement | None:
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if criteria == 'today':
+        return User.created_at >= today
+    if criteria == 'week':
+        return User.created_at >= now - timedelta(days=7)
+    if criteria == 'month':
+        return User.created_at >= now - timedelta(days=30)
+    if criteria == 'active_today':
+        return User.last_activity >= today
+    if criteria == 'inactive_week':
+        return User.last_activity < now - timedelta(days=7)
+    if criteria == 'inactive_month':
+        return User.last_activity < now - timedelta(days=30)
+    if criteria == 'referrals':
+        return User.referred_by_id.isnot(None)
+    if criteria == 'direct':
+        return User.referred_by_id.is_(None)
+    return None
+
+
+def _segment_filter(target: str, now: datetime) -> ColumnElement | None:
+    if target == 'all':
+        return true()
+
+    if target == 'active':
+        return _has_subscription(*_active_subscription(now), Subscription.is_trial.is_(False))
+
+    if target == 'trial':
+        return _has_subscription(Subscription.is_trial.is_(True))
+
+    if target == 'no':
+        return not_(_has_subscription(*_active_subscription(now)))
+
+    if target in _EXPIRING_DAYS:
+        return _has_subscription(
+            *_active_subscription(now),
+            Subscription.end_date <= now + timedelta(days=_EXPIRING_DAYS[target]),
+        )
+
+    if target in ('expired', 'expired_subscribers'):
+        return or_(
+            _has_subscription(or_(Subscription.status.in_(_EXPIRED_STATUSES), Subscription.end_date <= now)),
+            and_(not_(_has_subscription()), User.has_had_paid_subscription.is_(True)),
+        )
+
+    if target == 'active_zero':
+        return _has_subscription(*_active_subscription(now), Subscription.is_trial.is_(False), _zero_traffic())
+
+    if target == 'trial_zero':
+        return _has_subscription(*_active_subscription(now), Subscription.is_trial.is_(True), _zero_traffic())
+
+    if target == 'zero':
+        return _has_subscription(*_active_subscription(now), _zero_traffic())
+
+    if target == 'canceled_subscribers':
+        return _has_subscription(Subscription.status == SubscriptionStatus.DISABLED.value)
+
+    if target == 'trial_ending':
+        return _has_subscription(
+            *_active_subscription(now),
+            Subscription.is_trial.is_(True),
+            Subscription.end_date <= now + timedelta(days=3),
+        )
+
+    if target == 'trial_expired':
+        return _has_subscription(Subscription.is_trial.is_(True), Subscription.end_date <= now)
+
+    if target == 'autopay_failed':
+        return (
+            exists()
+            .where(
+                SubscriptionEvent.user_id == User.id,
+                SubscriptionEvent.event_type == 'autopay_failed',
+                SubscriptionEvent.occurred_at >= now - timedelta(days=7),
+            )
+            .correlate(User)
+        )
+
+    if target == 'low_balance':
+        return and_(User.balance_kopeks > 0, User.balance_kopeks < LOW_BALANCE_THRESHOLD_KOPEKS)
+
+    if target in _INACTIVE_DAYS:
+        return User.last_activity < now - timedelta(days=_INACTIVE_DAYS[target])
+
+    if target.startswith('tariff_'):
+        try:
+            tariff_id = int(target.split('_')[1])
+        except (IndexError, ValueError):
+            return None
+        return _has_subscription(*_active_subscription(now), Subscription.tariff_id == tariff_id)
+
+    if target.startswith('custom_'):
+        return _custom_filter(target[len('custom_') :], now)
+
+    return None
+
+
+def build_audience_filter(target: str, now: datetime | None = None) -> ColumnElement | None:
+    """
+    Полный WHERE-предикат сегмента: активные пользователи с telegram_id + условие цели.
+
+    Возвращает None для неизвестной цели.
+    """
+    segment = _segment_filter(target, now or datetime.now(UTC))
+    if segment is None:
+        return None
+    return and_(User.status == UserStatus.ACTIVE.value, User.telegram_id.isnot(None), segment)
+
+
+async def count_audience(db: AsyncSession, target: str) -> int:
+    audience_filter = build_audience_filter(target)
+    if audience_filter is None:
+        return 0
+    return await db.scalar(select(func.count(User.id)).where(audience_filter)) or 0
+
+
+async def stream_audience_telegram_ids(
+    db: AsyncSession,
+    target: str,
+    batch_size: int = AUDIENCE_STREAM_BATCH_SIZE,
+) -> AsyncIterator[list[int]]:
+    """Отдаёт telegram_id получателей пачками через серверный курсор."""
+    audience_filter = build_audience_filter(target)
+    if audience_filter is None:
+        logger.warning('Неизвестная цель рассылки', target=target)
+        return
+
+    stmt = select(User.telegram_id).where(audience_filter).order_by(User.id).execution_options(yield_per=batch_size)
+    result = await db.stream_scalars(stmt)
+    async for partition in result.partitions():
+        yield list(partition)
+
+
+async def get_audience_telegram_ids(db: AsyncSession, target: str) -> list[int]:
+    telegram_ids: list[int] = []
+    async for batch in stream_audience_telegram_ids(db, target):
+        telegram_ids.extend(batch)
+    return telegram_ids
+
+
+async def get_audience_users(db: AsyncSession, target: str) -> list[User]:
+    """Пользователи сегмента без связей — для мест, где нужны id/язык, а не только telegram_id."""
+    audience_filter = build_audience_filter(target)
+    if audience_filter is None:
+        return []
+    result = await db.execute(select(User).where(audience_filter).order_by(User.id))
+    return list(result.scalars().all())
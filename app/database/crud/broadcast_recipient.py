@@ -0,0 +1,134 @@
+"""Очередь получателей рассылки (broadcast_recipients).
+
+Список получателей материализуется один раз в момент запуска рассылки —
+INSERT ... SELECT по SQL-предикату сегмента. Дальше реплики бота забирают
+пачки через FOR UPDATE SKIP LOCKED (каждый получатель достаётся одной реплике),
+а результат доставки фиксируется в той же строке. Пачка, не подтверждённая
+за BROADCAST_CLAIM_LEASE_SECONDS (реплика упала), снова становится доступной.
+"""
+
+from datetime import UTC, datetime, timedelta
+
+import structlog
+from sqlalchemy import and_, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.crud.broadcast_audience import build_audience_filter
+from app.database.models import BroadcastRecipient, BroadcastRecipientState, User
+
+
+logger = structlog.get_logger(__name__)
+
+_PENDING = BroadcastRecipientState.PENDING.value
+_CLAIMED = BroadcastRecipientState.CLAIMED.value
+
+
+async def materialize_broadcast_recipients(db: AsyncSession, broadcast_id: int, target: str) -> int:
+    """
+    Заполняет очередь получателей сегментом target. Повторный вызов ничего не дублирует.
+
+    Возвращает общее число получателей рассылки.
+    """
+    audience_filter = build_audience_filter(target)
+    if audience_filter is None:
+        logger.warning('Неизвестная цель рассылки', target=target)
+    else:
+        source = select(literal(broadcast_id), User.telegram_id, literal(_PENDING)).where(audience_filter)
+        await db.execute(
+            insert(BroadcastRecipient)
+            .from_select(['broadcast_id', 'telegram_id', 'state'], source)
+            .on_conflict_do_nothing(index_elements=['broadcast_id', 'telegram_id'])
+        )
+
+    return await db.scalar(
+        select(func.count()).select_from(BroadcastRecipient).where(BroadcastRecipient.broadcast_id == broadcast_id)
+    )
+
+
+async def claim_broadcast_recipients(
+    db: AsyncSession,
+    broadcast_id: int,
+    worker_id: str,
+    limit: int,
+    lease_seconds: int,
+) -> list[int]:
+    """Забирает пачку ещё не обработанных получателей (и пачки с истёкшей арендой) за worker_id."""
+    now = datetime.now(UTC)
+    claimable = (
+        select(BroadcastRecipient.telegram_id)
+        .where(
+            BroadcastRecipient.broadcast_id == broadcast_id,
+            or_(
+                BroadcastRecipient.state == _PENDING,
+                and_(
+                    BroadcastRecipient.state == _CLAIMED,
+                    BroadcastRecipient.claimed_at < now - timedelta(seconds=lease_seconds),
+                ),
+            ),
+        )
+        .order_by(BroadcastRecipient.telegram_id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        update(BroadcastRecipient)
+        .where(BroadcastRecipient.broadcast_id == broadcast_id, BroadcastRecipient.telegram_id.in_(claimable))
+        .values(state=_CLAIMED, claimed_by=worker_id, claimed_at=now)
+        .returning(BroadcastRecipient.telegram_id)
+        .execution_options(synchronize_session=False)
+    )
+    return sorted(result.scalars().all())
+
+
+async def ack_broadcast_recipients(
+    db: AsyncSession,
+    broadcast_id: int,
+    worker_id: str,
+    outcomes: dict[int, str],
+) -> None:
+    """
+    Фиксирует результаты доставки. Строки, которые тем временем перехватила
+    другая реплика (истекла аренда), не трогаются.
+    """
+    by_state: dict[str, list[int]] = {}
+    for telegram_id, state in outcomes.items():
+        by_state.setdefault(state, []).append(telegram_id)
+
+    for state, telegram_ids in by_state.items():
+        await db.execute(
+            update(BroadcastRecipient)
+            .where(
+                BroadcastRecipient.broadcast_id == broadcast_id,
+                BroadcastRecipient.telegram_id.in_(telegram_ids),
+                BroadcastRecipient.state == _CLAIMED,
+                BroadcastRecipient.claimed_by == worker_id,
+            )
+            .values(state=state, claimed_by=None, claimed_at=None)
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def release_broadcast_recipients(db: AsyncSession, broadcast_id: int, worker_id: str) -> int:
+    """Возвращает в очередь всё, что worker_id взял, но не отправил (остановка процесса)."""
+    result = await db.execute(
+        update(BroadcastRecipient)
+        .where(
+            BroadcastRecipient.broadcast_id == broadcast_id,
+            BroadcastRecipient.state == _CLAIMED,
+            BroadcastRecipient.claimed_by == worker_id,
+        )
+        .values(state=_PENDING, claimed_by=None, claimed_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount or 0
+
+
+async def count_broadcast_recipients_by_state(db: AsyncSession, broadcast_id: int) -> dict[str, int]:
+    result = await db.execute(
+        select(BroadcastRecipient.state, func.count())
+        .where(BroadcastRecipient.broadcast_id == broadcast_id)
+        .group_by(BroadcastRecipient.state)
+    )
+    return {state: count for state, count in result.all()}
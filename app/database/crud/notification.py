@@ -48,6 +48,29 @@ async def record_notification(
     await db.commit()
 
 
+async def record_notifications(
+    db: AsyncSession,
+    notifications: list[tuple[int, int, str, int | None]],
+) -> None:
+    """Пакетная запись (user_id, subscription_id, notification_type, days_before) одним коммитом.
+
+    В отличие от record_notification не проверяет дубли — вызывающий код
+    передаёт только уведомления, которых ещё нет в sent_notifications.
+    """
+    if not notifications:
+        return
+    db.add_all(
+        SentNotification(
+            user_id=user_id,
+            subscription_id=subscription_id,
+            notification_type=notification_type,
+            days_before=days_before,
+        )
+        for user_id, subscription_id, notification_type, days_before in notifications
+    )
+    await db.commit()
+
+
 async def clear_notifications(db: AsyncSession, subscription_id: int) -> None:
     await db.execute(delete(SentNotification).where(SentNotification.subscription_id == subscription_id))
     await db.commit()
@@ -1,22 +1,28 @@
 import random
+from collections import Counter
 from collections.abc import Iterable, Sequence
 from datetime import UTC, datetime
 
 import structlog
 from sqlalchemy import (
+    ColumnElement,
     String,
     and_,
+    case,
     cast,
     delete,
     func,
+    literal,
     or_,
     select,
-    text,
+    true,
     update,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from app.database.database import IS_SQLITE
 from app.database.models import (
     PromoGroup,
     ServerSquad,
@@ -31,6 +37,53 @@ from app.database.models import (
 logger = structlog.get_logger(__name__)
 
 
+_ACTIVE_SUBSCRIPTION_STATUSES = (SubscriptionStatus.ACTIVE.value, SubscriptionStatus.TRIAL.value)
+
+
+def _connected_squads_jsonb() -> ColumnElement:
+    # Выражение совпадает с индексом ix_subscriptions_connected_squads_gin (миграция 0014)
+    return cast(Subscription.connected_squads, JSONB)
+
+
+def subscription_in_squad(squad_uuid: str) -> ColumnElement:
+    """Условие «подписка подключена к скваду»: containment-запрос по GIN-индексу вместо LIKE по тексту JSON."""
+    if IS_SQLITE:
+        # JSONB и GIN-индекс есть только в PostgreSQL
+        return cast(Subscription.connected_squads, String).like(f'%"{squad_uuid}"%')
+    return _connected_squads_jsonb().contains([squad_uuid])
+
+
+def subscription_in_any_squad(squad_uuids: Iterable[str]) -> ColumnElement:
+    return or_(*(subscription_in_squad(squad_uuid) for squad_uuid in squad_uuids))
+
+
+async def count_active_users_by_squad(db: AsyncSession) -> dict[str, int]:
+    """Число активных и триальных подписок на каждом скваде — один проход с GROUP BY."""
+    if IS_SQLITE:
+        result = await db.execute(
+            select(Subscription.connected_squads).where(Subscription.status.in_(_ACTIVE_SUBSCRIPTION_STATUSES))
+        )
+        counts: Counter[str] = Counter()
+        for (connected_squads,) in result.all():
+            if isinstance(connected_squads, list):
+                counts.update(set(connected_squads))
+        return dict(counts)
+
+    squads = _connected_squads_jsonb()
+    # Не-массивы (NULL, битые значения) разворачиваем как пустой список
+    squads_array = case((func.jsonb_typeof(squads) == 'array', squads), else_=cast(literal('[]'), JSONB))
+    squad = func.jsonb_array_elements_text(squads_array).table_valued('value').render_derived(name='squad')
+
+    result = await db.execute(
+        select(squad.c.value, func.count(func.distinct(Subscription.id)))
+        .select_from(Subscription)
+        .join(squad, true())
+        .where(Subscription.status.in_(_ACTIVE_SUBSCRIPTION_STATUSES))
+        .group_by(squad.c.value)
+    )
+    return {squad_uuid: count for squad_uuid, count in result.all()}
+
+
 async def _get_default_promo_group_id(db: AsyncSession) -> int | None:
     result = await db.execute(select(PromoGroup.id).where(PromoGroup.is_default.is_(True)).limit(1))
     return result.scalar_one_or_none()
@@ -337,14 +390,9 @@ async def sync_with_remnawave(db: AsyncSession, remnawave_squads: list[dict]) ->
             for subscription in subscriptions_result.scalars().unique().all():
                 subscriptions_to_update[subscription.id] = subscription
 
-        for squad_uuid in removed_uuids:
-            if not squad_uuid:
-                continue
-
-            extra_result = await db.execute(
-                select(Subscription).where(text('connected_squads::text LIKE :uuid_pattern')),
-                {'uuid_pattern': f'%"{squad_uuid}"%'},
-            )
+        removed_squad_uuids = [squad_uuid for squad_uuid in removed_uuids if squad_uuid]
+        if removed_squad_uuids:
+            extra_result = await db.execute(select(Subscription).where(subscription_in_any_squad(removed_squad_uuids)))
 
             for subscription in extra_result.scalars().unique().all():
                 subscriptions_to_update[subscription.id] = subscription
@@ -404,7 +452,7 @@ async def get_server_connected_users(db: AsyncSession, server_id: int) -> list[U
     connection_filters = [SubscriptionServer.id.isnot(None)]
 
     if server_uuid:
-        connection_filters.append(cast(Subscription.connected_squads, String).like(f'%"{server_uuid}"%'))
+        connection_filters.append(subscription_in_squad(server_uuid))
 
     result = await db.execute(
         select(User)
@@ -702,23 +750,9 @@ async def get_server_statistics(db: AsyncSession) -> dict:
     available_result = await db.execute(select(func.count(ServerSquad.id)).where(ServerSquad.is_available == True))
     available_servers = available_result.scalar()
 
-    servers_with_connections = 0
     all_servers_result = await db.execute(select(ServerSquad.squad_uuid))
-    all_server_uuids = [row[0] for row in all_servers_result.fetchall()]
-
-    for squad_uuid in all_server_uuids:
-        count_result = await db.execute(
-            text("""
-                SELECT COUNT(s.id)
-                FROM subscriptions s
-                WHERE s.status IN ('active', 'trial')
-                AND s.connected_squads::text LIKE :uuid_pattern
-            """),
-            {'uuid_pattern': f'%"{squad_uuid}"%'},
-        )
-        user_count = count_result.scalar() or 0
-        if user_count > 0:
-            servers_with_connections += 1
+    users_by_squad = await count_active_users_by_squad(db)
+    servers_with_connections = sum(1 for (squad_uuid,) in all_servers_result.all() if users_by_squad.get(squad_uuid))
 
     revenue_result = await db.execute(select(func.coalesce(func.sum(SubscriptionServer.paid_price_kopeks), 0)))
     total_revenue_kopeks = revenue_result.scalar()
@@ -738,13 +772,8 @@ async def count_active_users_for_squad(db: AsyncSession, squad_uuid: str) -> int
 
     result = await db.execute(
         select(func.count(Subscription.id)).where(
-            Subscription.status.in_(
-                [
-                    SubscriptionStatus.ACTIVE.value,
-                    SubscriptionStatus.TRIAL.value,
-                ]
-            ),
-            cast(Subscription.connected_squads, String).like(f'%"{squad_uuid}"%'),
+            Subscription.status.in_(_ACTIVE_SUBSCRIPTION_STATUSES),
+            subscription_in_squad(squad_uuid),
         )
     )
 
@@ -907,18 +936,11 @@ async def sync_server_user_counts(db: AsyncSession) -> int:
 
         logger.info('🔍 Найдено серверов для синхронизации', all_servers_count=len(all_servers))
 
+        users_by_squad = await count_active_users_by_squad(db)
+
         updated_count = 0
         for server_id, squad_uuid in all_servers:
-            count_result = await db.execute(
-                text("""
-                    SELECT COUNT(s.id)
-                    FROM subscriptions s
-                    WHERE s.status IN ('active', 'trial')
-                    AND s.connected_squads::text LIKE :uuid_pattern
-                """),
-                {'uuid_pattern': f'%"{squad_uuid}"%'},
-            )
-            actual_users = count_result.scalar() or 0
+            actual_users = users_by_squad.get(squad_uuid, 0)
 
             logger.info(
                 '📊 Сервер пользователей', server_id=server_id, squad_uuid=squad_uuid[:8], actual_users=actual_users
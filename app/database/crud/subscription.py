@@ -3,7 +3,7 @@ from datetime import UTC, datetime, timedelta
 from typing import Optional
 
 import structlog
-from sqlalchemy import and_, delete, func, select
+from sqlalchemy import and_, delete, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy.orm.exc import StaleDataError
@@ -21,6 +21,7 @@ from app.database.models import (
 )
 from app.utils.pricing_utils import calculate_months_from_days, get_remaining_months
 from app.utils.timezone import format_local_datetime
+from app.utils.user_context_cache import invalidate_user_context
 
 
 logger = structlog.get_logger(__name__)
@@ -988,6 +989,9 @@ async def reset_trials_for_users_without_paid_subscription(db: AsyncSession) ->
         logger.error('Ошибка сохранения сброса триалов', error=error)
         raise
 
+    # Bulk DELETE не проходит через unit of work — сбрасываем кеш контекста явно
+    await invalidate_user_context(user_ids=[subscription.user_id for subscription in subscriptions])
+
     logger.info('♻️ Сброшено триальных подписок', reset_count=reset_count)
     return reset_count
 
@@ -1023,15 +1027,15 @@ async def get_all_subscriptions(db: AsyncSession, page: int = 1, limit: int = 10
 
 async def get_subscriptions_batch(
     db: AsyncSession,
-    offset: int = 0,
+    after_id: int = 0,
     limit: int = 500,
 ) -> list[Subscription]:
-    """Получает подписки пачками для синхронизации. Загружает связанных пользователей."""
+    """Получает подписки пачками для синхронизации (keyset по id). Загружает связанных пользователей."""
     result = await db.execute(
         select(Subscription)
         .options(selectinload(Subscription.user))
+        .where(Subscription.id > after_id)
         .order_by(Subscription.id)
-        .offset(offset)
         .limit(limit)
     )
     return list(result.scalars().all())
@@ -1555,6 +1559,22 @@ async def expire_subscription(db: AsyncSession, subscription: Subscription) -> S
     return subscription
 
 
+async def expire_subscriptions(db: AsyncSession, subscriptions: list[Subscription]) -> int:
+    """Помечает пачку подписок истёкшими одним коммитом (без refresh каждой строки)."""
+    if not subscriptions:
+        return 0
+
+    now = datetime.now(UTC)
+    for subscription in subscriptions:
+        subscription.status = SubscriptionStatus.EXPIRED.value
+        subscription.updated_at = now
+
+    await db.commit()
+
+    logger.info('⏰ Подписки помечены как истёкшие', count=len(subscriptions))
+    return len(subscriptions)
+
+
 async def check_and_update_subscription_status(db: AsyncSession, subscription: Subscription) -> Subscription:
     current_time = datetime.now(UTC)
 
@@ -2065,12 +2085,8 @@ async def resume_daily_subscription(
     return subscription
 
 
-async def update_daily_charge_time(
-    db: AsyncSession,
-    subscription: Subscription,
-    charge_time: datetime = None,
-) -> Subscription:
-    """Обновляет время последнего суточного списания и продлевает подписку на 1 день."""
+def advance_daily_charge(subscription: Subscription, charge_time: datetime = None) -> None:
+    """Сдвигает отметку суточного списания и продлевает подписку на 1 день, без commit."""
     now = charge_time or datetime.now(UTC)
     subscription.last_daily_charge_at = now
 
@@ -2080,6 +2096,14 @@ async def update_daily_charge_time(
         subscription.end_date = new_end_date
         logger.info('📅 Продлена подписка до', subscription_id=subscription.id, new_end_date=new_end_date)
 
+
+async def update_daily_charge_time(
+    db: AsyncSession,
+    subscription: Subscription,
+    charge_time: datetime = None,
+) -> Subscription:
+    """Обновляет время последнего суточного списания и продлевает подписку на 1 день."""
+    advance_daily_charge(subscription, charge_time)
     await db.commit()
     await db.refresh(subscription)
 
@@ -2138,3 +2162,43 @@ async def toggle_daily_subscription_pause(
     if subscription.is_daily_paused:
         return await resume_daily_subscription(db, subscription)
     return await pause_daily_subscription(db, subscription)
+
+
+async def get_user_ids_with_active_paid_subscription(db: AsyncSession, user_ids: Iterable[int]) -> set[int]:
+    """То же условие, что is_active_paid_subscription, одним запросом для набора пользователей."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return set()
+
+    result = await db.execute(
+        select(Subscription.user_id).where(
+            Subscription.user_id.in_(user_ids),
+            Subscription.is_trial.is_(False),
+            Subscription.status == SubscriptionStatus.ACTIVE.value,
+            Subscription.end_date > datetime.now(UTC),
+        )
+    )
+    return set(result.scalars().all())
+
+
+async def disable_active_subscriptions_for_users(db: AsyncSession, user_ids: Iterable[int]) -> list[int]:
+    """
+    Переводит активные и триальные подписки пользователей в DISABLED одним UPDATE.
+
+    Возвращает user_id, чьи подписки были отключены. Коммит — на вызывающем коде.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return []
+
+    result = await db.execute(
+        update(Subscription)
+        .where(
+            Subscription.user_id.in_(user_ids),
+            Subscription.status.in_([SubscriptionStatus.ACTIVE.value, SubscriptionStatus.TRIAL.value]),
+        )
+        .values(status=SubscriptionStatus.DISABLED.value, updated_at=datetime.now(UTC))
+        .returning(Subscription.user_id)
+        .execution_options(synchronize_session=False)
+    )
+    return list(result.scalars().all())
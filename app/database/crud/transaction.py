@@ -28,8 +28,10 @@ REAL_PAYMENT_METHODS = [
 ]
 
 
-async def create_transaction(
+async def on_transaction_created(
     db: AsyncSession,
+    *,
+    transaction_id: int,
     user_id: int,
     type: TransactionType,
     amount_kopeks: int,
@@ -37,24 +39,8 @@ async def create_transaction(
     payment_method: PaymentMethod | None = None,
     external_id: str | None = None,
     is_completed: bool = True,
-    created_at: datetime | None = None,
-) -> Transaction:
-    transaction = Transaction(
-        user_id=user_id,
-        type=type.value,
-        amount_kopeks=amount_kopeks,
-        description=description,
-        payment_method=payment_method.value if payment_method else None,
-        external_id=external_id,
-        is_completed=is_completed,
-        completed_at=datetime.now(UTC) if is_completed else None,
-        **({'created_at': created_at} if created_at else {}),
-    )
-
-    db.add(transaction)
-    await db.commit()
-    await db.refresh(transaction)
-
+) -> None:
+    """Побочные эффекты новой транзакции: событие, автовыдача промогруппы, конкурсы."""
     logger.info(
         '💳 Создана транзакция: на ₽ для пользователя',
         type_value=type.value,
@@ -69,7 +55,7 @@ async def create_transaction(
         await event_emitter.emit(
             'payment.completed' if type == TransactionType.DEPOSIT else 'transaction.created',
             {
-                'transaction_id': transaction.id,
+                'transaction_id': transaction_id,
                 'user_id': user_id,
                 'type': type.value,
                 'amount_kopeks': amount_kopeks,
@@ -104,6 +90,46 @@ async def create_transaction(
         except Exception as exc:
             logger.debug('Не удалось записать событие конкурса для пользователя', user_id=user_id, exc=exc)
 
+
+async def create_transaction(
+    db: AsyncSession,
+    user_id: int,
+    type: TransactionType,
+    amount_kopeks: int,
+    description: str,
+    payment_method: PaymentMethod | None = None,
+    external_id: str | None = None,
+    is_completed: bool = True,
+    created_at: datetime | None = None,
+) -> Transaction:
+    transaction = Transaction(
+        user_id=user_id,
+        type=type.value,
+        amount_kopeks=amount_kopeks,
+        description=description,
+        payment_method=payment_method.value if payment_method else None,
+        external_id=external_id,
+        is_completed=is_completed,
+        completed_at=datetime.now(UTC) if is_completed else None,
+        **({'created_at': created_at} if created_at else {}),
+    )
+
+    db.add(transaction)
+    await db.commit()
+    await db.refresh(transaction)
+
+    await on_transaction_created(
+        db,
+        transaction_id=transaction.id,
+        user_id=user_id,
+        type=type,
+        amount_kopeks=amount_kopeks,
+        description=description,
+        payment_method=payment_method,
+        external_id=external_id,
+        is_completed=is_completed,
+    )
+
     return transaction
 
 
@@ -1,16 +1,20 @@
 import secrets
 import string
 from datetime import UTC, datetime, timedelta
+from functools import partial
 
 import structlog
-from sqlalchemy import and_, case, func, nullslast, or_, select, text
+from sqlalchemy import and_, case, func, nullslast, or_, select, text, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
+from app.database.crud.balance_ledger import BalanceChange, LedgerEntry, change_balance
 from app.database.crud.discount_offer import get_latest_claimed_offer_for_user
 from app.database.crud.promo_group import get_default_promo_group
 from app.database.crud.promo_offer_log import log_promo_offer_action
+from app.database.database import AsyncSessionLocal, run_after_commit
 from app.database.models import (
     PaymentMethod,
     PromoGroup,
@@ -22,6 +26,7 @@ from app.database.models import (
     UserPromoGroup,
     UserStatus,
 )
+from app.utils.user_context_cache import invalidate_user_context, mark_user_context_changed
 from app.utils.validators import sanitize_telegram_name
 
 
@@ -382,90 +387,158 @@ async def update_user(db: AsyncSession, user: User, **kwargs) -> User:
     user.updated_at = datetime.now(UTC)
     await db.commit()
     await db.refresh(user)
+    await invalidate_user_context(telegram_ids=[user.telegram_id])
 
     return user
 
 
-async def add_user_balance(
+async def _resume_daily_subscription_after_topup(user_id: int) -> None:
+    """Возобновляет приостановленную суточную подписку, если после пополнения хватает баланса."""
+    from app.database.crud.subscription import get_subscription_by_user_id, resume_daily_subscription
+
+    async with AsyncSessionLocal() as db:
+        subscription = await get_subscription_by_user_id(db, user_id)
+        if not subscription or subscription.status != SubscriptionStatus.DISABLED.value:
+            return
+        if not subscription.is_daily_tariff:
+            return
+        daily_price = subscription.daily_price_kopeks
+        if daily_price <= 0 or subscription.user.balance_kopeks < daily_price:
+            return
+
+        await resume_daily_subscription(db, subscription)
+        logger.info(
+            '✅ Автоматически возобновлена суточная подписка после пополнения баланса (user_id=)',
+            subscription_id=subscription.id,
+            user_id=user_id,
+        )
+        # Синхронизируем с RemnaWave
+        try:
+            from app.services.subscription_service import SubscriptionService
+
+            subscription_service = SubscriptionService()
+            await subscription_service.update_remnawave_user(db, subscription)
+        except Exception as sync_err:
+            logger.warning('Не удалось синхронизировать с RemnaWave', sync_err=sync_err)
+
+
+async def credit_user_balance(
     db: AsyncSession,
     user: User,
     amount_kopeks: int,
     description: str = 'Пополнение баланса',
     create_transaction: bool = True,
     transaction_type: TransactionType = TransactionType.DEPOSIT,
-    bot=None,
     payment_method: PaymentMethod | None = None,
-) -> bool:
-    try:
-        old_balance = user.balance_kopeks
-        user.balance_kopeks += amount_kopeks
-        user.updated_at = datetime.now(UTC)
+    *,
+    external_id: str | None = None,
+    idempotency_key: str | None = None,
+) -> BalanceChange:
+    """
+    Пополняет баланс одним атомарным UPDATE вместе с записью транзакции.
 
-        if create_transaction:
-            from app.database.crud.transaction import create_transaction as create_trans
+    Возвращает BalanceChange: повтор платежа с тем же idempotency_key — duplicate=True,
+    пользователь не найден — applied=False без duplicate. Ошибка БД пробрасывается после
+    отката, чтобы платёжный webhook мог ответить ошибкой и получить повторную доставку.
+    """
+    entry = None
+    if create_transaction:
+        entry = LedgerEntry(transaction_type, description, payment_method, external_id)
 
-            await create_trans(
-                db=db,
-                user_id=user.id,
-                type=transaction_type,
-                amount_kopeks=amount_kopeks,
-                description=description,
-                payment_method=payment_method,
-            )
+    old_balance = user.balance_kopeks
+    try:
+        change = await change_balance(
+            db,
+            user.id,
+            amount_kopeks,
+            entry=entry,
+            idempotency_key=idempotency_key if create_transaction else None,
+            check_daily_resume=True,
+        )
+        if not change.applied:
+            if change.duplicate:
+                logger.info(
+                    'Пополнение уже было применено, повтор пропущен',
+                    user_id=user.id,
+                    idempotency_key=idempotency_key,
+                )
+            else:
+                logger.error('Пользователь для пополнения баланса не найден', user_id=user.id)
+            return change
+
+        mark_user_context_changed(db, telegram_id=user.telegram_id, user_id=user.id)
+        # Автоматическое возобновление приостановленной суточной подписки — после commit, своей сессией
+        if change.resume_daily:
+            run_after_commit(db, partial(_resume_daily_subscription_after_topup, user.id))
 
         await db.commit()
-        await db.refresh(user)
+    except Exception as e:
+        logger.error('Ошибка изменения баланса пользователя', user_id=user.id, error=e)
+        await db.rollback()
+        raise
 
-        user_id_display = user.telegram_id or user.email or f'#{user.id}'
-        logger.info(
-            '💰 Баланс пользователя изменен: → (изменение: +)',
-            user_id_display=user_id_display,
-            old_balance=old_balance,
-            balance_kopeks=user.balance_kopeks,
+    set_committed_value(user, 'balance_kopeks', change.balance_kopeks)
+
+    user_id_display = user.telegram_id or user.email or f'#{user.id}'
+    logger.info(
+        '💰 Баланс пользователя изменен: → (изменение: +)',
+        user_id_display=user_id_display,
+        old_balance=old_balance,
+        balance_kopeks=change.balance_kopeks,
+        amount_kopeks=amount_kopeks,
+    )
+
+    if change.transaction_id is not None:
+        from app.database.crud.transaction import on_transaction_created
+
+        await on_transaction_created(
+            db,
+            transaction_id=change.transaction_id,
+            user_id=user.id,
+            type=transaction_type,
             amount_kopeks=amount_kopeks,
+            description=description,
+            payment_method=payment_method,
+            external_id=external_id,
         )
 
-        # Автоматическое возобновление приостановленной суточной подписки
-        try:
-            from app.database.crud.subscription import get_subscription_by_user_id, resume_daily_subscription
-            from app.database.crud.tariff import get_tariff_by_id
-            from app.database.models import SubscriptionStatus
-
-            # Загружаем подписку явно, чтобы избежать lazy loading
-            subscription = await get_subscription_by_user_id(db, user.id)
-            if subscription and subscription.status == SubscriptionStatus.DISABLED.value:
-                # Проверяем что это суточный тариф
-                is_daily = getattr(subscription, 'is_daily_tariff', False)
-                if is_daily and subscription.tariff_id:
-                    # Загружаем тариф явно
-                    tariff = await get_tariff_by_id(db, subscription.tariff_id)
-                    if tariff:
-                        daily_price = getattr(tariff, 'daily_price_kopeks', 0)
-                        # Если баланс достаточный для суточной оплаты - возобновляем
-                        if daily_price > 0 and user.balance_kopeks >= daily_price:
-                            await resume_daily_subscription(db, subscription)
-                            logger.info(
-                                '✅ Автоматически возобновлена суточная подписка после пополнения баланса (user_id=)',
-                                subscription_id=subscription.id,
-                                user_id=user.id,
-                            )
-                            # Синхронизируем с RemnaWave
-                            try:
-                                from app.services.subscription_service import SubscriptionService
-
-                                subscription_service = SubscriptionService()
-                                await subscription_service.update_remnawave_user(db, subscription)
-                            except Exception as sync_err:
-                                logger.warning('Не удалось синхронизировать с RemnaWave', sync_err=sync_err)
-        except Exception as resume_err:
-            logger.warning('Ошибка при попытке возобновить суточную подписку', resume_err=resume_err)
-
-        return True
+    return change
 
-    except Exception as e:
-        logger.error('Ошибка изменения баланса пользователя', user_id=user.id, error=e)
-        await db.rollback()
+
+async def add_user_balance(
+    db: AsyncSession,
+    user: User,
+    amount_kopeks: int,
+    description: str = 'Пополнение баланса',
+    create_transaction: bool = True,
+    transaction_type: TransactionType = TransactionType.DEPOSIT,
+    bot=None,
+    payment_method: PaymentMethod | None = None,
+    *,
+    external_id: str | None = None,
+    idempotency_key: str | None = None,
+) -> bool:
+    """
+    Пополняет баланс (см. credit_user_balance).
+
+    Возвращает False, если пополнение не применено: повтор по idempotency_key,
+    пользователь не найден или ошибка БД.
+    """
+    try:
+        change = await credit_user_balance(
+            db,
+            user,
+            amount_kopeks,
+            description,
+            create_transaction,
+            transaction_type,
+            payment_method,
+            external_id=external_id,
+            idempotency_key=idempotency_key,
+        )
+    except Exception:
         return False
+    return change.applied
 
 
 async def add_user_balance_by_id(
@@ -496,7 +569,7 @@ async def add_user_balance_by_id(
         return False
 
 
-async def subtract_user_balance(
+async def debit_user_balance(
     db: AsyncSession,
     user: User,
     amount_kopeks: int,
@@ -505,7 +578,17 @@ async def subtract_user_balance(
     payment_method: PaymentMethod | None = None,
     *,
     consume_promo_offer: bool = False,
-) -> bool:
+    transaction_type: TransactionType = TransactionType.WITHDRAWAL,
+    idempotency_key: str | None = None,
+) -> BalanceChange:
+    """
+    Списывает средства одним атомарным UPDATE с условием balance_kopeks >= amount.
+
+    Строка пользователя не блокируется: параллельные пополнения и списания не ждут
+    друг друга, а баланс не уходит в минус. Изменения других объектов сессии
+    фиксируются тем же commit, что и списание. Повтор с тем же idempotency_key —
+    duplicate=True; ошибка БД пробрасывается после отката.
+    """
     user_id_display = user.telegram_id or user.email or f'#{user.id}'
     logger.info('💸 ОТЛАДКА subtract_user_balance:')
     logger.info('👤 User ID: (ID: )', user_id=user.id, user_id_display=user_id_display)
@@ -513,11 +596,8 @@ async def subtract_user_balance(
     logger.info('💸 Сумма к списанию: копеек', amount_kopeks=amount_kopeks)
     logger.info('📝 Описание', description=description)
 
-    # Lock the user row to prevent concurrent balance race conditions
-    locked_result = await db.execute(select(User).where(User.id == user.id).with_for_update())
-    user = locked_result.scalar_one()
-
     log_context: dict[str, object] | None = None
+    user_values: dict[str, object] | None = None
     if consume_promo_offer:
         try:
             current_percent = int(getattr(user, 'promo_offer_discount_percent', 0) or 0)
@@ -526,6 +606,11 @@ async def subtract_user_balance(
 
         if current_percent > 0:
             source = getattr(user, 'promo_offer_discount_source', None)
+            user_values = {
+                'promo_offer_discount_percent': 0,
+                'promo_offer_discount_source': None,
+                'promo_offer_discount_expires_at': None,
+            }
             log_context = {
                 'offer_id': None,
                 'percent': current_percent,
@@ -551,40 +636,46 @@ async def subtract_user_balance(
                 if not log_context['percent'] and offer.discount_percent:
                     log_context['percent'] = offer.discount_percent
 
-    if user.balance_kopeks < amount_kopeks:
-        logger.error('   ❌ НЕДОСТАТОЧНО СРЕДСТВ!')
-        return False
+    entry = None
+    if create_transaction:
+        entry = LedgerEntry(transaction_type, description, payment_method)
 
     try:
         old_balance = user.balance_kopeks
-        user.balance_kopeks -= amount_kopeks
-
-        if consume_promo_offer and getattr(user, 'promo_offer_discount_percent', 0):
-            user.promo_offer_discount_percent = 0
-            user.promo_offer_discount_source = None
-            user.promo_offer_discount_expires_at = None
-
-        user.updated_at = datetime.now(UTC)
+        change = await change_balance(
+            db,
+            user.id,
+            -amount_kopeks,
+            require_funds=True,
+            entry=entry,
+            idempotency_key=idempotency_key if create_transaction else None,
+            user_values=user_values,
+        )
+        if not change.applied:
+            if change.duplicate:
+                logger.warning('Списание уже было применено, повтор пропущен', idempotency_key=idempotency_key)
+            else:
+                logger.error('   ❌ НЕДОСТАТОЧНО СРЕДСТВ!')
+            return change
+
+        mark_user_context_changed(db, telegram_id=user.telegram_id, user_id=user.id)
+        await db.commit()
+        set_committed_value(user, 'balance_kopeks', change.balance_kopeks)
+        for key, value in (user_values or {}).items():
+            set_committed_value(user, key, value)
 
-        if create_transaction:
-            from app.database.crud.transaction import (
-                create_transaction as create_trans,
-            )
+        if change.transaction_id is not None:
+            from app.database.crud.transaction import on_transaction_created
 
-            # create_trans commits the session, atomically persisting
-            # both the balance change and the transaction record
-            await create_trans(
-                db=db,
+            await on_transaction_created(
+                db,
+                transaction_id=change.transaction_id,
                 user_id=user.id,
-                type=TransactionType.WITHDRAWAL,
+                type=transaction_type,
                 amount_kopeks=amount_kopeks,
                 description=description,
                 payment_method=payment_method,
             )
-        else:
-            await db.commit()
-
-        await db.refresh(user)
 
         if consume_promo_offer and log_context:
             try:
@@ -610,13 +701,48 @@ async def subtract_user_balance(
                         rollback_error=rollback_error,
                     )
 
-        logger.info('✅ Средства списаны: →', old_balance=old_balance, balance_kopeks=user.balance_kopeks)
-        return True
+        logger.info('✅ Средства списаны: →', old_balance=old_balance, balance_kopeks=change.balance_kopeks)
+        return change
 
     except Exception as e:
         logger.error('❌ ОШИБКА СПИСАНИЯ', error=e)
         await db.rollback()
+        raise
+
+
+async def subtract_user_balance(
+    db: AsyncSession,
+    user: User,
+    amount_kopeks: int,
+    description: str,
+    create_transaction: bool = False,
+    payment_method: PaymentMethod | None = None,
+    *,
+    consume_promo_offer: bool = False,
+    transaction_type: TransactionType = TransactionType.WITHDRAWAL,
+    idempotency_key: str | None = None,
+) -> bool:
+    """
+    Списывает средства (см. debit_user_balance).
+
+    Возвращает False, если списание не применено: не хватает средств, повтор
+    по idempotency_key или ошибка БД.
+    """
+    try:
+        change = await debit_user_balance(
+            db,
+            user,
+            amount_kopeks,
+            description,
+            create_transaction,
+            payment_method,
+            consume_promo_offer=consume_promo_offer,
+            transaction_type=transaction_type,
+            idempotency_key=idempotency_key,
+        )
+    except Exception:
         return False
+    return change.applied
 
 
 async def cleanup_expired_promo_offer_discounts(db: AsyncSession) -> int:
@@ -989,6 +1115,7 @@ async def delete_user(db: AsyncSession, user: User) -> bool:
     user.updated_at = datetime.now(UTC)
 
     await db.commit()
+    await invalidate_user_context(telegram_ids=[user.telegram_id])
     user_id_display = user.telegram_id or user.email or f'#{user.id}'
     logger.info('🗑️ Пользователь помечен как удаленный', user_id_display=user_id_display)
     return True
@@ -1357,3 +1484,23 @@ async def create_user_by_oauth(
         logger.warning('Failed to emit user.created event', error=error)
 
     return user
+
+
+async def block_users_by_telegram_ids(db: AsyncSession, telegram_ids: list[int]) -> list[tuple[int, int, str | None]]:
+    """
+    Помечает пользователей BLOCKED одним UPDATE ... RETURNING.
+
+    Возвращает (user_id, telegram_id, remnawave_uuid) только тех, кто ещё не был заблокирован.
+    Коммит — на вызывающем коде.
+    """
+    if not telegram_ids:
+        return []
+
+    result = await db.execute(
+        update(User)
+        .where(User.telegram_id.in_(telegram_ids), User.status != UserStatus.BLOCKED.value)
+        .values(status=UserStatus.BLOCKED.value, updated_at=datetime.now(UTC))
+        .returning(User.id, User.telegram_id, User.remnawave_uuid)
+        .execution_options(synchronize_session=False)
+    )
+    return [tuple(row) for row in result.all()]
@@ -10,6 +10,7 @@ from sqlalchemy import bindparam, event, text
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import InterfaceError, OperationalError
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
 from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
 from app.config import settings
@@ -404,6 +405,51 @@ class BatchOperations:
 
 batch_ops = BatchOperations()
 
+# ============================================================================
+# AFTER-COMMIT HOOKS
+# ============================================================================
+
+_AFTER_COMMIT_KEY = 'after_commit_callbacks'
+_after_commit_tasks: set[asyncio.Task] = set()
+
+
+def run_after_commit(session: AsyncSession, callback: Callable[[], Awaitable[None]]) -> None:
+    """
+    Запускает callback фоновой задачей после успешного commit сессии.
+
+    При rollback callback отбрасывается. Callback не должен использовать эту сессию —
+    ему нужна своя (AsyncSessionLocal).
+    """
+    session.info.setdefault(_AFTER_COMMIT_KEY, []).append(callback)
+
+
+def _log_after_commit_error(task: asyncio.Task) -> None:
+    _after_commit_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error('Ошибка after-commit задачи', error=task.exception())
+
+
+@event.listens_for(Session, 'after_commit')
+def _run_after_commit_callbacks(session):
+    callbacks = session.info.pop(_AFTER_COMMIT_KEY, None)
+    if not callbacks:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        logger.warning('After-commit задачи пропущены: нет запущенного event loop', count=len(callbacks))
+        return
+    for callback in callbacks:
+        task = loop.create_task(callback())
+        _after_commit_tasks.add(task)
+        task.add_done_callback(_log_after_commit_error)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_commit_callbacks(session):
+    session.info.pop(_AFTER_COMMIT_KEY, None)
+
+
 # ============================================================================
 # INITIALIZATION AND CLEANUP
 # ============================================================================
@@ -27,6 +27,7 @@ from sqlalchemy import (
     Time,
     TypeDecorator,
     UniqueConstraint,
+    cast,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
@@ -1207,6 +1208,18 @@ class Subscription(Base):
         'TrafficPurchase', back_populates='subscription', passive_deletes=True, cascade='all, delete-orphan'
     )
 
+    # Keyset-обход изменённых подписок для дельта-синхронизации с панелью
+    __table_args__ = (
+        Index('ix_subscriptions_updated_at_id', 'updated_at', 'id'),
+        # Членство в скваде: containment-запросы (connected_squads::jsonb @> '["uuid"]')
+        Index(
+            'ix_subscriptions_connected_squads_gin',
+            cast(connected_squads, JSONB).label('connected_squads_jsonb'),
+            postgresql_using='gin',
+            postgresql_ops={'connected_squads_jsonb': 'jsonb_path_ops'},
+        ).ddl_if(dialect='postgresql'),
+    )
+
     @property
     def is_active(self) -> bool:
         current_time = datetime.now(UTC)
@@ -1392,6 +1405,8 @@ class Transaction(Base):
 
     payment_method = Column(String(50), nullable=True)
     external_id = Column(String(255), nullable=True)
+    # Ключ идемпотентности изменения баланса: одна операция не применяется дважды
+    idempotency_key = Column(String(255), nullable=True, unique=True, index=True)
 
     is_completed = Column(Boolean, default=True)
 
@@ -1989,9 +2004,34 @@ class BroadcastHistory(Base):
     email_subject = Column(String(255), nullable=True)
     email_html_content = Column(Text, nullable=True)
 
+    # Кнопки клавиатуры — чтобы продолжить рассылку после перезапуска
+    selected_buttons = Column(JSON, nullable=True)
+
     admin = relationship('User', back_populates='broadcasts')
 
 
+class BroadcastRecipientState(Enum):
+    PENDING = 'pending'
+    CLAIMED = 'claimed'
+    SENT = 'sent'
+    FAILED = 'failed'
+    BLOCKED = 'blocked'
+
+
+class BroadcastRecipient(Base):
+    """Получатель рассылки и состояние доставки ему (очередь задания рассылки)."""
+
+    __tablename__ = 'broadcast_recipients'
+
+    broadcast_id = Column(Integer, ForeignKey('broadcast_history.id', ondelete='CASCADE'), primary_key=True)
+    telegram_id = Column(BigInteger, primary_key=True)
+    state = Column(String(16), nullable=False, default=BroadcastRecipientState.PENDING.value)
+    claimed_by = Column(String(64), nullable=True)
+    claimed_at = Column(AwareDateTime(), nullable=True)
+
+    __table_args__ = (Index('ix_broadcast_recipients_broadcast_state', 'broadcast_id', 'state'),)
+
+
 class Poll(Base):
     __tablename__ = 'polls'
 
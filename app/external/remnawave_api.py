@@ -231,6 +231,98 @@ class RemnaWaveAPIError(Exception):
         super().__init__(self.message)
 
 
+class RemnaWaveConnectionPool:
+    """Общие долгоживущие aiohttp-сессии для RemnaWaveAPI.
+
+    Раньше каждый ``async with RemnaWaveAPI(...)`` создавал свой TCPConnector и
+    ClientSession, и каждый вызов панели платил за новый TCP/TLS handshake.
+    Пул держит одну сессию на набор параметров подключения (URL, заголовки, куки, SSL)
+    с keep-alive, лимитом соединений на хост и кешем DNS. HTTP/2 aiohttp не поддерживает.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.limit = 100
+        self.limit_per_host = 50
+        self.keepalive_timeout = 60.0
+        self.dns_cache_ttl = 300
+        self._sessions: dict[tuple, aiohttp.ClientSession] = {}
+        self._lock: asyncio.Lock | None = None
+
+    def configure(
+        self,
+        *,
+        enabled: bool = True,
+        limit: int = 100,
+        limit_per_host: int = 50,
+        keepalive_timeout: float = 60.0,
+        dns_cache_ttl: int = 300,
+    ) -> None:
+        self.enabled = enabled
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+
+    def build_connector(self, ssl_context: ssl.SSLContext | None = None) -> aiohttp.TCPConnector:
+        connector_kwargs: dict[str, Any] = {}
+        if ssl_context is not None:
+            connector_kwargs['ssl'] = ssl_context
+        if not self.enabled:
+            return aiohttp.TCPConnector(**connector_kwargs)
+        return aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+            **connector_kwargs,
+        )
+
+    async def acquire(self, key: tuple, factory) -> aiohttp.ClientSession:
+        """Возвращает живую сессию для ключа, создавая её при первом обращении."""
+        loop = asyncio.get_running_loop()
+        pool_key = (id(loop), *key)
+        session = self._sessions.get(pool_key)
+        if session is not None and not session.closed:
+            return session
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            session = self._sessions.get(pool_key)
+            if session is None or session.closed:
+                session = factory()
+                self._sessions[pool_key] = session
+                logger.info('Создана пуловая сессия RemnaWave API', base_url=key[0])
+            return session
+
+    def stats(self) -> list[dict[str, Any]]:
+        result = []
+        for key, session in self._sessions.items():
+            connector = session.connector
+            result.append(
+                {
+                    'base_url': key[1],
+                    'closed': session.closed,
+                    'limit': connector.limit if connector else None,
+                    'limit_per_host': connector.limit_per_host if connector else None,
+                }
+            )
+        return result
+
+    async def close(self) -> None:
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            if not session.closed:
+                await session.close()
+        if sessions:
+            logger.info('Пуловые сессии RemnaWave API закрыты', count=len(sessions))
+
+
+remnawave_connection_pool = RemnaWaveConnectionPool()
+
+
 class RemnaWaveAPI:
     def __init__(
         self,
@@ -250,6 +342,7 @@ class RemnaWaveAPI:
         self.caddy_token = caddy_token
         self.auth_type = auth_type.lower() if auth_type else 'api_key'
         self.session: aiohttp.ClientSession | None = None
+        self._owns_session = False
         self.authenticated = False
 
     def _detect_connection_type(self) -> str:
@@ -324,7 +417,7 @@ class RemnaWaveAPI:
                 cookies = {self.secret_key: self.secret_key}
                 logger.debug('Используем куки: =***', secret_key=self.secret_key)
 
-        connector_kwargs = {}
+        ssl_context = None
 
         if conn_type == 'local':
             logger.debug('Используют локальные заголовки proxy')
@@ -334,31 +427,45 @@ class RemnaWaveAPI:
                 ssl_context = ssl.create_default_context()
                 ssl_context.check_hostname = False
                 ssl_context.verify_mode = ssl.CERT_NONE
-                connector_kwargs['ssl'] = ssl_context
                 logger.debug('SSL проверка отключена для локального HTTPS')
 
         elif conn_type == 'external':
             logger.debug('Используют внешнее подключение с полной SSL проверкой')
 
-        connector = aiohttp.TCPConnector(**connector_kwargs)
-
-        session_kwargs = {
-            'timeout': aiohttp.ClientTimeout(total=60, connect=10),
-            'headers': headers,
-            'connector': connector,
-        }
-
-        if cookies:
-            session_kwargs['cookies'] = cookies
+        pool = remnawave_connection_pool
+
+        def create_session() -> aiohttp.ClientSession:
+            session_kwargs = {
+                'timeout': aiohttp.ClientTimeout(total=60, connect=10),
+                'headers': headers,
+                'connector': pool.build_connector(ssl_context),
+            }
+            if cookies:
+                session_kwargs['cookies'] = cookies
+            return aiohttp.ClientSession(**session_kwargs)
+
+        if pool.enabled:
+            # Сессия общая для всех клиентов с теми же параметрами: __aexit__ её не закрывает
+            pool_key = (
+                self.base_url,
+                tuple(sorted(headers.items())),
+                tuple(sorted(cookies.items())) if cookies else (),
+                ssl_context is not None,
+            )
+            self.session = await pool.acquire(pool_key, create_session)
+            self._owns_session = False
+        else:
+            self.session = create_session()
+            self._owns_session = True
 
-        self.session = aiohttp.ClientSession(**session_kwargs)
         self.authenticated = True
 
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
+        if self.session and self._owns_session:
             await self.session.close()
+        self.session = None
 
     async def _make_request(
         self, method: str, endpoint: str, data: dict | None = None, params: dict | None = None
@@ -645,8 +752,17 @@ class RemnaWaveAPI:
                 return []
             raise
 
-    async def get_all_users(self, start: int = 0, size: int = 100, enrich_happ_links: bool = False) -> dict[str, Any]:
+    async def get_all_users(
+        self,
+        start: int = 0,
+        size: int = 100,
+        enrich_happ_links: bool = False,
+        sorting: list[dict[str, Any]] | None = None,
+    ) -> dict[str, Any]:
         params = {'start': start, 'size': size}
+        if sorting:
+            # Формат панели: [{"id": "updatedAt", "desc": true}]
+            params['sorting'] = json.dumps(sorting)
         response = await self._make_request('GET', '/api/users', params=params)
 
         users = [self._parse_user(user) for user in response['response']['users']]
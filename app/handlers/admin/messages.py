@@ -6,21 +6,19 @@ import structlog
 from aiogram import Dispatcher, F, types
 from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import and_, func, or_, select
+from sqlalchemy import and_, func, select
 from sqlalchemy.exc import InterfaceError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
-from app.database.crud.subscription import get_expiring_subscriptions
+from app.database.crud.broadcast_audience import count_audience, get_audience_telegram_ids, get_audience_users
 from app.database.crud.tariff import get_all_tariffs
-from app.database.crud.user import get_users_list
 from app.database.database import AsyncSessionLocal
 from app.database.models import (
     BroadcastHistory,
     Subscription,
     SubscriptionStatus,
     User,
-    UserStatus,
 )
 from app.keyboards.admin import (
     BROADCAST_BUTTON_ROWS,
@@ -43,6 +41,7 @@ from app.services.pinned_message_service import (
     set_active_pinned_message,
     unpin_active_pinned_message,
 )
+from app.services.telegram_send_scheduler import telegram_send_scheduler
 from app.states import AdminStates
 from app.utils.decorators import admin_required, error_handler
 from app.utils.miniapp_buttons import BUTTON_KEY_TO_CABINET_PATH, build_miniapp_or_callback_button
@@ -1288,17 +1287,10 @@ async def confirm_broadcast(callback: types.CallbackQuery, db_user: User, state:
         parse_mode='HTML',
     )
 
-    # Загружаем пользователей и сразу извлекаем telegram_id в список
-    # чтобы не обращаться к ORM-объектам во время долгой рассылки
-    if target.startswith('custom_'):
-        users_orm = await get_custom_users(db, target.replace('custom_', ''))
-    else:
-        users_orm = await get_target_users(db, target)
-
-    # Извлекаем только telegram_id - это всё что нужно для отправки
-    # Фильтруем None (email-only пользователи)
-    recipient_telegram_ids: list[int] = [user.telegram_id for user in users_orm if user.telegram_id is not None]
-    total_users_count = len(users_orm)
+    # Выбираем только telegram_id (email-only пользователи отсекаются в SQL),
+    # чтобы не держать ORM-объекты во время долгой рассылки
+    recipient_telegram_ids: list[int] = await get_audience_telegram_ids(db, target)
+    total_users_count = len(recipient_telegram_ids)
 
     # Создаём запись истории рассылки
     broadcast_history = BroadcastHistory(
@@ -1332,102 +1324,39 @@ async def confirm_broadcast(callback: types.CallbackQuery, db_user: User, state:
 
     broadcast_keyboard = create_broadcast_keyboard(selected_buttons, admin_language)
 
-    # =========================================================================
-    # Rate limiting: Telegram допускает ~30 msg/sec для бота.
-    # Используем batch_size=25 + 1 сек задержка между батчами = ~25 msg/sec
-    # с запасом, чтобы не получать FloodWait.
-    # Semaphore=25 — все сообщения батча отправляются параллельно.
-    # =========================================================================
-    _BATCH_SIZE = 25
-    _BATCH_DELAY = 1.0  # секунда между батчами
-    _MAX_SEND_RETRIES = 3
-    # Обновляем прогресс каждые N батчей (не каждое сообщение — иначе FloodWait на edit_text)
-    _PROGRESS_UPDATE_INTERVAL = max(1, 500 // _BATCH_SIZE)  # ~каждые 500 сообщений
     # Минимальный интервал между обновлениями прогресса (секунды)
     _PROGRESS_MIN_INTERVAL = 5.0
 
-    # Глобальная пауза при FloodWait — тормозим ВСЕ отправки, а не один слот семафора
-    flood_wait_until: float = 0.0
-
-    async def send_single_broadcast(telegram_id: int) -> bool:
-        """Отправляет одно сообщение. Возвращает True при успехе."""
-        nonlocal flood_wait_until
-
-        for attempt in range(_MAX_SEND_RETRIES):
-            # Глобальная пауза при FloodWait
-            now = asyncio.get_event_loop().time()
-            if flood_wait_until > now:
-                await asyncio.sleep(flood_wait_until - now)
-
-            try:
-                if has_media and media_file_id:
-                    send_method = {
-                        'photo': callback.bot.send_photo,
-                        'video': callback.bot.send_video,
-                        'document': callback.bot.send_document,
-                    }.get(media_type)
-                    if send_method:
-                        media_kwarg = {
-                            'photo': 'photo',
-                            'video': 'video',
-                            'document': 'document',
-                        }[media_type]
-                        await send_method(
-                            chat_id=telegram_id,
-                            **{media_kwarg: media_file_id},
-                            caption=message_text,
-                            parse_mode='HTML',
-                            reply_markup=broadcast_keyboard,
-                        )
-                    else:
-                        # Неизвестный media_type — отправляем как текст
-                        await callback.bot.send_message(
-                            chat_id=telegram_id,
-                            text=message_text,
-                            parse_mode='HTML',
-                            reply_markup=broadcast_keyboard,
-                        )
-                else:
-                    await callback.bot.send_message(
-                        chat_id=telegram_id,
-                        text=message_text,
-                        parse_mode='HTML',
-                        reply_markup=broadcast_keyboard,
-                    )
-                return True
-
-            except TelegramRetryAfter as e:
-                # Глобальная пауза — тормозим все корутины
-                wait_seconds = e.retry_after + 1
-                flood_wait_until = asyncio.get_event_loop().time() + wait_seconds
-                logger.warning(
-                    'FloodWait: Telegram просит подождать сек (пользователь , попытка /)',
-                    retry_after=e.retry_after,
-                    telegram_id=telegram_id,
-                    attempt=attempt + 1,
-                    MAX_SEND_RETRIES=_MAX_SEND_RETRIES,
-                )
-                await asyncio.sleep(wait_seconds)
-
-            except TelegramForbiddenError:
-                return False
-
-            except TelegramBadRequest as e:
-                logger.debug('BadRequest при рассылке пользователю', telegram_id=telegram_id, e=e)
-                return False
-
-            except Exception as e:
-                logger.error(
-                    'Ошибка отправки пользователю (попытка /)',
-                    telegram_id=telegram_id,
-                    attempt=attempt + 1,
-                    MAX_SEND_RETRIES=_MAX_SEND_RETRIES,
-                    e=e,
+    async def send_single_broadcast(telegram_id: int) -> None:
+        """Отправляет одно сообщение. FloodWait и сетевые ошибки разбирает telegram_send_scheduler."""
+        if has_media and media_file_id:
+            send_method = {
+                'photo': callback.bot.send_photo,
+                'video': callback.bot.send_video,
+                'document': callback.bot.send_document,
+            }.get(media_type)
+            if send_method:
+                media_kwarg = {
+                    'photo': 'photo',
+                    'video': 'video',
+                    'document': 'document',
+                }[media_type]
+                await send_method(
+                    chat_id=telegram_id,
+                    **{media_kwarg: media_file_id},
+                    caption=message_text,
+                    parse_mode='HTML',
+                    reply_markup=broadcast_keyboard,
                 )
-                if attempt < _MAX_SEND_RETRIES - 1:
-                    await asyncio.sleep(0.5 * (attempt + 1))
+                return
 
-        return False
+        # Без медиа или неизвестный media_type — отправляем как текст
+        await callback.bot.send_message(
+            chat_id=telegram_id,
+            text=message_text,
+            parse_mode='HTML',
+            reply_markup=broadcast_keyboard,
+        )
 
     # =========================================================================
     # Прогресс-бар в реальном времени (как в сканере заблокированных)
@@ -1500,33 +1429,23 @@ async def confirm_broadcast(callback: types.CallbackQuery, db_user: User, state:
     await _update_progress_message(0, 0)
 
     # =========================================================================
-    # Основной цикл рассылки — батчами по _BATCH_SIZE
+    # Основной цикл рассылки — через общий планировщик отправки
+    # (лимит бота ~30 msg/sec делится с уведомлениями, общая пауза при FloodWait)
     # =========================================================================
-    for batch_idx, i in enumerate(range(0, total_recipients, _BATCH_SIZE)):
-        batch = recipient_telegram_ids[i : i + _BATCH_SIZE]
-
-        # Отправляем батч параллельно
-        results = await asyncio.gather(
-            *[send_single_broadcast(tid) for tid in batch],
-            return_exceptions=True,
-        )
-
-        for result in results:
-            if isinstance(result, bool):
-                if result:
-                    sent_count += 1
-                else:
-                    failed_count += 1
-            elif isinstance(result, Exception):
-                failed_count += 1
-                logger.error('Необработанное исключение в рассылке', result=result)
-
-        # Обновляем прогресс каждые _PROGRESS_UPDATE_INTERVAL батчей
-        if batch_idx % _PROGRESS_UPDATE_INTERVAL == 0:
-            await _update_progress_message(sent_count, failed_count)
+    async for telegram_id, error in telegram_send_scheduler.deliver(
+        recipient_telegram_ids,
+        lambda telegram_id: lambda: send_single_broadcast(telegram_id),
+    ):
+        if error is None:
+            sent_count += 1
+        else:
+            failed_count += 1
+            if isinstance(error, TelegramForbiddenError | TelegramBadRequest):
+                logger.debug('Не удалось доставить рассылку пользователю', telegram_id=telegram_id, error=error)
+            else:
+                logger.error('Ошибка отправки пользователю', telegram_id=telegram_id, error=error)
 
-        # Задержка между батчами для соблюдения rate limits
-        await asyncio.sleep(_BATCH_DELAY)
+        await _update_progress_message(sent_count, failed_count)
 
     # Учитываем пропущенных email-only пользователей
     skipped_email_users = total_users_count - total_recipients
@@ -1611,439 +1530,20 @@ async def confirm_broadcast(callback: types.CallbackQuery, db_user: User, state:
 
 
 async def get_target_users_count(db: AsyncSession, target: str) -> int:
-    """Быстрый подсчёт пользователей через SQL COUNT вместо загрузки всех в память."""
-    from datetime import datetime, timedelta
-
-    from sqlalchemy import distinct, func as sql_func
-
-    base_filter = User.status == UserStatus.ACTIVE.value
-
-    if target == 'all':
-        query = select(sql_func.count(User.id)).where(base_filter)
-        result = await db.execute(query)
-        return result.scalar() or 0
-
-    if target == 'active':
-        # Активные платные подписки (не триал)
-        query = (
-            select(sql_func.count(distinct(User.id)))
-            .join(Subscription, User.id == Subscription.user_id)
-            .where(
-                base_filter,
-                Subscription.status == SubscriptionStatus.ACTIVE.value,
-                Subscription.is_trial == False,
-            )
-        )
-        result = await db.execute(query)
-        return result.scalar() or 0
-
-    if target == 'trial':
-        # Триальные подписки (без проверки is_active, как в оригинале)
-        query = (
-            select(sql_func.count(distinct(User.id)))
-            .join(Subscription, User.id == Subscription.user_id)
-            .where(
-                base_filter,
-                Subscription.is_trial == True,
-            )
-        )
-        result = await db.execute(query)
-        return result.scalar() or 0
-
-    if target == 'no':
-        # Без активной подписки - используем NOT EXISTS для корректности
-        subquery = (
-            select(Subscription.id)
-            .where(
-                Subscription.user_id == User.id,
-                Subscription.status == SubscriptionStatus.ACTIVE.value,
-            )
-            .exists()
-        )
-        query = select(sql_func.count(User.id)).where(base_filter, ~subquery)
-        result = await db.execute(query)
-        return result.scalar() or 0
-
-    if target == 'expiring':
-        # Истекающие в ближайшие 3 дня
-        now = datetime.utcnow()
-        expiry_threshold = now + timedelta(days=3)
-        query = (
-            select(sql_func.count(distinct(User.id)))
-            .join(Subscription, User.id == Subscription.user_id)
-            .where(
-                base_filter,
-                Subscription.status == SubscriptionStatus.ACTIVE.value,
-                Subscription.end_date <= expiry_threshold,
-                Subscription.end_date > now,
-            )
-        )
-        result = await db.execute(query)
-        return result.scalar() or 0
-
-    if target == 'expiring_subscribers':
-        # Истекающие в ближайшие 7 дней
-        now = datetime.utcnow()
-        expiry_threshold = now + timedelta(days=7)
-        query = (
-            select(sql_func.count(distinct(User.id)))
-            .join(Subscription, User.id == Subscription.user_id)
-            .where(
-                base_filter,
-                Subscription.status == SubscriptionStatus.ACTIVE.value,
-                Subscription.end_date <= expiry_threshold,
-                Subscription.end_date > now,
-            )
-        )
-        result = await db.execute(query)
-        return result.scalar() or 0
-
-    if target == 'expired':
-        # Истекшие подписки
-        now = datetime.utcnow()
-        expired_statuses = [SubscriptionStatus.EXPIRED.value, SubscriptionStatus.DISABLED.value]
-        query = (
-            select(sql_func.count(distinct(User.id)))
-            .outerjoin(Subscription, User.id == Subscription.user_id)
-            .where(
-                base_filter,
-                or_(
-                    Subscription.status.in_(expired_statuses),
-                    and_(Subscription.end_date <= now, Subscription.status != SubscriptionStatus.ACTIVE.value),
-                    and_(Subscription.id == None, User.has_had_paid_subscription == True),
-                ),
-            )
-        )
-        result = await db.execute(query)
-        return result.scalar() or 0
-
-    if target == 'expired_subscribers':
-        # То же что и expired
-        now = datetime.utcnow()
-        expired_statuses = [SubscriptionStatus.EXPIRED.value, SubscriptionStatus.DISABLED.value]
-        query = (
-            select(sql_func.count(distinct(User.id)))
-            .outerjoin(Subscription, User.id == Subscription.user_id)
-            .where(
-                base_filter,
-                or_(
-                    Subscription.status.in_(expired_statuses),
-                    and_(Subscription.end_date <= now, Subscription.status != SubscriptionStatus.ACTIVE.value),
-                    and_(Subscription.id == None, User.has_had_paid_subscription == True),
-                ),
-            )
-        )
-        result = await db.execute(query)
-        return result.scalar() or 0
-
-    if target == 'active_zero':
-        # Активные платные с нулевым трафиком
-        query = (
-            select(sql_func.count(distinct(User.id)))
-            .join(Subscription, User.id == Subscription.user_id)
-            .where(
-                base_filter,
-                Subscription.status == SubscriptionStatus.ACTIVE.value,
-                Subscription.is_trial == False,
-                or_(Subscription.traffic_used_gb == None, Subscription.traffic_used_gb <= 0),
-            )
-        )
-        result = await db.execute(query)
-        return result.scalar() or 0
-
-    if target == 'trial_zero':
-        # Триальные с нулевым трафиком
-        query = (
-            select(sql_func.count(distinct(User.id)))
-            .join(Subscription, User.id == Subscription.user_id)
-            .where(
-                base_filter,
-                Subscription.is_trial == True,
-                Subscription.status == SubscriptionStatus.ACTIVE.value,
-                or_(Subscription.traffic_used_gb == None, Subscription.traffic_used_gb <= 0),
-            )
-        )
-        result = await db.execute(query)
-        return result.scalar() or 0
-
-    if target == 'zero':
-        # Все активные с нулевым трафиком
-        query = (
-            select(sql_func.count(distinct(User.id)))
-            .join(Subscription, User.id == Subscription.user_id)
-            .where(
-                base_filter,
-                Subscription.status == SubscriptionStatus.ACTIVE.value,
-                or_(Subscription.traffic_used_gb == None, Subscription.traffic_used_gb <= 0),
-            )
-        )
-        result = await db.execute(query)
-        return result.scalar() or 0
-
-    # Фильтр по тарифу
-    if target.startswith('tariff_'):
-        tariff_id = int(target.split('_')[1])
-        query = (
-            select(sql_func.count(distinct(User.id)))
-            .join(Subscription, User.id == Subscription.user_id)
-            .where(
-                base_filter,
-                Subscription.status == SubscriptionStatus.ACTIVE.value,
-                Subscription.tariff_id == tariff_id,
-            )
-        )
-        result = await db.execute(query)
-        return result.scalar() or 0
-
-    # Custom filters — быстрый COUNT вместо загрузки всех пользователей
-    if target.startswith('custom_'):
-        now = datetime.utcnow()
-        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        criteria = target[len('custom_') :]
-
-        if criteria == 'today':
-            query = select(sql_func.count(User.id)).where(base_filter, User.created_at >= today)
-        elif criteria == 'week':
-            query = select(sql_func.count(User.id)).where(base_filter, User.created_at >= now - timedelta(days=7))
-        elif criteria == 'month':
-            query = select(sql_func.count(User.id)).where(base_filter, User.created_at >= now - timedelta(days=30))
-        elif criteria == 'active_today':
-            query = select(sql_func.count(User.id)).where(base_filter, User.last_activity >= today)
-        elif criteria == 'inactive_week':
-            query = select(sql_func.count(User.id)).where(base_filter, User.last_activity < now - timedelta(days=7))
-        elif criteria == 'inactive_month':
-            query = select(sql_func.count(User.id)).where(base_filter, User.last_activity < now - timedelta(days=30))
-        elif criteria == 'referrals':
-            query = select(sql_func.count(User.id)).where(base_filter, User.referred_by_id.isnot(None))
-        elif criteria == 'direct':
-            query = select(sql_func.count(User.id)).where(base_filter, User.referred_by_id.is_(None))
-        else:
-            return 0
-
-        result = await db.execute(query)
-        return result.scalar() or 0
-
-    return 0
+    """Размер сегмента: тот же SQL-предикат, что и при выборке получателей."""
+    return await count_audience(db, target)
 
 
 async def get_target_users(db: AsyncSession, target: str) -> list:
-    # Загружаем всех активных пользователей батчами, чтобы не ограничиваться 10к
-    users: list[User] = []
-    offset = 0
-    batch_size = 5000
-
-    while True:
-        batch = await get_users_list(
-            db,
-            offset=offset,
-            limit=batch_size,
-            status=UserStatus.ACTIVE,
-        )
-
-        if not batch:
-            break
-
-        users.extend(batch)
-        offset += batch_size
-
-    if target == 'all':
-        return users
-
-    if target == 'active':
-        return [
-            user
-            for user in users
-            if user.subscription and user.subscription.is_active and not user.subscription.is_trial
-        ]
-
-    if target == 'trial':
-        return [user for user in users if user.subscription and user.subscription.is_trial]
-
-    if target == 'no':
-        return [user for user in users if not user.subscription or not user.subscription.is_active]
-
-    if target == 'expiring':
-        expiring_subs = await get_expiring_subscriptions(db, 3)
-        return [sub.user for sub in expiring_subs if sub.user]
-
-    if target == 'expired':
-        now = datetime.utcnow()
-        expired_statuses = {
-            SubscriptionStatus.EXPIRED.value,
-            SubscriptionStatus.DISABLED.value,
-        }
-        expired_users = []
-        for user in users:
-            subscription = user.subscription
-            if subscription:
-                if subscription.status in expired_statuses:
-                    expired_users.append(user)
-                    continue
-                if subscription.end_date <= now and not subscription.is_active:
-                    expired_users.append(user)
-                    continue
-            elif user.has_had_paid_subscription:
-                expired_users.append(user)
-        return expired_users
-
-    if target == 'active_zero':
-        return [
-            user
-            for user in users
-            if user.subscription
-            and not user.subscription.is_trial
-            and user.subscription.is_active
-            and (user.subscription.traffic_used_gb or 0) <= 0
-        ]
-
-    if target == 'trial_zero':
-        return [
-            user
-            for user in users
-            if user.subscription
-            and user.subscription.is_trial
-            and user.subscription.is_active
-            and (user.subscription.traffic_used_gb or 0) <= 0
-        ]
-
-    if target == 'zero':
-        return [
-            user
-            for user in users
-            if user.subscription and user.subscription.is_active and (user.subscription.traffic_used_gb or 0) <= 0
-        ]
-
-    if target == 'expiring_subscribers':
-        expiring_subs = await get_expiring_subscriptions(db, 7)
-        return [sub.user for sub in expiring_subs if sub.user]
-
-    if target == 'expired_subscribers':
-        now = datetime.utcnow()
-        expired_statuses = {
-            SubscriptionStatus.EXPIRED.value,
-            SubscriptionStatus.DISABLED.value,
-        }
-        expired_users = []
-        for user in users:
-            subscription = user.subscription
-            if subscription:
-                if subscription.status in expired_statuses:
-                    expired_users.append(user)
-                    continue
-                if subscription.end_date <= now and not subscription.is_active:
-                    expired_users.append(user)
-                    continue
-            elif user.has_had_paid_subscription:
-                expired_users.append(user)
-        return expired_users
-
-    if target == 'canceled_subscribers':
-        return [
-            user
-            for user in users
-            if user.subscription and user.subscription.status == SubscriptionStatus.DISABLED.value
-        ]
-
-    if target == 'trial_ending':
-        now = datetime.utcnow()
-        in_3_days = now + timedelta(days=3)
-        return [
-            user
-            for user in users
-            if user.subscription
-            and user.subscription.is_trial
-            and user.subscription.is_active
-            and user.subscription.end_date <= in_3_days
-        ]
-
-    if target == 'trial_expired':
-        now = datetime.utcnow()
-        return [
-            user
-            for user in users
-            if user.subscription and user.subscription.is_trial and user.subscription.end_date <= now
-        ]
-
-    if target == 'autopay_failed':
-        from app.database.models import SubscriptionEvent
-
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        stmt = (
-            select(SubscriptionEvent.user_id)
-            .where(
-                and_(
-                    SubscriptionEvent.event_type == 'autopay_failed',
-                    SubscriptionEvent.occurred_at >= week_ago,
-                )
-            )
-            .distinct()
-        )
-        result = await db.execute(stmt)
-        failed_user_ids = set(result.scalars().all())
-        return [user for user in users if user.id in failed_user_ids]
-
-    if target == 'low_balance':
-        threshold_kopeks = 10000  # 100 рублей
-        return [
-            user for user in users if (user.balance_kopeks or 0) < threshold_kopeks and (user.balance_kopeks or 0) > 0
-        ]
-
-    if target == 'inactive_30d':
-        threshold = datetime.utcnow() - timedelta(days=30)
-        return [user for user in users if user.last_activity and user.last_activity < threshold]
-
-    if target == 'inactive_60d':
-        threshold = datetime.utcnow() - timedelta(days=60)
-        return [user for user in users if user.last_activity and user.last_activity < threshold]
-
-    if target == 'inactive_90d':
-        threshold = datetime.utcnow() - timedelta(days=90)
-        return [user for user in users if user.last_activity and user.last_activity < threshold]
-
-    # Фильтр по тарифу
-    if target.startswith('tariff_'):
-        tariff_id = int(target.split('_')[1])
-        return [
-            user
-            for user in users
-            if user.subscription and user.subscription.is_active and user.subscription.tariff_id == tariff_id
-        ]
-
-    return []
+    return await get_audience_users(db, target)
 
 
 async def get_custom_users_count(db: AsyncSession, criteria: str) -> int:
-    users = await get_custom_users(db, criteria)
-    return len(users)
+    return await count_audience(db, f'custom_{criteria}')
 
 
 async def get_custom_users(db: AsyncSession, criteria: str) -> list:
-    now = datetime.utcnow()
-    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    week_ago = now - timedelta(days=7)
-    month_ago = now - timedelta(days=30)
-
-    if criteria == 'today':
-        stmt = select(User).where(and_(User.status == 'active', User.created_at >= today))
-    elif criteria == 'week':
-        stmt = select(User).where(and_(User.status == 'active', User.created_at >= week_ago))
-    elif criteria == 'month':
-        stmt = select(User).where(and_(User.status == 'active', User.created_at >= month_ago))
-    elif criteria == 'active_today':
-        stmt = select(User).where(and_(User.status == 'active', User.last_activity >= today))
-    elif criteria == 'inactive_week':
-        stmt = select(User).where(and_(User.status == 'active', User.last_activity < week_ago))
-    elif criteria == 'inactive_month':
-        stmt = select(User).where(and_(User.status == 'active', User.last_activity < month_ago))
-    elif criteria == 'referrals':
-        stmt = select(User).where(and_(User.status == 'active', User.referred_by_id.isnot(None)))
-    elif criteria == 'direct':
-        stmt = select(User).where(and_(User.status == 'active', User.referred_by_id.is_(None)))
-    else:
-        return []
-
-    result = await db.execute(stmt)
-    return result.scalars().all()
+    return await get_audience_users(db, f'custom_{criteria}')
 
 
 async def get_users_statistics(db: AsyncSession) -> dict:
@@ -149,6 +149,11 @@ def _build_auto_sync_view(status: RemnaWaveAutoSyncStatus, texts) -> tuple[str,
         if status.is_running
         else texts.t('ADMIN_RW_AUTO_SYNC_WAITING', 'Ожидание')
     )
+    if status.is_running and status.progress:
+        running_text += texts.t('ADMIN_RW_AUTO_SYNC_PROGRESS', ' ({processed}/{total})').format(
+            processed=status.progress.get('processed', 0),
+            total=status.progress.get('total') or '?',
+        )
     toggle_text = (
         texts.t('ADMIN_SERVER_DISABLE', '❌ Отключить')
         if status.enabled
@@ -483,25 +483,12 @@ async def process_yookassa_sbp_payment_amount(
         qr_photo = None
         if qr_confirmation_data:
             try:
-                # Импортируем необходимые модули для генерации QR-кода
-                from io import BytesIO
-
-                import qrcode
                 from aiogram.types import BufferedInputFile
 
-                # Создаем QR-код из полученных данных
-                qr = qrcode.QRCode(version=1, box_size=10, border=5)
-                qr.add_data(qr_confirmation_data)
-                qr.make(fit=True)
-
-                img = qr.make_image(fill_color='black', back_color='white')
-
-                # Сохраняем изображение в байты
-                img_bytes = BytesIO()
-                img.save(img_bytes, format='PNG')
-                img_bytes.seek(0)
+                from app.utils.qr_code import render_qr_png_async
 
-                qr_photo = BufferedInputFile(img_bytes.getvalue(), filename='qrcode.png')
+                # Создаем QR-код из полученных данных (в пуле CPU-задач, не блокируя event loop)
+                qr_photo = BufferedInputFile(await render_qr_png_async(qr_confirmation_data), filename='qrcode.png')
             except ImportError:
                 logger.warning('qrcode библиотека не установлена, QR-код не будет сгенерирован')
             except Exception as e:
@@ -510,25 +497,12 @@ async def process_yookassa_sbp_payment_amount(
         # Если нет QR-данных из YooKassa, но есть URL, генерируем QR-код из URL
         if not qr_photo and confirmation_url:
             try:
-                # Импортируем необходимые модули для генерации QR-кода
-                from io import BytesIO
-
-                import qrcode
                 from aiogram.types import BufferedInputFile
 
-                # Создаем QR-код из URL
-                qr = qrcode.QRCode(version=1, box_size=10, border=5)
-                qr.add_data(confirmation_url)
-                qr.make(fit=True)
-
-                img = qr.make_image(fill_color='black', back_color='white')
-
-                # Сохраняем изображение в байты
-                img_bytes = BytesIO()
-                img.save(img_bytes, format='PNG')
-                img_bytes.seek(0)
+                from app.utils.qr_code import render_qr_png_async
 
-                qr_photo = BufferedInputFile(img_bytes.getvalue(), filename='qrcode.png')
+                # Создаем QR-код из URL (в пуле CPU-задач, не блокируя event loop)
+                qr_photo = BufferedInputFile(await render_qr_png_async(confirmation_url), filename='qrcode.png')
             except ImportError:
                 logger.warning('qrcode библиотека не установлена, QR-код не будет сгенерирован')
             except Exception as e:
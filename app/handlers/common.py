@@ -2,11 +2,11 @@ import structlog
 from aiogram import Dispatcher, F, types
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.models import User
 from app.keyboards.inline import get_back_keyboard
 from app.localization.texts import get_rules, get_texts
+from app.utils.user_context_cache import UserContext
 
 
 logger = structlog.get_logger(__name__)
@@ -72,64 +72,67 @@ async def handle_unknown_callback(callback: types.CallbackQuery, db_user: User):
     )
 
 
-async def handle_noop(callback: types.CallbackQuery, db_user: User):
+async def handle_noop(callback: types.CallbackQuery):
     try:
         await callback.answer()
     except Exception:
         pass
 
 
-async def handle_current_page(callback: types.CallbackQuery, db_user: User):
+async def handle_current_page(callback: types.CallbackQuery):
     try:
         await callback.answer()
     except Exception:
         pass
 
 
-async def handle_cancel(callback: types.CallbackQuery, state: FSMContext, db_user: User):
-    texts = get_texts(db_user.language)
+async def handle_cancel(callback: types.CallbackQuery, state: FSMContext, user_context: UserContext):
+    texts = get_texts(user_context.language)
 
     await state.clear()
-    await callback.message.edit_text(texts.OPERATION_CANCELLED, reply_markup=get_back_keyboard(db_user.language))
+    await callback.message.edit_text(texts.OPERATION_CANCELLED, reply_markup=get_back_keyboard(user_context.language))
     await callback.answer()
 
 
 async def handle_unknown_message(
     message: types.Message,
-    db_user: User | None = None,
+    user_context: UserContext | None = None,
 ):
-    texts = get_texts(db_user.language if db_user else 'ru')
+    language = user_context.language if user_context else 'ru'
+    texts = get_texts(language)
 
     await message.answer(
         texts.t(
             'UNKNOWN_COMMAND_MESSAGE',
             '❓ Не понимаю эту команду. Используйте кнопки меню.',
         ),
-        reply_markup=get_back_keyboard(db_user.language if db_user else 'ru'),
+        reply_markup=get_back_keyboard(language),
     )
 
 
-async def show_rules(callback: types.CallbackQuery, db_user: User, db: AsyncSession):
-    get_texts(db_user.language)
-
-    rules_text = await get_rules(db_user.language)
+async def show_rules(callback: types.CallbackQuery, user_context: UserContext):
+    rules_text = await get_rules(user_context.language)
 
-    await callback.message.edit_text(rules_text, reply_markup=get_back_keyboard(db_user.language))
+    await callback.message.edit_text(rules_text, reply_markup=get_back_keyboard(user_context.language))
     await callback.answer()
 
 
+# Хендлеры только читают снимок пользователя: AuthMiddleware не загружает для них ORM-модель
+READ_ONLY_FLAGS = {'user_context': True}
+
+
 def register_handlers(dp: Dispatcher):
     # Удаление уведомлений
-    dp.callback_query.register(handle_delete_ban_notification, F.data == 'ban_notify:delete')
-    dp.callback_query.register(handle_webhook_notification_close, F.data == 'webhook:close')
+    dp.callback_query.register(handle_delete_ban_notification, F.data == 'ban_notify:delete', flags=READ_ONLY_FLAGS)
+    dp.callback_query.register(handle_webhook_notification_close, F.data == 'webhook:close', flags=READ_ONLY_FLAGS)
 
-    dp.callback_query.register(show_rules, F.data == 'menu_rules')
+    dp.callback_query.register(show_rules, F.data == 'menu_rules', flags=READ_ONLY_FLAGS)
 
     # No-op utility handlers used in many keyboards
-    dp.callback_query.register(handle_noop, F.data == 'noop')
-    dp.callback_query.register(handle_current_page, F.data == 'current_page')
+    dp.callback_query.register(handle_noop, F.data == 'noop', flags=READ_ONLY_FLAGS)
+    dp.callback_query.register(handle_current_page, F.data == 'current_page', flags=READ_ONLY_FLAGS)
 
-    dp.callback_query.register(handle_cancel, F.data.in_(['cancel', 'subscription_cancel']))
+    dp.callback_query.register(handle_cancel, F.data.in_(['cancel', 'subscription_cancel']), flags=READ_ONLY_FLAGS)
 
     # Самый последний: ловим любые неизвестные текстовые сообщения
     # Исключаем специальные сервисные события (например, успешные платежи),
@@ -140,4 +143,5 @@ def register_handlers(dp: Dispatcher):
         F.successful_payment.is_(None),
         F.text.is_not(None),
         ~F.text.startswith('/'),
+        flags=READ_ONLY_FLAGS,
     )
@@ -33,6 +33,7 @@ from app.services.subscription_checkout_service import (
     should_offer_checkout_resume,
 )
 from app.services.support_settings_service import SupportSettingsService
+from app.services.user_activity_service import user_activity_tracker
 from app.services.user_cart_service import user_cart_service
 from app.utils.photo_message import edit_or_answer_photo
 from app.utils.pricing_utils import format_period_description
@@ -165,8 +166,7 @@ async def show_main_menu(
 
     texts = get_texts(db_user.language)
 
-    db_user.last_activity = datetime.now(UTC)
-    await db.commit()
+    user_activity_tracker.touch(db_user.id)
 
     has_active_subscription = bool(db_user.subscription and db_user.subscription.is_active)
     subscription_is_active = False
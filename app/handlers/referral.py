@@ -16,6 +16,7 @@ from app.localization.texts import get_texts
 from app.services.admin_notification_service import AdminNotificationService
 from app.services.referral_withdrawal_service import referral_withdrawal_service
 from app.states import ReferralWithdrawalStates
+from app.utils.cpu_executor import run_cpu_bound
 from app.utils.photo_message import edit_or_answer_photo
 from app.utils.user_utils import (
     get_detailed_referral_list,
@@ -225,8 +226,7 @@ async def show_referral_qr(
 
     file_path = qr_dir / f'{db_user.id}.png'
     if not file_path.exists():
-        img = qrcode.make(referral_link)
-        img.save(file_path)
+        await run_cpu_bound('qr', lambda: qrcode.make(referral_link).save(file_path))
 
     photo = FSInputFile(file_path)
     keyboard = types.InlineKeyboardMarkup(
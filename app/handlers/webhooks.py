@@ -3,10 +3,10 @@ from aiogram import Bot, types
 from aiohttp import web
 
 from app.config import settings
-from app.database.crud.transaction import create_transaction, get_transaction_by_external_id
-from app.database.crud.user import add_user_balance, get_user_by_id
+from app.database.crud.transaction import get_transaction_by_external_id
+from app.database.crud.user import credit_user_balance, get_user_by_id
 from app.database.database import AsyncSessionLocal
-from app.database.models import PaymentMethod, TransactionType
+from app.database.models import PaymentMethod
 from app.external.tribute import TributeService
 from app.localization.texts import get_texts
 
@@ -56,7 +56,8 @@ async def tribute_webhook(request):
 
                     if user:
                         texts = get_texts(user.language if user.language else settings.DEFAULT_LANGUAGE)
-                        await add_user_balance(
+                        # Одно зачисление вместе с транзакцией; ключ защищает от повторной доставки webhook
+                        change = await credit_user_balance(
                             db,
                             user,
                             processed_data['amount_kopeks'],
@@ -64,20 +65,17 @@ async def tribute_webhook(request):
                                 'WEBHOOK_TRIBUTE_TOPUP_WITH_PAYMENT_ID',
                                 'Пополнение через Tribute: {payment_id}',
                             ).format(payment_id=processed_data['payment_id']),
-                        )
-
-                        await create_transaction(
-                            db=db,
-                            user_id=user.id,
-                            type=TransactionType.DEPOSIT,
-                            amount_kopeks=processed_data['amount_kopeks'],
-                            description=texts.t(
-                                'WEBHOOK_TRIBUTE_TOPUP_DESCRIPTION',
-                                'Пополнение через Tribute',
-                            ),
                             payment_method=PaymentMethod.TRIBUTE,
                             external_id=processed_data['payment_id'],
+                            idempotency_key=f'tribute:{processed_data["payment_id"]}',
                         )
+                        if change.duplicate:
+                            logger.info('Платеж уже обработан', processed_data=processed_data['payment_id'])
+                            return web.Response(status=200, text='Already processed')
+                        if not change.applied:
+                            # Ответ с ошибкой — Tribute доставит webhook повторно
+                            logger.warning('Tribute платеж не зачислен', payment_id=processed_data['payment_id'])
+                            return web.Response(status=500, text='Internal error')
 
                         logger.info('✅ Обработан Tribute платеж', processed_data=processed_data['payment_id'])
 
@@ -120,7 +118,7 @@ async def handle_successful_payment(message: types.Message):
 
                     if user:
                         texts = get_texts(user.language if user.language else settings.DEFAULT_LANGUAGE)
-                        await add_user_balance(
+                        change = await credit_user_balance(
                             db,
                             user,
                             amount_kopeks,
@@ -128,20 +126,20 @@ async def handle_successful_payment(message: types.Message):
                                 'WEBHOOK_STARS_TOPUP_DESCRIPTION',
                                 'Пополнение через Telegram Stars',
                             ),
-                        )
-
-                        await create_transaction(
-                            db=db,
-                            user_id=user.id,
-                            type=TransactionType.DEPOSIT,
-                            amount_kopeks=amount_kopeks,
-                            description=texts.t(
-                                'WEBHOOK_STARS_TOPUP_DESCRIPTION',
-                                'Пополнение через Telegram Stars',
-                            ),
                             payment_method=PaymentMethod.TELEGRAM_STARS,
                             external_id=payment.telegram_payment_charge_id,
+                            idempotency_key=f'stars:{payment.telegram_payment_charge_id}',
                         )
+                        if change.duplicate:
+                            logger.info(
+                                'Stars платеж уже обработан',
+                                telegram_payment_charge_id=payment.telegram_payment_charge_id,
+                            )
+                            return
+                        if not change.applied:
+                            raise RuntimeError(
+                                f'Stars payment {payment.telegram_payment_charge_id} was not credited to user {user_id}'
+                            )
 
                         await message.answer(
                             texts.t(
@@ -163,9 +161,12 @@ async def handle_successful_payment(message: types.Message):
                 except Exception as e:
                     logger.error('Ошибка обработки Stars платежа', error=e)
                     await db.rollback()
+                    # Платёж не должен потеряться молча: ошибка уходит в обработчик ошибок aiogram
+                    raise
 
     except Exception as e:
         logger.error('Ошибка в обработчике Stars платежа', error=e)
+        raise
 
 
 async def handle_pre_checkout_query(pre_checkout_query: types.PreCheckoutQuery):
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import marshal
 import os
+import re
 import shutil
+import sys
 import tempfile
 from functools import cache
 from pathlib import Path
@@ -20,6 +24,12 @@ _FALLBACK_LANGUAGE = 'ru'
 _BASE_DIR = Path(__file__).resolve().parent
 _DEFAULT_LOCALES_DIR = _BASE_DIR / 'locales'
 
+# Версия формата скомпилированных бандлов: при изменении старые файлы пересобираются
+_BUNDLE_FORMAT_VERSION = 1
+_BUNDLE_SUFFIX = '.bundle'
+_LOCALE_EXTENSIONS = ('.json', '.yml', '.yaml')
+_LANGUAGE_CODE_RE = re.compile(r'[a-z0-9]+(?:[-_][a-z0-9]+)*')
+
 
 def _normalize_language_code(value: Any) -> str:
     if isinstance(value, str):
@@ -133,6 +143,44 @@ def _determine_default_language() -> str:
 DEFAULT_LANGUAGE = _determine_default_language()
 
 
+@cache
+def _known_languages() -> frozenset[str]:
+    """Языки из AVAILABLE_LANGUAGES и файлов локалей: только из них строятся пути к файлам и бандлам."""
+    try:
+        languages = {_normalize_language_code(lang) for lang in settings.get_available_languages()}
+    except Exception as error:  # pragma: no cover - defensive logging
+        _logger.warning('Failed to load available languages from settings', error=error)
+        languages = set()
+
+    for directory in (_DEFAULT_LOCALES_DIR, _resolve_user_locales_dir()):
+        try:
+            languages.update(
+                _normalize_language_code(path.stem)
+                for path in directory.iterdir()
+                if path.suffix.lower() in _LOCALE_EXTENSIONS
+            )
+        except OSError:
+            continue
+
+    return frozenset(lang for lang in languages if _LANGUAGE_CODE_RE.fullmatch(lang))
+
+
+def resolve_language(language: Any) -> str:
+    """
+    Код языка в каноническом виде: по нему кешируются локали и экземпляры Texts.
+    Неизвестный код (в том числе пришедший из запроса) заменяется языком по умолчанию,
+    поэтому кеши и бандлы на диске не растут от произвольных значений.
+    """
+    code = _normalize_language_code(language)
+    known = _known_languages()
+    if code in known:
+        return code
+    base = re.split(r'[-_]', code, maxsplit=1)[0]
+    if base in known:
+        return base
+    return DEFAULT_LANGUAGE
+
+
 def _normalize_key(raw_key: Any) -> str:
     key = str(raw_key).strip().replace(' ', '_')
     return key.upper()
@@ -285,9 +333,7 @@ def _merge_dicts(base: dict[str, Any], overrides: dict[str, Any]) -> dict[str, A
     return result
 
 
-@cache
-def load_locale(language: str) -> dict[str, Any]:
-    language = language or DEFAULT_LANGUAGE
+def _read_locale(language: str) -> dict[str, Any]:
     defaults = _load_default_locale(language)
     overrides = _load_user_locale(language)
     merged = _merge_dicts(defaults, overrides)
@@ -296,9 +342,135 @@ def load_locale(language: str) -> dict[str, Any]:
         _logger.warning(
             'Locale not found. Falling back to default language .', language=language, DEFAULT_LANGUAGE=DEFAULT_LANGUAGE
         )
-        return load_locale(DEFAULT_LANGUAGE)
+        return _read_locale(DEFAULT_LANGUAGE)
     return merged
 
 
+def load_locale(language: str) -> dict[str, Any]:
+    return _load_locale(resolve_language(language))
+
+
+@cache
+def _load_locale(language: str) -> dict[str, Any]:
+    return _read_locale(language)
+
+
+def _resolve_bundles_dir() -> Path:
+    path = Path(settings.LOCALE_BUNDLES_PATH).expanduser()
+    if not path.is_absolute():
+        path = Path.cwd() / path
+    return path
+
+
+def _locale_sources(language: str) -> list[Path]:
+    user_dir = _resolve_user_locales_dir()
+    sources = [_DEFAULT_LOCALES_DIR / f'{language}.json']
+    sources.extend(user_dir / f'{language}{extension}' for extension in ('.json', '.yml', '.yaml'))
+    return sources
+
+
+def _bundle_fingerprint(language: str) -> str:
+    """Отпечаток исходников бандла: файлы языка и языка по умолчанию (он же fallback)."""
+    digest = hashlib.sha256(f'{_BUNDLE_FORMAT_VERSION}:{language}:{DEFAULT_LANGUAGE}'.encode())
+    for source in (*_locale_sources(language), *_locale_sources(DEFAULT_LANGUAGE)):
+        try:
+            stat = source.stat()
+        except OSError:
+            continue
+        digest.update(f'{source}:{stat.st_mtime_ns}:{stat.st_size}'.encode())
+    return digest.hexdigest()
+
+
+def _compile_bundle_payload(language: str) -> tuple:
+    """
+    Бандл языка: его собственные строки и список ключей, которые берутся из языка
+    по умолчанию. Fallback вычисляется здесь, а строки языка по умолчанию при загрузке
+    не копируются — все языки ссылаются на одни и те же объекты. Ключи интернированы.
+    """
+    own = {sys.intern(key): value for key, value in _read_locale(language).items()}
+    fallback_keys: tuple[str, ...] = ()
+    if language != DEFAULT_LANGUAGE:
+        fallback_keys = tuple(sys.intern(key) for key in _read_locale(DEFAULT_LANGUAGE) if key not in own)
+    return _BUNDLE_FORMAT_VERSION, _bundle_fingerprint(language), own, fallback_keys
+
+
+def _write_bundle(path: Path, payload: tuple) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f'.{path.name}.', delete=False) as handle:
+        handle.write(marshal.dumps(payload))
+    Path(handle.name).replace(path)
+
+
+def compile_locale_bundle(language: str) -> tuple:
+    """Собирает бандл языка и сохраняет его в LOCALE_BUNDLES_PATH (если каталог доступен на запись)."""
+    language = resolve_language(language)
+    payload = _compile_bundle_payload(language)
+    try:
+        _write_bundle(_resolve_bundles_dir() / f'{language}{_BUNDLE_SUFFIX}', payload)
+    except OSError as error:
+        _logger.warning('Не удалось сохранить скомпилированную локаль', language=language, error=error)
+    return payload
+
+
+def _read_bundle(language: str) -> tuple | None:
+    path = _resolve_bundles_dir() / f'{language}{_BUNDLE_SUFFIX}'
+    try:
+        # Бандлы пишет только compile_locale_bundle в каталог приложения
+        payload = marshal.loads(path.read_bytes())  # noqa: S302
+        version, fingerprint, _own, _fallback_keys = payload
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != _BUNDLE_FORMAT_VERSION or fingerprint != _bundle_fingerprint(language):
+        return None
+    return payload
+
+
+def load_locale_bundle(language: str) -> dict[str, Any]:
+    """
+    Полная локаль языка (с fallback на язык по умолчанию) из скомпилированного бандла.
+    Загружается лениво при первом обращении; устаревший бандл пересобирается.
+    """
+    return _load_locale_bundle(resolve_language(language))
+
+
+@cache
+def _load_locale_bundle(language: str) -> dict[str, Any]:
+    payload = _read_bundle(language) or compile_locale_bundle(language)
+    _version, _fingerprint, resolved, fallback_keys = payload
+    if fallback_keys:
+        default = _load_locale_bundle(DEFAULT_LANGUAGE)
+        resolved.update({key: default[key] for key in fallback_keys if key in default})
+    return resolved
+
+
+def compile_locale_bundles() -> list[str]:
+    """Шаг запуска: пересобирает устаревшие бандлы всех доступных языков. Возвращает пересобранные."""
+    try:
+        languages = {resolve_language(lang) for lang in settings.get_available_languages()}
+    except Exception as error:  # pragma: no cover - defensive logging
+        _logger.warning('Failed to load available languages from settings', error=error)
+        languages = set()
+    languages.add(DEFAULT_LANGUAGE)
+
+    compiled = []
+    for language in sorted(languages):
+        if _read_bundle(language) is None:
+            compile_locale_bundle(language)
+            compiled.append(language)
+    return compiled
+
+
+_locale_generation = 0
+
+
+def get_locale_generation() -> int:
+    """Номер поколения кеша локалей: растёт при каждом clear_locale_cache()."""
+    return _locale_generation
+
+
 def clear_locale_cache() -> None:
-    load_locale.cache_clear()
+    global _locale_generation
+    _known_languages.cache_clear()
+    _load_locale.cache_clear()
+    _load_locale_bundle.cache_clear()
+    _locale_generation += 1
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+from types import MappingProxyType
 from typing import Any
 
 import structlog
@@ -9,7 +10,9 @@ from app.config import settings
 from app.localization.loader import (
     DEFAULT_LANGUAGE,
     clear_locale_cache,
-    load_locale,
+    get_locale_generation,
+    load_locale_bundle,
+    resolve_language,
 )
 
 
@@ -112,49 +115,67 @@ def _get_cached_rules_value(language: str) -> str:
     return default
 
 
-def _build_dynamic_values(language: str) -> dict[str, Any]:
-    language_code = (language or DEFAULT_LANGUAGE).split('-')[0].lower()
+_DYNAMIC_KEYS = frozenset(key for key, _size, _price_attr in _TRAFFIC_TIERS) | {'TRAFFIC_UNLIMITED', 'SUPPORT_INFO'}
+
 
+def _get_dynamic_config(language: str) -> dict[str, str] | None:
+    language_code = (language or DEFAULT_LANGUAGE).split('-')[0].lower()
     language_code = _LANGUAGE_ALIASES.get(language_code, language_code)
-    config = _DYNAMIC_LANGUAGE_CONFIGS.get(language_code)
+    return _DYNAMIC_LANGUAGE_CONFIGS.get(language_code)
+
+
+def _build_dynamic_value(config: dict[str, str], key: str) -> str | None:
+    """Значение, зависящее от текущих настроек (цены, username поддержки), — считается при обращении."""
+    if key == 'TRAFFIC_UNLIMITED':
+        return config['unlimited_pattern'].format(price=settings.format_price(settings.PRICE_TRAFFIC_UNLIMITED))
 
+    if key == 'SUPPORT_INFO':
+        support_template = config.get('support_info')
+        if not support_template:
+            return None
+        return support_template.format(support_username=settings.SUPPORT_USERNAME)
+
+    for tier_key, size, price_attr in _TRAFFIC_TIERS:
+        if tier_key == key:
+            return config['traffic_pattern'].format(
+                size=size,
+                price=settings.format_price(getattr(settings, price_attr)),
+            )
+    return None
+
+
+def _build_dynamic_values(language: str) -> dict[str, Any]:
+    config = _get_dynamic_config(language)
     if not config:
         return {}
 
     values: dict[str, Any] = {}
-    traffic_pattern = config['traffic_pattern']
-    for key, size, price_attr in _TRAFFIC_TIERS:
-        price_value = getattr(settings, price_attr)
-        values[key] = traffic_pattern.format(
-            size=size,
-            price=settings.format_price(price_value),
-        )
-
-    values['TRAFFIC_UNLIMITED'] = config['unlimited_pattern'].format(
-        price=settings.format_price(settings.PRICE_TRAFFIC_UNLIMITED)
-    )
-
-    support_template = config.get('support_info')
-    if support_template:
-        values['SUPPORT_INFO'] = support_template.format(support_username=settings.SUPPORT_USERNAME)
-
+    for key in _DYNAMIC_KEYS:
+        value = _build_dynamic_value(config, key)
+        if value is not None:
+            values[key] = value
     return values
 
 
 class Texts:
-    def __init__(self, language: str = DEFAULT_LANGUAGE):
-        self.language = language or DEFAULT_LANGUAGE
-        raw_data = load_locale(self.language)
-        self._values = {key: value for key, value in raw_data.items()}
+    """
+    Тексты одного языка. Экземпляр неизменяемый и общий для всех вызовов
+    get_texts(language): локаль с подставленным fallback собирается один раз.
+    """
 
-        if self.language != DEFAULT_LANGUAGE:
-            fallback_data = load_locale(DEFAULT_LANGUAGE)
-        else:
-            fallback_data = self._values
+    __slots__ = ('_dynamic_config', '_values', 'language')
 
-        self._fallback_values = {key: value for key, value in fallback_data.items() if key not in self._values}
+    def __init__(self, language: str = DEFAULT_LANGUAGE):
+        language = language or DEFAULT_LANGUAGE
+        # В бандле ключи языка по умолчанию уже подставлены на этапе компиляции
+        values = load_locale_bundle(language)
+
+        object.__setattr__(self, 'language', language)
+        object.__setattr__(self, '_values', MappingProxyType(values))
+        object.__setattr__(self, '_dynamic_config', _get_dynamic_config(language))
 
-        self._values.update(_build_dynamic_values(self.language))
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError('Texts is read-only')
 
     def __getattr__(self, item: str) -> Any:
         if item == 'language':
@@ -185,14 +206,16 @@ class Texts:
         if item == 'RULES_TEXT':
             return _get_cached_rules_value(self.language)
 
-        if item in self._values:
-            return self._values[item]
-
-        if item in self._fallback_values:
-            return self._fallback_values[item]
+        if item in _DYNAMIC_KEYS and self._dynamic_config:
+            value = _build_dynamic_value(self._dynamic_config, item)
+            if value is not None:
+                return value
 
-        _logger.warning("Missing localization key '' for language ''", item=item, language=self.language)
-        raise KeyError(item)
+        try:
+            return self._values[item]
+        except KeyError:
+            _logger.warning("Missing localization key '' for language ''", item=item, language=self.language)
+            raise
 
     @staticmethod
     def format_price(kopeks: int) -> str:
@@ -213,8 +236,23 @@ class Texts:
         return f'{gb:.0f} ГБ'
 
 
+_texts_registry: dict[str, Texts] = {}
+_texts_registry_generation = get_locale_generation()
+
+
 def get_texts(language: str = DEFAULT_LANGUAGE) -> Texts:
-    return Texts(language)
+    """Общий экземпляр Texts для языка; пересобирается только после clear_locale_cache()."""
+    global _texts_registry_generation
+    generation = get_locale_generation()
+    if generation != _texts_registry_generation:
+        _texts_registry.clear()
+        _texts_registry_generation = generation
+
+    language = resolve_language(language)
+    texts = _texts_registry.get(language)
+    if texts is None:
+        texts = _texts_registry[language] = Texts(language)
+    return texts
 
 
 async def get_rules_from_db(language: str = DEFAULT_LANGUAGE) -> str:
@@ -237,21 +275,11 @@ async def get_rules_from_db(language: str = DEFAULT_LANGUAGE) -> str:
 
 
 def _get_default_rules(language: str = DEFAULT_LANGUAGE) -> str:
-    default_key = 'RULES_TEXT_DEFAULT'
-    locale = load_locale(language)
-    if default_key in locale:
-        return locale[default_key]
-    fallback = load_locale(DEFAULT_LANGUAGE)
-    return fallback.get(default_key, '')
+    return load_locale_bundle(language).get('RULES_TEXT_DEFAULT', '')
 
 
 def _get_default_privacy_policy(language: str = DEFAULT_LANGUAGE) -> str:
-    default_key = 'PRIVACY_POLICY_TEXT_DEFAULT'
-    locale = load_locale(language)
-    if default_key in locale:
-        return locale[default_key]
-    fallback = load_locale(DEFAULT_LANGUAGE)
-    return fallback.get(default_key, '')
+    return load_locale_bundle(language).get('PRIVACY_POLICY_TEXT_DEFAULT', '')
 
 
 def get_privacy_policy(language: str = DEFAULT_LANGUAGE) -> str:
@@ -5,19 +5,24 @@ from typing import Any
 
 import structlog
 from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
 from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message, TelegramObject, User as TgUser
 from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.config import settings
 from app.database.crud.user import get_user_by_telegram_id
 from app.database.database import AsyncSessionLocal
+from app.database.models import UserStatus
 from app.localization.loader import DEFAULT_LANGUAGE
 from app.localization.texts import get_texts
 from app.services.remnawave_service import RemnaWaveService
+from app.services.user_activity_service import user_activity_tracker
 from app.states import RegistrationStates
 from app.utils.check_reg_process import is_registration_process
+from app.utils.user_context_cache import UserContext, user_context_cache
 from app.utils.validators import sanitize_telegram_name
 
 
@@ -36,7 +41,48 @@ async def _refresh_remnawave_description(remnawave_uuid: str, description: str,
         )
 
 
+async def _answer_blocked(event: TelegramObject, texts) -> None:
+    if isinstance(event, Message):
+        await event.answer(
+            texts.t(
+                'AUTH_MIDDLEWARE_ACCOUNT_BLOCKED',
+                '🚫 Ваш аккаунт заблокирован администратором.',
+            )
+        )
+    elif isinstance(event, CallbackQuery):
+        await event.answer(
+            texts.t(
+                'AUTH_MIDDLEWARE_ACCOUNT_BLOCKED',
+                '🚫 Ваш аккаунт заблокирован администратором.',
+            ),
+            show_alert=True,
+        )
+
+
+async def _commit_after_handler(db) -> None:
+    try:
+        await db.commit()
+    except (InterfaceError, OperationalError) as conn_err:
+        # Соединение закрылось (таймаут после долгой операции) - просто логируем
+        logger.warning('⚠️ Соединение с БД закрыто после обработки, пропускаем commit', conn_err=conn_err)
+    except Exception as commit_err:
+        # Transaction aborted (e.g. handler swallowed a ProgrammingError) — rollback
+        logger.warning('⚠️ Не удалось commit после обработки, rollback', commit_err=commit_err)
+        try:
+            await db.rollback()
+        except Exception:
+            pass
+
+
 class AuthMiddleware(BaseMiddleware):
+    """
+    Загружает пользователя и кладёт в data: db, db_user, user_context, is_admin.
+
+    Снимок пользователя берётся из user_context_cache. Заблокированным пользователям
+    отвечаем без обращения к БД, а хендлеры с флагом ``user_context`` получают только
+    снимок (db_user=None) — ORM-загрузка с selectinload для них не выполняется.
+    """
+
     async def __call__(
         self,
         handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
@@ -63,8 +109,34 @@ class AuthMiddleware(BaseMiddleware):
             language = user.language_code.split('-')[0]
         texts = get_texts(language)
 
+        safe_first = sanitize_telegram_name(user.first_name)
+        safe_last = sanitize_telegram_name(user.last_name)
+
         async with AsyncSessionLocal() as db:
             try:
+                cached_context = await user_context_cache.get(user.id)
+                if cached_context is not None:
+                    if cached_context.status == UserStatus.BLOCKED.value:
+                        await _answer_blocked(event, get_texts(cached_context.language or language))
+                        logger.info('🚫 Заблокированный пользователь попытался использовать бота', user_id=user.id)
+                        return None
+
+                    if (
+                        cached_context.status == UserStatus.ACTIVE.value
+                        and get_flag(data, 'user_context')
+                        and cached_context.matches_profile(user.username, safe_first, safe_last)
+                    ):
+                        user_activity_tracker.touch(cached_context.user_id)
+                        data['db'] = db
+                        data['db_user'] = None
+                        data['user_context'] = cached_context
+                        data['is_admin'] = settings.is_admin(user.id)
+
+                        result = await handler(event, data)
+                        await _commit_after_handler(db)
+                        return result
+
+                generation = user_context_cache.generation(user.id)
                 db_user = await get_user_by_telegram_id(db, user.id)
 
                 if not db_user:
@@ -91,6 +163,7 @@ class AuthMiddleware(BaseMiddleware):
                             logger.info('🔍 Пропускаем пользователя в процессе регистрации', user_id=user.id)
                         data['db'] = db
                         data['db_user'] = None
+                        data['user_context'] = None
                         data['is_admin'] = False
                         result = await handler(event, data)
                         await db.commit()
@@ -112,26 +185,11 @@ class AuthMiddleware(BaseMiddleware):
                         )
                     logger.info('🚫 Заблокирован незарегистрированный пользователь', user_id=user.id)
                     return None
-                from app.database.models import UserStatus
-
                 texts = get_texts(db_user.language if db_user.language else language)
 
                 if db_user.status == UserStatus.BLOCKED.value:
-                    if isinstance(event, Message):
-                        await event.answer(
-                            texts.t(
-                                'AUTH_MIDDLEWARE_ACCOUNT_BLOCKED',
-                                '🚫 Ваш аккаунт заблокирован администратором.',
-                            )
-                        )
-                    elif isinstance(event, CallbackQuery):
-                        await event.answer(
-                            texts.t(
-                                'AUTH_MIDDLEWARE_ACCOUNT_BLOCKED',
-                                '🚫 Ваш аккаунт заблокирован администратором.',
-                            ),
-                            show_alert=True,
-                        )
+                    await user_context_cache.set(UserContext.from_user(db_user), generation)
+                    await _answer_blocked(event, texts)
                     logger.info('🚫 Заблокированный пользователь попытался использовать бота', user_id=user.id)
                     return None
 
@@ -173,6 +231,7 @@ class AuthMiddleware(BaseMiddleware):
                         logger.info('🔄 Удаленный пользователь начинает повторную регистрацию', user_id=user.id)
                         data['db'] = db
                         data['db_user'] = None
+                        data['user_context'] = None
                         data['is_admin'] = False
                         result = await handler(event, data)
                         await db.commit()
@@ -195,11 +254,19 @@ class AuthMiddleware(BaseMiddleware):
                     logger.info('❌ Удаленный пользователь попытался использовать бота без /start', user_id=user.id)
                     return None
 
+                # Профиль и last_activity пишутся write-behind трекером: меняем только состояние
+                # объекта в сессии (set_committed_value), не помечая строку users грязной
+                pending_profile = user_activity_tracker.get_pending_profile(db_user.id)
+                if pending_profile:
+                    set_committed_value(db_user, 'username', pending_profile.username)
+                    set_committed_value(db_user, 'first_name', pending_profile.first_name)
+                    set_committed_value(db_user, 'last_name', pending_profile.last_name)
+
                 profile_updated = False
 
                 if db_user.username != user.username:
                     old_username = db_user.username
-                    db_user.username = user.username
+                    set_committed_value(db_user, 'username', user.username)
                     logger.info(
                         '🔄 [Middleware] Username обновлен для',
                         user_id=user.id,
@@ -208,11 +275,9 @@ class AuthMiddleware(BaseMiddleware):
                     )
                     profile_updated = True
 
-                safe_first = sanitize_telegram_name(user.first_name)
-                safe_last = sanitize_telegram_name(user.last_name)
                 if db_user.first_name != safe_first:
                     old_first_name = db_user.first_name
-                    db_user.first_name = safe_first
+                    set_committed_value(db_user, 'first_name', safe_first)
                     logger.info(
                         '🔄 [Middleware] Имя обновлено для',
                         user_id=user.id,
@@ -223,7 +288,7 @@ class AuthMiddleware(BaseMiddleware):
 
                 if db_user.last_name != safe_last:
                     old_last_name = db_user.last_name
-                    db_user.last_name = safe_last
+                    set_committed_value(db_user, 'last_name', safe_last)
                     logger.info(
                         '🔄 [Middleware] Фамилия обновлена для',
                         user_id=user.id,
@@ -232,10 +297,12 @@ class AuthMiddleware(BaseMiddleware):
                     )
                     profile_updated = True
 
-                db_user.last_activity = datetime.now(UTC)
+                now = datetime.now(UTC)
+                set_committed_value(db_user, 'last_activity', now)
+                user_activity_tracker.touch(db_user.id, now)
 
                 if profile_updated:
-                    db_user.updated_at = datetime.now(UTC)
+                    user_activity_tracker.record_profile(db_user.id, user.username, safe_first, safe_last)
                     logger.info('💾 [Middleware] Профиль пользователя обновлен в middleware', user_id=user.id)
 
                     if db_user.remnawave_uuid:
@@ -250,23 +317,16 @@ class AuthMiddleware(BaseMiddleware):
                             )
                         )
 
+                user_context = UserContext.from_user(db_user)
                 data['db'] = db
                 data['db_user'] = db_user
+                data['user_context'] = user_context
                 data['is_admin'] = settings.is_admin(user.id)
 
                 result = await handler(event, data)
-                try:
-                    await db.commit()
-                except (InterfaceError, OperationalError) as conn_err:
-                    # Соединение закрылось (таймаут после долгой операции) - просто логируем
-                    logger.warning('⚠️ Соединение с БД закрыто после обработки, пропускаем commit', conn_err=conn_err)
-                except Exception as commit_err:
-                    # Transaction aborted (e.g. handler swallowed a ProgrammingError) — rollback
-                    logger.warning('⚠️ Не удалось commit после обработки, rollback', commit_err=commit_err)
-                    try:
-                        await db.rollback()
-                    except Exception:
-                        pass
+                await _commit_after_handler(db)
+                # Если хендлер изменил данные снимка, поколение уже сменилось и запись будет пропущена
+                await user_context_cache.set(user_context, generation)
                 return result
 
             except (InterfaceError, OperationalError) as conn_err:
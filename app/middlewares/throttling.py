@@ -1,5 +1,5 @@
-import time
 from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
 from typing import Any
 
 import structlog
@@ -7,17 +7,43 @@ from aiogram import BaseMiddleware
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message, TelegramObject
 
+from app.config import settings
 from app.localization.loader import DEFAULT_LANGUAGE
 from app.localization.texts import get_texts
+from app.utils.rate_limit_store import MemoryRateLimitStore, RedisRateLimitStore
 
 logger = structlog.get_logger(__name__)
 
 
+@dataclass(frozen=True, slots=True)
+class ThrottlePolicy:
+    """Не больше limit вызовов за window секунд."""
+
+    limit: int
+    window: float
+
+
+def create_rate_limit_store() -> MemoryRateLimitStore | RedisRateLimitStore:
+    memory_store = MemoryRateLimitStore(maxsize=settings.THROTTLING_MEMORY_MAXSIZE)
+    if settings.get_throttling_backend() == 'redis':
+        return RedisRateLimitStore(fallback=memory_store)
+    return memory_store
+
+
+def _extract_command(text: str | None) -> str | None:
+    if not text or not text.startswith('/'):
+        return None
+    return text.split(maxsplit=1)[0][1:].split('@', 1)[0].lower() or None
+
+
 class ThrottlingMiddleware(BaseMiddleware):
     """
     Двухуровневый rate-limiter:
-    1. Общий троттлинг — 0.5 сек между любыми сообщениями (UX)
-    2. /start burst-лимит — макс N вызовов за окно (anti-spam)
+    1. Общий троттлинг — 0.5 сек между любыми сообщениями и нажатиями (UX)
+    2. Лимиты на команды — например, /start не чаще N раз за окно (anti-spam)
+
+    Один экземпляр регистрируется и для сообщений, и для callback-ов, а состояние
+    хранится в ограниченном хранилище (в памяти процесса или общем Redis).
     """
 
     def __init__(
@@ -25,14 +51,27 @@ class ThrottlingMiddleware(BaseMiddleware):
         rate_limit: float = 0.5,
         start_max_calls: int = 3,
         start_window: float = 60.0,
+        *,
+        store: MemoryRateLimitStore | RedisRateLimitStore | None = None,
+        command_policies: dict[str, ThrottlePolicy] | None = None,
     ):
         self.rate_limit = rate_limit
-        self.user_buckets: dict[int, float] = {}
-
-        # /start anti-spam: sliding window per user
-        self.start_max_calls = start_max_calls
-        self.start_window = start_window
-        self.start_buckets: dict[int, list[float]] = {}
+        self.store = store or MemoryRateLimitStore()
+        self.default_policy = ThrottlePolicy(limit=1, window=rate_limit)
+        if command_policies is None:
+            command_policies = {'start': ThrottlePolicy(limit=start_max_calls, window=start_window)}
+        self.command_policies = command_policies
+
+    @classmethod
+    def from_settings(cls) -> 'ThrottlingMiddleware':
+        return cls(
+            rate_limit=settings.THROTTLING_RATE_LIMIT_SECONDS,
+            store=create_rate_limit_store(),
+            command_policies={
+                command: ThrottlePolicy(limit=limit, window=window)
+                for command, (limit, window) in settings.get_throttling_command_limits().items()
+            },
+        )
 
     async def __call__(
         self,
@@ -52,22 +91,19 @@ class ThrottlingMiddleware(BaseMiddleware):
             language = event.from_user.language_code.split('-')[0]
         texts = get_texts(language)
 
-        now = time.time()
-
-        # --- /start burst rate-limit ---
-        if isinstance(event, Message) and event.text and event.text.startswith('/start'):
-            timestamps = self.start_buckets.get(user_id, [])
-            # Оставляем только вызовы внутри окна
-            timestamps = [ts for ts in timestamps if now - ts < self.start_window]
-
-            if len(timestamps) >= self.start_max_calls:
-                cooldown = int(self.start_window - (now - timestamps[0])) + 1
+        # --- Лимиты на команды (/start и др.) ---
+        command = _extract_command(event.text) if isinstance(event, Message) else None
+        policy = self.command_policies.get(command) if command else None
+        if policy is not None:
+            retry_after = await self.store.hit(f'cmd:{command}:{user_id}', policy.limit, policy.window)
+            if retry_after > 0:
+                cooldown = int(retry_after) + 1
                 logger.warning(
-                    'Rate-limit /start для : вызовов за s (лимит)',
+                    'Rate-limit команды',
                     user_id=user_id,
-                    timestamps_count=len(timestamps),
-                    start_window=int(self.start_window),
-                    start_max_calls=self.start_max_calls,
+                    command=command,
+                    window=policy.window,
+                    max_calls=policy.limit,
                 )
                 try:
                     await event.answer(
@@ -78,16 +114,11 @@ class ThrottlingMiddleware(BaseMiddleware):
                     )
                 except Exception:
                     pass
-                self.start_buckets[user_id] = timestamps
                 return None
 
-            timestamps.append(now)
-            self.start_buckets[user_id] = timestamps
-
         # --- Общий троттлинг (0.5 сек) ---
-        last_call = self.user_buckets.get(user_id, 0)
-
-        if now - last_call < self.rate_limit:
+        policy = self.default_policy
+        if await self.store.hit(f'any:{user_id}', policy.limit, policy.window) > 0:
             logger.warning('Throttling для пользователя', user_id=user_id)
 
             # Для сообщений: молчим только если это состояние работы с тикетами; иначе показываем блок
@@ -125,19 +156,4 @@ class ThrottlingMiddleware(BaseMiddleware):
                 )
                 return None
 
-        self.user_buckets[user_id] = now
-
-        # Периодическая очистка старых записей
-        cleanup_threshold = now - 60
-        self.user_buckets = {
-            uid: timestamp for uid, timestamp in self.user_buckets.items() if timestamp > cleanup_threshold
-        }
-        # Очистка /start бакетов (раз в ~60 сек, лениво)
-        if len(self.start_buckets) > 500:
-            self.start_buckets = {
-                uid: [ts for ts in tss if now - ts < self.start_window]
-                for uid, tss in self.start_buckets.items()
-                if any(now - ts < self.start_window for ts in tss)
-            }
-
         return await handler(event, data)
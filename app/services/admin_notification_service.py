@@ -21,6 +21,7 @@ from app.database.models import (
     Transaction,
     User,
 )
+from app.services.telegram_send_scheduler import telegram_send_scheduler
 from app.utils.timezone import format_local_datetime
 
 
@@ -1903,7 +1904,8 @@ class AdminNotificationService:
             if notification_topic_id:
                 message_kwargs['message_thread_id'] = notification_topic_id
 
-            await bot.send_message(**message_kwargs)
+            # Через общий планировщик: делит лимит бота с рассылками и уведомлениями мониторинга
+            await telegram_send_scheduler.send(self.chat_id, lambda: bot.send_message(**message_kwargs))
             logger.info(
                 'Уведомление о подозрительной активности отправлено в чат топик',
                 chat_id=self.chat_id,
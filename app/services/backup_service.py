@@ -356,9 +356,15 @@ class BackupService:
                     await meta_file.write(json_lib.dumps(metadata, ensure_ascii=False, indent=2))
 
                 mode = 'w:gz' if compress else 'w'
-                with tarfile.open(backup_path, mode) as tar:
-                    for item in staging_dir.iterdir():
-                        tar.add(item, arcname=item.name)
+
+                def _create_archive():
+                    with tarfile.open(backup_path, mode) as tar:
+                        for item in staging_dir.iterdir():
+                            tar.add(item, arcname=item.name)
+
+                # Сжатие занимает секунды — не блокируем event loop. Отдельный поток, а не общий
+                # CPU-пул: долгий бекап не должен задерживать bcrypt и QR
+                await asyncio.to_thread(_create_archive)
 
             file_size = backup_path.stat().st_size
 
@@ -709,8 +715,12 @@ class BackupService:
             temp_path = Path(temp_dir)
 
             mode = 'r:gz' if backup_path.suffixes and backup_path.suffixes[-1] == '.gz' else 'r'
-            with tarfile.open(backup_path, mode) as tar:
-                tar.extractall(temp_path, filter='data')
+
+            def _extract_archive():
+                with tarfile.open(backup_path, mode) as tar:
+                    tar.extractall(temp_path, filter='data')
+
+            await asyncio.to_thread(_extract_archive)
 
             metadata_path = temp_path / 'metadata.json'
             if not metadata_path.exists():
@@ -1017,8 +1027,8 @@ class BackupService:
         if backup_path.suffix == '.gz':
             async with aiofiles.open(backup_path, 'rb') as f:
                 compressed_data = await f.read()
-                uncompressed_data = gzip.decompress(compressed_data).decode('utf-8')
-                backup_structure = json_lib.loads(uncompressed_data)
+            uncompressed_data = await asyncio.to_thread(gzip.decompress, compressed_data)
+            backup_structure = json_lib.loads(uncompressed_data.decode('utf-8'))
         else:
             async with aiofiles.open(backup_path, encoding='utf-8') as f:
                 file_content = await f.read()
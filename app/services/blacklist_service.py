@@ -1,10 +1,16 @@
 """
 Сервис для работы с черным списком пользователей
 Проверяет пользователей по списку из GitHub репозитория
+
+Скачанный список компилируется в индекс (frozenset ID и словарь нормализованных
+username), который подменяется целиком. Обновление идёт в фоне: проверка
+пользователя никогда не ждёт загрузки с GitHub.
 """
 
 import asyncio
 import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import UTC, datetime, timedelta
 
 import aiohttp
@@ -15,6 +21,35 @@ from app.config import settings
 
 logger = structlog.get_logger(__name__)
 
+_DEFAULT_REASON = 'Занесен в черный список'
+_REFRESH_RETRY_SECONDS = 60
+
+
+def _normalize_username(username: str | None) -> str:
+    return (username or '').strip().lstrip('@').lower()
+
+
+@dataclass(frozen=True, slots=True)
+class _BlacklistIndex:
+    """Неизменяемый индекс черного списка для O(1) проверок."""
+
+    entries: tuple[tuple[int, str, str], ...] = ()
+    ids: frozenset[int] = frozenset()
+    by_id: dict[int, tuple[int, str, str]] = field(default_factory=dict)
+    by_username: dict[str, tuple[int, str, str]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, entries: list[tuple[int, str, str]]) -> '_BlacklistIndex':
+        by_id: dict[int, tuple[int, str, str]] = {}
+        by_username: dict[str, tuple[int, str, str]] = {}
+        for entry in entries:
+            bl_id, bl_username, _bl_reason = entry
+            by_id.setdefault(bl_id, entry)
+            normalized = _normalize_username(bl_username)
+            if normalized:
+                by_username.setdefault(normalized, entry)
+        return cls(entries=tuple(entries), ids=frozenset(by_id), by_id=by_id, by_username=by_username)
+
 
 class BlacklistService:
     """
@@ -22,15 +57,24 @@ class BlacklistService:
     """
 
     def __init__(self):
-        self.blacklist_data = []  # Список в формате [(telegram_id, username, reason), ...]
+        self._index = _BlacklistIndex()
         self.last_update = None
         # Используем интервал из настроек, по умолчанию 24 часа
         interval_hours = self.get_blacklist_update_interval_hours()
         self.update_interval = timedelta(hours=interval_hours)
         self.lock = asyncio.Lock()  # Блокировка для предотвращения одновременных обновлений
-        # Кэш результатов проверки: {telegram_id: (is_blacklisted, reason, timestamp)}
-        self._check_cache: dict[int, tuple[bool, str | None, float]] = {}
+        # LRU-кэш результатов проверки: {telegram_id: (is_blacklisted, reason, expires_at)}
+        self._check_cache: OrderedDict[int, tuple[bool, str | None, float]] = OrderedDict()
         self._cache_ttl = 300  # 5 минут
+        self._cache_maxsize = max(1, getattr(settings, 'BLACKLIST_CHECK_CACHE_MAXSIZE', 50000))
+        self._refresh_task: asyncio.Task | None = None
+        self._last_refresh_attempt = 0.0
+        self._periodic_task: asyncio.Task | None = None
+
+    @property
+    def blacklist_data(self) -> list[tuple[int, str, str]]:
+        """Список в формате [(telegram_id, username, reason), ...]"""
+        return list(self._index.entries)
 
     def is_blacklist_check_enabled(self) -> bool:
         """Проверяет, включена ли проверка черного списка"""
@@ -103,7 +147,7 @@ class BlacklistService:
                                 username = parts[1]
 
                         # По умолчанию используем "Занесен в черный список", если нет другой информации
-                        reason = 'Занесен в черный список'
+                        reason = _DEFAULT_REASON
 
                         # Если есть запятая в строке, можем использовать часть после нее как причину
                         full_line_after_id = line[len(str(telegram_id)) :].strip()
@@ -121,7 +165,8 @@ class BlacklistService:
                             line=line,
                         )
 
-                self.blacklist_data = blacklist_data
+                # Индекс собирается целиком и подменяется одним присваиванием
+                self._index = _BlacklistIndex.build(blacklist_data)
                 self.last_update = datetime.now(UTC)
                 self._check_cache.clear()
                 logger.info('Черный список успешно обновлен. Найдено записей', blacklist_data_count=len(blacklist_data))
@@ -134,6 +179,67 @@ class BlacklistService:
                 logger.error('Ошибка при обновлении черного списка', error=e)
                 return False
 
+    def _is_stale(self) -> bool:
+        if self.last_update is None:
+            return True
+        required_interval = timedelta(hours=self.get_blacklist_update_interval_hours())
+        return datetime.now(UTC) - self.last_update > required_interval
+
+    def _schedule_refresh(self) -> None:
+        """Запускает фоновое обновление, если оно ещё не идёт."""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if self.lock.locked() or not self.get_blacklist_github_url():
+            return
+        # Недоступный GitHub не дёргаем на каждый апдейт
+        now = time.monotonic()
+        if now - self._last_refresh_attempt < _REFRESH_RETRY_SECONDS:
+            return
+        self._last_refresh_attempt = now
+        self._refresh_task = asyncio.create_task(self.update_blacklist(), name='blacklist-refresh')
+
+    async def start(self) -> None:
+        """Загружает черный список и запускает его периодическое обновление."""
+        if not self.is_blacklist_check_enabled() or not self.get_blacklist_github_url():
+            return
+        await self.update_blacklist()
+        if self._periodic_task is None or self._periodic_task.done():
+            self._periodic_task = asyncio.create_task(self._periodic_refresh(), name='blacklist-periodic-refresh')
+
+    async def stop(self) -> None:
+        for task in (self._periodic_task, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._periodic_task = None
+        self._refresh_task = None
+
+    async def _periodic_refresh(self) -> None:
+        while True:
+            await asyncio.sleep(self.get_blacklist_update_interval_hours() * 3600)
+            if self.is_blacklist_check_enabled():
+                await self.update_blacklist()
+
+    def _get_cached(self, telegram_id: int, now: float) -> tuple[bool, str | None] | None:
+        cached = self._check_cache.get(telegram_id)
+        if cached is None:
+            return None
+        is_bl, reason, expires_at = cached
+        if now >= expires_at:
+            self._check_cache.pop(telegram_id, None)
+            return None
+        self._check_cache.move_to_end(telegram_id)
+        return is_bl, reason
+
+    def _put_cached(self, telegram_id: int, is_bl: bool, reason: str | None, now: float) -> None:
+        self._check_cache[telegram_id] = (is_bl, reason, now + self._cache_ttl)
+        self._check_cache.move_to_end(telegram_id)
+        while len(self._check_cache) > self._cache_maxsize:
+            self._check_cache.popitem(last=False)
+
     async def is_user_blacklisted(self, telegram_id: int, username: str | None = None) -> tuple[bool, str | None]:
         """
         Проверяет, находится ли пользователь в черном списке
@@ -150,57 +256,54 @@ class BlacklistService:
 
         # Проверяем кэш
         now = time.monotonic()
-        cached = self._check_cache.get(telegram_id)
+        cached = self._get_cached(telegram_id, now)
         if cached is not None:
-            is_bl, reason, ts = cached
-            if now - ts < self._cache_ttl:
-                return is_bl, reason
+            return cached
 
         # Проверяем, является ли пользователь администратором и нужно ли его игнорировать
         if self.should_ignore_admins() and self.is_admin(telegram_id):
-            self._check_cache[telegram_id] = (False, None, now)
+            self._put_cached(telegram_id, False, None, now)
             return False, None
 
-        # Если черный список пуст или устарел, обновляем его
-        interval_hours = self.get_blacklist_update_interval_hours()
-        required_interval = timedelta(hours=interval_hours)
-        if not self.blacklist_data or (self.last_update and datetime.now(UTC) - self.last_update > required_interval):
-            await self.update_blacklist()
+        # Устаревший список обновляется в фоне, проверка идёт по текущему индексу
+        if self._is_stale():
+            self._schedule_refresh()
+
+        index = self._index
 
         # Проверяем по Telegram ID
-        for bl_id, bl_username, bl_reason in self.blacklist_data:
-            if bl_id == telegram_id:
-                logger.info('Пользователь найден в черном списке по ID', telegram_id=telegram_id, bl_reason=bl_reason)
-                self._check_cache[telegram_id] = (True, bl_reason, now)
-                return True, bl_reason
+        if telegram_id in index.ids:
+            bl_reason = index.by_id[telegram_id][2]
+            logger.info('Пользователь найден в черном списке по ID', telegram_id=telegram_id, bl_reason=bl_reason)
+            self._put_cached(telegram_id, True, bl_reason, now)
+            return True, bl_reason
 
         # Проверяем по username, если он передан
-        if username:
-            username_lower = username.lower().lstrip('@')
-            for bl_id, bl_username, bl_reason in self.blacklist_data:
-                if bl_username and bl_username.lower().lstrip('@') == username_lower:
-                    logger.info(
-                        'Пользователь найден в черном списке по username',
-                        username=username,
-                        telegram_id=telegram_id,
-                        bl_reason=bl_reason,
-                    )
-                    self._check_cache[telegram_id] = (True, bl_reason, now)
-                    return True, bl_reason
-
-        self._check_cache[telegram_id] = (False, None, now)
+        entry = index.by_username.get(_normalize_username(username)) if username else None
+        if entry is not None:
+            bl_reason = entry[2]
+            logger.info(
+                'Пользователь найден в черном списке по username',
+                username=username,
+                telegram_id=telegram_id,
+                bl_reason=bl_reason,
+            )
+            self._put_cached(telegram_id, True, bl_reason, now)
+            return True, bl_reason
+
+        # Пока список ни разу не загружался, отрицательный ответ не кэшируем
+        if self.last_update is not None:
+            self._put_cached(telegram_id, False, None, now)
         return False, None
 
     async def get_all_blacklisted_users(self) -> list[tuple[int, str, str]]:
         """
         Возвращает весь черный список
         """
-        interval_hours = self.get_blacklist_update_interval_hours()
-        required_interval = timedelta(hours=interval_hours)
-        if not self.blacklist_data or (self.last_update and datetime.now(UTC) - self.last_update > required_interval):
+        if self._is_stale():
             await self.update_blacklist()
 
-        return self.blacklist_data.copy()
+        return self.blacklist_data
 
     async def get_user_by_telegram_id(self, telegram_id: int) -> tuple[int, str, str] | None:
         """
@@ -212,10 +315,7 @@ class BlacklistService:
         Returns:
             Кортеж (telegram_id, username, reason) или None, если не найден
         """
-        for bl_id, bl_username, bl_reason in self.blacklist_data:
-            if bl_id == telegram_id:
-                return (bl_id, bl_username, bl_reason)
-        return None
+        return self._index.by_id.get(telegram_id)
 
     async def get_user_by_username(self, username: str) -> tuple[int, str, str] | None:
         """
@@ -227,14 +327,7 @@ class BlacklistService:
         Returns:
             Кортеж (telegram_id, username, reason) или None, если не найден
         """
-        # Проверяем как с @, так и без
-        username_with_at = f'@{username}' if not username.startswith('@') else username
-        username_without_at = username.lstrip('@')
-
-        for bl_id, bl_username, bl_reason in self.blacklist_data:
-            if bl_username == username_with_at or bl_username.lstrip('@') == username_without_at:
-                return (bl_id, bl_username, bl_reason)
-        return None
+        return self._index.by_username.get(_normalize_username(username))
 
     async def force_update_blacklist(self) -> tuple[bool, str]:
         """
@@ -245,7 +338,7 @@ class BlacklistService:
         """
         success = await self.update_blacklist()
         if success:
-            return True, f'Черный список обновлен успешно. Записей: {len(self.blacklist_data)}'
+            return True, f'Черный список обновлен успешно. Записей: {len(self._index.entries)}'
         return False, 'Ошибка обновления черного списка'
 
 
@@ -1,24 +1,38 @@
 from __future__ import annotations
 
 import asyncio
+import os
+import socket
 from dataclasses import dataclass
 from datetime import UTC, datetime
 from typing import TYPE_CHECKING
 
 import structlog
 from aiogram import Bot
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 from aiogram.types import InlineKeyboardMarkup
 from sqlalchemy import select
 from sqlalchemy.exc import InterfaceError, SQLAlchemyError
 
-from app.database.database import AsyncSessionLocal
-from app.database.models import BroadcastHistory, Subscription, SubscriptionStatus, User, UserStatus
-from app.handlers.admin.messages import (
-    create_broadcast_keyboard,
-    get_custom_users,
-    get_target_users,
+from app.config import settings
+from app.database.crud.broadcast_recipient import (
+    ack_broadcast_recipients,
+    claim_broadcast_recipients,
+    count_broadcast_recipients_by_state,
+    materialize_broadcast_recipients,
+    release_broadcast_recipients,
+)
+from app.database.crud.subscription import (
+    disable_active_subscriptions_for_users,
+    get_user_ids_with_active_paid_subscription,
 )
+from app.database.crud.user import block_users_by_telegram_ids
+from app.database.database import AsyncSessionLocal
+from app.database.models import BroadcastHistory, BroadcastRecipientState
+from app.handlers.admin.messages import create_broadcast_keyboard
+from app.services.telegram_send_scheduler import telegram_send_scheduler
+from app.utils.adaptive_concurrency import AIMDConcurrencyController
+from app.utils.user_context_cache import invalidate_user_context
 
 
 if TYPE_CHECKING:
@@ -30,17 +44,13 @@ logger = structlog.get_logger(__name__)
 
 VALID_MEDIA_TYPES = {'photo', 'video', 'document'}
 
-# =========================================================================
-# Telegram rate limits: ~30 msg/sec для бота.
-# batch_size=25 + 1 sec delay = ~25 msg/sec с запасом.
-# =========================================================================
-_TG_BATCH_SIZE = 25
-_TG_BATCH_DELAY = 1.0  # секунда между батчами
-_TG_MAX_RETRIES = 3  # retry при FloodWait / transient errors
-
 # Прогресс обновляется каждые ~500 сообщений ИЛИ раз в 5 секунд (что наступит раньше)
 _PROGRESS_UPDATE_MESSAGES = 500
 _PROGRESS_MIN_INTERVAL_SEC = 5.0
+# Как часто проверять очередь, когда остаток рассылки разбирают другие реплики
+_CLAIM_RETRY_INTERVAL_SEC = 5.0
+# Очистка заблокировавших бота: пользователей на одну транзакцию
+_BLOCKED_CLEANUP_CHUNK_SIZE = 1000
 
 # Email broadcast rate limiting: max 8 emails per second
 EMAIL_RATE_LIMIT = 8
@@ -88,12 +98,21 @@ class _BroadcastTask:
 
 
 class BroadcastService:
-    """Handles broadcast execution triggered from the admin web API."""
+    """
+    Handles broadcast execution triggered from the admin web API.
+
+    Рассылка — задание в БД: получатели материализуются в broadcast_recipients
+    один раз, дальше разбираются пачками с фиксацией результата. После перезапуска
+    рассылка продолжается с неподтверждённых получателей, а несколько реплик
+    делят одну рассылку (см. app.database.crud.broadcast_recipient).
+    """
 
     def __init__(self) -> None:
         self._bot: Bot | None = None
         self._tasks: dict[int, _BroadcastTask] = {}
         self._lock = asyncio.Lock()
+        self._worker_id = f'{socket.gethostname()}:{os.getpid()}'[:64]
+        self._watcher_task: asyncio.Task | None = None
 
     def set_bot(self, bot: Bot) -> None:
         self._bot = bot
@@ -108,6 +127,16 @@ class BroadcastService:
             await self._mark_failed(broadcast_id)
             return
 
+        # Кнопки сохраняются сразу: по ним рассылку можно восстановить после перезапуска
+        async with AsyncSessionLocal() as session:
+            broadcast = await session.get(BroadcastHistory, broadcast_id)
+            if broadcast and broadcast.selected_buttons is None:
+                broadcast.selected_buttons = list(config.selected_buttons or [])
+                await session.commit()
+
+        await self._spawn(broadcast_id, config)
+
+    async def _spawn(self, broadcast_id: int, config: BroadcastConfig) -> None:
         cancel_event = asyncio.Event()
 
         async with self._lock:
@@ -131,6 +160,86 @@ class BroadcastService:
             task_entry.cancel_event.set()
             return True
 
+    async def start(self) -> int:
+        """
+        Подхватывает незавершённые рассылки и запускает периодический поиск новых (для нескольких реплик).
+
+        Возвращает число продолженных рассылок.
+        """
+        resumed = await self.resume_broadcasts()
+
+        if settings.BROADCAST_JOB_POLL_INTERVAL_SECONDS > 0 and not self._watcher_task:
+            self._watcher_task = asyncio.create_task(self._watch_jobs(), name='broadcast-jobs-watcher')
+        return resumed
+
+    async def stop(self) -> None:
+        """Останавливает рассылки этого процесса; взятые, но не отправленные получатели возвращаются в очередь."""
+        tasks = [entry.task for entry in self._tasks.values()]
+        if self._watcher_task:
+            tasks.append(self._watcher_task)
+            self._watcher_task = None
+
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _watch_jobs(self) -> None:
+        while True:
+            await asyncio.sleep(settings.BROADCAST_JOB_POLL_INTERVAL_SECONDS)
+            try:
+                await self.resume_broadcasts()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error('Ошибка поиска незавершённых рассылок', exc=exc)
+
+    async def resume_broadcasts(self) -> int:
+        """
+        Запускает в этом процессе незавершённые рассылки, которые ещё не выполняются локально.
+
+        Учитываются только рассылки-задания (с сохранёнными кнопками); старые записи
+        и рассылки из админ-меню бота без очереди получателей не перезапускаются.
+        """
+        if self._bot is None:
+            return 0
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(BroadcastHistory).where(
+                    BroadcastHistory.status.in_(('queued', 'in_progress')),
+                    BroadcastHistory.channel.in_(('telegram', 'both')),
+                    BroadcastHistory.selected_buttons.isnot(None),
+                )
+            )
+            configs = {
+                broadcast.id: self._config_from_history(broadcast)
+                for broadcast in result.scalars().all()
+                if not self.is_running(broadcast.id)
+            }
+
+        for broadcast_id, config in configs.items():
+            logger.info('Подключаемся к незавершённой рассылке', broadcast_id=broadcast_id, worker_id=self._worker_id)
+            await self._spawn(broadcast_id, config)
+        return len(configs)
+
+    @staticmethod
+    def _config_from_history(broadcast: BroadcastHistory) -> BroadcastConfig:
+        media = None
+        if broadcast.has_media and broadcast.media_type and broadcast.media_file_id:
+            media = BroadcastMediaConfig(
+                type=broadcast.media_type,
+                file_id=broadcast.media_file_id,
+                caption=broadcast.media_caption,
+            )
+        return BroadcastConfig(
+            target=broadcast.target_type,
+            message_text=broadcast.message_text or '',
+            selected_buttons=list(broadcast.selected_buttons or []),
+            media=media,
+            initiator_name=broadcast.admin_name,
+        )
+
     async def _run_broadcast(
         self,
         broadcast_id: int,
@@ -147,34 +256,28 @@ class BroadcastService:
                 return
 
             async with AsyncSessionLocal() as session:
-                broadcast = await session.get(BroadcastHistory, broadcast_id)
+                broadcast = await session.get(BroadcastHistory, broadcast_id, with_for_update=True)
                 if not broadcast:
                     logger.error('Запись рассылки не найдена в БД', broadcast_id=broadcast_id)
                     return
 
-                broadcast.status = 'in_progress'
-                broadcast.sent_count = 0
-                broadcast.failed_count = 0
-                broadcast.blocked_count = 0
-                await session.commit()
-
-            # _fetch_recipients теперь возвращает list[int] (telegram_id), а не ORM-объекты
-            recipient_ids: list[int] = await self._fetch_recipients(config.target)
-
-            async with AsyncSessionLocal() as session:
-                broadcast = await session.get(BroadcastHistory, broadcast_id)
-                if not broadcast:
-                    logger.error('Запись рассылки удалена до запуска', broadcast_id=broadcast_id)
+                if broadcast.status == 'queued':
+                    # Список получателей фиксируется один раз; повторный запуск его не дублирует
+                    broadcast.total_count = await materialize_broadcast_recipients(session, broadcast_id, config.target)
+                    broadcast.status = 'in_progress'
+                    broadcast.sent_count = 0
+                    broadcast.failed_count = 0
+                    broadcast.blocked_count = 0
+                elif broadcast.status != 'in_progress':
+                    logger.info(
+                        'Рассылка уже завершена, пропускаем', broadcast_id=broadcast_id, status=broadcast.status
+                    )
                     return
 
-                broadcast.total_count = len(recipient_ids)
+                total_count = broadcast.total_count or 0
                 await session.commit()
 
-            if cancel_event.is_set():
-                await self._mark_cancelled(broadcast_id, sent_count, failed_count, blocked_count)
-                return
-
-            if not recipient_ids:
+            if not total_count:
                 logger.info('Рассылка : получатели не найдены', broadcast_id=broadcast_id)
                 await self._mark_finished(broadcast_id, sent_count, failed_count, blocked_count, cancelled=False)
                 return
@@ -182,16 +285,15 @@ class BroadcastService:
             keyboard = self._build_keyboard(config.selected_buttons)
 
             logger.info(
-                'Рассылка : начинаем отправку получателям (batch delay=s)',
+                'Рассылка : начинаем отправку получателям',
                 broadcast_id=broadcast_id,
-                recipient_ids_count=len(recipient_ids),
-                TG_BATCH_SIZE=_TG_BATCH_SIZE,
-                TG_BATCH_DELAY=_TG_BATCH_DELAY,
+                recipient_ids_count=total_count,
+                worker_id=self._worker_id,
+                send_workers=telegram_send_scheduler.workers_count,
             )
 
             sent_count, failed_count, blocked_count, cancelled_during_run = await self._send_batched(
                 broadcast_id,
-                recipient_ids,
                 config,
                 keyboard,
                 cancel_event,
@@ -219,144 +321,137 @@ class BroadcastService:
             )
 
         except asyncio.CancelledError:
-            await self._mark_cancelled(broadcast_id, sent_count, failed_count, blocked_count)
+            # Остановка процесса: рассылка остаётся in_progress и продолжится после перезапуска
+            await asyncio.shield(self._release_claims(broadcast_id))
             raise
         except Exception as exc:
             logger.exception('Критическая ошибка при выполнении рассылки', broadcast_id=broadcast_id, exc=exc)
+            await self._release_claims(broadcast_id)
             await self._mark_failed(broadcast_id, sent_count, failed_count, blocked_count)
 
-    async def _fetch_recipients(self, target: str) -> list[int]:
-        """Загружает получателей и возвращает список telegram_id (скаляры, не ORM-объекты)."""
-        async with AsyncSessionLocal() as session:
-            if target.startswith('custom_'):
-                criteria = target[len('custom_') :]
-                users_orm = await get_custom_users(session, criteria)
-            else:
-                users_orm = await get_target_users(session, target)
-
-            # Извлекаем telegram_id сразу, пока сессия жива.
-            # После выхода из блока ORM-объекты станут detached.
-            return [u.telegram_id for u in users_orm if u.telegram_id is not None]
-
     async def _send_batched(
         self,
         broadcast_id: int,
-        recipient_ids: list[int],
         config: BroadcastConfig,
         keyboard: InlineKeyboardMarkup | None,
         cancel_event: asyncio.Event,
     ) -> tuple[int, int, int, bool]:
         """
-        Единый метод рассылки для любого количества получателей.
+        Разбирает очередь получателей рассылки пачками по BROADCAST_CLAIM_BATCH_SIZE.
 
-        Батчинг по _TG_BATCH_SIZE сообщений с _TG_BATCH_DELAY задержкой.
-        Прогресс обновляется каждые _PROGRESS_UPDATE_MESSAGES сообщений.
-        Глобальная пауза при FloodWait.
+        Сообщения идут через общий telegram_send_scheduler: он держит лимит бота
+        (~30 сообщений/с вместе с уведомлениями мониторинга) и ставит общую паузу при FloodWait.
+        Результат каждой пачки сразу фиксируется в broadcast_recipients, поэтому после
+        перезапуска повторно может уйти не больше одной неподтверждённой пачки.
+        Счётчики считаются по всей очереди — с учётом других реплик.
 
         Returns (sent_count, failed_count, blocked_count, was_cancelled).
         """
-        sent_count = 0
-        failed_count = 0
-        blocked_count = 0
-        blocked_telegram_ids: list[int] = []
-
-        # Глобальная пауза при FloodWait — все корутины ждут
-        flood_wait_until: float = 0.0
-        last_progress_update: float = 0.0
+        counts: dict[str, int] = {}
+        last_progress_update: float = asyncio.get_running_loop().time()
         last_progress_count: int = 0
 
-        async def send_single(telegram_id: int) -> str:
-            """Returns 'sent', 'blocked', or 'failed'."""
-            nonlocal flood_wait_until
-
-            for attempt in range(_TG_MAX_RETRIES):
-                # Глобальная пауза при FloodWait
-                now = asyncio.get_event_loop().time()
-                if flood_wait_until > now:
-                    await asyncio.sleep(flood_wait_until - now)
-
-                if cancel_event.is_set():
-                    return 'failed'
-
-                try:
-                    await self._deliver_message(telegram_id, config, keyboard)
-                    return 'sent'
-
-                except TelegramRetryAfter as e:
-                    wait_seconds = e.retry_after + 1
-                    flood_wait_until = asyncio.get_event_loop().time() + wait_seconds
-                    logger.warning(
-                        'FloodWait рассылки : Telegram просит сек (user попытка /)',
-                        broadcast_id=broadcast_id,
-                        retry_after=e.retry_after,
-                        telegram_id=telegram_id,
-                        attempt=attempt + 1,
-                        TG_MAX_RETRIES=_TG_MAX_RETRIES,
-                    )
-                    await asyncio.sleep(wait_seconds)
-
-                except TelegramForbiddenError:
-                    return 'blocked'
+        def make_send(telegram_id: int):
+            return lambda: self._deliver_message(telegram_id, config, keyboard)
 
-                except TelegramBadRequest as e:
-                    err = str(e).lower()
-                    if 'bot was blocked' in err or 'user is deactivated' in err or 'chat not found' in err:
-                        return 'blocked'
-                    return 'failed'
-
-                except Exception as exc:
-                    logger.error(
-                        'Ошибка отправки рассылки пользователю (попытка /)',
-                        broadcast_id=broadcast_id,
-                        telegram_id=telegram_id,
-                        attempt=attempt + 1,
-                        TG_MAX_RETRIES=_TG_MAX_RETRIES,
-                        exc=exc,
-                    )
-                    if attempt < _TG_MAX_RETRIES - 1:
-                        await asyncio.sleep(0.5 * (attempt + 1))
-
-            return 'failed'
-
-        for i in range(0, len(recipient_ids), _TG_BATCH_SIZE):
-            if cancel_event.is_set():
-                await self._mark_cancelled(broadcast_id, sent_count, failed_count, blocked_count)
-                return sent_count, failed_count, blocked_count, True
-
-            batch = recipient_ids[i : i + _TG_BATCH_SIZE]
-            results = await asyncio.gather(
-                *[send_single(tid) for tid in batch],
-                return_exceptions=True,
+        def totals() -> tuple[int, int, int]:
+            return (
+                counts.get(BroadcastRecipientState.SENT.value, 0),
+                counts.get(BroadcastRecipientState.FAILED.value, 0),
+                counts.get(BroadcastRecipientState.BLOCKED.value, 0),
             )
 
-            for idx, result in enumerate(results):
-                if isinstance(result, str):
-                    if result == 'sent':
-                        sent_count += 1
-                    elif result == 'blocked':
-                        blocked_count += 1
-                        blocked_telegram_ids.append(batch[idx])
+        while True:
+            async with AsyncSessionLocal() as session:
+                status = await session.scalar(
+                    select(BroadcastHistory.status).where(BroadcastHistory.id == broadcast_id)
+                )
+                # Отмена могла прийти через другую реплику
+                if cancel_event.is_set() or status in ('cancelling', 'cancelled'):
+                    counts = await count_broadcast_recipients_by_state(session, broadcast_id)
+                    await self._mark_cancelled(broadcast_id, *totals())
+                    return *totals(), True
+                if status != 'in_progress':
+                    counts = await count_broadcast_recipients_by_state(session, broadcast_id)
+                    return *totals(), False
+
+                claimed = await claim_broadcast_recipients(
+                    session,
+                    broadcast_id,
+                    self._worker_id,
+                    settings.BROADCAST_CLAIM_BATCH_SIZE,
+                    settings.BROADCAST_CLAIM_LEASE_SECONDS,
+                )
+                await session.commit()
+
+            if not claimed:
+                async with AsyncSessionLocal() as session:
+                    counts = await count_broadcast_recipients_by_state(session, broadcast_id)
+                if not counts.get(BroadcastRecipientState.CLAIMED.value):
+                    return *totals(), False
+                # Остаток обрабатывают другие реплики; ждём их или истечения аренды
+                await asyncio.sleep(_CLAIM_RETRY_INTERVAL_SEC)
+                continue
+
+            outcomes: dict[int, str] = {}
+            deliveries = telegram_send_scheduler.deliver(claimed, make_send)
+            try:
+                async for telegram_id, error in deliveries:
+                    if error is None:
+                        outcomes[telegram_id] = BroadcastRecipientState.SENT.value
+                    elif self._is_blocked_error(error):
+                        outcomes[telegram_id] = BroadcastRecipientState.BLOCKED.value
                     else:
-                        failed_count += 1
-                elif isinstance(result, Exception):
-                    failed_count += 1
-                    logger.error('Необработанное исключение в рассылке', broadcast_id=broadcast_id, result=result)
+                        outcomes[telegram_id] = BroadcastRecipientState.FAILED.value
+                        logger.error(
+                            'Ошибка отправки рассылки пользователю',
+                            broadcast_id=broadcast_id,
+                            telegram_id=telegram_id,
+                            error=error,
+                        )
+
+                    if cancel_event.is_set():
+                        break
+            finally:
+                # Снимает с очереди неотправленные сообщения при отмене
+                await deliveries.aclose()
+
+            async with AsyncSessionLocal() as session:
+                await ack_broadcast_recipients(session, broadcast_id, self._worker_id, outcomes)
+                if len(outcomes) < len(claimed):
+                    await release_broadcast_recipients(session, broadcast_id, self._worker_id)
+                counts = await count_broadcast_recipients_by_state(session, broadcast_id)
+                await session.commit()
 
             # Обновляем прогресс в БД периодически
-            processed = sent_count + failed_count + blocked_count
-            now = asyncio.get_event_loop().time()
+            processed = sum(totals())
+            now = asyncio.get_running_loop().time()
             if (
                 processed - last_progress_count >= _PROGRESS_UPDATE_MESSAGES
                 or now - last_progress_update >= _PROGRESS_MIN_INTERVAL_SEC
             ):
-                await self._update_progress(broadcast_id, sent_count, failed_count, blocked_count)
+                await self._update_progress(broadcast_id, *totals())
                 last_progress_count = processed
                 last_progress_update = now
 
-            # Задержка между батчами для rate limiting
-            await asyncio.sleep(_TG_BATCH_DELAY)
+    async def _release_claims(self, broadcast_id: int) -> None:
+        try:
+            async with AsyncSessionLocal() as session:
+                released = await release_broadcast_recipients(session, broadcast_id, self._worker_id)
+                await session.commit()
+            if released:
+                logger.info('Получатели рассылки возвращены в очередь', broadcast_id=broadcast_id, released=released)
+        except SQLAlchemyError as exc:
+            logger.warning('Не удалось вернуть получателей рассылки в очередь', broadcast_id=broadcast_id, exc=exc)
 
-        return sent_count, failed_count, blocked_count, False
+    @staticmethod
+    def _is_blocked_error(error: BaseException) -> bool:
+        if isinstance(error, TelegramForbiddenError):
+            return True
+        if isinstance(error, TelegramBadRequest):
+            err = str(error).lower()
+            return 'bot was blocked' in err or 'user is deactivated' in err or 'chat not found' in err
+        return False
 
     def _build_keyboard(self, selected_buttons: list[str] | None) -> InlineKeyboardMarkup | None:
         if selected_buttons is None:
@@ -373,7 +468,7 @@ class BroadcastService:
         Отправляет одно сообщение.
 
         НЕ ловит исключения — TelegramRetryAfter, TelegramForbiddenError и др.
-        обрабатываются в вызывающем коде (_send_batched).
+        разбирают telegram_send_scheduler (FloodWait, сетевые ошибки) и _send_batched.
         """
         if not self._bot:
             raise RuntimeError('Телеграм-бот не инициализирован')
@@ -465,7 +560,7 @@ class BroadcastService:
             sent_count,
             failed_count,
             blocked_count,
-            status='in_progress',
+            status=None,
             update_completed_at=False,
         )
 
@@ -476,9 +571,10 @@ class BroadcastService:
         failed_count: int,
         blocked_count: int = 0,
         *,
-        status: str,
+        status: str | None,
         update_completed_at: bool = True,
     ) -> None:
+        """status=None обновляет только счётчики — не затирает отмену, пришедшую через API."""
         attempts = 0
 
         while attempts < 2:
@@ -491,7 +587,8 @@ class BroadcastService:
                     broadcast.sent_count = sent_count
                     broadcast.failed_count = failed_count
                     broadcast.blocked_count = blocked_count
-                    broadcast.status = status
+                    if status is not None:
+                        broadcast.status = status
 
                     if update_completed_at:
                         broadcast.completed_at = datetime.now(UTC)
@@ -516,75 +613,88 @@ async def cleanup_blocked_broadcast_users(blocked_telegram_ids: list[int]) -> No
     """
     Фоновая очистка пользователей, заблокировавших бота (обнаруженных при рассылке).
 
-    Для каждого telegram_id:
-    - Помечает пользователя как BLOCKED
-    - Отключает активные подписки (ACTIVE/TRIAL → DISABLED)
-    - Отключает пользователя в Remnawave панели
+    Обрабатывает получателей пачками по _BLOCKED_CLEANUP_CHUNK_SIZE, на пачку — одна транзакция:
+    - помечает пользователей BLOCKED (UPDATE ... RETURNING);
+    - отключает активные и триальные подписки (ACTIVE/TRIAL → DISABLED),
+      кроме пользователей с активной оплаченной подпиской.
+    После этого отключает пользователей в Remnawave панели через один клиент API
+    с ограниченным параллелизмом.
     """
     from app.services.subscription_service import SubscriptionService
 
-    subscription_service = SubscriptionService()
+    panel_uuids: list[str] = []
+    blocked_total = 0
+    disabled_total = 0
 
-    for telegram_id in blocked_telegram_ids:
+    unique_ids = list(dict.fromkeys(blocked_telegram_ids))
+    for start in range(0, len(unique_ids), _BLOCKED_CLEANUP_CHUNK_SIZE):
+        chunk = unique_ids[start : start + _BLOCKED_CLEANUP_CHUNK_SIZE]
         try:
             async with AsyncSessionLocal() as session:
-                result = await session.execute(select(User).where(User.telegram_id == telegram_id))
-                user = result.scalar_one_or_none()
-                if not user or user.status == UserStatus.BLOCKED.value:
-                    continue
-
-                user.status = UserStatus.BLOCKED.value
-
-                # Проверяем, есть ли активная оплаченная подписка
-                from app.database.crud.subscription import is_active_paid_subscription
-
-                sub_result = await session.execute(select(Subscription).where(Subscription.user_id == user.id))
-                user_subscription = sub_result.scalar_one_or_none()
-
-                if is_active_paid_subscription(user_subscription):
-                    logger.info(
-                        '⏭️ Пропуск отключения подписки: у пользователя активная оплаченная подписка',
-                        telegram_id=telegram_id,
-                        user_id=user.id,
-                    )
-                    await session.commit()
-                    continue
-
-                # Отключаем активные подписки (только триальные или истёкшие)
-                active_sub_result = await session.execute(
-                    select(Subscription).where(
-                        Subscription.user_id == user.id,
-                        Subscription.status.in_(
-                            [
-                                SubscriptionStatus.ACTIVE.value,
-                                SubscriptionStatus.TRIAL.value,
-                            ]
-                        ),
-                    )
+                blocked_users = await block_users_by_telegram_ids(session, chunk)
+                user_ids = [user_id for user_id, _, _ in blocked_users]
+                paid_user_ids = await get_user_ids_with_active_paid_subscription(session, user_ids)
+                eligible = [user for user in blocked_users if user[0] not in paid_user_ids]
+                disabled_user_ids = await disable_active_subscriptions_for_users(
+                    session, [user_id for user_id, _, _ in eligible]
                 )
-                subscriptions = active_sub_result.scalars().all()
-                for sub in subscriptions:
-                    sub.status = SubscriptionStatus.DISABLED.value
-
                 await session.commit()
+        except SQLAlchemyError as exc:
+            logger.error('Ошибка очистки заблокированных пользователей', chunk_size=len(chunk), exc=exc)
+            continue
 
-                # Отключаем в Remnawave панели (вне транзакции)
-                if user.remnawave_uuid:
-                    await subscription_service.disable_remnawave_user(user.remnawave_uuid)
+        await invalidate_user_context(telegram_ids=[telegram_id for _, telegram_id, _ in blocked_users])
+        if paid_user_ids:
+            logger.info(
+                '⏭️ Пропуск отключения подписок: у пользователей активная оплаченная подписка',
+                count=len(paid_user_ids),
+            )
 
-                logger.info(
-                    'Заблокированный пользователь очищен при рассылке',
-                    telegram_id=telegram_id,
-                    user_id=user.id,
-                    disabled_subs=len(subscriptions),
-                )
+        blocked_total += len(blocked_users)
+        disabled_total += len(disabled_user_ids)
+        panel_uuids.extend(remnawave_uuid for _, _, remnawave_uuid in eligible if remnawave_uuid)
+
+    disabled_in_panel = 0
+    if panel_uuids:
+        controller = AIMDConcurrencyController(
+            initial=settings.REMNAWAVE_PANEL_SYNC_INITIAL_CONCURRENCY,
+            min_limit=settings.REMNAWAVE_PANEL_SYNC_MIN_CONCURRENCY,
+            max_limit=settings.REMNAWAVE_PANEL_SYNC_MAX_CONCURRENCY,
+            latency_target=settings.REMNAWAVE_PANEL_SYNC_LATENCY_TARGET_MS / 1000,
+        )
 
+        async def disable_in_panel(api, user_uuid: str) -> bool:
+            async with controller.slot():
+                started = asyncio.get_running_loop().time()
+                try:
+                    await api.disable_user(user_uuid)
+                except Exception as exc:
+                    # "User already disabled" - считаем успехом, в том числе для регулятора
+                    if 'already disabled' in str(exc).lower():
+                        controller.record(asyncio.get_running_loop().time() - started)
+                        return True
+                    controller.record(asyncio.get_running_loop().time() - started, exc)
+                    logger.error('Ошибка отключения RemnaWave пользователя', user_uuid=user_uuid, error=exc)
+                    return False
+                controller.record(asyncio.get_running_loop().time() - started)
+                return True
+
+        try:
+            async with SubscriptionService().get_api_client() as api:
+                results = await asyncio.gather(*(disable_in_panel(api, user_uuid) for user_uuid in panel_uuids))
+            disabled_in_panel = sum(results)
         except Exception as exc:
-            logger.error(
-                'Ошибка очистки заблокированного пользователя',
-                telegram_id=telegram_id,
-                exc=exc,
-            )
+            logger.error('Не удалось отключить заблокированных пользователей в панели', exc=exc)
+
+    logger.info(
+        'Заблокированные пользователи очищены после рассылки',
+        requested=len(unique_ids),
+        blocked=blocked_total,
+        disabled_subs=disabled_total,
+        disabled_in_panel=disabled_in_panel,
+        panel_total=len(panel_uuids),
+        concurrency=controller.get_stats() if panel_uuids else None,
+    )
 
 
 broadcast_service = BroadcastService()
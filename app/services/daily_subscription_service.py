@@ -14,12 +14,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.database.crud.subscription import (
+    advance_daily_charge,
     get_daily_subscriptions_for_charge,
     suspend_daily_subscription_insufficient_balance,
     update_daily_charge_time,
 )
-from app.database.crud.transaction import create_transaction
-from app.database.crud.user import get_user_by_id, subtract_user_balance
+from app.database.crud.user import debit_user_balance, get_user_by_id
 from app.database.database import AsyncSessionLocal
 from app.database.models import PaymentMethod, Subscription, TransactionType, User
 from app.localization.texts import get_texts
@@ -151,29 +151,34 @@ class DailySubscriptionService:
         ).format(tariff_name=tariff.name)
 
         try:
-            deducted = await subtract_user_balance(
+            # Ключ — подписка и момент предыдущего списания: повторный прогон не спишет день дважды
+            charge_anchor = subscription.last_daily_charge_at or subscription.created_at
+            idempotency_key = f'daily:{subscription.id}:{charge_anchor.isoformat() if charge_anchor else "first"}'
+
+            # Отметка списания и продление фиксируются тем же commit, что и само списание
+            charge_time = datetime.now(UTC)
+            advance_daily_charge(subscription, charge_time)
+            change = await debit_user_balance(
                 db,
                 user,
                 daily_price,
                 description,
+                create_transaction=True,
+                payment_method=PaymentMethod.MANUAL,
+                transaction_type=TransactionType.SUBSCRIPTION_PAYMENT,
+                idempotency_key=idempotency_key,
             )
 
-            if not deducted:
+            if change.duplicate:
+                # День уже оплачен (параллельный прогон или списание без сохранённой отметки) — только отметка
+                logger.info('Суточное списание уже применено', subscription_id=subscription.id)
+                subscription = await update_daily_charge_time(db, subscription, charge_time)
+            elif not change.applied:
+                await db.rollback()
                 logger.warning('Не удалось списать средства для подписки', subscription_id=subscription.id)
                 return 'error'
-
-            # Создаём транзакцию
-            await create_transaction(
-                db=db,
-                user_id=user.id,
-                type=TransactionType.SUBSCRIPTION_PAYMENT,
-                amount_kopeks=daily_price,
-                description=description,
-                payment_method=PaymentMethod.MANUAL,
-            )
-
-            # Обновляем время последнего списания и продлеваем подписку
-            subscription = await update_daily_charge_time(db, subscription)
+            else:
+                await db.refresh(subscription)
 
             user_id_display = user.telegram_id or user.email or f'#{user.id}'
             logger.info(
@@ -198,7 +203,7 @@ class DailySubscriptionService:
                 logger.warning('Не удалось обновить Remnawave', error=e)
 
             # Уведомляем пользователя
-            if self._bot:
+            if self._bot and change.applied:
                 await self._notify_daily_charge(user, subscription, daily_price)
 
             return 'charged'
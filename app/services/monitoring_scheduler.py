@@ -0,0 +1,188 @@
+"""Планировщик фоновых задач мониторинга.
+
+Каждая задача выполняется в своей сессии БД со своим интервалом и таймаутом,
+так что медленный вызов Telegram или панели не держит общую транзакцию,
+а ошибка одной задачи не откатывает остальные. Независимые задачи идут
+параллельно в пределах общего лимита слотов; задачи одной группы
+(например, работающие с подписками) выполняются строго по очереди.
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any
+
+import structlog
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+logger = structlog.get_logger(__name__)
+
+# Максимальная пауза планировщика: чтобы вовремя заметить остановку и изменение интервалов
+MAX_TICK_SECONDS = 5.0
+
+
+@dataclass(slots=True)
+class MonitoringJob:
+    name: str
+    # Возвращает число обработанных строк (или None, если считать нечего)
+    func: Callable[[AsyncSession], Awaitable[int | None]]
+    interval: Callable[[], float]
+    timeout: Callable[[], float]
+    group: str | None = None
+    # Задержка первого запуска (по умолчанию — сразу после старта)
+    first_run_delay: Callable[[], float] | None = None
+
+
+@dataclass(slots=True)
+class MonitoringJobStats:
+    runs: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    running: bool = False
+    last_started_at: datetime | None = None
+    last_finished_at: datetime | None = None
+    last_duration: float | None = None
+    last_rows: int | None = None
+    total_rows: int = 0
+    last_error: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'runs': self.runs,
+            'failures': self.failures,
+            'timeouts': self.timeouts,
+            'running': self.running,
+            'last_started_at': self.last_started_at,
+            'last_finished_at': self.last_finished_at,
+            'last_duration': round(self.last_duration, 3) if self.last_duration is not None else None,
+            'last_rows': self.last_rows,
+            'total_rows': self.total_rows,
+            'last_error': self.last_error,
+        }
+
+
+class MonitoringJobScheduler:
+    def __init__(
+        self,
+        session_factory: Callable[[], Any],
+        max_concurrency: Callable[[], int],
+        on_failure: Callable[[str, str], Awaitable[None]] | None = None,
+    ):
+        self._session_factory = session_factory
+        self._max_concurrency = max_concurrency
+        self._on_failure = on_failure
+        self._jobs: dict[str, MonitoringJob] = {}
+        self._stats: dict[str, MonitoringJobStats] = {}
+        self._next_run: dict[str, float] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._group_locks: dict[str, asyncio.Lock] = {}
+        self._slots: asyncio.Semaphore | None = None
+
+    def register(self, job: MonitoringJob) -> None:
+        self._jobs[job.name] = job
+        self._stats[job.name] = MonitoringJobStats()
+        self._next_run[job.name] = time.monotonic() + job.first_run_delay() if job.first_run_delay else 0.0
+
+    @property
+    def jobs(self) -> list[str]:
+        return list(self._jobs)
+
+    async def run(self, is_running: Callable[[], bool]) -> None:
+        """Запускает задачи по мере наступления их срока, пока is_running() истинно."""
+        self._slots = asyncio.Semaphore(max(1, self._max_concurrency()))
+        try:
+            while is_running():
+                now = time.monotonic()
+                for name, job in self._jobs.items():
+                    if self._next_run[name] <= now and name not in self._tasks:
+                        self._next_run[name] = now + max(1.0, job.interval())
+                        self._start(job)
+
+                wake_at = min(self._next_run.values(), default=now + MAX_TICK_SECONDS)
+                await asyncio.sleep(min(MAX_TICK_SECONDS, max(0.0, wake_at - now)))
+
+            # Мягкая остановка: даём начатым задачам завершиться
+            if self._tasks:
+                await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        finally:
+            await self.cancel()
+
+    async def run_once(self) -> None:
+        """Однократный прогон всех задач (ручной запуск)."""
+        self._slots = self._slots or asyncio.Semaphore(max(1, self._max_concurrency()))
+        for job in self._jobs.values():
+            if job.name not in self._tasks:
+                self._start(job)
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def cancel(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _start(self, job: MonitoringJob) -> None:
+        task = asyncio.create_task(self._execute(job), name=f'monitoring:{job.name}')
+        self._tasks[job.name] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.name, None))
+
+    async def _execute(self, job: MonitoringJob) -> None:
+        group_lock = self._group_locks.setdefault(job.group, asyncio.Lock()) if job.group else None
+        async with group_lock or nullcontext(), self._slots:
+            await self._run_job(job)
+
+    async def _run_job(self, job: MonitoringJob) -> None:
+        stats = self._stats[job.name]
+        stats.running = True
+        stats.last_started_at = datetime.now(UTC)
+        started = time.monotonic()
+        error: str | None = None
+
+        try:
+            async with self._session_factory() as db:
+                try:
+                    async with asyncio.timeout(job.timeout()):
+                        rows = await job.func(db)
+                    await db.commit()
+                except BaseException:
+                    await db.rollback()
+                    raise
+        except TimeoutError:
+            stats.timeouts += 1
+            error = f'timeout after {job.timeout():.0f}s'
+        except asyncio.CancelledError:
+            error = 'cancelled'
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        else:
+            stats.last_rows = rows
+            stats.total_rows += rows or 0
+        finally:
+            stats.running = False
+            stats.runs += 1
+            stats.last_duration = time.monotonic() - started
+            stats.last_finished_at = datetime.now(UTC)
+            stats.last_error = error
+
+        if error is None:
+            logger.debug(
+                'Задача мониторинга выполнена', job=job.name, duration=round(stats.last_duration, 3), rows=rows
+            )
+            return
+
+        stats.failures += 1
+        logger.error('Ошибка задачи мониторинга', job=job.name, error=error)
+        if self._on_failure:
+            try:
+                await self._on_failure(job.name, error)
+            except Exception as e:
+                logger.error('Не удалось записать ошибку задачи мониторинга', job=job.name, error=e)
+
+    def get_status(self) -> dict[str, dict[str, Any]]:
+        return {name: stats.to_dict() for name, stats in self._stats.items()}
@@ -5,9 +5,9 @@ from typing import Any
 
 import structlog
 from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramNetworkError
-from sqlalchemy import and_, or_, select
+from sqlalchemy import and_, case, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 
 from app.config import settings
 from app.database.crud.discount_offer import (
@@ -19,10 +19,12 @@ from app.database.crud.notification import (
     clear_notification_by_type,
     notification_sent,
     record_notification,
+    record_notifications,
 )
 from app.database.crud.promo_offer_log import log_promo_offer_action
 from app.database.crud.subscription import (
     deactivate_subscription,
+    expire_subscriptions,
     extend_subscription,
     get_expired_subscriptions,
     get_expiring_subscriptions,
@@ -38,8 +40,10 @@ from app.database.crud.user import (
 from app.database.database import AsyncSessionLocal
 from app.database.models import (
     MonitoringLog,
+    SentNotification,
     Subscription,
     SubscriptionStatus,
+    Tariff,
     Ticket,
     TicketStatus,
     User,
@@ -53,12 +57,14 @@ from app.external.remnawave_api import (
     UserStatus as RemnaWaveUserStatus,
 )
 from app.localization.texts import get_texts
+from app.services.monitoring_scheduler import MonitoringJob, MonitoringJobScheduler
 from app.services.notification_delivery_service import (
     notification_delivery_service,
 )
 from app.services.notification_settings_service import NotificationSettingsService
 from app.services.promo_offer_service import promo_offer_service
 from app.services.subscription_service import SubscriptionService
+from app.services.telegram_send_scheduler import telegram_send_scheduler
 from app.utils.cache import cache
 from app.utils.miniapp_buttons import build_miniapp_or_callback_button
 from app.utils.pricing_utils import apply_percentage_discount
@@ -74,6 +80,10 @@ AUTOPAY_INSUFFICIENT_BALANCE_COOLDOWN_SECONDS: int = 21600
 # Размер батча для проверки подписок на каналы (keyset pagination)
 _CHANNEL_CHECK_BATCH_SIZE: int = 100
 
+# Пакетная рассылка уведомлений мониторинга: параллельно внутри пачки,
+# темп отправки задаёт общий telegram_send_scheduler
+NOTIFICATION_BATCH_SIZE: int = 50
+
 
 logger = structlog.get_logger(__name__)
 
@@ -89,6 +99,58 @@ class MonitoringService:
         self._notified_users: set[str] = set()
         self._last_cleanup = datetime.now(UTC)
         self._sla_task = None
+        self._scheduler = self._build_scheduler()
+
+    def _build_scheduler(self) -> MonitoringJobScheduler:
+        """
+        Задачи цикла мониторинга. Каждая — в своей сессии и со своим таймаутом;
+        задачи группы 'subscriptions' меняют одни и те же подписки и идут по очереди,
+        остальные (проверка каналов, очистки, статистика панели) — параллельно.
+        """
+        scheduler = MonitoringJobScheduler(
+            AsyncSessionLocal,
+            max_concurrency=lambda: settings.MONITORING_MAX_CONCURRENT_JOBS,
+            on_failure=self._record_job_failure,
+        )
+
+        def every_cycle() -> float:
+            return settings.MONITORING_INTERVAL * 60
+
+        def hourly() -> float:
+            return 3600
+
+        def job_timeout() -> float:
+            return settings.MONITORING_JOB_TIMEOUT_SECONDS
+
+        def until_daily_cleanup() -> float:
+            # Раз в сутки в 03:00 UTC; запуск в самом начале часа не планирует повтор на эти же сутки
+            now = datetime.now(UTC)
+            next_run = now.replace(hour=3, minute=0, second=0, microsecond=0)
+            if next_run - now < timedelta(minutes=1):
+                next_run += timedelta(days=1)
+            return (next_run - now).total_seconds()
+
+        for name, func, interval, group in (
+            ('offers_cleanup', self._cleanup_expired_offers, every_cycle, None),
+            ('expired_subscriptions', self._check_expired_subscriptions, every_cycle, 'subscriptions'),
+            ('expiring_subscriptions', self._check_expiring_subscriptions, every_cycle, 'subscriptions'),
+            ('trial_expiring', self._check_trial_expiring_soon, every_cycle, 'subscriptions'),
+            ('expired_followups', self._check_expired_subscription_followups, every_cycle, 'subscriptions'),
+            ('autopay', self._process_autopayments_if_enabled, every_cycle, 'subscriptions'),
+            ('trial_channel_subscriptions', self._check_trial_channel_subscriptions, every_cycle, None),
+            ('remnawave_stats', self._sync_with_remnawave, hourly, None),
+        ):
+            scheduler.register(MonitoringJob(name, func, interval, job_timeout, group))
+        scheduler.register(
+            MonitoringJob(
+                'inactive_users_cleanup',
+                self._cleanup_inactive_users,
+                until_daily_cleanup,
+                job_timeout,
+                first_run_delay=until_daily_cleanup,
+            )
+        )
+        return scheduler
 
     async def _send_message_with_logo(
         self,
@@ -116,12 +178,15 @@ class MonitoringService:
             try:
                 from app.utils.message_patch import _cache_logo_file_id, get_logo_media
 
-                result = await self.bot.send_photo(
-                    chat_id=chat_id,
-                    photo=get_logo_media(),
-                    caption=text,
-                    reply_markup=reply_markup,
-                    parse_mode=parse_mode,
+                result = await telegram_send_scheduler.send(
+                    chat_id,
+                    lambda: self.bot.send_photo(
+                        chat_id=chat_id,
+                        photo=get_logo_media(),
+                        caption=text,
+                        reply_markup=reply_markup,
+                        parse_mode=parse_mode,
+                    ),
                 )
                 _cache_logo_file_id(result)
                 return result
@@ -132,11 +197,14 @@ class MonitoringService:
                     exc=exc,
                 )
 
-        return await self.bot.send_message(
-            chat_id=chat_id,
-            text=text,
-            reply_markup=reply_markup,
-            parse_mode=parse_mode,
+        return await telegram_send_scheduler.send(
+            chat_id,
+            lambda: self.bot.send_message(
+                chat_id=chat_id,
+                text=text,
+                reply_markup=reply_markup,
+                parse_mode=parse_mode,
+            ),
         )
 
     @staticmethod
@@ -178,14 +246,11 @@ class MonitoringService:
         except Exception as e:
             logger.error('Не удалось запустить SLA-мониторинг', error=e)
 
-        while self.is_running:
-            try:
-                await self._monitoring_cycle()
-                await asyncio.sleep(settings.MONITORING_INTERVAL * 60)
-
-            except Exception as e:
-                logger.error('Ошибка в цикле мониторинга', error=e)
-                await asyncio.sleep(60)
+        # Ошибка самого планировщика пробрасывается — main.py перезапустит мониторинг
+        try:
+            await self._scheduler.run(lambda: self.is_running)
+        finally:
+            self.is_running = False
 
     def stop_monitoring(self):
         self.is_running = False
@@ -196,59 +261,39 @@ class MonitoringService:
         except Exception:
             pass
 
-    async def _monitoring_cycle(self):
-        async with AsyncSessionLocal() as db:
-            try:
-                await self._cleanup_notification_cache()
+    async def _cleanup_expired_offers(self, db: AsyncSession) -> int:
+        await self._cleanup_notification_cache()
 
-                expired_offers = await deactivate_expired_offers(db)
-                if expired_offers:
-                    logger.info('🧹 Деактивировано просроченных скидочных предложений', expired_offers=expired_offers)
+        expired_offers = await deactivate_expired_offers(db)
+        if expired_offers:
+            logger.info('🧹 Деактивировано просроченных скидочных предложений', expired_offers=expired_offers)
 
-                expired_active_discounts = await cleanup_expired_promo_offer_discounts(db)
-                if expired_active_discounts:
-                    logger.info(
-                        '🧹 Сброшено активных скидок промо-предложений с истекшим сроком',
-                        expired_active_discounts=expired_active_discounts,
-                    )
+        expired_active_discounts = await cleanup_expired_promo_offer_discounts(db)
+        if expired_active_discounts:
+            logger.info(
+                '🧹 Сброшено активных скидок промо-предложений с истекшим сроком',
+                expired_active_discounts=expired_active_discounts,
+            )
 
-                cleaned_test_access = await promo_offer_service.cleanup_expired_test_access(db)
-                if cleaned_test_access:
-                    logger.info(
-                        '🧹 Отозвано истекших тестовых доступов к сквадам', cleaned_test_access=cleaned_test_access
-                    )
+        cleaned_test_access = await promo_offer_service.cleanup_expired_test_access(db)
+        if cleaned_test_access:
+            logger.info('🧹 Отозвано истекших тестовых доступов к сквадам', cleaned_test_access=cleaned_test_access)
 
-                await self._check_expired_subscriptions(db)
-                await self._check_expiring_subscriptions(db)
-                await self._check_trial_expiring_soon(db)
-                await self._check_trial_channel_subscriptions(db)
-                await self._check_expired_subscription_followups(db)
-                if settings.ENABLE_AUTOPAY:
-                    await self._process_autopayments(db)
-                await self._cleanup_inactive_users(db)
-                await self._sync_with_remnawave(db)
+        return (expired_offers or 0) + (expired_active_discounts or 0) + (cleaned_test_access or 0)
 
-                await self._log_monitoring_event(
-                    db,
-                    'monitoring_cycle_completed',
-                    'Цикл мониторинга успешно завершен',
-                    {'timestamp': datetime.now(UTC).isoformat()},
-                )
-                await db.commit()
+    async def _process_autopayments_if_enabled(self, db: AsyncSession) -> None:
+        if settings.ENABLE_AUTOPAY:
+            await self._process_autopayments(db)
 
-            except Exception as e:
-                logger.error('Ошибка в цикле мониторинга', error=e)
-                try:
-                    await self._log_monitoring_event(
-                        db,
-                        'monitoring_cycle_error',
-                        f'Ошибка в цикле мониторинга: {e!s}',
-                        {'error': str(e)},
-                        is_success=False,
-                    )
-                except Exception:
-                    pass
-                await db.rollback()
+    async def _record_job_failure(self, job_name: str, error: str) -> None:
+        async with AsyncSessionLocal() as db:
+            await self._log_monitoring_event(
+                db,
+                'monitoring_job_error',
+                f'Ошибка задачи мониторинга {job_name}: {error}',
+                {'job': job_name, 'error': error},
+                is_success=False,
+            )
 
     async def _cleanup_notification_cache(self):
         current_time = datetime.now(UTC)
@@ -259,41 +304,51 @@ class MonitoringService:
             self._last_cleanup = current_time
             logger.info('🧹 Очищен кеш уведомлений ( записей)', old_count=old_count)
 
-    async def _check_expired_subscriptions(self, db: AsyncSession):
-        try:
-            from app.database.crud.subscription import is_recently_updated_by_webhook
-
-            expired_subscriptions = await get_expired_subscriptions(db)
+    async def _check_expired_subscriptions(self, db: AsyncSession) -> int:
+        from app.database.crud.subscription import is_recently_updated_by_webhook
 
-            for subscription in expired_subscriptions:
-                if is_recently_updated_by_webhook(subscription):
-                    logger.debug(
-                        'Пропуск expire подписки : обновлена вебхуком недавно', subscription_id=subscription.id
-                    )
-                    continue
+        expired_subscriptions = await get_expired_subscriptions(db)
 
-                from app.database.crud.subscription import expire_subscription
+        to_expire = []
+        for subscription in expired_subscriptions:
+            if is_recently_updated_by_webhook(subscription):
+                logger.debug('Пропуск expire подписки : обновлена вебхуком недавно', subscription_id=subscription.id)
+                continue
+            to_expire.append(subscription)
 
-                await expire_subscription(db, subscription)
+        # Пользователи уже загружены вместе с подписками — без запроса на каждого
+        users = [subscription.user for subscription in to_expire if subscription.user]
+        await expire_subscriptions(db, to_expire)
 
-                user = await get_user_by_id(db, subscription.user_id)
-                if user and self.bot:
-                    await self._send_subscription_expired_notification(user)
+        for subscription in to_expire:
+            logger.info("🔴 Подписка пользователя истекла и статус изменен на 'expired'", user_id=subscription.user_id)
 
-                logger.info(
-                    "🔴 Подписка пользователя истекла и статус изменен на 'expired'", user_id=subscription.user_id
-                )
+        if users and self.bot:
+            async for _ in self._deliver_in_batches(users, self._send_subscription_expired_notification):
+                pass
 
-            if expired_subscriptions:
-                await self._log_monitoring_event(
-                    db,
-                    'expired_subscriptions_processed',
-                    f'Обработано {len(expired_subscriptions)} истёкших подписок',
-                    {'count': len(expired_subscriptions)},
-                )
+        if expired_subscriptions:
+            await self._log_monitoring_event(
+                db,
+                'expired_subscriptions_processed',
+                f'Обработано {len(expired_subscriptions)} истёкших подписок',
+                {'count': len(expired_subscriptions)},
+            )
+        return len(to_expire)
 
-        except Exception as e:
-            logger.error('Ошибка проверки истёкших подписок', error=e)
+    async def _deliver_in_batches(self, items: list, send):
+        """
+        Отправляет уведомления пачками по NOTIFICATION_BATCH_SIZE параллельно.
+        Лимит Telegram соблюдает общий telegram_send_scheduler, поэтому паузы между пачками нет.
+        Отдаёт [(item, успех)] после каждой пачки, чтобы вызывающий код сразу фиксировал результат.
+        """
+        for start in range(0, len(items), NOTIFICATION_BATCH_SIZE):
+            batch = items[start : start + NOTIFICATION_BATCH_SIZE]
+            outcomes = await asyncio.gather(*(send(item) for item in batch), return_exceptions=True)
+            for item, outcome in zip(batch, outcomes, strict=True):
+                if isinstance(outcome, Exception):
+                    logger.error('Ошибка пакетной отправки уведомления', error=outcome)
+            yield [(item, outcome is True) for item, outcome in zip(batch, outcomes, strict=True)]
 
     async def update_remnawave_user(self, db: AsyncSession, subscription: Subscription) -> RemnaWaveUser | None:
         try:
@@ -379,149 +434,111 @@ class MonitoringService:
             logger.error('Ошибка обновления RemnaWave пользователя', error=e)
             return None
 
-    async def _check_expiring_subscriptions(self, db: AsyncSession):
-        try:
-            warning_days = settings.get_autopay_warning_days()
-            all_processed_users = set()
-
-            for days in warning_days:
-                expiring_subscriptions = await self._get_expiring_paid_subscriptions(db, days)
-                sent_count = 0
-
-                for subscription in expiring_subscriptions:
-                    user = await get_user_by_id(db, subscription.user_id)
-                    if not user:
-                        continue
-
-                    # Use user.id for key to support both Telegram and email users
-                    user_key = f'user_{user.id}_today'
-                    user_identifier = user.telegram_id or f'email:{user.id}'
-
-                    if (
-                        await notification_sent(db, user.id, subscription.id, 'expiring', days)
-                        or user_key in all_processed_users
-                    ):
-                        logger.debug(
-                            'Уведомление уже отправлено, пропускаем',
-                            user_identifier=user_identifier,
-                            days=days,
-                        )
-                        continue
+    async def _check_expiring_subscriptions(self, db: AsyncSession) -> int:
+        plan = await self._plan_expiring_notifications(db)
+        if not plan:
+            return 0
 
-                    should_send = True
-                    for other_days in warning_days:
-                        if other_days < days:
-                            other_subs = await self._get_expiring_paid_subscriptions(db, other_days)
-                            if any(s.user_id == user.id for s in other_subs):
-                                should_send = False
-                                logger.debug(
-                                    '🎯 Пропускаем уведомление на дней для пользователя есть более срочное на дней',
-                                    days=days,
-                                    user_identifier=user_identifier,
-                                    other_days=other_days,
-                                )
-                                break
+        sent_by_days: dict[int, int] = {}
+        async for results in self._deliver_in_batches(plan, self._deliver_expiring_notification):
+            delivered = [(subscription, days) for (subscription, days), success in results if success]
+            await record_notifications(
+                db,
+                [(subscription.user_id, subscription.id, 'expiring', days) for subscription, days in delivered],
+            )
+            for _, days in delivered:
+                sent_by_days[days] = sent_by_days.get(days, 0) + 1
 
-                    if not should_send:
-                        continue
+        for days, sent_count in sorted(sent_by_days.items()):
+            await self._log_monitoring_event(
+                db,
+                'expiring_notifications_sent',
+                f'Отправлено {sent_count} уведомлений об истечении через {days} дней',
+                {'days': days, 'count': sent_count},
+            )
+        return sum(sent_by_days.values())
 
-                    # Handle email-only users via notification delivery service
-                    if not user.telegram_id:
-                        success = await notification_delivery_service.notify_subscription_expiring(
-                            user=user,
-                            days_left=days,
-                            expires_at=subscription.end_date,
-                        )
-                        if success:
-                            await record_notification(db, user.id, subscription.id, 'expiring', days)
-                            all_processed_users.add(user_key)
-                            sent_count += 1
-                            logger.info(
-                                '✅ Email-пользователю отправлено уведомление об истечении подписки через дней',
-                                user_id=user.id,
-                                days=days,
-                            )
-                        continue
+    async def _deliver_expiring_notification(self, planned: tuple[Subscription, int]) -> bool:
+        subscription, days = planned
+        user = subscription.user
 
-                    if self.bot:
-                        success = await self._send_subscription_expiring_notification(user, subscription, days)
-                        if success:
-                            await record_notification(db, user.id, subscription.id, 'expiring', days)
-                            all_processed_users.add(user_key)
-                            sent_count += 1
-                            logger.info(
-                                '✅ Пользователю отправлено уведомление об истечении подписки через дней',
-                                telegram_id=user.telegram_id,
-                                days=days,
-                            )
-                        else:
-                            logger.warning(
-                                '❌ Не удалось отправить уведомление пользователю', telegram_id=user.telegram_id
-                            )
+        # Handle email-only users via notification delivery service
+        if not user.telegram_id:
+            success = await notification_delivery_service.notify_subscription_expiring(
+                user=user,
+                days_left=days,
+                expires_at=subscription.end_date,
+            )
+            if success:
+                logger.info(
+                    '✅ Email-пользователю отправлено уведомление об истечении подписки через дней',
+                    user_id=user.id,
+                    days=days,
+                )
+            return success
 
-                if sent_count > 0:
-                    await self._log_monitoring_event(
-                        db,
-                        'expiring_notifications_sent',
-                        f'Отправлено {sent_count} уведомлений об истечении через {days} дней',
-                        {'days': days, 'count': sent_count},
-                    )
+        if not self.bot:
+            return False
 
-        except Exception as e:
-            logger.error('Ошибка проверки истекающих подписок', error=e)
+        success = await self._send_subscription_expiring_notification(user, subscription, days)
+        if success:
+            logger.info(
+                '✅ Пользователю отправлено уведомление об истечении подписки через дней',
+                telegram_id=user.telegram_id,
+                days=days,
+            )
+        else:
+            logger.warning('❌ Не удалось отправить уведомление пользователю', telegram_id=user.telegram_id)
+        return success
 
     async def _check_trial_expiring_soon(self, db: AsyncSession):
-        try:
-            threshold_time = datetime.now(UTC) + timedelta(hours=2)
+        threshold_time = datetime.now(UTC) + timedelta(hours=2)
 
-            result = await db.execute(
-                select(Subscription)
-                .join(Subscription.user)
-                .options(
-                    selectinload(Subscription.user).selectinload(User.promo_group),
-                    selectinload(Subscription.user)
-                    .selectinload(User.user_promo_groups)
-                    .selectinload(UserPromoGroup.promo_group),
-                )
-                .where(
-                    and_(
-                        Subscription.status == SubscriptionStatus.ACTIVE.value,
-                        Subscription.is_trial == True,
-                        Subscription.end_date <= threshold_time,
-                        Subscription.end_date > datetime.now(UTC),
-                        User.status == UserStatus.ACTIVE.value,
-                    )
+        result = await db.execute(
+            select(Subscription)
+            .join(Subscription.user)
+            .options(
+                selectinload(Subscription.user).selectinload(User.promo_group),
+                selectinload(Subscription.user)
+                .selectinload(User.user_promo_groups)
+                .selectinload(UserPromoGroup.promo_group),
+            )
+            .where(
+                and_(
+                    Subscription.status == SubscriptionStatus.ACTIVE.value,
+                    Subscription.is_trial == True,
+                    Subscription.end_date <= threshold_time,
+                    Subscription.end_date > datetime.now(UTC),
+                    User.status == UserStatus.ACTIVE.value,
                 )
             )
-            trial_expiring = result.scalars().all()
-
-            for subscription in trial_expiring:
-                user = subscription.user
-                if not user:
-                    continue
+        )
+        trial_expiring = result.scalars().all()
 
-                if await notification_sent(db, user.id, subscription.id, 'trial_2h'):
-                    continue
+        for subscription in trial_expiring:
+            user = subscription.user
+            if not user:
+                continue
 
-                if self.bot:
-                    success = await self._send_trial_ending_notification(user, subscription)
-                    if success:
-                        await record_notification(db, user.id, subscription.id, 'trial_2h')
-                        logger.info(
-                            '🎁 Пользователю отправлено уведомление об окончании тестовой подписки через 2 часа',
-                            telegram_id=user.telegram_id,
-                        )
+            if await notification_sent(db, user.id, subscription.id, 'trial_2h'):
+                continue
 
-            if trial_expiring:
-                await self._log_monitoring_event(
-                    db,
-                    'trial_expiring_notifications_sent',
-                    f'Отправлено {len(trial_expiring)} уведомлений об окончании тестовых подписок',
-                    {'count': len(trial_expiring)},
-                )
+            if self.bot:
+                success = await self._send_trial_ending_notification(user, subscription)
+                if success:
+                    await record_notification(db, user.id, subscription.id, 'trial_2h')
+                    logger.info(
+                        '🎁 Пользователю отправлено уведомление об окончании тестовой подписки через 2 часа',
+                        telegram_id=user.telegram_id,
+                    )
 
-        except Exception as e:
-            logger.error('Ошибка проверки истекающих тестовых подписок', error=e)
+        if trial_expiring:
+            await self._log_monitoring_event(
+                db,
+                'trial_expiring_notifications_sent',
+                f'Отправлено {len(trial_expiring)} уведомлений об окончании тестовых подписок',
+                {'count': len(trial_expiring)},
+            )
 
     async def _check_trial_channel_subscriptions(self, db: AsyncSession):
         """Background reconciliation of channel subscriptions (rate-limited).
@@ -558,208 +575,203 @@ class MonitoringService:
         if not channel_subscription_service.bot:
             channel_subscription_service.bot = self.bot
 
-        try:
-            now = datetime.now(UTC)
-            notifications_allowed = (
-                NotificationSettingsService.are_notifications_globally_enabled()
-                and NotificationSettingsService.is_trial_channel_unsubscribed_enabled()
-            )
-
-            disabled_count = 0
-            restored_count = 0
-            checked_count = 0
-            last_id = 0
-
-            # Build the trial/all filter based on CHANNEL_REQUIRED_FOR_ALL setting
-            from sqlalchemy import true as sa_true
-
-            is_trial_filter = sa_true() if settings.CHANNEL_REQUIRED_FOR_ALL else Subscription.is_trial.is_(True)
-
-            while True:
-                # Fresh session per batch to avoid long-running connections
-                async with AsyncSessionLocal() as batch_db:
-                    result = await batch_db.execute(
-                        select(Subscription)
-                        .join(Subscription.user)
-                        .options(
-                            selectinload(Subscription.user),
-                            selectinload(Subscription.tariff),
-                        )
-                        .where(
-                            and_(
-                                Subscription.id > last_id,
-                                is_trial_filter,
-                                Subscription.end_date > now,
-                                Subscription.status.in_(
-                                    [
-                                        SubscriptionStatus.ACTIVE.value,
-                                        SubscriptionStatus.DISABLED.value,
-                                    ]
-                                ),
-                                User.status == UserStatus.ACTIVE.value,
-                            )
+        now = datetime.now(UTC)
+        notifications_allowed = (
+            NotificationSettingsService.are_notifications_globally_enabled()
+            and NotificationSettingsService.is_trial_channel_unsubscribed_enabled()
+        )
+
+        disabled_count = 0
+        restored_count = 0
+        checked_count = 0
+        last_id = 0
+
+        # Build the trial/all filter based on CHANNEL_REQUIRED_FOR_ALL setting
+        from sqlalchemy import true as sa_true
+
+        is_trial_filter = sa_true() if settings.CHANNEL_REQUIRED_FOR_ALL else Subscription.is_trial.is_(True)
+
+        while True:
+            # Fresh session per batch to avoid long-running connections
+            async with AsyncSessionLocal() as batch_db:
+                result = await batch_db.execute(
+                    select(Subscription)
+                    .join(Subscription.user)
+                    .options(
+                        selectinload(Subscription.user),
+                        selectinload(Subscription.tariff),
+                    )
+                    .where(
+                        and_(
+                            Subscription.id > last_id,
+                            is_trial_filter,
+                            Subscription.end_date > now,
+                            Subscription.status.in_(
+                                [
+                                    SubscriptionStatus.ACTIVE.value,
+                                    SubscriptionStatus.DISABLED.value,
+                                ]
+                            ),
+                            User.status == UserStatus.ACTIVE.value,
                         )
-                        .order_by(Subscription.id)
-                        .limit(_CHANNEL_CHECK_BATCH_SIZE)
                     )
+                    .order_by(Subscription.id)
+                    .limit(_CHANNEL_CHECK_BATCH_SIZE)
+                )
 
-                    subscriptions = result.scalars().all()
-                    if not subscriptions:
-                        break
-
-                    last_id = subscriptions[-1].id
+                subscriptions = result.scalars().all()
+                if not subscriptions:
+                    break
 
-                    for subscription in subscriptions:
-                        user = subscription.user
-                        if not user or not user.telegram_id:
-                            continue
+                last_id = subscriptions[-1].id
 
-                        # Existing guard: skip if recently updated by webhook
-                        if is_recently_updated_by_webhook(subscription):
-                            logger.debug(
-                                'Skipping subscription: recently updated by webhook',
-                                subscription_id=subscription.id,
-                            )
-                            continue
+                for subscription in subscriptions:
+                    user = subscription.user
+                    if not user or not user.telegram_id:
+                        continue
 
-                        checked_count += 1
+                    # Existing guard: skip if recently updated by webhook
+                    if is_recently_updated_by_webhook(subscription):
+                        logger.debug(
+                            'Skipping subscription: recently updated by webhook',
+                            subscription_id=subscription.id,
+                        )
+                        continue
 
-                        # Rate-limited check for ALL channels
-                        all_subscribed = True
-                        for ch in channels:
-                            is_member = await channel_subscription_service._rate_limited_check(
-                                user.telegram_id, ch['channel_id']
-                            )
-                            # Update DB + cache
-                            await upsert_user_channel_sub(batch_db, user.telegram_id, ch['channel_id'], is_member)
-                            await ChannelSubCache.set_sub_status(user.telegram_id, ch['channel_id'], is_member)
-
-                            if not is_member:
-                                all_subscribed = False
-
-                        # DEACTIVATE: was active, now not subscribed to all
-                        if subscription.status == SubscriptionStatus.ACTIVE.value and not all_subscribed:
-                            # Guard: always skip paid subscriptions (user paid money)
-                            if is_active_paid_subscription(subscription):
-                                continue
-
-                            subscription = await deactivate_subscription(batch_db, subscription)
-                            disabled_count += 1
-                            logger.info(
-                                'Subscription deactivated (channel unsubscribe)',
-                                telegram_id=user.telegram_id,
-                                subscription_id=subscription.id,
-                                is_trial=subscription.is_trial,
-                            )
+                    checked_count += 1
 
-                            if user.remnawave_uuid:
-                                try:
-                                    await self.subscription_service.disable_remnawave_user(user.remnawave_uuid)
-                                except Exception as api_error:
-                                    logger.error(
-                                        'Failed to disable RemnaWave user',
-                                        remnawave_uuid=user.remnawave_uuid,
-                                        api_error=api_error,
-                                    )
+                    # Rate-limited check for ALL channels
+                    all_subscribed = True
+                    for ch in channels:
+                        is_member = await channel_subscription_service._rate_limited_check(
+                            user.telegram_id, ch['channel_id']
+                        )
+                        # Update DB + cache
+                        await upsert_user_channel_sub(batch_db, user.telegram_id, ch['channel_id'], is_member)
+                        await ChannelSubCache.set_sub_status(user.telegram_id, ch['channel_id'], is_member)
 
-                            if notifications_allowed:
-                                if not await notification_sent(
-                                    batch_db,
-                                    user.id,
-                                    subscription.id,
-                                    'trial_channel_unsubscribed',
-                                ):
-                                    sent = await self._send_trial_channel_unsubscribed_notification(user)
-                                    if sent:
-                                        await record_notification(
-                                            batch_db,
-                                            user.id,
-                                            subscription.id,
-                                            'trial_channel_unsubscribed',
-                                        )
-
-                        # REACTIVATE: was disabled, now subscribed to all
-                        elif subscription.status == SubscriptionStatus.DISABLED.value and all_subscribed:
-                            # Guard: traffic limit exhausted
-                            if (
-                                subscription.traffic_limit_gb
-                                and subscription.traffic_used_gb is not None
-                                and subscription.traffic_used_gb >= subscription.traffic_limit_gb
-                            ):
-                                logger.debug(
-                                    'Skipping reactivation: traffic exhausted',
-                                    subscription_id=subscription.id,
-                                    traffic_used=subscription.traffic_used_gb,
-                                    traffic_limit=subscription.traffic_limit_gb,
-                                )
-                                continue
-
-                            # Guard: disabled by webhook, not by monitoring
-                            if (
-                                subscription.last_webhook_update_at
-                                and subscription.updated_at
-                                and subscription.last_webhook_update_at
-                                >= subscription.updated_at - timedelta(seconds=10)
-                            ):
-                                logger.debug(
-                                    'Skipping reactivation: disabled by RemnaWave panel',
-                                    subscription_id=subscription.id,
-                                    last_webhook_at=subscription.last_webhook_update_at,
-                                    updated_at=subscription.updated_at,
-                                )
-                                continue
+                        if not is_member:
+                            all_subscribed = False
 
-                            subscription.status = SubscriptionStatus.ACTIVE.value
-                            subscription.updated_at = datetime.now(UTC)
-                            restored_count += 1
+                    # DEACTIVATE: was active, now not subscribed to all
+                    if subscription.status == SubscriptionStatus.ACTIVE.value and not all_subscribed:
+                        # Guard: always skip paid subscriptions (user paid money)
+                        if is_active_paid_subscription(subscription):
+                            continue
 
-                            logger.info(
-                                'Subscription restored (channel resubscribe)',
-                                telegram_id=user.telegram_id,
-                                subscription_id=subscription.id,
-                                is_trial=subscription.is_trial,
-                            )
+                        subscription = await deactivate_subscription(batch_db, subscription)
+                        disabled_count += 1
+                        logger.info(
+                            'Subscription deactivated (channel unsubscribe)',
+                            telegram_id=user.telegram_id,
+                            subscription_id=subscription.id,
+                            is_trial=subscription.is_trial,
+                        )
 
+                        if user.remnawave_uuid:
                             try:
-                                if user.remnawave_uuid:
-                                    await self.subscription_service.update_remnawave_user(batch_db, subscription)
-                                else:
-                                    await self.subscription_service.create_remnawave_user(batch_db, subscription)
+                                await self.subscription_service.disable_remnawave_user(user.remnawave_uuid)
                             except Exception as api_error:
                                 logger.error(
-                                    'Failed to update RemnaWave user',
-                                    telegram_id=user.telegram_id,
+                                    'Failed to disable RemnaWave user',
+                                    remnawave_uuid=user.remnawave_uuid,
                                     api_error=api_error,
                                 )
 
-                            await clear_notification_by_type(
+                        if notifications_allowed:
+                            if not await notification_sent(
                                 batch_db,
+                                user.id,
                                 subscription.id,
                                 'trial_channel_unsubscribed',
+                            ):
+                                sent = await self._send_trial_channel_unsubscribed_notification(user)
+                                if sent:
+                                    await record_notification(
+                                        batch_db,
+                                        user.id,
+                                        subscription.id,
+                                        'trial_channel_unsubscribed',
+                                    )
+
+                    # REACTIVATE: was disabled, now subscribed to all
+                    elif subscription.status == SubscriptionStatus.DISABLED.value and all_subscribed:
+                        # Guard: traffic limit exhausted
+                        if (
+                            subscription.traffic_limit_gb
+                            and subscription.traffic_used_gb is not None
+                            and subscription.traffic_used_gb >= subscription.traffic_limit_gb
+                        ):
+                            logger.debug(
+                                'Skipping reactivation: traffic exhausted',
+                                subscription_id=subscription.id,
+                                traffic_used=subscription.traffic_used_gb,
+                                traffic_limit=subscription.traffic_limit_gb,
                             )
+                            continue
 
-                    # Commit all changes for this batch
-                    await batch_db.commit()
+                        # Guard: disabled by webhook, not by monitoring
+                        if (
+                            subscription.last_webhook_update_at
+                            and subscription.updated_at
+                            and subscription.last_webhook_update_at >= subscription.updated_at - timedelta(seconds=10)
+                        ):
+                            logger.debug(
+                                'Skipping reactivation: disabled by RemnaWave panel',
+                                subscription_id=subscription.id,
+                                last_webhook_at=subscription.last_webhook_update_at,
+                                updated_at=subscription.updated_at,
+                            )
+                            continue
 
-            if disabled_count or restored_count:
-                check_scope = 'all' if settings.CHANNEL_REQUIRED_FOR_ALL else 'trial'
-                await self._log_monitoring_event(
-                    db,
-                    'trial_channel_subscription_check',
-                    (
-                        f'Checked {checked_count} {check_scope} subscriptions: '
-                        f'disabled {disabled_count}, restored {restored_count}'
-                    ),
-                    {
-                        'checked': checked_count,
-                        'disabled': disabled_count,
-                        'restored': restored_count,
-                        'scope': check_scope,
-                    },
-                )
+                        subscription.status = SubscriptionStatus.ACTIVE.value
+                        subscription.updated_at = datetime.now(UTC)
+                        restored_count += 1
 
-        except Exception as error:
-            logger.error('Error checking channel subscriptions', error=error)
+                        logger.info(
+                            'Subscription restored (channel resubscribe)',
+                            telegram_id=user.telegram_id,
+                            subscription_id=subscription.id,
+                            is_trial=subscription.is_trial,
+                        )
+
+                        try:
+                            if user.remnawave_uuid:
+                                await self.subscription_service.update_remnawave_user(batch_db, subscription)
+                            else:
+                                await self.subscription_service.create_remnawave_user(batch_db, subscription)
+                        except Exception as api_error:
+                            logger.error(
+                                'Failed to update RemnaWave user',
+                                telegram_id=user.telegram_id,
+                                api_error=api_error,
+                            )
+
+                        await clear_notification_by_type(
+                            batch_db,
+                            subscription.id,
+                            'trial_channel_unsubscribed',
+                        )
+
+                # Commit all changes for this batch
+                await batch_db.commit()
+
+        if disabled_count or restored_count:
+            check_scope = 'all' if settings.CHANNEL_REQUIRED_FOR_ALL else 'trial'
+            await self._log_monitoring_event(
+                db,
+                'trial_channel_subscription_check',
+                (
+                    f'Checked {checked_count} {check_scope} subscriptions: '
+                    f'disabled {disabled_count}, restored {restored_count}'
+                ),
+                {
+                    'checked': checked_count,
+                    'disabled': disabled_count,
+                    'restored': restored_count,
+                    'scope': check_scope,
+                },
+            )
 
     async def _check_expired_subscription_followups(self, db: AsyncSession):
         if not NotificationSettingsService.are_notifications_globally_enabled():
@@ -767,66 +779,94 @@ class MonitoringService:
         if not self.bot:
             return
 
-        try:
-            now = datetime.now(UTC)
+        now = datetime.now(UTC)
 
-            result = await db.execute(
-                select(Subscription)
-                .options(
-                    selectinload(Subscription.user),
-                    selectinload(Subscription.tariff),
-                )
-                .where(
-                    and_(
-                        Subscription.is_trial == False,
-                        Subscription.end_date <= now,
-                    )
+        result = await db.execute(
+            select(Subscription)
+            .options(
+                selectinload(Subscription.user),
+                selectinload(Subscription.tariff),
+            )
+            .where(
+                and_(
+                    Subscription.is_trial == False,
+                    Subscription.end_date <= now,
                 )
             )
+        )
 
-            all_subscriptions = result.scalars().all()
+        all_subscriptions = result.scalars().all()
 
-            # Исключаем суточные тарифы - для них отдельная логика
-            subscriptions = [
-                sub for sub in all_subscriptions if not (sub.tariff and getattr(sub.tariff, 'is_daily', False))
-            ]
+        # Исключаем суточные тарифы - для них отдельная логика
+        subscriptions = [
+            sub for sub in all_subscriptions if not (sub.tariff and getattr(sub.tariff, 'is_daily', False))
+        ]
 
-            sent_day1 = 0
-            sent_wave2 = 0
-            sent_wave3 = 0
+        sent_day1 = 0
+        sent_wave2 = 0
+        sent_wave3 = 0
 
-            for subscription in subscriptions:
-                user = subscription.user
-                if not user:
-                    continue
+        for subscription in subscriptions:
+            user = subscription.user
+            if not user:
+                continue
 
-                if subscription.end_date is None:
-                    continue
+            if subscription.end_date is None:
+                continue
 
-                time_since_end = now - subscription.end_date
-                if time_since_end.total_seconds() < 0:
-                    continue
+            time_since_end = now - subscription.end_date
+            if time_since_end.total_seconds() < 0:
+                continue
 
-                days_since = time_since_end.total_seconds() / 86400
+            days_since = time_since_end.total_seconds() / 86400
 
-                # Day 1 reminder
-                if NotificationSettingsService.is_expired_1d_enabled() and 1 <= days_since < 2:
-                    if not await notification_sent(db, user.id, subscription.id, 'expired_1d'):
-                        success = await self._send_expired_day1_notification(user, subscription)
-                        if success:
-                            await record_notification(db, user.id, subscription.id, 'expired_1d')
-                            sent_day1 += 1
-
-                # Second wave (2-3 days) discount
-                if NotificationSettingsService.is_second_wave_enabled() and 2 <= days_since < 4:
-                    if not await notification_sent(db, user.id, subscription.id, 'expired_discount_wave2'):
-                        percent = NotificationSettingsService.get_second_wave_discount_percent()
-                        valid_hours = NotificationSettingsService.get_second_wave_valid_hours()
+            # Day 1 reminder
+            if NotificationSettingsService.is_expired_1d_enabled() and 1 <= days_since < 2:
+                if not await notification_sent(db, user.id, subscription.id, 'expired_1d'):
+                    success = await self._send_expired_day1_notification(user, subscription)
+                    if success:
+                        await record_notification(db, user.id, subscription.id, 'expired_1d')
+                        sent_day1 += 1
+
+            # Second wave (2-3 days) discount
+            if NotificationSettingsService.is_second_wave_enabled() and 2 <= days_since < 4:
+                if not await notification_sent(db, user.id, subscription.id, 'expired_discount_wave2'):
+                    percent = NotificationSettingsService.get_second_wave_discount_percent()
+                    valid_hours = NotificationSettingsService.get_second_wave_valid_hours()
+                    offer = await upsert_discount_offer(
+                        db,
+                        user_id=user.id,
+                        subscription_id=subscription.id,
+                        notification_type='expired_discount_wave2',
+                        discount_percent=percent,
+                        bonus_amount_kopeks=0,
+                        valid_hours=valid_hours,
+                        effect_type='percent_discount',
+                    )
+                    success = await self._send_expired_discount_notification(
+                        user,
+                        subscription,
+                        percent,
+                        offer.expires_at,
+                        offer.id,
+                        'second',
+                    )
+                    if success:
+                        await record_notification(db, user.id, subscription.id, 'expired_discount_wave2')
+                        sent_wave2 += 1
+
+            # Third wave (N days) discount
+            if NotificationSettingsService.is_third_wave_enabled():
+                trigger_days = NotificationSettingsService.get_third_wave_trigger_days()
+                if trigger_days <= days_since < trigger_days + 1:
+                    if not await notification_sent(db, user.id, subscription.id, 'expired_discount_wave3'):
+                        percent = NotificationSettingsService.get_third_wave_discount_percent()
+                        valid_hours = NotificationSettingsService.get_third_wave_valid_hours()
                         offer = await upsert_discount_offer(
                             db,
                             user_id=user.id,
                             subscription_id=subscription.id,
-                            notification_type='expired_discount_wave2',
+                            notification_type='expired_discount_wave3',
                             discount_percent=percent,
                             bonus_amount_kopeks=0,
                             valid_hours=valid_hours,
@@ -838,95 +878,82 @@ class MonitoringService:
                             percent,
                             offer.expires_at,
                             offer.id,
-                            'second',
+                            'third',
+                            trigger_days=trigger_days,
                         )
                         if success:
-                            await record_notification(db, user.id, subscription.id, 'expired_discount_wave2')
-                            sent_wave2 += 1
-
-                # Third wave (N days) discount
-                if NotificationSettingsService.is_third_wave_enabled():
-                    trigger_days = NotificationSettingsService.get_third_wave_trigger_days()
-                    if trigger_days <= days_since < trigger_days + 1:
-                        if not await notification_sent(db, user.id, subscription.id, 'expired_discount_wave3'):
-                            percent = NotificationSettingsService.get_third_wave_discount_percent()
-                            valid_hours = NotificationSettingsService.get_third_wave_valid_hours()
-                            offer = await upsert_discount_offer(
-                                db,
-                                user_id=user.id,
-                                subscription_id=subscription.id,
-                                notification_type='expired_discount_wave3',
-                                discount_percent=percent,
-                                bonus_amount_kopeks=0,
-                                valid_hours=valid_hours,
-                                effect_type='percent_discount',
-                            )
-                            success = await self._send_expired_discount_notification(
-                                user,
-                                subscription,
-                                percent,
-                                offer.expires_at,
-                                offer.id,
-                                'third',
-                                trigger_days=trigger_days,
-                            )
-                            if success:
-                                await record_notification(db, user.id, subscription.id, 'expired_discount_wave3')
-                                sent_wave3 += 1
-
-            if sent_day1 or sent_wave2 or sent_wave3:
-                await self._log_monitoring_event(
-                    db,
-                    'expired_followups_sent',
-                    (f'Follow-ups: 1д={sent_day1}, скидка 2-3д={sent_wave2}, скидка N={sent_wave3}'),
-                    {
-                        'day1': sent_day1,
-                        'wave2': sent_wave2,
-                        'wave3': sent_wave3,
-                    },
-                )
-
-        except Exception as e:
-            logger.error('Ошибка проверки напоминаний об истекшей подписке', error=e)
+                            await record_notification(db, user.id, subscription.id, 'expired_discount_wave3')
+                            sent_wave3 += 1
 
-    async def _get_expiring_paid_subscriptions(self, db: AsyncSession, days_before: int) -> list[Subscription]:
-        current_time = datetime.now(UTC)
-        threshold_date = current_time + timedelta(days=days_before)
+        if sent_day1 or sent_wave2 or sent_wave3:
+            await self._log_monitoring_event(
+                db,
+                'expired_followups_sent',
+                (f'Follow-ups: 1д={sent_day1}, скидка 2-3д={sent_wave2}, скидка N={sent_wave3}'),
+                {
+                    'day1': sent_day1,
+                    'wave2': sent_wave2,
+                    'wave3': sent_wave3,
+                },
+            )
 
-        result = await db.execute(
-            select(Subscription)
-            .options(
-                selectinload(Subscription.user),
-                selectinload(Subscription.tariff),
+    @staticmethod
+    def _expiring_candidates_query(warning_days: list[int], current_time: datetime):
+        """
+        Один запрос на все окна предупреждений: платные активные подписки, истекающие
+        в пределах максимального окна, вместе с пользователем, самым срочным окном
+        (CASE по возрастанию дней) и уже отправленным уведомлением для этого окна.
+        """
+        window_days = case(
+            *((Subscription.end_date <= current_time + timedelta(days=days), days) for days in warning_days)
+        )
+        return (
+            select(Subscription, window_days.label('window_days'), SentNotification.id.label('sent_id'))
+            .outerjoin(Tariff, Subscription.tariff_id == Tariff.id)
+            .outerjoin(
+                SentNotification,
+                and_(
+                    SentNotification.subscription_id == Subscription.id,
+                    SentNotification.user_id == Subscription.user_id,
+                    SentNotification.notification_type == 'expiring',
+                    SentNotification.days_before == window_days,
+                ),
             )
+            .options(joinedload(Subscription.user))
             .where(
-                and_(
-                    Subscription.status == SubscriptionStatus.ACTIVE.value,
-                    Subscription.is_trial == False,
-                    Subscription.end_date > current_time,
-                    Subscription.end_date <= threshold_date,
-                )
+                Subscription.status == SubscriptionStatus.ACTIVE.value,
+                Subscription.is_trial == False,
+                Subscription.end_date > current_time,
+                Subscription.end_date <= current_time + timedelta(days=warning_days[-1]),
+                # Исключаем суточные тарифы - для них отдельная логика списания
+                or_(Tariff.id.is_(None), Tariff.is_daily.is_(False)),
             )
+            .order_by(Subscription.end_date, Subscription.id)
         )
 
-        logger.debug('🔍 Поиск платных подписок, истекающих в ближайшие дней', days_before=days_before)
-        logger.debug('📅 Текущее время', current_time=current_time)
-        logger.debug('📅 Пороговая дата', threshold_date=threshold_date)
-
-        all_subscriptions = result.scalars().all()
-
-        # Исключаем суточные тарифы - для них отдельная логика списания
-        subscriptions = [
-            sub for sub in all_subscriptions if not (sub.tariff and getattr(sub.tariff, 'is_daily', False))
-        ]
-
-        excluded_count = len(all_subscriptions) - len(subscriptions)
-        if excluded_count > 0:
-            logger.debug('🔄 Исключено суточных подписок из уведомлений', excluded_count=excluded_count)
+    @staticmethod
+    def _pick_most_urgent(rows) -> list[tuple[Subscription, int]]:
+        """Самое срочное окно на пользователя; уже отправленные уведомления отбрасываются."""
+        chosen: dict[int, tuple[Subscription, int, bool]] = {}
+        for subscription, days, sent_id in rows:
+            current = chosen.get(subscription.user_id)
+            if current is None or days < current[1]:
+                chosen[subscription.user_id] = (subscription, days, sent_id is not None)
+            elif current[0] is subscription and sent_id is not None:
+                chosen[subscription.user_id] = (subscription, days, True)
+
+        return [(subscription, days) for subscription, days, sent in chosen.values() if not sent and subscription.user]
+
+    async def _plan_expiring_notifications(self, db: AsyncSession) -> list[tuple[Subscription, int]]:
+        warning_days = sorted({days for days in settings.get_autopay_warning_days() if days > 0})
+        if not warning_days:
+            return []
 
-        logger.info('📊 Найдено платных подписок для уведомлений', subscriptions_count=len(subscriptions))
+        result = await db.execute(self._expiring_candidates_query(warning_days, datetime.now(UTC)))
+        plan = self._pick_most_urgent(result.unique().all())
 
-        return subscriptions
+        logger.info('📊 Запланировано уведомлений об истечении подписки', plan_count=len(plan))
+        return plan
 
     @staticmethod
     def _get_user_promo_offer_discount_percent(user: User | None) -> int:
@@ -1001,182 +1028,178 @@ class MonitoringService:
                 )
 
     async def _process_autopayments(self, db: AsyncSession):
-        try:
-            current_time = datetime.now(UTC)
+        current_time = datetime.now(UTC)
 
-            result = await db.execute(
-                select(Subscription)
-                .options(
-                    selectinload(Subscription.user).options(
-                        selectinload(User.promo_group),
-                        selectinload(User.user_promo_groups).selectinload(UserPromoGroup.promo_group),
-                    ),
-                    selectinload(Subscription.tariff),
-                )
-                .where(
-                    and_(
-                        Subscription.status == SubscriptionStatus.ACTIVE.value,
-                        Subscription.autopay_enabled == True,
-                        Subscription.is_trial == False,
-                    )
+        result = await db.execute(
+            select(Subscription)
+            .options(
+                selectinload(Subscription.user).options(
+                    selectinload(User.promo_group),
+                    selectinload(User.user_promo_groups).selectinload(UserPromoGroup.promo_group),
+                ),
+                selectinload(Subscription.tariff),
+            )
+            .where(
+                and_(
+                    Subscription.status == SubscriptionStatus.ACTIVE.value,
+                    Subscription.autopay_enabled == True,
+                    Subscription.is_trial == False,
                 )
             )
-            all_autopay_subscriptions = result.scalars().all()
+        )
+        all_autopay_subscriptions = result.scalars().all()
 
-            autopay_subscriptions = []
-            for sub in all_autopay_subscriptions:
-                # Суточные подписки имеют свой собственный механизм продления
-                # (DailySubscriptionService), глобальный autopay на них не распространяется
-                if sub.tariff and getattr(sub.tariff, 'is_daily', False):
-                    logger.debug(
-                        'Пропускаем суточную подписку (тариф) в глобальном autopay', sub_id=sub.id, name=sub.tariff.name
-                    )
-                    continue
+        autopay_subscriptions = []
+        for sub in all_autopay_subscriptions:
+            # Суточные подписки имеют свой собственный механизм продления
+            # (DailySubscriptionService), глобальный autopay на них не распространяется
+            if sub.tariff and getattr(sub.tariff, 'is_daily', False):
+                logger.debug(
+                    'Пропускаем суточную подписку (тариф) в глобальном autopay', sub_id=sub.id, name=sub.tariff.name
+                )
+                continue
 
-                days_before_expiry = (sub.end_date - current_time).days
-                if days_before_expiry <= min(sub.autopay_days_before, 3):
-                    autopay_subscriptions.append(sub)
+            days_before_expiry = (sub.end_date - current_time).days
+            if days_before_expiry <= min(sub.autopay_days_before, 3):
+                autopay_subscriptions.append(sub)
 
-            processed_count = 0
-            failed_count = 0
+        processed_count = 0
+        failed_count = 0
 
-            for subscription in autopay_subscriptions:
-                from app.database.crud.subscription import is_recently_updated_by_webhook
+        for subscription in autopay_subscriptions:
+            from app.database.crud.subscription import is_recently_updated_by_webhook
 
-                if is_recently_updated_by_webhook(subscription):
-                    logger.debug(
-                        'Пропуск автоплатежа подписки : обновлена вебхуком недавно', subscription_id=subscription.id
-                    )
-                    continue
+            if is_recently_updated_by_webhook(subscription):
+                logger.debug(
+                    'Пропуск автоплатежа подписки : обновлена вебхуком недавно', subscription_id=subscription.id
+                )
+                continue
 
-                user = subscription.user
-                if not user:
-                    continue
+            user = subscription.user
+            if not user:
+                continue
 
-                user_identifier = user.telegram_id or f'email:{user.id}'
+            user_identifier = user.telegram_id or f'email:{user.id}'
 
-                # Правильный расчет стоимости продления с учетом всех параметров подписки
-                renewal_cost = await self.subscription_service.calculate_renewal_price(subscription, 30, db, user=user)
-                promo_discount_percent = self._get_user_promo_offer_discount_percent(user)
-                charge_amount = renewal_cost
-                promo_discount_value = 0
+            # Правильный расчет стоимости продления с учетом всех параметров подписки
+            renewal_cost = await self.subscription_service.calculate_renewal_price(subscription, 30, db, user=user)
+            promo_discount_percent = self._get_user_promo_offer_discount_percent(user)
+            charge_amount = renewal_cost
+            promo_discount_value = 0
 
-                if renewal_cost > 0 and promo_discount_percent > 0:
-                    charge_amount, promo_discount_value = apply_percentage_discount(
-                        renewal_cost,
-                        promo_discount_percent,
+            if renewal_cost > 0 and promo_discount_percent > 0:
+                charge_amount, promo_discount_value = apply_percentage_discount(
+                    renewal_cost,
+                    promo_discount_percent,
+                )
+
+            autopay_key = f'autopay_{user.id}_{subscription.id}'
+            if autopay_key in self._notified_users:
+                continue
+
+            if user.balance_kopeks >= charge_amount:
+                success = await subtract_user_balance(db, user, charge_amount, 'Автопродление подписки')
+
+                if success:
+                    await extend_subscription(db, subscription, 30)
+                    await self.subscription_service.update_remnawave_user(
+                        db,
+                        subscription,
+                        reset_traffic=settings.RESET_TRAFFIC_ON_PAYMENT,
+                        reset_reason='автопродление подписки',
                     )
 
-                autopay_key = f'autopay_{user.id}_{subscription.id}'
-                if autopay_key in self._notified_users:
-                    continue
+                    if promo_discount_value > 0:
+                        await self._consume_user_promo_offer_discount(db, user)
 
-                if user.balance_kopeks >= charge_amount:
-                    success = await subtract_user_balance(db, user, charge_amount, 'Автопродление подписки')
+                    # Send notification via appropriate channel
+                    if user.telegram_id and self.bot:
+                        await self._send_autopay_success_notification(user, charge_amount, 30)
+                    elif not user.telegram_id:
+                        # Email-only user - use notification delivery service
+                        await notification_delivery_service.notify_autopay_success(
+                            user=user,
+                            amount_kopeks=charge_amount,
+                            new_expires_at=subscription.end_date,
+                        )
 
-                    if success:
-                        await extend_subscription(db, subscription, 30)
-                        await self.subscription_service.update_remnawave_user(
-                            db,
-                            subscription,
-                            reset_traffic=settings.RESET_TRAFFIC_ON_PAYMENT,
-                            reset_reason='автопродление подписки',
+                    processed_count += 1
+                    self._notified_users.add(autopay_key)
+                    logger.info(
+                        '💳 Автопродление подписки пользователя успешно (списано , скидка %)',
+                        user_identifier=user_identifier,
+                        charge_amount=charge_amount,
+                        promo_discount_percent=promo_discount_percent,
+                    )
+                else:
+                    failed_count += 1
+                    if user.telegram_id and self.bot:
+                        await self._send_autopay_failed_notification(user, user.balance_kopeks, charge_amount)
+                    elif not user.telegram_id:
+                        await notification_delivery_service.notify_autopay_failed(
+                            user=user,
+                            reason='Ошибка списания средств',
                         )
+                    logger.warning(
+                        '💳 Ошибка списания средств для автопродления пользователя', user_identifier=user_identifier
+                    )
+            else:
+                failed_count += 1
 
-                        if promo_discount_value > 0:
-                            await self._consume_user_promo_offer_discount(db, user)
-
-                        # Send notification via appropriate channel
-                        if user.telegram_id and self.bot:
-                            await self._send_autopay_success_notification(user, charge_amount, 30)
-                        elif not user.telegram_id:
-                            # Email-only user - use notification delivery service
-                            await notification_delivery_service.notify_autopay_success(
-                                user=user,
-                                amount_kopeks=charge_amount,
-                                new_expires_at=subscription.end_date,
-                            )
+                # Проверяем кулдаун уведомления через Redis, чтобы не спамить
+                # при каждом срабатывании мониторинга
+                cooldown_key = f'autopay_insufficient_balance_notified:{user.id}'
+                should_notify = True
 
-                        processed_count += 1
-                        self._notified_users.add(autopay_key)
-                        logger.info(
-                            '💳 Автопродление подписки пользователя успешно (списано , скидка %)',
+                try:
+                    if await cache.exists(cooldown_key):
+                        should_notify = False
+                        logger.debug(
+                            '💳 Пропуск уведомления о недостаточном балансе для пользователя — кулдаун активен',
                             user_identifier=user_identifier,
-                            charge_amount=charge_amount,
-                            promo_discount_percent=promo_discount_percent,
-                        )
-                    else:
-                        failed_count += 1
-                        if user.telegram_id and self.bot:
-                            await self._send_autopay_failed_notification(user, user.balance_kopeks, charge_amount)
-                        elif not user.telegram_id:
-                            await notification_delivery_service.notify_autopay_failed(
-                                user=user,
-                                reason='Ошибка списания средств',
-                            )
-                        logger.warning(
-                            '💳 Ошибка списания средств для автопродления пользователя', user_identifier=user_identifier
                         )
-                else:
-                    failed_count += 1
+                except Exception as redis_err:
+                    # Fallback: если Redis недоступен — отправляем уведомление
+                    logger.warning(
+                        '⚠️ Ошибка проверки кулдауна в Redis для пользователя : . Отправляем уведомление.',
+                        user_identifier=user_identifier,
+                        redis_err=redis_err,
+                    )
 
-                    # Проверяем кулдаун уведомления через Redis, чтобы не спамить
-                    # при каждом срабатывании мониторинга
-                    cooldown_key = f'autopay_insufficient_balance_notified:{user.id}'
-                    should_notify = True
+                if should_notify:
+                    if user.telegram_id and self.bot:
+                        await self._send_autopay_failed_notification(user, user.balance_kopeks, charge_amount)
+                    elif not user.telegram_id:
+                        await notification_delivery_service.notify_autopay_failed(
+                            user=user,
+                            reason='Недостаточно средств на балансе',
+                        )
 
+                    # Ставим ключ кулдауна после отправки
                     try:
-                        if await cache.exists(cooldown_key):
-                            should_notify = False
-                            logger.debug(
-                                '💳 Пропуск уведомления о недостаточном балансе для пользователя — кулдаун активен',
-                                user_identifier=user_identifier,
-                            )
+                        await cache.set(
+                            cooldown_key,
+                            1,
+                            expire=AUTOPAY_INSUFFICIENT_BALANCE_COOLDOWN_SECONDS,
+                        )
                     except Exception as redis_err:
-                        # Fallback: если Redis недоступен — отправляем уведомление
                         logger.warning(
-                            '⚠️ Ошибка проверки кулдауна в Redis для пользователя : . Отправляем уведомление.',
+                            '⚠️ Не удалось установить кулдаун в Redis для пользователя',
                             user_identifier=user_identifier,
                             redis_err=redis_err,
                         )
 
-                    if should_notify:
-                        if user.telegram_id and self.bot:
-                            await self._send_autopay_failed_notification(user, user.balance_kopeks, charge_amount)
-                        elif not user.telegram_id:
-                            await notification_delivery_service.notify_autopay_failed(
-                                user=user,
-                                reason='Недостаточно средств на балансе',
-                            )
-
-                        # Ставим ключ кулдауна после отправки
-                        try:
-                            await cache.set(
-                                cooldown_key,
-                                1,
-                                expire=AUTOPAY_INSUFFICIENT_BALANCE_COOLDOWN_SECONDS,
-                            )
-                        except Exception as redis_err:
-                            logger.warning(
-                                '⚠️ Не удалось установить кулдаун в Redis для пользователя',
-                                user_identifier=user_identifier,
-                                redis_err=redis_err,
-                            )
-
-                    logger.warning(
-                        '💳 Недостаточно средств для автопродления у пользователя', user_identifier=user_identifier
-                    )
-
-            if processed_count > 0 or failed_count > 0:
-                await self._log_monitoring_event(
-                    db,
-                    'autopayments_processed',
-                    f'Автоплатежи: успешно {processed_count}, неудачно {failed_count}',
-                    {'processed': processed_count, 'failed': failed_count},
+                logger.warning(
+                    '💳 Недостаточно средств для автопродления у пользователя', user_identifier=user_identifier
                 )
 
-        except Exception as e:
-            logger.error('Ошибка обработки автоплатежей', error=e)
+        if processed_count > 0 or failed_count > 0:
+            await self._log_monitoring_event(
+                db,
+                'autopayments_processed',
+                f'Автоплатежи: успешно {processed_count}, неудачно {failed_count}',
+                {'processed': processed_count, 'failed': failed_count},
+            )
 
     async def _send_subscription_expired_notification(self, user: User) -> bool:
         try:
@@ -1640,58 +1663,36 @@ class MonitoringService:
                 'Ошибка отправки уведомления о неудачном автоплатеже пользователю', telegram_id=user.telegram_id, e=e
             )
 
-    async def _cleanup_inactive_users(self, db: AsyncSession):
-        try:
-            now = datetime.now(UTC)
-            if now.hour != 3:
-                return
-
-            inactive_users = await get_inactive_users(db, settings.INACTIVE_USER_DELETE_MONTHS)
-            deleted_count = 0
-
-            for user in inactive_users:
-                if not user.subscription or not user.subscription.is_active:
-                    success = await delete_user(db, user)
-                    if success:
-                        deleted_count += 1
+    async def _cleanup_inactive_users(self, db: AsyncSession) -> int:
+        inactive_users = await get_inactive_users(db, settings.INACTIVE_USER_DELETE_MONTHS)
+        deleted_count = 0
 
-            if deleted_count > 0:
-                await self._log_monitoring_event(
-                    db,
-                    'inactive_users_cleanup',
-                    f'Удалено {deleted_count} неактивных пользователей',
-                    {'deleted_count': deleted_count},
-                )
-                logger.info('🗑️ Удалено неактивных пользователей', deleted_count=deleted_count)
+        for user in inactive_users:
+            if not user.subscription or not user.subscription.is_active:
+                success = await delete_user(db, user)
+                if success:
+                    deleted_count += 1
 
-        except Exception as e:
-            logger.error('Ошибка очистки неактивных пользователей', error=e)
+        if deleted_count > 0:
+            await self._log_monitoring_event(
+                db,
+                'inactive_users_cleanup',
+                f'Удалено {deleted_count} неактивных пользователей',
+                {'deleted_count': deleted_count},
+            )
+            logger.info('🗑️ Удалено неактивных пользователей', deleted_count=deleted_count)
+        return deleted_count
 
     async def _sync_with_remnawave(self, db: AsyncSession):
-        try:
-            now = datetime.now(UTC)
-            if now.minute != 0:
-                return
-
-            if not self.subscription_service.is_configured:
-                logger.warning('RemnaWave API не настроен. Пропускаем синхронизацию')
-                return
-
-            async with self.subscription_service.get_api_client() as api:
-                system_stats = await api.get_system_stats()
+        if not self.subscription_service.is_configured:
+            logger.warning('RemnaWave API не настроен. Пропускаем синхронизацию')
+            return
 
-                await self._log_monitoring_event(
-                    db, 'remnawave_sync', 'Синхронизация с RemnaWave завершена', {'stats': system_stats}
-                )
+        async with self.subscription_service.get_api_client() as api:
+            system_stats = await api.get_system_stats()
 
-        except Exception as e:
-            logger.error('Ошибка синхронизации с RemnaWave', error=e)
             await self._log_monitoring_event(
-                db,
-                'remnawave_sync_error',
-                f'Ошибка синхронизации с RemnaWave: {e!s}',
-                {'error': str(e)},
-                is_success=False,
+                db, 'remnawave_sync', 'Синхронизация с RemnaWave завершена', {'stats': system_stats}
             )
 
     async def _check_ticket_sla(self, db: AsyncSession):
@@ -1839,6 +1840,7 @@ class MonitoringService:
             return {
                 'is_running': self.is_running,
                 'last_update': datetime.now(UTC),
+                'jobs': self._scheduler.get_status(),
                 'recent_events': [
                     {
                         'type': event.event_type,
@@ -1861,6 +1863,7 @@ class MonitoringService:
             return {
                 'is_running': self.is_running,
                 'last_update': datetime.now(UTC),
+                'jobs': self._scheduler.get_status(),
                 'recent_events': [],
                 'stats_24h': {'total_events': 0, 'successful': 0, 'failed': 0, 'success_rate': 0},
             }
@@ -1,5 +1,8 @@
 import asyncio
+import hashlib
+import json
 import re
+import time
 from contextlib import AsyncExitStack, asynccontextmanager
 from dataclasses import asdict, is_dataclass
 from datetime import UTC, datetime, timedelta
@@ -7,13 +10,13 @@ from typing import Any, Optional
 from zoneinfo import ZoneInfo
 
 import structlog
-from sqlalchemy import String, and_, cast, delete, func, select, update
+from sqlalchemy import and_, delete, func, or_, select, tuple_, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.config import settings
-from app.database.crud.server_squad import get_server_squad_by_uuid
+from app.database.crud.server_squad import get_server_squad_by_uuid, subscription_in_squad
 from app.database.crud.subscription import (
     decrement_subscription_server_counts,
 )
@@ -34,6 +37,8 @@ from app.external.remnawave_api import (
     TrafficLimitStrategy,
     UserStatus,
 )
+from app.utils.adaptive_concurrency import AIMDConcurrencyController
+from app.utils.cache import cache
 from app.utils.subscription_utils import (
     resolve_hwid_device_limit_for_payload,
 )
@@ -42,6 +47,16 @@ from app.utils.timezone import get_local_timezone
 
 logger = structlog.get_logger(__name__)
 
+# Размер страницы потоковой синхронизации с панелью
+PANEL_SYNC_PAGE_SIZE = 500
+# Попыток применить страницу: после rollback страница перечитывается из БД заново
+PANEL_SYNC_PAGE_ATTEMPTS = 2
+# Redis-хеш: subscription_id → отпечаток последнего успешно отправленного в панель payload
+PANEL_PAYLOAD_HASH_KEY = 'remnawave:panel_payload_hash'
+# Хеш целиком истекает, если полная синхронизация в панель перестала запускаться;
+# поля удалённых подписок вычищаются после каждой полной синхронизации
+PANEL_PAYLOAD_HASH_TTL_SECONDS = 7 * 24 * 3600
+
 
 def _get_user_traffic_bytes(panel_user: dict[str, Any]) -> int:
     """Извлекает usedTrafficBytes из панельного пользователя (совместимо с новым и старым API)"""
@@ -135,6 +150,10 @@ class RemnaWaveConfigurationError(Exception):
     """Raised when RemnaWave API configuration is missing."""
 
 
+class RemnaWavePanelSortingError(Exception):
+    """Панель не сортирует пользователей по updatedAt, дельта-обход по ней невозможен."""
+
+
 class RemnaWaveService:
     def __init__(self):
         auth_params = settings.get_remnawave_auth_params()
@@ -145,6 +164,8 @@ class RemnaWaveService:
 
         self._panel_timezone = get_local_timezone()
         self._utc_timezone = ZoneInfo('UTC')
+        # Прогресс текущей/последней синхронизации панель → бот (для статуса автосинхронизации)
+        self.sync_progress: dict[str, Any] | None = None
 
         if not base_url:
             self._config_error = 'REMNAWAVE_API_URL не настроен'
@@ -966,7 +987,7 @@ class RemnaWaveService:
                         SubscriptionStatus.TRIAL.value,
                     ]
                 ),
-                cast(Subscription.connected_squads, String).like(f'%"{source_uuid}"%'),
+                subscription_in_squad(source_uuid),
             )
         )
 
@@ -1126,514 +1147,414 @@ class RemnaWaveService:
         finally:
             await exit_stack.aclose()
 
-    async def sync_users_from_panel(self, db: AsyncSession, sync_type: str = 'all') -> dict[str, int]:
-        try:
-            stats = {'created': 0, 'updated': 0, 'errors': 0, 'deleted': 0}
-
-            logger.info('🔄 Начинаем синхронизацию типа', sync_type=sync_type)
-
-            async with self.get_api_client() as api:
-                panel_users = []
-                start = 0
-                size = 500  # Увеличен размер батча для ускорения загрузки
-
-                while True:
-                    logger.info('📥 Загружаем пользователей: start=, size', start=start, size=size)
+    @staticmethod
+    def _panel_user_to_dict(user_obj) -> dict[str, Any]:
+        return {
+            'uuid': user_obj.uuid,
+            'shortUuid': user_obj.short_uuid,
+            'username': user_obj.username,
+            'status': user_obj.status.value,
+            'telegramId': user_obj.telegram_id,
+            'email': user_obj.email,  # Email для синхронизации email-only пользователей
+            'expireAt': user_obj.expire_at.isoformat(),
+            'trafficLimitBytes': user_obj.traffic_limit_bytes,
+            'usedTrafficBytes': user_obj.used_traffic_bytes,
+            'hwidDeviceLimit': user_obj.hwid_device_limit,
+            'subscriptionUrl': user_obj.subscription_url,
+            'subscriptionCryptoLink': user_obj.happ_crypto_link,
+            'activeInternalSquads': user_obj.active_internal_squads,
+            'updatedAt': user_obj.updated_at.isoformat() if user_obj.updated_at else None,
+        }
 
-                    # enrich_happ_links=False - happ_crypto_link уже возвращается API в поле happ.cryptoLink
-                    # Не делаем дополнительные HTTP-запросы для каждого пользователя
-                    response = await api.get_all_users(start=start, size=size, enrich_happ_links=False)
-                    users_batch = response['users']
-                    total_users = response['total']
+    async def _iter_panel_user_pages(self, api: RemnaWaveAPI, size: int = PANEL_SYNC_PAGE_SIZE):
+        """Постранично отдаёт пользователей панели, не накапливая их в памяти."""
+        start = 0
+        while True:
+            # enrich_happ_links=False - happ_crypto_link уже возвращается API в поле happ.cryptoLink
+            response = await api.get_all_users(start=start, size=size, enrich_happ_links=False)
+            users_batch = response['users']
+            total_users = response['total']
 
-                    logger.info(
-                        '📊 Получено пользователей из', users_batch_count=len(users_batch), total_users=total_users
-                    )
+            logger.debug('📥 Получена страница пользователей панели', start=start, count=len(users_batch))
+            yield [self._panel_user_to_dict(user_obj) for user_obj in users_batch], total_users
 
-                    for user_obj in users_batch:
-                        user_dict = {
-                            'uuid': user_obj.uuid,
-                            'shortUuid': user_obj.short_uuid,
-                            'username': user_obj.username,
-                            'status': user_obj.status.value,
-                            'telegramId': user_obj.telegram_id,
-                            'email': user_obj.email,  # Email для синхронизации email-only пользователей
-                            'expireAt': user_obj.expire_at.isoformat(),
-                            'trafficLimitBytes': user_obj.traffic_limit_bytes,
-                            'usedTrafficBytes': user_obj.used_traffic_bytes,
-                            'hwidDeviceLimit': user_obj.hwid_device_limit,
-                            'subscriptionUrl': user_obj.subscription_url,
-                            'subscriptionCryptoLink': user_obj.happ_crypto_link,
-                            'activeInternalSquads': user_obj.active_internal_squads,
-                        }
-                        panel_users.append(user_dict)
+            if len(users_batch) < size:
+                break
+            start += size
+            if start > total_users:
+                break
 
-                    if len(users_batch) < size:
-                        break
+    def _panel_user_rank(self, panel_user: dict[str, Any]) -> tuple[float, bool]:
+        """Ключ предпочтения записи панели, согласованный с _is_preferred_panel_user."""
+        status = (panel_user.get('status') or '').upper()
+        return self._safe_panel_expire_date(panel_user).timestamp(), status in {'ACTIVE', 'TRIAL'}
+
+    def _report_sync_progress(self, phase: str, processed: int, total: int | None, stats: dict[str, int]) -> None:
+        self.sync_progress = {
+            'phase': phase,
+            'processed': processed,
+            'total': total,
+            **stats,
+            'updated_at': datetime.now(UTC).isoformat(),
+        }
 
-                    start += size
+    async def _load_page_users(
+        self,
+        db: AsyncSession,
+        telegram_ids: list[int],
+        uuids: list[str],
+        emails: list[str],
+    ) -> list[User]:
+        """Один индексированный запрос на страницу вместо загрузки всей таблицы users."""
+        conditions = []
+        if telegram_ids:
+            conditions.append(User.telegram_id.in_(telegram_ids))
+        if uuids:
+            conditions.append(User.remnawave_uuid.in_(uuids))
+        if emails:
+            conditions.append(func.lower(User.email).in_(emails))
+        if not conditions:
+            return []
 
-                    if start > total_users:
-                        break
+        result = await db.execute(select(User).options(selectinload(User.subscription)).where(or_(*conditions)))
+        return list(result.scalars().all())
 
-                logger.info('✅ Всего загружено пользователей из панели', panel_users_count=len(panel_users))
+    async def sync_users_from_panel(self, db: AsyncSession, sync_type: str = 'all') -> dict[str, int]:
+        """Потоковая синхронизация панель → бот.
 
-            # Загрузка пользователей с их подписками за один запрос (bulk loading)
-            from sqlalchemy import select
-            from sqlalchemy.orm import selectinload
+        Панель читается страницами, каждая страница сверяется с БД пакетными IN-запросами
+        и коммитится целиком. В памяти между страницами остаётся только ранг записи
+        на каждый telegram_id панели — он нужен для дедупликации и деактивации отсутствующих.
+        """
+        stats = {'created': 0, 'updated': 0, 'errors': 0, 'deleted': 0}
+        try:
+            logger.info('🔄 Начинаем синхронизацию типа', sync_type=sync_type)
+            self._report_sync_progress('panel', 0, None, stats)
 
-            from app.database.models import Subscription, User
+            panel_ranks: dict[int, tuple[float, bool]] = {}
+            processed = 0
 
-            # Получаем всех пользователей с их подписками за один запрос
-            bot_users_result = await db.execute(select(User).options(selectinload(User.subscription)))
-            bot_users = bot_users_result.scalars().all()
-            # Filter out email-only users (telegram_id=None) to avoid None key issues
-            bot_users_by_telegram_id = {user.telegram_id: user for user in bot_users if user.telegram_id is not None}
-            bot_users_by_uuid = {
-                user.remnawave_uuid: user for user in bot_users if getattr(user, 'remnawave_uuid', None)
-            }
-            # Index users by email for email-only sync
-            bot_users_by_email = {user.email.lower(): user for user in bot_users if user.email and user.email_verified}
-            # Also index email-only users by their remnawave_uuid for sync
-            email_users_count = sum(1 for u in bot_users if u.telegram_id is None)
-            if email_users_count > 0:
-                logger.info('📧 Email-only пользователей (без telegram_id)', email_users_count=email_users_count)
+            async with self.get_api_client() as api:
+                async for page, total_users in self._iter_panel_user_pages(api):
+                    await self._sync_panel_page(db, page, sync_type, panel_ranks, stats)
+                    processed += len(page)
+                    self._report_sync_progress('panel', processed, total_users, stats)
+                    logger.info(
+                        '📦 Обработана страница пользователей панели',
+                        processed=processed,
+                        total_users=total_users,
+                    )
 
-            logger.info('📊 Пользователей в боте', bot_users_count=len(bot_users))
+            logger.info(
+                '✅ Пользователи панели обработаны',
+                processed=processed,
+                unique_telegram_ids=len(panel_ranks),
+            )
 
-            panel_users_with_tg = [user for user in panel_users if user.get('telegramId') is not None]
+            if sync_type == 'all':
+                await self._deactivate_users_missing_in_panel(db, panel_ranks.keys(), stats)
 
-            logger.info('📊 Пользователей в панели с Telegram ID', panel_users_with_tg_count=len(panel_users_with_tg))
+            self._report_sync_progress('done', processed, processed, stats)
+            logger.info(
+                '🎯 Синхронизация завершена: создано обновлено деактивировано ошибок',
+                stats=stats['created'],
+                stats_2=stats['updated'],
+                stats_3=stats['deleted'],
+                stats_4=stats['errors'],
+            )
+            return stats
 
-            unique_panel_users_map = self._deduplicate_panel_users_by_telegram_id(panel_users_with_tg)
-            unique_panel_users = list(unique_panel_users_map.values())
-            duplicates_count = len(panel_users_with_tg) - len(unique_panel_users)
+        except Exception as e:
+            logger.error('❌ Критическая ошибка синхронизации пользователей', error=e)
+            self._report_sync_progress('failed', 0, None, stats)
+            return {'created': 0, 'updated': 0, 'errors': 1, 'deleted': 0}
 
-            if duplicates_count:
-                logger.info(
-                    '♻️ Обнаружено дубликатов пользователей по Telegram ID. Используем самые свежие записи.',
-                    duplicates_count=duplicates_count,
-                )
+    async def _sync_panel_page(
+        self,
+        db: AsyncSession,
+        page: list[dict[str, Any]],
+        sync_type: str,
+        panel_ranks: dict[int, tuple[float, bool]],
+        stats: dict[str, int],
+        touched_user_ids: set[int] | None = None,
+    ) -> None:
+        # Дубликаты по Telegram ID внутри страницы и относительно предыдущих страниц:
+        # применяем запись, только если она предпочтительнее уже применённой
+        page_unique = self._deduplicate_panel_users_by_telegram_id(page)
+        panel_users: list[dict[str, Any]] = []
+        for telegram_id, panel_user in page_unique.items():
+            rank = self._panel_user_rank(panel_user)
+            previous_rank = panel_ranks.get(telegram_id)
+            if previous_rank is not None and rank <= previous_rank:
+                continue
+            panel_ranks[telegram_id] = rank
+            panel_users.append(panel_user)
 
-            panel_telegram_ids = set(unique_panel_users_map.keys())
+        email_only_users = []
+        if sync_type in ['new_only', 'all']:
+            email_only_users = [user for user in page if user.get('telegramId') is None and user.get('email')]
 
-            # Email-only пользователи из панели (без telegram_id, но с email)
-            panel_users_email_only = [
-                user for user in panel_users if user.get('telegramId') is None and user.get('email')
-            ]
-            if panel_users_email_only:
-                logger.info(
-                    '📧 Пользователей в панели с Email (без Telegram)',
-                    panel_users_email_only_count=len(panel_users_email_only),
-                )
+        if not panel_users and not email_only_users:
+            return
 
-            # Для ускорения - подготовим данные о подписках
-            # Соберем все существующие подписки за один запрос
-            existing_subscriptions_result = await db.execute(
-                select(Subscription).join(User).options(selectinload(Subscription.user))
+        # Ошибки считаются только по последней попытке: изменения неудачной откатены,
+        # а успешный повтор применяет страницу целиком
+        for attempt in range(1, PANEL_SYNC_PAGE_ATTEMPTS + 1):
+            page_stats = {'created': 0, 'updated': 0, 'errors': 0}
+            page_touched: set[int] = set()
+            applied = await self._apply_panel_page(
+                db, panel_users, email_only_users, sync_type, page_stats, page_touched
             )
-            existing_subscriptions = existing_subscriptions_result.scalars().all()
-
-            # Создадим словарь для быстрого доступа к подпискам
-            {sub.user_id: sub for sub in existing_subscriptions}
+            if applied:
+                break
+            if attempt < PANEL_SYNC_PAGE_ATTEMPTS:
+                logger.warning('⚠️ Страница синхронизации не применена, повторяем', attempt=attempt)
 
-            # Для оптимизации коммитим изменения каждые N пользователей
-            batch_size = 50
-            pending_uuid_mutations: list[_UUIDMapMutation] = []
+        for key, value in page_stats.items():
+            stats[key] += value
+        if touched_user_ids is not None:
+            touched_user_ids.update(page_touched)
 
-            for i, panel_user in enumerate(unique_panel_users):
-                uuid_mutation: _UUIDMapMutation | None = None
-                try:
-                    telegram_id = panel_user.get('telegramId')
-                    if not telegram_id:
-                        continue
+    async def _apply_panel_page(
+        self,
+        db: AsyncSession,
+        panel_users: list[dict[str, Any]],
+        email_only_users: list[dict[str, Any]],
+        sync_type: str,
+        stats: dict[str, int],
+        touched_user_ids: set[int],
+    ) -> bool:
+        """Применяет страницу одной транзакцией. False — страница откатена."""
+        page_users = await self._load_page_users(
+            db,
+            telegram_ids=[user['telegramId'] for user in panel_users],
+            uuids=[user['uuid'] for user in (*panel_users, *email_only_users) if user.get('uuid')],
+            emails=[user['email'].lower() for user in email_only_users],
+        )
+        users_by_telegram_id = {user.telegram_id: user for user in page_users if user.telegram_id is not None}
+        users_by_uuid = {user.remnawave_uuid: user for user in page_users if user.remnawave_uuid}
+        users_by_email = {user.email.lower(): user for user in page_users if user.email and user.email_verified}
 
-                    if (i + 1) % 10 == 0:
-                        logger.info(
-                            '🔄 Обрабатываем пользователя /',
-                            i=i + 1,
-                            unique_panel_users_count=len(unique_panel_users),
-                            telegram_id=telegram_id,
-                        )
+        for panel_user in panel_users:
+            telegram_id = panel_user['telegramId']
+            try:
+                db_user = users_by_telegram_id.get(telegram_id)
 
-                    db_user = bot_users_by_telegram_id.get(telegram_id)
+                if not db_user:
+                    if sync_type not in ['new_only', 'all']:
+                        continue
 
+                    logger.info('🆕 Создание пользователя для telegram_id', telegram_id=telegram_id)
+                    db_user, is_created = await self._get_or_create_bot_user_from_panel(db, panel_user)
                     if not db_user:
-                        if sync_type in ['new_only', 'all']:
-                            logger.info('🆕 Создание пользователя для telegram_id', telegram_id=telegram_id)
-
-                            db_user, is_created = await self._get_or_create_bot_user_from_panel(db, panel_user)
-
-                            if not db_user:
-                                logger.error(
-                                    '❌ Не удалось создать или получить пользователя для telegram_id',
-                                    telegram_id=telegram_id,
-                                )
-                                stats['errors'] += 1
-                                continue
-
-                            bot_users_by_telegram_id[telegram_id] = db_user
-
-                            # При синхронизации не обновляем имя и username пользователя
-                            # только сохраняем изменения, если были обновлены другие поля (подписка и т.д.)
-                            updated_fields = []
-                            # Если были обновлены другие поля (подписка, статус и т.д.), сохраняем изменения
-                            if updated_fields:
-                                logger.info(
-                                    '🔄 Обновлены поля для пользователя',
-                                    updated_fields=updated_fields,
-                                    telegram_id=telegram_id,
-                                )
-                                await db.flush()  # Сохраняем изменения без коммита
-
-                            _, uuid_mutation = self._ensure_user_remnawave_uuid(
-                                db_user,
-                                panel_user.get('uuid'),
-                                bot_users_by_uuid,
-                            )
-
-                            if is_created:
-                                await self._create_subscription_from_panel_data(db, db_user, panel_user)
-                                stats['created'] += 1
-                                logger.info('✅ Создан пользователь с подпиской', telegram_id=telegram_id)
-                            else:
-                                # Обновляем данные существующего пользователя
-                                # Но теперь мы уже загрузили подписку с пользователем, нет необходимости перезагружать
-                                await self._update_subscription_from_panel_data(db, db_user, panel_user)
-                                stats['updated'] += 1
-                                logger.info('♻️ Обновлена подписка существующего пользователя', telegram_id=telegram_id)
-
-                    elif sync_type in ['update_only', 'all']:
-                        logger.debug('🔄 Обновление пользователя', telegram_id=telegram_id)
-
-                        # При синхронизации не обновляем имя и username пользователя
-                        # только сохраняем изменения, если были обновлены другие поля (подписка и т.д.)
-                        updated_fields = []
-                        # Если были обновлены другие поля (подписка, статус и т.д.), сохраняем изменения
-                        if updated_fields:
-                            logger.info(
-                                '🔄 Обновлены поля для пользователя',
-                                updated_fields=updated_fields,
-                                telegram_id=telegram_id,
-                            )
-                            await db.flush()  # Сохраняем изменения без коммита
-
-                        # Обновляем UUID ДО операций с подпиской, чтобы избежать
-                        # greenlet_spawn ошибки при доступе к атрибутам после flush
-                        _, uuid_mutation = self._ensure_user_remnawave_uuid(
-                            db_user,
-                            panel_user.get('uuid'),
-                            bot_users_by_uuid,
-                        )
-
-                        # Используем async запрос вместо доступа к relationship,
-                        # чтобы избежать lazy-load в async контексте
-                        from app.database.crud.subscription import get_subscription_by_user_id as _get_sub
-
-                        existing_sub = await _get_sub(db, db_user.id)
-                        if existing_sub:
-                            await self._update_subscription_from_panel_data(db, db_user, panel_user)
-                        else:
-                            await self._create_subscription_from_panel_data(db, db_user, panel_user)
-
-                        stats['updated'] += 1
-                        logger.debug('✅ Обновлён пользователь', telegram_id=telegram_id)
-
-                except Exception as user_error:
-                    logger.error('❌ Ошибка обработки пользователя', telegram_id=telegram_id, user_error=user_error)
-                    stats['errors'] += 1
-                    if uuid_mutation:
-                        uuid_mutation.rollback()
-                    if pending_uuid_mutations:
-                        for mutation in reversed(pending_uuid_mutations):
-                            mutation.rollback()
-                        pending_uuid_mutations.clear()
-                    try:
-                        await db.rollback()  # Выполняем rollback при ошибке
-                    except Exception:
-                        pass
-                    # After rollback all ORM objects in the session are expired.
-                    # Accessing their attributes triggers a lazy load which fails
-                    # in async context (greenlet_spawn error).  Break the loop to
-                    # prevent cascading failures for every remaining user.
-                    logger.warning(
-                        '⚠️ Сессия повреждена после rollback, прерываем обработку (обработано / пользователей)',
-                        i=i + 1,
-                        unique_panel_users_count=len(unique_panel_users),
-                    )
-                    break
-
-                else:
-                    if uuid_mutation and uuid_mutation.has_changes():
-                        pending_uuid_mutations.append(uuid_mutation)
-
-                # Коммитим изменения каждые N пользователей для ускорения
-                if (i + 1) % batch_size == 0:
-                    try:
-                        await db.commit()
-                        logger.debug('📦 Коммит изменений после обработки пользователей', i=i + 1)
-                        pending_uuid_mutations.clear()
-                    except Exception as commit_error:
                         logger.error(
-                            '❌ Ошибка коммита после обработки пользователей', i=i + 1, commit_error=commit_error
+                            '❌ Не удалось создать или получить пользователя для telegram_id', telegram_id=telegram_id
                         )
-                        await db.rollback()
-                        for mutation in reversed(pending_uuid_mutations):
-                            mutation.rollback()
-                        pending_uuid_mutations.clear()
-                        stats['errors'] += batch_size  # Учитываем ошибки за всю группу
-
-            # Коммитим оставшиеся изменения
-            try:
-                await db.commit()
-                pending_uuid_mutations.clear()
-            except Exception as final_commit_error:
-                logger.error('❌ Ошибка финального коммита', final_commit_error=final_commit_error)
-                await db.rollback()
-                for mutation in reversed(pending_uuid_mutations):
-                    mutation.rollback()
-                pending_uuid_mutations.clear()
-
-            # Обработка email-only пользователей из панели
-            if panel_users_email_only and sync_type in ['new_only', 'all']:
-                logger.info(
-                    '📧 Обработка email-only пользователей из панели...',
-                    panel_users_email_only_count=len(panel_users_email_only),
-                )
-
-                for panel_user in panel_users_email_only:
-                    try:
-                        panel_email = panel_user.get('email', '').lower()
-                        panel_uuid = panel_user.get('uuid')
-
-                        if not panel_email:
-                            continue
-
-                        # Ищем пользователя по email в боте
-                        db_user = bot_users_by_email.get(panel_email)
+                        stats['errors'] += 1
+                        continue
 
-                        # Если не нашли по email, ищем по UUID
-                        if not db_user and panel_uuid:
-                            db_user = bot_users_by_uuid.get(panel_uuid)
+                    self._ensure_user_remnawave_uuid(db_user, panel_user.get('uuid'), users_by_uuid)
 
-                        if db_user:
-                            # Обновляем существующего пользователя
-                            # Обновляем remnawave_uuid если нет
-                            if panel_uuid and not db_user.remnawave_uuid:
-                                db_user.remnawave_uuid = panel_uuid
+                    if is_created:
+                        await self._create_subscription_from_panel_data(db, db_user, panel_user)
+                        stats['created'] += 1
+                        logger.info('✅ Создан пользователь с подпиской', telegram_id=telegram_id)
+                    else:
+                        await self._update_subscription_from_panel_data(db, db_user, panel_user)
+                        stats['updated'] += 1
+                        logger.info('♻️ Обновлена подписка существующего пользователя', telegram_id=telegram_id)
 
-                            # Используем async запрос вместо доступа к relationship,
-                            # чтобы избежать lazy-load (greenlet_spawn) в async контексте
-                            from app.database.crud.subscription import get_subscription_by_user_id as _get_sub_email
+                elif sync_type in ['update_only', 'all']:
+                    # Обновляем UUID ДО операций с подпиской, чтобы избежать
+                    # greenlet_spawn ошибки при доступе к атрибутам после flush
+                    self._ensure_user_remnawave_uuid(db_user, panel_user.get('uuid'), users_by_uuid)
 
-                            existing_sub = await _get_sub_email(db, db_user.id)
-                            if existing_sub:
-                                await self._update_subscription_from_panel_data(db, db_user, panel_user)
-                            else:
-                                await self._create_subscription_from_panel_data(db, db_user, panel_user)
+                    # Подписка уже загружена selectinload в запросе страницы
+                    subscription = db_user.subscription
+                    if subscription:
+                        await self._update_subscription_from_panel_data(db, db_user, panel_user, subscription)
+                    else:
+                        await self._create_subscription_from_panel_data(db, db_user, panel_user)
 
-                            stats['updated'] += 1
-                            logger.info('📧 Обновлен email-пользователь', panel_email=panel_email)
-                        else:
-                            # Email-only пользователи не создаются автоматически при синхронизации,
-                            # они должны сначала зарегистрироваться через cabinet
-                            logger.debug('📧 Email-пользователь не найден в боте, пропускаем', panel_email=panel_email)
+                    stats['updated'] += 1
+                    logger.debug('✅ Обновлён пользователь', telegram_id=telegram_id)
 
-                    except Exception as email_user_error:
-                        logger.error('❌ Ошибка обработки email-пользователя', email_user_error=email_user_error)
-                        stats['errors'] += 1
+                touched_user_ids.add(db_user.id)
 
+            except Exception as user_error:
+                logger.error('❌ Ошибка обработки пользователя', telegram_id=telegram_id, user_error=user_error)
+                stats['errors'] += 1
                 try:
-                    await db.commit()
-                except Exception as email_commit_error:
-                    logger.error('❌ Ошибка коммита email-пользователей', email_commit_error=email_commit_error)
                     await db.rollback()
+                except Exception:
+                    pass
+                # После rollback объекты страницы expired: обращение к ним вызовет lazy load
+                # (greenlet_spawn). Пропускаем остаток страницы, следующая загрузится заново.
+                logger.warning('⚠️ Сессия откатена, пропускаем остаток страницы', telegram_id=telegram_id)
+                return False
 
-            if sync_type == 'all':
-                logger.info('🗑️ Деактивация подписок пользователей, отсутствующих в панели...')
-
-                batch_size = 50
-                processed_count = 0
-                cleanup_uuid_mutations: list[_UUIDMapMutation] = []
-
-                # Собираем список пользователей для деактивации
-                users_to_deactivate = [
-                    (telegram_id, db_user)
-                    for telegram_id, db_user in bot_users_by_telegram_id.items()
-                    if telegram_id not in panel_telegram_ids
-                    and hasattr(db_user, 'subscription')
-                    and db_user.subscription
-                ]
-
-                if users_to_deactivate:
-                    logger.info(
-                        '📊 Найдено пользователей для деактивации', users_to_deactivate_count=len(users_to_deactivate)
-                    )
-
-                # Используем один API клиент для всех операций сброса HWID
-                hwid_api_cm = None
-                try:
-                    hwid_api_cm = self.get_api_client()
-                    await hwid_api_cm.__aenter__()
-                except Exception as api_init_error:
-                    logger.warning('⚠️ Не удалось создать API клиент для сброса HWID', api_init_error=api_init_error)
-                    hwid_api_cm = None
+        for panel_user in email_only_users:
+            try:
+                panel_email = panel_user['email'].lower()
+                panel_uuid = panel_user.get('uuid')
 
-                try:
-                    for telegram_id, db_user in users_to_deactivate:
-                        cleanup_mutation: _UUIDMapMutation | None = None
-                        try:
-                            subscription = db_user.subscription
+                db_user = users_by_email.get(panel_email)
+                if not db_user and panel_uuid:
+                    db_user = users_by_uuid.get(panel_uuid)
 
-                            # Skip if recently updated by webhook
-                            from app.database.crud.subscription import is_recently_updated_by_webhook
+                if not db_user:
+                    # Email-only пользователи не создаются автоматически при синхронизации,
+                    # они должны сначала зарегистрироваться через cabinet
+                    logger.debug('📧 Email-пользователь не найден в боте, пропускаем', panel_email=panel_email)
+                    continue
 
-                            if subscription and is_recently_updated_by_webhook(subscription):
-                                logger.debug(
-                                    'Пропуск деактивации подписки : обновлена вебхуком недавно',
-                                    subscription_id=subscription.id,
-                                )
-                                continue
+                if panel_uuid and not db_user.remnawave_uuid:
+                    db_user.remnawave_uuid = panel_uuid
 
-                            logger.info('🗑️ Деактивация подписки пользователя (нет в панели)', telegram_id=telegram_id)
+                subscription = db_user.subscription
+                if subscription:
+                    await self._update_subscription_from_panel_data(db, db_user, panel_user, subscription)
+                else:
+                    await self._create_subscription_from_panel_data(db, db_user, panel_user)
 
-                            # NOTE: Не сбрасываем HWID здесь — пользователь уже удалён из панели,
-                            # API вернёт 404, UUID очищается ниже (cleanup_mutation)
+                stats['updated'] += 1
+                logger.info('📧 Обновлен email-пользователь', panel_email=panel_email)
+                touched_user_ids.add(db_user.id)
 
-                            try:
-                                from sqlalchemy import delete
+            except Exception as email_user_error:
+                logger.error('❌ Ошибка обработки email-пользователя', email_user_error=email_user_error)
+                stats['errors'] += 1
+                try:
+                    await db.rollback()
+                except Exception:
+                    pass
+                return False
 
-                                from app.database.models import SubscriptionServer
+        try:
+            await db.commit()
+        except Exception as commit_error:
+            logger.error('❌ Ошибка коммита страницы синхронизации', commit_error=commit_error)
+            await db.rollback()
+            stats['errors'] += len(panel_users) + len(email_only_users)
+            return False
+        return True
 
-                                await decrement_subscription_server_counts(db, subscription)
+    async def _deactivate_users_missing_in_panel(
+        self,
+        db: AsyncSession,
+        panel_telegram_ids,
+        stats: dict[str, int],
+        page_size: int = PANEL_SYNC_PAGE_SIZE,
+    ) -> None:
+        """Отключает подписки пользователей, которых нет в панели. Keyset-обход по users.id."""
+        from app.database.crud.subscription import is_recently_updated_by_webhook
+
+        logger.info('🗑️ Деактивация подписок пользователей, отсутствующих в панели...')
+
+        last_user_id = 0
+        scanned = 0
+        while True:
+            result = await db.execute(
+                select(User)
+                .options(selectinload(User.subscription))
+                .where(
+                    User.id > last_user_id,
+                    User.telegram_id.is_not(None),
+                    User.id.in_(select(Subscription.user_id)),
+                )
+                .order_by(User.id)
+                .limit(page_size)
+            )
+            users = result.scalars().all()
+            if not users:
+                break
 
-                                await db.execute(
-                                    delete(SubscriptionServer).where(
-                                        SubscriptionServer.subscription_id == subscription.id
-                                    )
-                                )
-                                logger.info('🗑️ Удалены серверы подписки для', telegram_id=telegram_id)
-                            except Exception as servers_error:
-                                logger.warning('⚠️ Не удалось удалить серверы подписки', servers_error=servers_error)
+            last_user_id = users[-1].id
+            scanned += len(users)
+            deactivated = 0
 
-                            from app.database.models import SubscriptionStatus
+            for db_user in users:
+                telegram_id = db_user.telegram_id
+                subscription = db_user.subscription
+                if telegram_id in panel_telegram_ids or not subscription:
+                    continue
 
-                            # Проверяем, была ли это платная подписка
-                            was_paid = not subscription.is_trial or getattr(db_user, 'has_had_paid_subscription', False)
+                try:
+                    # Skip if recently updated by webhook
+                    if is_recently_updated_by_webhook(subscription):
+                        logger.debug(
+                            'Пропуск деактивации подписки : обновлена вебхуком недавно',
+                            subscription_id=subscription.id,
+                        )
+                        continue
 
-                            subscription.status = SubscriptionStatus.DISABLED.value
+                    logger.info('🗑️ Деактивация подписки пользователя (нет в панели)', telegram_id=telegram_id)
 
-                            if was_paid:
-                                # Для платных подписок - НЕ сбрасываем is_trial и end_date!
-                                # Сохраняем оригинальные значения чтобы можно было восстановить
-                                logger.warning(
-                                    '⚠️ ПЛАТНАЯ подписка пользователя отключена (нет в панели), но is_trial= и end_date= СОХРАНЕНЫ',
-                                    telegram_id=telegram_id,
-                                    is_trial=subscription.is_trial,
-                                    end_date=subscription.end_date,
-                                )
-                            else:
-                                # Для триальных подписок - сбрасываем как раньше
-                                subscription.is_trial = True
-                                subscription.end_date = datetime.now(UTC)
-                                subscription.traffic_limit_gb = 0
-                                subscription.traffic_used_gb = 0.0
-                                subscription.device_limit = 1
+                    # NOTE: Не сбрасываем HWID здесь — пользователь уже удалён из панели,
+                    # API вернёт 404, UUID очищается ниже
+                    try:
+                        await decrement_subscription_server_counts(db, subscription)
+                        await db.execute(
+                            delete(SubscriptionServer).where(SubscriptionServer.subscription_id == subscription.id)
+                        )
+                        logger.info('🗑️ Удалены серверы подписки для', telegram_id=telegram_id)
+                    except Exception as servers_error:
+                        logger.warning('⚠️ Не удалось удалить серверы подписки', servers_error=servers_error)
 
-                            subscription.connected_squads = []
-                            subscription.autopay_enabled = False
-                            subscription.remnawave_short_uuid = None
-                            subscription.subscription_url = ''
-                            subscription.subscription_crypto_link = ''
-
-                            old_uuid = getattr(db_user, 'remnawave_uuid', None)
-                            cleanup_mutation = _UUIDMapMutation(bot_users_by_uuid)
-                            if old_uuid:
-                                cleanup_mutation.remove_map_entry(old_uuid)
-                            cleanup_mutation.set_user_uuid(db_user, None)
-                            cleanup_mutation.set_user_updated_at(db_user, datetime.now(UTC))
-
-                            stats['deleted'] += 1
-                            logger.info(
-                                '✅ Деактивирована подписка пользователя (сохранен баланс)', telegram_id=telegram_id
-                            )
+                    # Проверяем, была ли это платная подписка
+                    was_paid = not subscription.is_trial or getattr(db_user, 'has_had_paid_subscription', False)
 
-                            processed_count += 1
+                    subscription.status = SubscriptionStatus.DISABLED.value
 
-                        except Exception as delete_error:
-                            logger.error(
-                                '❌ Ошибка деактивации подписки', telegram_id=telegram_id, delete_error=delete_error
-                            )
-                            stats['errors'] += 1
-                            if cleanup_mutation:
-                                cleanup_mutation.rollback()
-                            if cleanup_uuid_mutations:
-                                for mutation in reversed(cleanup_uuid_mutations):
-                                    mutation.rollback()
-                                cleanup_uuid_mutations.clear()
-                            try:
-                                await db.rollback()
-                            except:
-                                pass
-                        else:
-                            if cleanup_mutation and cleanup_mutation.has_changes():
-                                cleanup_uuid_mutations.append(cleanup_mutation)
-
-                            # Коммитим изменения каждые N пользователей
-                            if processed_count % batch_size == 0:
-                                try:
-                                    await db.commit()
-                                    logger.debug(
-                                        '📦 Коммит изменений после деактивации подписок',
-                                        processed_count=processed_count,
-                                    )
-                                    cleanup_uuid_mutations.clear()
-                                except Exception as commit_error:
-                                    logger.error(
-                                        '❌ Ошибка коммита после деактивации подписок',
-                                        processed_count=processed_count,
-                                        commit_error=commit_error,
-                                    )
-                                    await db.rollback()
-                                    for mutation in reversed(cleanup_uuid_mutations):
-                                        mutation.rollback()
-                                    cleanup_uuid_mutations.clear()
-                                    stats['errors'] += batch_size
-                                    break  # Прерываем цикл при ошибке коммита
-
-                    # Коммитим оставшиеся изменения
-                    try:
-                        await db.commit()
-                        cleanup_uuid_mutations.clear()
-                    except Exception as final_commit_error:
-                        logger.error(
-                            '❌ Ошибка финального коммита при деактивации', final_commit_error=final_commit_error
+                    if was_paid:
+                        # Для платных подписок - НЕ сбрасываем is_trial и end_date!
+                        # Сохраняем оригинальные значения чтобы можно было восстановить
+                        logger.warning(
+                            '⚠️ ПЛАТНАЯ подписка пользователя отключена (нет в панели), но is_trial= и end_date= СОХРАНЕНЫ',
+                            telegram_id=telegram_id,
+                            is_trial=subscription.is_trial,
+                            end_date=subscription.end_date,
                         )
+                    else:
+                        # Для триальных подписок - сбрасываем как раньше
+                        subscription.is_trial = True
+                        subscription.end_date = datetime.now(UTC)
+                        subscription.traffic_limit_gb = 0
+                        subscription.traffic_used_gb = 0.0
+                        subscription.device_limit = 1
+
+                    subscription.connected_squads = []
+                    subscription.autopay_enabled = False
+                    subscription.remnawave_short_uuid = None
+                    subscription.subscription_url = ''
+                    subscription.subscription_crypto_link = ''
+
+                    db_user.remnawave_uuid = None
+                    db_user.updated_at = datetime.now(UTC)
+
+                    deactivated += 1
+                    logger.info('✅ Деактивирована подписка пользователя (сохранен баланс)', telegram_id=telegram_id)
+
+                except Exception as delete_error:
+                    logger.error('❌ Ошибка деактивации подписки', telegram_id=telegram_id, delete_error=delete_error)
+                    stats['errors'] += 1
+                    deactivated = 0
+                    try:
                         await db.rollback()
-                        for mutation in reversed(cleanup_uuid_mutations):
-                            mutation.rollback()
-                        cleanup_uuid_mutations.clear()
-
-                finally:
-                    # Закрываем API клиент
-                    if hwid_api_cm:
-                        try:
-                            await hwid_api_cm.__aexit__(None, None, None)
-                        except Exception:
-                            pass
+                    except Exception:
+                        pass
+                    break
 
-            logger.info(
-                '🎯 Синхронизация завершена: создано обновлено деактивировано ошибок',
-                stats=stats['created'],
-                stats_2=stats['updated'],
-                stats_3=stats['deleted'],
-                stats_4=stats['errors'],
-            )
-            return stats
+            if deactivated:
+                try:
+                    await db.commit()
+                    stats['deleted'] += deactivated
+                except Exception as commit_error:
+                    logger.error('❌ Ошибка коммита после деактивации подписок', commit_error=commit_error)
+                    await db.rollback()
+                    stats['errors'] += deactivated
 
-        except Exception as e:
-            logger.error('❌ Критическая ошибка синхронизации пользователей', error=e)
-            return {'created': 0, 'updated': 0, 'errors': 1, 'deleted': 0}
+            self._report_sync_progress('cleanup', scanned, None, stats)
 
     async def _create_subscription_from_panel_data(self, db: AsyncSession, user, panel_user):
         try:
@@ -1715,14 +1636,36 @@ class RemnaWaveService:
             except Exception as basic_error:
                 logger.error('❌ Ошибка создания базовой подписки', basic_error=basic_error)
 
-    async def _update_subscription_from_panel_data(self, db: AsyncSession, user, panel_user):
+    @staticmethod
+    def _expire_overdue_subscription(subscription: Subscription) -> None:
+        if getattr(subscription, 'is_daily_paused', False):
+            return
+        current_time = datetime.now(UTC)
+        if subscription.status == SubscriptionStatus.ACTIVE.value and subscription.end_date <= current_time:
+            logger.warning(
+                '⏰ DEACTIVATION: подписка (user_id=) истекла, статус меняется на expired при синхронизации',
+                subscription_id=subscription.id,
+                user_id=subscription.user_id,
+                end_date=subscription.end_date,
+            )
+            subscription.status = SubscriptionStatus.EXPIRED.value
+            subscription.updated_at = current_time
+
+    async def _update_subscription_from_panel_data(
+        self, db: AsyncSession, user, panel_user, subscription: Subscription | None = None
+    ):
         try:
             from app.database.crud.subscription import get_subscription_by_user_id, is_recently_updated_by_webhook
             from app.database.models import SubscriptionStatus
 
-            # Всегда используем async CRUD запрос для получения подписки,
-            # чтобы избежать lazy-load (greenlet_spawn) в async контексте
-            subscription = await get_subscription_by_user_id(db, user.id)
+            if subscription is None:
+                # Используем async CRUD запрос для получения подписки,
+                # чтобы избежать lazy-load (greenlet_spawn) в async контексте
+                subscription = await get_subscription_by_user_id(db, user.id)
+            else:
+                # Подписка предзагружена пакетным запросом: та же проверка истечения,
+                # что в get_subscription_by_user_id, но без отдельного коммита на строку
+                self._expire_overdue_subscription(subscription)
 
             if not subscription:
                 await self._create_subscription_from_panel_data(db, user, panel_user)
@@ -1886,189 +1829,267 @@ class RemnaWaveService:
             # Ошибку прокидываем выше для корректной обработки в основном цикле
             raise
 
-    async def sync_users_to_panel(self, db: AsyncSession) -> dict[str, int]:
-        from app.database.crud.subscription import get_subscriptions_batch
+    def _build_panel_user_payload(self, sub: Subscription) -> dict[str, Any]:
+        """Параметры create_user для панели по подписке и её пользователю."""
+        user = sub.user
+        hwid_limit = resolve_hwid_device_limit_for_payload(sub)
+        expire_at = self._safe_expire_at_for_panel(sub.end_date)
+
+        # Определяем статус для панели
+        is_subscription_active = sub.status in (
+            SubscriptionStatus.ACTIVE.value,
+            SubscriptionStatus.TRIAL.value,
+        ) and sub.end_date > datetime.now(UTC)
+        status = UserStatus.ACTIVE if is_subscription_active else UserStatus.DISABLED
+
+        username = settings.format_remnawave_username(
+            full_name=user.full_name,
+            username=user.username,
+            telegram_id=user.telegram_id,
+            email=user.email,
+            user_id=user.id,
+        )
+
+        create_kwargs = dict(
+            username=username,
+            expire_at=expire_at,
+            status=status,
+            traffic_limit_bytes=sub.traffic_limit_gb * (1024**3) if sub.traffic_limit_gb > 0 else 0,
+            traffic_limit_strategy=TrafficLimitStrategy.MONTH,
+            telegram_id=user.telegram_id,
+            email=user.email,
+            description=settings.format_remnawave_user_description(
+                full_name=user.full_name,
+                username=user.username,
+                telegram_id=user.telegram_id,
+                email=user.email,
+            ),
+            active_internal_squads=sub.connected_squads,
+        )
+
+        if hwid_limit is not None:
+            create_kwargs['hwid_device_limit'] = hwid_limit
+
+        return create_kwargs
+
+    def _panel_payload_hash(self, sub: Subscription) -> str:
+        """Отпечаток того, что бот отправил бы в панель для подписки."""
+        payload = self._build_panel_user_payload(sub)
+        # Для истёкших подписок expire_at подтягивается к «сейчас + 1 мин» — в отпечаток идёт исходная дата
+        payload['expire_at'] = sub.end_date
+        payload['active_internal_squads'] = sorted(payload['active_internal_squads'] or [])
+        return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    async def _push_subscription_to_panel(self, api: RemnaWaveAPI, sub: Subscription) -> tuple[str, Subscription, Any]:
+        """Создаёт или обновляет пользователя панели по подписке.
 
+        Возвращает (action, sub, new_user); для action='error' третьим элементом идёт исключение.
+        """
         try:
-            stats = {'created': 0, 'updated': 0, 'errors': 0}
+            user = sub.user
+            create_kwargs = self._build_panel_user_payload(sub)
+            hwid_limit = create_kwargs.get('hwid_device_limit')
+            status = create_kwargs['status']
+            expire_at = create_kwargs['expire_at']
+
+            # Определяем UUID для обновления
+            panel_uuid = user.remnawave_uuid
+
+            # Если нет UUID в базе, ищем пользователя по telegram_id в панели
+            if not panel_uuid and user.telegram_id:
+                existing_users = await api.get_user_by_telegram_id(user.telegram_id)
+                if existing_users:
+                    panel_uuid = existing_users[0].uuid
+                    logger.debug(
+                        'Найден пользователь в панели',
+                        telegram_id=user.telegram_id,
+                        panel_uuid=panel_uuid,
+                    )
 
-            batch_size = 500
-            offset = 0
-            concurrent_limit = 5
+            # Fallback: поиск по email (для OAuth юзеров без telegram_id)
+            if not panel_uuid and user.email:
+                existing_users = await api.get_user_by_email(user.email)
+                if existing_users:
+                    panel_uuid = existing_users[0].uuid
+                    logger.debug(
+                        'Найден пользователь в панели по email',
+                        email=user.email,
+                        panel_uuid=panel_uuid,
+                    )
 
-            async with self.get_api_client() as api:
-                semaphore = asyncio.Semaphore(concurrent_limit)
+            if panel_uuid:
+                update_kwargs = dict(
+                    uuid=panel_uuid,
+                    status=status,
+                    expire_at=expire_at,
+                    traffic_limit_bytes=create_kwargs['traffic_limit_bytes'],
+                    traffic_limit_strategy=TrafficLimitStrategy.MONTH,
+                    email=user.email,
+                    description=create_kwargs['description'],
+                    active_internal_squads=sub.connected_squads,
+                )
 
-                while True:
-                    # Получаем подписки напрямую (не через users)
-                    subscriptions = await get_subscriptions_batch(db, offset=offset, limit=batch_size)
+                if hwid_limit is not None:
+                    update_kwargs['hwid_device_limit'] = hwid_limit
 
-                    if not subscriptions:
-                        break
+                try:
+                    await api.update_user(**update_kwargs)
+                    # Сохраняем UUID если его не было
+                    if not user.remnawave_uuid:
+                        user.remnawave_uuid = panel_uuid
+                    return ('updated', sub, None)
+                except RemnaWaveAPIError as api_error:
+                    if api_error.status_code == 404:
+                        new_user = await api.create_user(**create_kwargs)
+                        return ('created', sub, new_user)
+                    raise
+            else:
+                new_user = await api.create_user(**create_kwargs)
+                return ('created', sub, new_user)
 
-                    # Фильтруем подписки у которых есть пользователь
-                    valid_subscriptions = [s for s in subscriptions if s.user]
+        except Exception as e:
+            logger.error(
+                'Ошибка синхронизации пользователя в панель',
+                telegram_id=sub.user.telegram_id if sub.user else 'N/A',
+                error=e,
+            )
+            return ('error', sub, e)
 
-                    if not valid_subscriptions:
-                        if len(subscriptions) < batch_size:
-                            break
-                        offset += batch_size
-                        continue
+    @staticmethod
+    def _apply_panel_push_results(results: list, stats: dict[str, int]) -> None:
+        for result in results:
+            if isinstance(result, Exception):
+                stats['errors'] += 1
+                continue
 
-                    # Подготавливаем задачи для параллельного выполнения
-                    async def process_subscription(sub):
-                        async with semaphore:
-                            try:
-                                user = sub.user
-                                hwid_limit = resolve_hwid_device_limit_for_payload(sub)
-                                expire_at = self._safe_expire_at_for_panel(sub.end_date)
-
-                                # Определяем статус для панели
-                                is_subscription_active = sub.status in (
-                                    SubscriptionStatus.ACTIVE.value,
-                                    SubscriptionStatus.TRIAL.value,
-                                ) and sub.end_date > datetime.now(UTC)
-                                status = UserStatus.ACTIVE if is_subscription_active else UserStatus.DISABLED
-
-                                username = settings.format_remnawave_username(
-                                    full_name=user.full_name,
-                                    username=user.username,
-                                    telegram_id=user.telegram_id,
-                                    email=user.email,
-                                    user_id=user.id,
-                                )
+            action, sub, new_user = result
+            if action == 'created':
+                if new_user and sub.user:
+                    sub.user.remnawave_uuid = new_user.uuid
+                    sub.remnawave_short_uuid = new_user.short_uuid
+                stats['created'] += 1
+            elif action == 'updated':
+                stats['updated'] += 1
+            else:
+                stats['errors'] += 1
+
+    def _create_push_controller(self) -> AIMDConcurrencyController:
+        return AIMDConcurrencyController(
+            initial=settings.REMNAWAVE_PANEL_SYNC_INITIAL_CONCURRENCY,
+            min_limit=settings.REMNAWAVE_PANEL_SYNC_MIN_CONCURRENCY,
+            max_limit=settings.REMNAWAVE_PANEL_SYNC_MAX_CONCURRENCY,
+            latency_target=settings.REMNAWAVE_PANEL_SYNC_LATENCY_TARGET_MS / 1000,
+        )
 
-                                create_kwargs = dict(
-                                    username=username,
-                                    expire_at=expire_at,
-                                    status=status,
-                                    traffic_limit_bytes=sub.traffic_limit_gb * (1024**3)
-                                    if sub.traffic_limit_gb > 0
-                                    else 0,
-                                    traffic_limit_strategy=TrafficLimitStrategy.MONTH,
-                                    telegram_id=user.telegram_id,
-                                    email=user.email,
-                                    description=settings.format_remnawave_user_description(
-                                        full_name=user.full_name,
-                                        username=user.username,
-                                        telegram_id=user.telegram_id,
-                                        email=user.email,
-                                    ),
-                                    active_internal_squads=sub.connected_squads,
-                                )
+    async def _push_subscriptions_batch(
+        self,
+        api: RemnaWaveAPI,
+        subscriptions: list[Subscription],
+        controller: AIMDConcurrencyController,
+        stats: dict[str, int],
+    ) -> None:
+        """Отправляет в панель подписки, чей payload изменился с прошлой успешной отправки."""
+        stored_hashes = await cache.get_hash_fields(PANEL_PAYLOAD_HASH_KEY, [str(sub.id) for sub in subscriptions])
+
+        to_push: list[tuple[Subscription, str]] = []
+        for sub, stored_hash in zip(subscriptions, stored_hashes, strict=True):
+            payload_hash = self._panel_payload_hash(sub)
+            # Без UUID пользователя в панели ещё нет (или он потерян) — отправляем всегда
+            if sub.user.remnawave_uuid and stored_hash == payload_hash:
+                stats['unchanged'] += 1
+                continue
+            to_push.append((sub, payload_hash))
 
-                                if hwid_limit is not None:
-                                    create_kwargs['hwid_device_limit'] = hwid_limit
-
-                                # Определяем UUID для обновления
-                                panel_uuid = user.remnawave_uuid
-
-                                # Если нет UUID в базе, ищем пользователя по telegram_id в панели
-                                if not panel_uuid and user.telegram_id:
-                                    existing_users = await api.get_user_by_telegram_id(user.telegram_id)
-                                    if existing_users:
-                                        panel_uuid = existing_users[0].uuid
-                                        logger.debug(
-                                            'Найден пользователь в панели',
-                                            telegram_id=user.telegram_id,
-                                            panel_uuid=panel_uuid,
-                                        )
+        if not to_push:
+            return
 
-                                # Fallback: поиск по email (для OAuth юзеров без telegram_id)
-                                if not panel_uuid and user.email:
-                                    existing_users = await api.get_user_by_email(user.email)
-                                    if existing_users:
-                                        panel_uuid = existing_users[0].uuid
-                                        logger.debug(
-                                            'Найден пользователь в панели по email',
-                                            email=user.email,
-                                            panel_uuid=panel_uuid,
-                                        )
+        async def push(sub: Subscription):
+            async with controller.slot():
+                started = time.monotonic()
+                result = await self._push_subscription_to_panel(api, sub)
+                controller.record(time.monotonic() - started, result[2] if result[0] == 'error' else None)
+                return result
 
-                                if panel_uuid:
-                                    update_kwargs = dict(
-                                        uuid=panel_uuid,
-                                        status=status,
-                                        expire_at=expire_at,
-                                        traffic_limit_bytes=create_kwargs['traffic_limit_bytes'],
-                                        traffic_limit_strategy=TrafficLimitStrategy.MONTH,
-                                        email=user.email,
-                                        description=create_kwargs['description'],
-                                        active_internal_squads=sub.connected_squads,
-                                    )
-
-                                    if hwid_limit is not None:
-                                        update_kwargs['hwid_device_limit'] = hwid_limit
-
-                                    try:
-                                        await api.update_user(**update_kwargs)
-                                        # Сохраняем UUID если его не было
-                                        if not user.remnawave_uuid:
-                                            user.remnawave_uuid = panel_uuid
-                                        return ('updated', sub, None)
-                                    except RemnaWaveAPIError as api_error:
-                                        if api_error.status_code == 404:
-                                            new_user = await api.create_user(**create_kwargs)
-                                            return ('created', sub, new_user)
-                                        raise
-                                else:
-                                    new_user = await api.create_user(**create_kwargs)
-                                    return ('created', sub, new_user)
-
-                            except Exception as e:
-                                logger.error(
-                                    'Ошибка синхронизации пользователя в панель',
-                                    telegram_id=sub.user.telegram_id if sub.user else 'N/A',
-                                    error=e,
-                                )
-                                return ('error', sub, None)
+        results = await asyncio.gather(*(push(sub) for sub, _ in to_push))
+        self._apply_panel_push_results(results, stats)
 
-                    # Выполняем параллельно
-                    tasks = [process_subscription(s) for s in valid_subscriptions]
-                    results = await asyncio.gather(*tasks, return_exceptions=True)
+        pushed_hashes = {
+            str(sub.id): payload_hash
+            for (sub, payload_hash), (action, _, _) in zip(to_push, results, strict=True)
+            if action in ('created', 'updated')
+        }
+        if pushed_hashes:
+            await cache.set_hash(PANEL_PAYLOAD_HASH_KEY, pushed_hashes, expire=PANEL_PAYLOAD_HASH_TTL_SECONDS)
+
+    async def _prune_panel_payload_hashes(self, db: AsyncSession) -> int:
+        """Удаляет из PANEL_PAYLOAD_HASH_KEY отпечатки подписок, которых больше нет в БД."""
+        removed = 0
+        async for fields in cache.scan_hash_fields(PANEL_PAYLOAD_HASH_KEY):
+            ids = {int(field) for field in fields if field.isdigit()}
+            existing = set((await db.execute(select(Subscription.id).where(Subscription.id.in_(ids)))).scalars())
+            stale = [field for field in fields if not field.isdigit() or int(field) not in existing]
+            removed += await cache.delete_hash_fields(PANEL_PAYLOAD_HASH_KEY, stale)
+        if removed:
+            logger.info('🧹 Удалены отпечатки payload удалённых подписок', removed=removed)
+        return removed
 
-                    # Обрабатываем результаты
-                    for result in results:
-                        if isinstance(result, Exception):
-                            stats['errors'] += 1
-                            continue
+    async def sync_users_to_panel(self, db: AsyncSession) -> dict[str, int]:
+        from app.database.crud.subscription import get_subscriptions_batch
 
-                        action, sub, new_user = result
-                        if action == 'created':
-                            if new_user and sub.user:
-                                sub.user.remnawave_uuid = new_user.uuid
-                                sub.remnawave_short_uuid = new_user.short_uuid
-                            stats['created'] += 1
-                        elif action == 'updated':
-                            stats['updated'] += 1
-                        else:
-                            stats['errors'] += 1
+        try:
+            stats = {'created': 0, 'updated': 0, 'errors': 0, 'unchanged': 0}
 
-                    try:
-                        await db.commit()
-                    except Exception as commit_error:
-                        logger.error('Ошибка фиксации транзакции при синхронизации в панель', commit_error=commit_error)
-                        await db.rollback()
-                        stats['errors'] += len(valid_subscriptions)
+            batch_size = 500
+            last_id = 0
+            controller = self._create_push_controller()
+
+            async with self.get_api_client() as api:
+                while True:
+                    # Keyset по id: каждая страница — индексный range scan, без OFFSET
+                    subscriptions = await get_subscriptions_batch(db, after_id=last_id, limit=batch_size)
+
+                    if not subscriptions:
+                        break
+
+                    last_id = subscriptions[-1].id
+
+                    # Фильтруем подписки у которых есть пользователь
+                    valid_subscriptions = [s for s in subscriptions if s.user]
+
+                    if valid_subscriptions:
+                        await self._push_subscriptions_batch(api, valid_subscriptions, controller, stats)
+
+                        try:
+                            await db.commit()
+                        except Exception as commit_error:
+                            logger.error(
+                                'Ошибка фиксации транзакции при синхронизации в панель', commit_error=commit_error
+                            )
+                            await db.rollback()
+                            stats['errors'] += len(valid_subscriptions)
 
                     logger.info(
-                        '📦 Обработано подписок: создано обновлено ошибок',
-                        offset=offset + len(subscriptions),
+                        '📦 Обработано подписок: создано обновлено без изменений ошибок',
+                        last_id=last_id,
                         stats=stats['created'],
                         stats_2=stats['updated'],
-                        stats_3=stats['errors'],
+                        stats_3=stats['unchanged'],
+                        stats_4=stats['errors'],
+                        concurrency=controller.current_limit,
                     )
 
                     if len(subscriptions) < batch_size:
                         break
 
-                    offset += batch_size
-
+            stats['concurrency'] = controller.get_stats()
+            stats['pruned_hashes'] = await self._prune_panel_payload_hashes(db)
             logger.info(
-                '✅ Синхронизация в панель завершена: создано обновлено ошибок',
+                '✅ Синхронизация в панель завершена: создано обновлено без изменений ошибок',
                 stats=stats['created'],
                 stats_2=stats['updated'],
-                stats_3=stats['errors'],
+                stats_3=stats['unchanged'],
+                stats_4=stats['errors'],
+                concurrency=stats['concurrency'],
             )
             return stats
 
@@ -2076,6 +2097,124 @@ class RemnaWaveService:
             logger.error('Ошибка синхронизации пользователей в панель', error=e)
             return {'created': 0, 'updated': 0, 'errors': 1}
 
+    async def _iter_changed_panel_users(self, api: RemnaWaveAPI, since: datetime, size: int = PANEL_SYNC_PAGE_SIZE):
+        """Отдаёт страницы пользователей панели с updatedAt > since.
+
+        Панель сортирует по updatedAt по убыванию, поэтому обход останавливается на первой
+        более старой записи. Если порядок не монотонный (панель игнорирует сортировку),
+        поднимает RemnaWavePanelSortingError: читать ради дельты всю панель дороже полной
+        синхронизации.
+        """
+        sorting = [{'id': 'updatedAt', 'desc': True}]
+        previous_updated_at: datetime | None = None
+        start = 0
+
+        while True:
+            response = await api.get_all_users(start=start, size=size, enrich_happ_links=False, sorting=sorting)
+            users_batch = response['users']
+
+            changed = []
+            reached_older = False
+            for user_obj in users_batch:
+                updated_at = user_obj.updated_at
+                if previous_updated_at is not None and updated_at > previous_updated_at:
+                    raise RemnaWavePanelSortingError('RemnaWave panel ignores sorting by updatedAt')
+                previous_updated_at = updated_at
+
+                if updated_at > since:
+                    changed.append(self._panel_user_to_dict(user_obj))
+                else:
+                    reached_older = True
+
+            if changed:
+                yield changed
+
+            if len(users_batch) < size or reached_older:
+                break
+            start += size
+            if start > response['total']:
+                break
+
+    async def sync_changed_users_from_panel(
+        self, db: AsyncSession, since: datetime
+    ) -> tuple[dict[str, int], datetime | None, set[int]]:
+        """Дельта панель → бот: только пользователи, изменённые в панели после since.
+
+        Возвращает статистику, максимальный updatedAt из обработанных записей
+        и id пользователей бота, которых коснулась синхронизация.
+        """
+        stats = {'created': 0, 'updated': 0, 'errors': 0, 'deleted': 0, 'changed': 0}
+        panel_ranks: dict[int, tuple[float, bool]] = {}
+        touched_user_ids: set[int] = set()
+        high_water_mark: datetime | None = None
+
+        async with self.get_api_client() as api:
+            async for page in self._iter_changed_panel_users(api, since):
+                await self._sync_panel_page(db, page, 'all', panel_ranks, stats, touched_user_ids)
+                stats['changed'] += len(page)
+                page_max = max(datetime.fromisoformat(user['updatedAt']) for user in page)
+                if high_water_mark is None or page_max > high_water_mark:
+                    high_water_mark = page_max
+
+        return stats, high_water_mark, touched_user_ids
+
+    async def sync_changed_subscriptions_to_panel(
+        self,
+        db: AsyncSession,
+        since: datetime,
+        *,
+        exclude_user_ids: set[int] | frozenset[int] = frozenset(),
+    ) -> tuple[dict[str, int], datetime | None]:
+        """Дельта бот → панель: подписки с updated_at > since, keyset-обход по (updated_at, id).
+
+        exclude_user_ids — пользователи, только что обновлённые из панели: их изменения
+        не отправляются обратно, чтобы синхронизация не гоняла одни и те же строки по кругу.
+        """
+        stats = {'created': 0, 'updated': 0, 'errors': 0, 'skipped': 0, 'unchanged': 0, 'changed': 0}
+        high_water_mark: datetime | None = None
+        last_key = (since, 0)
+        # Строки, изменённые самим прогоном (uuid/short_uuid после создания), ждут следующего
+        until = datetime.now(UTC)
+
+        controller = self._create_push_controller()
+
+        async with self.get_api_client() as api:
+            while True:
+                result = await db.execute(
+                    select(Subscription)
+                    .options(selectinload(Subscription.user))
+                    .where(
+                        tuple_(Subscription.updated_at, Subscription.id) > tuple_(*last_key),
+                        Subscription.updated_at <= until,
+                    )
+                    .order_by(Subscription.updated_at, Subscription.id)
+                    .limit(PANEL_SYNC_PAGE_SIZE)
+                )
+                subscriptions = list(result.scalars().all())
+                if not subscriptions:
+                    break
+
+                last_key = (subscriptions[-1].updated_at, subscriptions[-1].id)
+                high_water_mark = subscriptions[-1].updated_at
+                stats['changed'] += len(subscriptions)
+
+                to_push = [sub for sub in subscriptions if sub.user and sub.user_id not in exclude_user_ids]
+                stats['skipped'] += len(subscriptions) - len(to_push)
+
+                if to_push:
+                    await self._push_subscriptions_batch(api, to_push, controller, stats)
+                    try:
+                        await db.commit()
+                    except Exception as commit_error:
+                        logger.error('Ошибка фиксации дельта-синхронизации в панель', commit_error=commit_error)
+                        await db.rollback()
+                        stats['errors'] += len(to_push)
+
+                if len(subscriptions) < PANEL_SYNC_PAGE_SIZE:
+                    break
+
+        return stats, high_water_mark
+
     async def get_user_traffic_stats(self, telegram_id: int) -> dict[str, Any] | None:
         try:
             async with self.get_api_client() as api:
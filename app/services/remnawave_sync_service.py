@@ -12,6 +12,7 @@ from app.database.crud.server_squad import sync_with_remnawave
 from app.database.database import AsyncSessionLocal
 from app.services.remnawave_service import (
     RemnaWaveConfigurationError,
+    RemnaWavePanelSortingError,
     RemnaWaveService,
 )
 from app.utils.cache import cache
@@ -19,6 +20,10 @@ from app.utils.cache import cache
 
 logger = structlog.get_logger(__name__)
 
+DELTA_MARKS_CACHE_KEY = 'remnawave_sync:delta_marks'
+# Перекрытие окна дельты: защита от расхождения часов и строк, изменённых во время чтения
+DELTA_OVERLAP = timedelta(seconds=5)
+
 
 @dataclass(frozen=True)
 class RemnaWaveAutoSyncStatus:
@@ -33,6 +38,9 @@ class RemnaWaveAutoSyncStatus:
     last_user_stats: dict[str, Any] | None
     last_server_stats: dict[str, Any] | None
     is_running: bool
+    progress: dict[str, Any] | None = None
+    delta_enabled: bool = False
+    last_delta_stats: dict[str, Any] | None = None
 
 
 class RemnaWaveAutoSyncService:
@@ -41,6 +49,7 @@ class RemnaWaveAutoSyncService:
         service_factory: Callable[[], RemnaWaveService] = RemnaWaveService,
     ) -> None:
         self._scheduler_task: asyncio.Task | None = None
+        self._delta_task: asyncio.Task | None = None
         self._scheduler_lock = asyncio.Lock()
         self._sync_lock = asyncio.Lock()
         self._service_factory = service_factory
@@ -59,6 +68,10 @@ class RemnaWaveAutoSyncService:
         self._last_run_error: str | None = None
         self._last_user_stats: dict[str, Any] | None = None
         self._last_server_stats: dict[str, Any] | None = None
+        self._delta_marks: dict[str, datetime] | None = None
+        self._last_delta_stats: dict[str, Any] | None = None
+        # Панель игнорирует сортировку по updatedAt: дельта панель → бот отключена до перезапуска
+        self._delta_pull_disabled = False
 
     async def initialize(self) -> None:
         self._loop = asyncio.get_running_loop()
@@ -86,6 +99,7 @@ class RemnaWaveAutoSyncService:
                     pass
                 finally:
                     self._scheduler_task = None
+            await self._cancel_delta_task()
 
             if not settings.REMNAWAVE_AUTO_SYNC_ENABLED:
                 self._next_run = None
@@ -98,6 +112,8 @@ class RemnaWaveAutoSyncService:
                 return
 
             self._scheduler_task = asyncio.create_task(self._run_scheduler(times))
+            if settings.REMNAWAVE_DELTA_SYNC_ENABLED:
+                self._delta_task = asyncio.create_task(self._run_delta_scheduler())
 
         if run_immediately:
             asyncio.create_task(self.run_sync_now(reason='immediate'))
@@ -122,13 +138,15 @@ class RemnaWaveAutoSyncService:
                     pass
             self._scheduler_task = None
             self._next_run = None
+            await self._cancel_delta_task()
 
     async def run_sync_now(self, *, reason: str = 'manual') -> dict[str, Any]:
         if self._sync_lock.locked():
             return {'started': False, 'reason': 'already_running'}
 
         async with self._sync_lock:
-            self._last_run_started_at = datetime.now(UTC)
+            started_at = datetime.now(UTC)
+            self._last_run_started_at = started_at
             self._last_run_finished_at = None
             self._last_run_reason = reason
             self._last_run_error = None
@@ -173,6 +191,12 @@ class RemnaWaveAutoSyncService:
             self._last_server_stats = server_stats
             self._last_run_finished_at = datetime.now(UTC)
 
+            # Полный прогон (только панель → бот) покрыл изменения панели до его старта.
+            # Отметку бота не трогаем: ещё не отправленные изменения бота досылает дельта
+            marks = await self._load_delta_marks()
+            if marks is not None and not (user_stats or {}).get('errors', 0):
+                await self._save_delta_marks({**marks, 'panel': max(marks['panel'], started_at)})
+
             return {
                 'started': True,
                 'success': True,
@@ -197,6 +221,9 @@ class RemnaWaveAutoSyncService:
             last_user_stats=self._last_user_stats,
             last_server_stats=self._last_server_stats,
             is_running=self._sync_lock.locked(),
+            progress=getattr(self._service, 'sync_progress', None),
+            delta_enabled=enabled and settings.REMNAWAVE_DELTA_SYNC_ENABLED,
+            last_delta_stats=self._last_delta_stats,
         )
 
     async def _run_scheduler(self, times: list[time]) -> None:
@@ -215,6 +242,115 @@ class RemnaWaveAutoSyncService:
         finally:
             self._next_run = None
 
+    async def _cancel_delta_task(self) -> None:
+        if self._delta_task and not self._delta_task.done():
+            self._delta_task.cancel()
+            try:
+                await self._delta_task
+            except asyncio.CancelledError:
+                pass
+        self._delta_task = None
+
+    async def _run_delta_scheduler(self) -> None:
+        interval = max(10, settings.REMNAWAVE_DELTA_SYNC_INTERVAL_SECONDS)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.run_delta_sync_now()
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                logger.exception('❌ Ошибка дельта-синхронизации RemnaWave', error=error)
+
+    async def _load_delta_marks(self) -> dict[str, datetime] | None:
+        if self._delta_marks is not None:
+            return self._delta_marks
+        stored = await cache.get(DELTA_MARKS_CACHE_KEY)
+        if isinstance(stored, dict) and stored.get('panel') and stored.get('bot'):
+            self._delta_marks = {
+                'panel': datetime.fromisoformat(stored['panel']),
+                'bot': datetime.fromisoformat(stored['bot']),
+            }
+        return self._delta_marks
+
+    async def _save_delta_marks(self, marks: dict[str, datetime]) -> None:
+        self._delta_marks = marks
+        try:
+            await cache.set(DELTA_MARKS_CACHE_KEY, {key: value.isoformat() for key, value in marks.items()})
+        except Exception as error:
+            logger.warning('⚠️ Не удалось сохранить отметки дельта-синхронизации', error=error)
+
+    async def run_delta_sync_now(self) -> dict[str, Any]:
+        """Синхронизирует только строки, изменённые после high-water mark.
+
+        Сначала панель → бот (updatedAt панели), затем бот → панель (Subscription.updated_at).
+        Отметка сдвигается только при прогоне без ошибок — иначе окно повторится.
+        """
+        if self._sync_lock.locked():
+            return {'started': False, 'reason': 'already_running'}
+
+        async with self._sync_lock:
+            service = self._refresh_service()
+            if not service.is_configured:
+                return {'started': False, 'reason': 'not_configured'}
+
+            started_at = datetime.now(UTC)
+            marks = await self._load_delta_marks()
+            if marks is None:
+                # Без отметки нечего сравнивать: точкой отсчёта становится текущий момент,
+                # всё более раннее закроет полная синхронизация
+                await self._save_delta_marks({'panel': started_at, 'bot': started_at})
+                logger.info('ℹ️ Дельта-синхронизация: отметки инициализированы, ждём следующего запуска')
+                return {'started': False, 'reason': 'initialized'}
+
+            async with AsyncSessionLocal() as session:
+                pull_stats = {'created': 0, 'updated': 0, 'errors': 0, 'deleted': 0, 'changed': 0}
+                panel_mark, touched_user_ids = None, set()
+                if not self._delta_pull_disabled:
+                    try:
+                        pull_stats, panel_mark, touched_user_ids = await service.sync_changed_users_from_panel(
+                            session, marks['panel'] - DELTA_OVERLAP
+                        )
+                    except RemnaWavePanelSortingError:
+                        # Отметка панели не сдвигается: изменения подтянет полная синхронизация
+                        self._delta_pull_disabled = True
+                        logger.warning(
+                            '⚠️ Панель не сортирует пользователей по updatedAt: '
+                            'дельта панель → бот отключена, изменения панели подтянет полная синхронизация'
+                        )
+                push_stats, bot_mark = await service.sync_changed_subscriptions_to_panel(
+                    session, marks['bot'] - DELTA_OVERLAP, exclude_user_ids=touched_user_ids
+                )
+
+            new_marks = dict(marks)
+            if not pull_stats['errors'] and panel_mark:
+                new_marks['panel'] = max(marks['panel'], panel_mark)
+            if not push_stats['errors'] and bot_mark:
+                new_marks['bot'] = max(marks['bot'], bot_mark)
+            if new_marks != marks:
+                await self._save_delta_marks(new_marks)
+
+            finished_at = datetime.now(UTC)
+            self._last_delta_stats = {
+                'started_at': started_at.isoformat(),
+                'finished_at': finished_at.isoformat(),
+                'duration_seconds': round((finished_at - started_at).total_seconds(), 3),
+                'delta_size': pull_stats['changed'] + push_stats['changed'],
+                'pulled': pull_stats,
+                'pushed': push_stats,
+                # Насколько отстаёт синхронизация: возраст самой старой отметки после прогона
+                'lag_seconds': round((finished_at - min(new_marks.values())).total_seconds(), 3),
+                'panel_high_water_mark': new_marks['panel'].isoformat(),
+                'bot_high_water_mark': new_marks['bot'].isoformat(),
+                'panel_pull_disabled': self._delta_pull_disabled,
+            }
+            logger.info(
+                '🔁 Дельта-синхронизация RemnaWave завершена',
+                delta_size=self._last_delta_stats['delta_size'],
+                lag_seconds=self._last_delta_stats['lag_seconds'],
+            )
+            return {'started': True, 'success': True, 'stats': self._last_delta_stats}
+
     def _refresh_service(self) -> RemnaWaveService:
         self._service = self._service_factory()
         return self._service
@@ -1,11 +1,16 @@
+import asyncio
 import hashlib
 import json
+import uuid
+from collections.abc import Iterable, Mapping
 from dataclasses import dataclass
+from types import MappingProxyType
 from typing import Any, Optional, Union, get_args, get_origin
 
 import structlog
-from sqlalchemy import select
+from sqlalchemy import event, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
 from app.config import (
     ENV_OVERRIDE_KEYS,
@@ -21,10 +26,17 @@ from app.database.crud.system_setting import (
 from app.database.database import AsyncSessionLocal
 from app.database.models import SystemSetting
 from app.services.web_api_token_service import ensure_default_web_api_token
+from app.utils.cache import cache
 
 
 logger = structlog.get_logger(__name__)
 
+# Синхронизация изменений между репликами: версия в Redis + уведомление через pub/sub
+_CHANGES_CHANNEL = 'system_settings:changes'
+_VERSION_KEY = 'system_settings:version'
+_PENDING_KEY = 'system_settings_changed_keys'
+_INSTANCE_ID = uuid.uuid4().hex
+
 
 def _title_from_key(key: str) -> str:
     parts = key.split('_')
@@ -270,8 +282,18 @@ class BotConfigurationService:
         'ENABLE_NOTIFICATIONS': 'NOTIFICATIONS',
         'NOTIFICATION_RETRY_ATTEMPTS': 'NOTIFICATIONS',
         'NOTIFICATION_CACHE_HOURS': 'NOTIFICATIONS',
+        'TELEGRAM_SEND_RATE_PER_SECOND': 'NOTIFICATIONS',
+        'TELEGRAM_SEND_WORKERS': 'NOTIFICATIONS',
+        'TELEGRAM_SEND_CHAT_INTERVAL_SECONDS': 'NOTIFICATIONS',
+        'TELEGRAM_SEND_GROUP_INTERVAL_SECONDS': 'NOTIFICATIONS',
+        'TELEGRAM_SEND_FLOOD_RETRIES': 'NOTIFICATIONS',
+        'BROADCAST_CLAIM_BATCH_SIZE': 'NOTIFICATIONS',
+        'BROADCAST_CLAIM_LEASE_SECONDS': 'NOTIFICATIONS',
+        'BROADCAST_JOB_POLL_INTERVAL_SECONDS': 'NOTIFICATIONS',
         'MONITORING_LOGS_RETENTION_DAYS': 'MONITORING',
         'MONITORING_INTERVAL': 'MONITORING',
+        'MONITORING_MAX_CONCURRENT_JOBS': 'MONITORING',
+        'MONITORING_JOB_TIMEOUT_SECONDS': 'MONITORING',
         'TRAFFIC_MONITORING_ENABLED': 'MONITORING',
         'TRAFFIC_MONITORING_INTERVAL_HOURS': 'MONITORING',
         'TRAFFIC_MONITORED_NODES': 'MONITORING',
@@ -1008,7 +1030,11 @@ class BotConfigurationService:
 
     _definitions: dict[str, SettingDefinition] = {}
     _original_values: dict[str, Any] = settings.model_dump()
-    _overrides_raw: dict[str, str | None] = {}
+    # Неизменяемый снимок переопределений: изменения подменяют его целиком, чтение без блокировок
+    _overrides_raw: Mapping[str, str | None] = MappingProxyType({})
+    _snapshot_version: int = 0
+    _listener_task: asyncio.Task | None = None
+    _background_tasks: set[asyncio.Task] = set()
     _env_override_keys: set[str] = set(ENV_OVERRIDE_KEYS)
     _callback_tokens: dict[str, str] = {}
     _token_to_key: dict[str, str] = {}
@@ -1424,9 +1450,51 @@ class BotConfigurationService:
             if row.key in cls._definitions:
                 overrides[row.key] = row.value
 
-        for key, raw_value in overrides.items():
+        cls._apply_overrides(overrides, cls._definitions.keys() | cls._overrides_raw.keys())
+        await cls._sync_default_web_api_token()
+
+    @classmethod
+    async def reload(cls) -> None:
+        await cls.initialize()
+
+    @classmethod
+    async def reload_keys(cls, keys: Iterable[str]) -> None:
+        """Перечитывает из БД только указанные настройки (изменены другой репликой)."""
+        cls.initialize_definitions()
+        keys = {key for key in keys if key in cls._definitions}
+        if not keys:
+            return
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(SystemSetting).where(SystemSetting.key.in_(keys)))
+            rows = result.scalars().all()
+
+        cls._apply_overrides({row.key: row.value for row in rows}, keys)
+        if keys & {'WEB_API_DEFAULT_TOKEN', 'WEB_API_DEFAULT_TOKEN_NAME'}:
+            await cls._sync_default_web_api_token()
+
+    @classmethod
+    def _apply_overrides(cls, db_values: Mapping[str, str | None], keys: Iterable[str]) -> None:
+        """
+        Приводит настройки keys к значениям из БД (нет строки — исходное значение)
+        и подменяет снимок переопределений одним присваиванием.
+        """
+        overrides = dict(cls._overrides_raw)
+        for key in keys:
             if cls._is_env_override(key):
-                logger.debug('Пропускаем настройку из БД: используется значение из окружения', key=key)
+                if key in db_values:
+                    logger.debug('Пропускаем настройку из БД: используется значение из окружения', key=key)
+                overrides.pop(key, None)
+                continue
+
+            if key not in db_values:
+                if key in overrides:
+                    overrides.pop(key)
+                    cls._apply_to_settings(key, cls.get_original_value(key))
+                continue
+
+            raw_value = db_values[key]
+            if key in overrides and overrides[key] == raw_value:
                 continue
             try:
                 parsed_value = cls.deserialize_value(key, raw_value)
@@ -1434,15 +1502,114 @@ class BotConfigurationService:
                 logger.error('Не удалось применить настройку', key=key, error=error)
                 continue
 
-            cls._overrides_raw[key] = raw_value
+            overrides[key] = raw_value
             cls._apply_to_settings(key, parsed_value)
 
-        await cls._sync_default_web_api_token()
+        cls._overrides_raw = MappingProxyType(overrides)
 
     @classmethod
-    async def reload(cls) -> None:
-        cls._overrides_raw.clear()
-        await cls.initialize()
+    def _mark_changed(cls, db: AsyncSession, key: str) -> None:
+        """Запоминает изменённый ключ: другие реплики узнают о нём после commit."""
+        info = getattr(db, 'info', None)
+        if isinstance(info, dict):
+            info.setdefault(_PENDING_KEY, set()).add(key)
+
+    @classmethod
+    def publish_changes_soon(cls, keys: set[str]) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(cls.publish_changes(keys))
+        cls._background_tasks.add(task)
+        task.add_done_callback(cls._background_tasks.discard)
+
+    @classmethod
+    async def publish_changes(cls, keys: Iterable[str]) -> None:
+        if not cache._connected or cache.redis_client is None:
+            return
+        keys = sorted(keys)
+        try:
+            version = int(await cache.redis_client.incr(_VERSION_KEY))
+            message = json.dumps({'version': version, 'keys': keys, 'origin': _INSTANCE_ID})
+            await cache.redis_client.publish(_CHANGES_CHANNEL, message)
+        except Exception as error:
+            logger.warning('Не удалось разослать изменение настроек другим репликам', keys=keys, error=error)
+            return
+        if version == cls._snapshot_version + 1:
+            cls._snapshot_version = version
+
+    @classmethod
+    async def start_change_listener(cls) -> bool:
+        """Подписывает реплику на изменения настроек, сделанные другими репликами."""
+        if not cache._connected or cache.redis_client is None:
+            logger.info('Redis недоступен: изменения настроек других реплик применятся после перезапуска')
+            return False
+        if cls._listener_task is None or cls._listener_task.done():
+            cls._listener_task = asyncio.create_task(cls._listen_for_changes(), name='system-settings-listener')
+        return True
+
+    @classmethod
+    async def stop_change_listener(cls) -> None:
+        task, cls._listener_task = cls._listener_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    @classmethod
+    async def _listen_for_changes(cls) -> None:
+        while True:
+            pubsub = cache.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(_CHANGES_CHANNEL)
+                # Изменения, пропущенные до подписки (старт, обрыв связи), забираем полной перезагрузкой
+                stored_version = int(await cache.redis_client.get(_VERSION_KEY) or 0)
+                if stored_version != cls._snapshot_version:
+                    await cls.initialize()
+                    cls._snapshot_version = stored_version
+
+                while True:
+                    message = await pubsub.get_message(timeout=30.0)
+                    if message is not None:
+                        await cls._handle_change_message(message.get('data'))
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                logger.warning('Подписка на изменения настроек прервана, переподключение', error=error)
+                await asyncio.sleep(5)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    @classmethod
+    async def _handle_change_message(cls, data: Any) -> None:
+        try:
+            payload = json.loads(data)
+            version = int(payload['version'])
+            keys = list(payload.get('keys') or [])
+        except (TypeError, ValueError, KeyError) as error:
+            logger.warning('Некорректное уведомление об изменении настроек', error=error)
+            return
+
+        if version <= cls._snapshot_version:
+            return
+        if payload.get('origin') == _INSTANCE_ID and version == cls._snapshot_version + 1:
+            cls._snapshot_version = version
+            return
+
+        if version == cls._snapshot_version + 1:
+            await cls.reload_keys(keys)
+            logger.info('Применены изменения настроек другой реплики', keys=keys, version=version)
+        else:
+            # Пропущены уведомления — надёжнее перечитать всё
+            await cls.initialize()
+            logger.info('Настройки перезагружены целиком', version=version, previous=cls._snapshot_version)
+        cls._snapshot_version = version
 
     @classmethod
     def deserialize_value(cls, key: str, raw_value: str | None) -> Any:
@@ -1541,11 +1708,15 @@ class BotConfigurationService:
 
         raw_value = cls.serialize_value(key, value)
         await upsert_system_setting(db, key, raw_value)
+        cls._mark_changed(db, key)
+        overrides = dict(cls._overrides_raw)
         if cls._is_env_override(key):
             logger.info('Настройка сохранена в БД, но не применена: значение задаётся через окружение', key=key)
-            cls._overrides_raw.pop(key, None)
+            overrides.pop(key, None)
+            cls._overrides_raw = MappingProxyType(overrides)
         else:
-            cls._overrides_raw[key] = raw_value
+            overrides[key] = raw_value
+            cls._overrides_raw = MappingProxyType(overrides)
             cls._apply_to_settings(key, value)
 
         if key in {'WEB_API_DEFAULT_TOKEN', 'WEB_API_DEFAULT_TOKEN_NAME'}:
@@ -1563,7 +1734,8 @@ class BotConfigurationService:
             raise ReadOnlySettingError(f'Setting {key} is read-only')
 
         await delete_system_setting(db, key)
-        cls._overrides_raw.pop(key, None)
+        cls._mark_changed(db, key)
+        cls._overrides_raw = MappingProxyType({k: v for k, v in cls._overrides_raw.items() if k != key})
         if cls._is_env_override(key):
             logger.info('Настройка сброшена в БД, используется значение из окружения', key=key)
         else:
@@ -1656,4 +1828,16 @@ class BotConfigurationService:
         }
 
 
+@event.listens_for(Session, 'after_commit')
+def _publish_settings_after_commit(session):
+    keys = session.info.pop(_PENDING_KEY, None)
+    if keys:
+        BotConfigurationService.publish_changes_soon(keys)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_settings_after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
 bot_configuration_service = BotConfigurationService
@@ -0,0 +1,269 @@
+"""Общий планировщик исходящих сообщений Telegram.
+
+Рассылки, уведомления мониторинга и уведомления о превышении трафика
+отправляются через одну очередь, которую разбирает фиксированный пул воркеров:
+- глобальный token bucket (~30 сообщений/с на бота);
+- минимальный интервал между сообщениями в один чат (группы — реже);
+- при FloodWait (TelegramRetryAfter) пауза ставится для всех отправок сразу,
+  а сообщение повторяется после неё.
+Так отправители вместе выбирают лимит бота, но не превышают его.
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+import structlog
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+
+from app.config import settings
+
+
+logger = structlog.get_logger(__name__)
+
+# Когда таблица интервалов чатов разрастается, из неё выбрасываются уже свободные чаты
+_CHAT_TABLE_PRUNE_SIZE = 10000
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = max(rate, 0.001)
+        self.capacity = max(1.0, capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    def drain(self) -> None:
+        """Обнуляет запас токенов — после паузы FloodWait не отправляем всплеском."""
+        self._refill()
+        self._tokens = 0.0
+
+
+@dataclass(slots=True)
+class _SendJob:
+    chat_id: int
+    send: Callable[[], Awaitable[Any]]
+    future: asyncio.Future
+
+
+class TelegramSendScheduler:
+    def __init__(
+        self,
+        *,
+        rate: float | None = None,
+        workers: int | None = None,
+        chat_interval: float | None = None,
+        group_interval: float | None = None,
+        max_retries: int | None = None,
+    ):
+        self._rate = rate
+        self._workers_count = workers
+        self._chat_interval = chat_interval
+        self._group_interval = group_interval
+        self._max_retries = max_retries
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[_SendJob] | None = None
+        self._bucket: TokenBucket | None = None
+        self._workers: list[asyncio.Task] = []
+        self._chat_ready_at: dict[int, float] = {}
+        self._paused_until = 0.0
+
+        self.sent = 0
+        self.failed = 0
+        self.flood_waits = 0
+
+    @property
+    def workers_count(self) -> int:
+        return max(1, self._workers_count or settings.TELEGRAM_SEND_WORKERS)
+
+    def _chat_spacing(self, chat_id: int) -> float:
+        # Отрицательные id — группы и каналы: у них лимит ~20 сообщений в минуту
+        if chat_id < 0:
+            return (
+                self._group_interval
+                if self._group_interval is not None
+                else settings.TELEGRAM_SEND_GROUP_INTERVAL_SECONDS
+            )
+        return self._chat_interval if self._chat_interval is not None else settings.TELEGRAM_SEND_CHAT_INTERVAL_SECONDS
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._workers:
+            return
+
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.workers_count * 4)
+        self._bucket = TokenBucket(self._rate or settings.TELEGRAM_SEND_RATE_PER_SECOND)
+        self._chat_ready_at.clear()
+        self._paused_until = 0.0
+        self._workers = [
+            loop.create_task(self._worker(), name=f'telegram-send:{index}') for index in range(self.workers_count)
+        ]
+        logger.info('Планировщик отправки Telegram запущен', workers=self.workers_count, rate=self._bucket.rate)
+
+    async def submit(self, chat_id: int, send: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """
+        Ставит отправку в очередь и возвращает future с её результатом.
+
+        Ждёт, если очередь заполнена, — это естественное ограничение для больших рассылок.
+        """
+        self._ensure_started()
+        future = self._loop.create_future()
+        await self._queue.put(_SendJob(chat_id, send, future))
+        return future
+
+    async def send(self, chat_id: int, send: Callable[[], Awaitable[Any]]) -> Any:
+        """Отправляет через общую очередь и возвращает результат (или пробрасывает ошибку Telegram)."""
+        return await (await self.submit(chat_id, send))
+
+    async def deliver(
+        self,
+        chat_ids: Iterable[int],
+        make_send: Callable[[int], Callable[[], Awaitable[Any]]],
+        *,
+        window: int | None = None,
+    ) -> AsyncIterator[tuple[int, BaseException | None]]:
+        """
+        Отправляет в каждый чат и отдаёт (chat_id, ошибка или None) по мере завершения.
+
+        В полёте держится не больше window отправок; при выходе из цикла
+        (например, отмена рассылки) ещё не отправленные сообщения снимаются с очереди.
+        """
+        window = window or self.workers_count * 2
+        pending: dict[asyncio.Future, int] = {}
+
+        try:
+            for chat_id in chat_ids:
+                future = await self.submit(chat_id, make_send(chat_id))
+                pending[future] = chat_id
+                if len(pending) < window:
+                    continue
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.exception()
+
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.exception()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def pause(self, seconds: float) -> None:
+        """Глобальная пауза всех отправок (FloodWait)."""
+        until = time.monotonic() + seconds
+        if until > self._paused_until:
+            self._paused_until = until
+            if self._bucket:
+                self._bucket.drain()
+
+    async def _wait_for_pause(self) -> None:
+        while (delay := self._paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+    async def _wait_for_chat(self, chat_id: int) -> None:
+        now = time.monotonic()
+        ready_at = max(now, self._chat_ready_at.get(chat_id, 0.0))
+        # Слот резервируется сразу: второе сообщение в тот же чат встанет за первым
+        self._chat_ready_at[chat_id] = ready_at + self._chat_spacing(chat_id)
+
+        if len(self._chat_ready_at) > _CHAT_TABLE_PRUNE_SIZE:
+            self._chat_ready_at = {chat: ready for chat, ready in self._chat_ready_at.items() if ready > now}
+
+        if ready_at > now:
+            await asyncio.sleep(ready_at - now)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                if not job.future.done():
+                    await self._run_job(job)
+            except asyncio.CancelledError:
+                job.future.cancel()
+                raise
+            except Exception as error:  # pragma: no cover - страховка, чтобы воркер не умирал
+                logger.error('Ошибка воркера отправки Telegram', chat_id=job.chat_id, error=error)
+                if not job.future.done():
+                    job.future.set_exception(error)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job: _SendJob) -> None:
+        max_retries = self._max_retries if self._max_retries is not None else settings.TELEGRAM_SEND_FLOOD_RETRIES
+        await self._wait_for_chat(job.chat_id)
+
+        for attempt in range(max_retries + 1):
+            await self._wait_for_pause()
+            await self._bucket.acquire()
+            # Пока ждали токен, кто-то мог получить FloodWait
+            await self._wait_for_pause()
+            if job.future.done():
+                return
+
+            try:
+                result = await job.send()
+            except TelegramRetryAfter as error:
+                self.flood_waits += 1
+                self.pause(error.retry_after + 1)
+                logger.warning(
+                    'FloodWait: пауза всех отправок',
+                    retry_after=error.retry_after,
+                    chat_id=job.chat_id,
+                    attempt=attempt + 1,
+                )
+                last_error: BaseException = error
+            except (TelegramNetworkError, TelegramServerError) as error:
+                last_error = error
+                await asyncio.sleep(0.5 * (attempt + 1))
+            except Exception as error:
+                self.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(error)
+                return
+            else:
+                self.sent += 1
+                if not job.future.done():
+                    job.future.set_result(result)
+                return
+
+        self.failed += 1
+        if not job.future.done():
+            job.future.set_exception(last_error)
+
+    async def close(self) -> None:
+        workers, self._workers = self._workers, []
+        for task in workers:
+            task.cancel()
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            'workers': len(self._workers),
+            'queued': self._queue.qsize() if self._queue else 0,
+            'paused_for': round(max(0.0, self._paused_until - time.monotonic()), 1),
+            'sent': self.sent,
+            'failed': self.failed,
+            'flood_waits': self.flood_waits,
+        }
+
+
+telegram_send_scheduler = TelegramSendScheduler()
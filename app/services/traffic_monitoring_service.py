@@ -4,6 +4,7 @@
 """
 
 import asyncio
+from collections import defaultdict
 from dataclasses import dataclass
 from datetime import UTC, datetime, time, timedelta
 
@@ -13,15 +14,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
 from app.database.crud.user import get_user_by_remnawave_uuid
 from app.database.database import AsyncSessionLocal
+from app.external.remnawave_api import RemnaWaveAPIError
 from app.services.admin_notification_service import AdminNotificationService
 from app.services.remnawave_service import RemnaWaveService
 from app.utils.cache import cache, cache_key
+from app.utils.traffic_snapshot import TrafficSnapshot, UuidIndex
 
 
 logger = structlog.get_logger(__name__)
 
-# Ключи для хранения snapshot в Redis
-TRAFFIC_SNAPSHOT_KEY = 'traffic:snapshot'
+# Ключи для хранения snapshot в Redis: индекс uuid (строки через '\n') и упакованные int64
+TRAFFIC_SNAPSHOT_INDEX_KEY = 'traffic:snapshot:index'
+TRAFFIC_SNAPSHOT_VALUES_KEY = 'traffic:snapshot:values'
 TRAFFIC_SNAPSHOT_TIME_KEY = 'traffic:snapshot:time'
 TRAFFIC_NOTIFICATION_CACHE_KEY = 'traffic:notifications'
 
@@ -56,8 +60,10 @@ class TrafficMonitoringServiceV2:
         self.remnawave_service = RemnaWaveService()
         self._nodes_cache: dict[str, str] = {}  # {node_uuid: node_name}
         # Fallback на память если Redis недоступен
-        self._memory_snapshot: dict[str, float] = {}
+        self._memory_snapshot: TrafficSnapshot | None = None
         self._memory_snapshot_time: datetime | None = None
+        # Последний записанный/прочитанный индекс uuid — переиспользуется, пока Redis с ним согласован
+        self._snapshot_index: UuidIndex | None = None
         self._memory_notification_cache: dict[str, datetime] = {}
 
     # ============== Настройки ==============
@@ -111,15 +117,36 @@ class TrafficMonitoringServiceV2:
 
     # ============== Redis операции для snapshot ==============
 
-    async def _save_snapshot_to_redis(self, snapshot: dict[str, float]) -> bool:
-        """Сохраняет snapshot трафика в Redis"""
+    async def _save_snapshot_index(self, index: UuidIndex, ttl: int) -> bool:
+        """Дописывает в Redis новые uuid индекса; при рассогласовании переписывает индекс целиком"""
+        if (
+            0 < index.persisted <= len(index)
+            and await cache.strlen(TRAFFIC_SNAPSHOT_INDEX_KEY) == index.persisted_bytes
+        ):
+            tail = index.encode(index.persisted)
+            if await cache.append_bytes(TRAFFIC_SNAPSHOT_INDEX_KEY, tail, expire=ttl):
+                index.persisted = len(index)
+                index.persisted_bytes += len(tail)
+                return True
+
+        blob = index.encode()
+        if not await cache.set_bytes(TRAFFIC_SNAPSHOT_INDEX_KEY, blob, expire=ttl):
+            return False
+        index.persisted = len(index)
+        index.persisted_bytes = len(blob)
+        return True
+
+    async def _save_snapshot_to_redis(self, snapshot: TrafficSnapshot) -> bool:
+        """Сохраняет snapshot трафика в Redis (индекс uuid + бинарный блоб значений)"""
         try:
-            # Сохраняем snapshot как JSON
-            snapshot_data = {uuid: bytes_val for uuid, bytes_val in snapshot.items()}
             ttl = self.get_snapshot_ttl_seconds()
+            index = snapshot.index
 
-            success = await cache.set(TRAFFIC_SNAPSHOT_KEY, snapshot_data, expire=ttl)
+            success = await self._save_snapshot_index(index, ttl) and await cache.set_bytes(
+                TRAFFIC_SNAPSHOT_VALUES_KEY, snapshot.pack_values(), expire=ttl
+            )
             if success:
+                self._snapshot_index = index
                 # Сохраняем время создания snapshot
                 await cache.set(TRAFFIC_SNAPSHOT_TIME_KEY, datetime.now(UTC).isoformat(), expire=ttl)
                 logger.info(
@@ -128,23 +155,36 @@ class TrafficMonitoringServiceV2:
                     value=ttl // 3600,
                 )
             else:
+                index.persisted = index.persisted_bytes = 0
                 logger.warning('⚠️ Не удалось сохранить snapshot в Redis')
             return success
         except Exception as e:
             logger.error('❌ Ошибка сохранения snapshot в Redis', error=e)
             return False
 
-    async def _load_snapshot_from_redis(self) -> dict[str, float] | None:
+    async def _load_snapshot_from_redis(self) -> TrafficSnapshot | None:
         """Загружает snapshot трафика из Redis"""
         try:
-            snapshot_data = await cache.get(TRAFFIC_SNAPSHOT_KEY)
-            # ВАЖНО: пустой словарь {} - это валидный snapshot!
-            if snapshot_data is not None and isinstance(snapshot_data, dict):
-                # Конвертируем обратно в float
-                result = {uuid: float(bytes_val) for uuid, bytes_val in snapshot_data.items()}
-                logger.debug('📦 Snapshot загружен из Redis: пользователей', result_count=len(result))
-                return result
-            return None
+            values_blob = await cache.get_bytes(TRAFFIC_SNAPSHOT_VALUES_KEY)
+            # ВАЖНО: пустой snapshot (b'') - это валидный snapshot!
+            if values_blob is None:
+                return None
+
+            index = self._snapshot_index
+            if index is None or await cache.strlen(TRAFFIC_SNAPSHOT_INDEX_KEY) != index.persisted_bytes:
+                index_blob = await cache.get_bytes(TRAFFIC_SNAPSHOT_INDEX_KEY)
+                if index_blob is None:
+                    return None
+                index = UuidIndex.decode(index_blob)
+
+            snapshot = TrafficSnapshot.unpack(index, values_blob)
+            if snapshot is None:
+                logger.warning('⚠️ Snapshot в Redis рассогласован с индексом, игнорируем')
+                return None
+
+            self._snapshot_index = index
+            logger.debug('📦 Snapshot загружен из Redis: пользователей', result_count=len(snapshot))
+            return snapshot
         except Exception as e:
             logger.error('❌ Ошибка загрузки snapshot из Redis', error=e)
             return None
@@ -300,9 +340,8 @@ class TrafficMonitoringServiceV2:
 
     async def has_snapshot(self) -> bool:
         """Проверяет, есть ли сохранённый snapshot (Redis + fallback на память)"""
-        # Проверяем Redis (пустой словарь {} - это тоже валидный snapshot!)
-        snapshot = await self._load_snapshot_from_redis()
-        if snapshot is not None:
+        # Проверяем Redis без загрузки самого snapshot (пустой snapshot - тоже валидный!)
+        if await cache.exists(TRAFFIC_SNAPSHOT_VALUES_KEY):
             return True
 
         # Fallback на память
@@ -321,40 +360,61 @@ class TrafficMonitoringServiceV2:
             return float('inf')
         return (datetime.now(UTC) - snapshot_time).total_seconds() / 60
 
-    async def _get_current_snapshot(self) -> dict[str, float]:
+    async def _get_current_snapshot(self) -> TrafficSnapshot:
         """Получает текущий snapshot (Redis + fallback на память)"""
         # Пробуем Redis
         snapshot = await self._load_snapshot_from_redis()
-        if snapshot:
+        if snapshot is not None:
             return snapshot
 
         # Fallback на память
-        return self._memory_snapshot.copy()
+        return self._memory_snapshot or TrafficSnapshot()
 
-    async def _save_snapshot(self, snapshot: dict[str, float]) -> bool:
+    async def _save_snapshot(self, snapshot: TrafficSnapshot) -> bool:
         """Сохраняет snapshot (Redis + fallback на память)"""
+        if snapshot.needs_compaction():
+            snapshot = snapshot.compacted()
+
         # Пробуем Redis
         saved = await self._save_snapshot_to_redis(snapshot)
 
         if saved:
             # Очищаем память если Redis доступен
-            self._memory_snapshot.clear()
+            self._memory_snapshot = None
             self._memory_snapshot_time = None
             return True
 
-        # Fallback на память
-        self._memory_snapshot = snapshot.copy()
+        # Fallback на память (snapshot после сохранения не изменяется)
+        self._memory_snapshot = snapshot
         self._memory_snapshot_time = datetime.now(UTC)
         logger.warning('⚠️ Redis недоступен, snapshot сохранён в память')
         return True
 
+    def _build_snapshot(self, users: list, previous: TrafficSnapshot | None = None) -> TrafficSnapshot:
+        """Собирает snapshot использованного трафика; позиции берутся из индекса предыдущего snapshot"""
+        snapshot = previous.successor() if previous is not None else TrafficSnapshot()
+        for user in users:
+            try:
+                if not user.uuid:
+                    continue
+
+                user_traffic = user.user_traffic
+                if not user_traffic:
+                    continue
+
+                snapshot.set(user.uuid, int(user_traffic.used_traffic_bytes or 0))
+
+            except Exception as e:
+                logger.error('❌ Ошибка при создании snapshot для', uuid=user.uuid, error=e)
+        return snapshot
+
     async def create_initial_snapshot(self) -> int:
         """
         Создаёт начальный snapshot при запуске бота.
         Если в Redis уже есть snapshot — использует его (персистентность).
         Возвращает количество пользователей в snapshot.
         """
-        # Проверяем есть ли snapshot в Redis (пустой {} тоже валидный snapshot!)
+        # Проверяем есть ли snapshot в Redis (пустой тоже валидный snapshot!)
         existing_snapshot = await self._load_snapshot_from_redis()
         if existing_snapshot is not None:
             age = await self.get_snapshot_age_minutes()
@@ -369,22 +429,7 @@ class TrafficMonitoringServiceV2:
         start_time = datetime.now(UTC)
 
         users = await self.get_all_users_with_traffic()
-        new_snapshot: dict[str, float] = {}
-
-        for user in users:
-            try:
-                if not user.uuid:
-                    continue
-
-                user_traffic = user.user_traffic
-                if not user_traffic:
-                    continue
-
-                current_bytes = user_traffic.used_traffic_bytes or 0
-                new_snapshot[user.uuid] = current_bytes
-
-            except Exception as e:
-                logger.error('❌ Ошибка при создании snapshot для', uuid=user.uuid, error=e)
+        new_snapshot = self._build_snapshot(users)
 
         # Сохраняем в Redis (с fallback на память)
         await self._save_snapshot(new_snapshot)
@@ -440,10 +485,9 @@ class TrafficMonitoringServiceV2:
             )
 
         violations: list[TrafficViolation] = []
-        threshold_bytes = self.get_fast_check_threshold_gb() * (1024**3)
+        threshold_bytes = int(self.get_fast_check_threshold_gb() * (1024**3))
 
         users = await self.get_all_users_with_traffic()
-        new_snapshot: dict[str, float] = {}
 
         # Загружаем предыдущий snapshot (из Redis или памяти)
         previous_snapshot = await self._get_current_snapshot()
@@ -453,49 +497,30 @@ class TrafficMonitoringServiceV2:
             is_first_run=is_first_run,
         )
 
+        # Новый snapshot на том же индексе uuid — дельты считаются поэлементно по позициям
+        new_snapshot = self._build_snapshot(users, previous_snapshot)
+
         users_with_delta = 0
+        # Первый запуск — только сохраняем, не проверяем
+        exceeding: dict[str, int] = {}
+        if not is_first_run:
+            users_with_delta, exceeding_deltas = new_snapshot.delta_report(previous_snapshot, threshold_bytes)
+            exceeding = dict(exceeding_deltas)
 
-        for user in users:
-            try:
-                if not user.uuid:
-                    continue
+        # Материализуем только пользователей с превышением дельты
+        candidates = [user for user in users if user.uuid in exceeding] if exceeding else []
 
-                # Получаем трафик из user_traffic
+        for user in candidates:
+            delta_bytes = exceeding[user.uuid]
+            try:
                 user_traffic = user.user_traffic
-                if not user_traffic:
-                    continue
-
-                current_bytes = user_traffic.used_traffic_bytes or 0
-                new_snapshot[user.uuid] = current_bytes
-
-                # Первый запуск — только сохраняем, не проверяем
-                if is_first_run:
-                    continue
-
-                # Пользователя не было в предыдущем snapshot — пропускаем (новый пользователь)
-                if user.uuid not in previous_snapshot:
-                    logger.debug('Пользователь не найден в предыдущем snapshot, пропускаем', uuid=user.uuid[:8])
-                    continue
-
-                # Получаем предыдущее значение
-                previous_bytes = previous_snapshot.get(user.uuid, 0)
-
-                # Вычисляем дельту (может быть отрицательной при сбросе трафика)
-                delta_bytes = current_bytes - previous_bytes
-                if delta_bytes <= 0:
-                    continue  # Трафик сбросился или не изменился
-
-                users_with_delta += 1
-                delta_gb = delta_bytes / (1024**3)
-
-                # Проверяем превышение дельты
-                if delta_bytes < threshold_bytes:
-                    continue
+                current_bytes = new_snapshot.get(user.uuid) or 0
+                previous_bytes = previous_snapshot.get(user.uuid) or 0
 
                 logger.info(
                     '⚠️ Превышение дельты: ... + ГБ (порог ГБ, previous= ГБ, current= ГБ)',
                     uuid=user.uuid[:8],
-                    delta_gb=round(delta_gb, 2),
+                    delta_gb=round(delta_bytes / (1024**3), 2),
                     get_fast_check_threshold_gb=self.get_fast_check_threshold_gb(),
                     previous_bytes=round(previous_bytes / 1024**3, 2),
                     current_bytes=round(current_bytes / 1024**3, 2),
@@ -567,7 +592,8 @@ class TrafficMonitoringServiceV2:
     async def run_daily_check(self, bot) -> list[TrafficViolation]:
         """
         Суточная проверка трафика за последние 24 часа
-        Использует bandwidth-stats API
+        Трафик берётся из статистики нод (O(нод) запросов) и суммируется в памяти;
+        по одному пользователю — только если панель не отдаёт статистику по нодам
         """
         if not self.is_daily_check_enabled():
             return []
@@ -578,7 +604,6 @@ class TrafficMonitoringServiceV2:
         # Загружаем кеш нод для красивых названий в уведомлениях
         await self._load_nodes_cache()
 
-        violations: list[TrafficViolation] = []
         threshold_bytes = self.get_daily_threshold_gb() * (1024**3)
 
         # Получаем период за последние 24 часа
@@ -586,18 +611,110 @@ class TrafficMonitoringServiceV2:
         start_date = (now - timedelta(hours=24)).strftime('%Y-%m-%d')
         end_date = now.strftime('%Y-%m-%d')
 
+        try:
+            async with self.remnawave_service.get_api_client() as api:
+                usage = await self._collect_daily_usage_by_nodes(api, start_date, end_date)
+                if usage is None:
+                    logger.warning('⚠️ Панель не отдаёт статистику пользователей по нодам, проверяем по одному')
+                    violations, checked_count = await self._run_daily_check_per_user(
+                        api, start_date, end_date, threshold_bytes
+                    )
+                else:
+                    violations = await self._materialize_daily_violations(api, usage, threshold_bytes)
+                    checked_count = len(usage)
+        except Exception as e:
+            logger.error('❌ Ошибка суточной проверки трафика', error=e)
+            return []
+
+        elapsed = (datetime.now(UTC) - start_time).total_seconds()
+        logger.info(
+            '✅ Суточная проверка завершена за с: пользователей, превышений',
+            elapsed=round(elapsed, 1),
+            users_count=checked_count,
+            violations_count=len(violations),
+        )
+
+        # Отправляем уведомления
+        await self._send_violation_notifications(violations, bot)
+
+        return violations
+
+    async def _collect_daily_usage_by_nodes(self, api, start_date: str, end_date: str) -> dict[str, int] | None:
+        """
+        Суммирует трафик пользователей по всем нодам: {user_uuid: bytes}.
+        Возвращает None, если панель не поддерживает статистику пользователей по нодам.
+        """
+        nodes = await api.get_all_nodes()
+        semaphore = asyncio.Semaphore(self.get_concurrency())
+
+        async def fetch_node_users(node):
+            async with semaphore:
+                try:
+                    return await api.get_bandwidth_stats_node_users_legacy(node.uuid, start_date, end_date)
+                except RemnaWaveAPIError as e:
+                    if e.status_code in (404, 405):
+                        raise
+                    logger.warning('⚠️ Не удалось получить трафик ноды, пропускаем', node_uuid=node.uuid, error=e)
+                except Exception as e:
+                    logger.warning('⚠️ Не удалось получить трафик ноды, пропускаем', node_uuid=node.uuid, error=e)
+                return None
+
+        try:
+            results = await asyncio.gather(*(fetch_node_users(node) for node in nodes))
+        except RemnaWaveAPIError:
+            # 404/405 — панель не поддерживает статистику пользователей по нодам
+            return None
+
+        # Ответ: [{userUuid, nodeUuid, total, date}, ...] — по записи на пользователя, ноду и день
+        usage: dict[str, int] = defaultdict(int)
+        for entries in results:
+            if entries is None:
+                continue
+            if not isinstance(entries, list):
+                return None
+            for entry in entries:
+                user_uuid = entry.get('userUuid')
+                total = int(entry.get('total') or 0)
+                if user_uuid and total > 0:
+                    usage[user_uuid] += total
+
+        logger.debug('📊 Трафик собран по нодам', nodes_count=len(nodes), users_count=len(usage))
+        return usage
+
+    async def _materialize_daily_violations(
+        self, api, usage: dict[str, int], threshold_bytes: float
+    ) -> list[TrafficViolation]:
+        """Загружает из панели только пользователей с превышением порога"""
+        semaphore = asyncio.Semaphore(self.get_concurrency())
+
+        async def build_violation(user_uuid: str, total_bytes: int) -> TrafficViolation | None:
+            async with semaphore:
+                try:
+                    user = await api.get_user_by_uuid(user_uuid)
+                except Exception as e:
+                    logger.error('❌ Ошибка суточной проверки для', uuid=user_uuid, error=e)
+                    return None
+            if not user:
+                return None
+            return self._build_daily_violation(user, total_bytes)
+
+        results = await asyncio.gather(
+            *(build_violation(user_uuid, total) for user_uuid, total in usage.items() if total >= threshold_bytes)
+        )
+        return [violation for violation in results if violation]
+
+    async def _run_daily_check_per_user(
+        self, api, start_date: str, end_date: str, threshold_bytes: float
+    ) -> tuple[list[TrafficViolation], int]:
+        """Fallback: статистика за период отдельным запросом на каждого пользователя"""
         users = await self.get_all_users_with_traffic()
         semaphore = asyncio.Semaphore(self.get_concurrency())
 
         async def check_user_daily_traffic(user) -> TrafficViolation | None:
             async with semaphore:
                 try:
-                    if not user.uuid:
-                        return None
-
                     # Получаем статистику за период
-                    async with self.remnawave_service.get_api_client() as api:
-                        stats = await api.get_bandwidth_stats_user(user.uuid, start_date, end_date)
+                    stats = await api.get_bandwidth_stats_user(user.uuid, start_date, end_date)
 
                     if not stats:
                         return None
@@ -613,25 +730,7 @@ class TrafficMonitoringServiceV2:
                     if total_bytes < threshold_bytes:
                         return None
 
-                    # Проверяем фильтр по нодам
-                    user_traffic = user.user_traffic
-                    last_node_uuid = user_traffic.last_connected_node_uuid if user_traffic else None
-                    if not self.should_monitor_node(last_node_uuid):
-                        return None
-
-                    used_gb = round(total_bytes / (1024**3), 2)
-                    node_name = self.get_node_name(last_node_uuid)
-                    return TrafficViolation(
-                        user_uuid=user.uuid,
-                        telegram_id=user.telegram_id,
-                        full_name=user.username,
-                        username=None,
-                        used_traffic_gb=used_gb,
-                        threshold_gb=self.get_daily_threshold_gb(),
-                        last_node_uuid=last_node_uuid,
-                        last_node_name=node_name,
-                        check_type='daily',
-                    )
+                    return self._build_daily_violation(user, total_bytes)
 
                 except Exception as e:
                     logger.error('❌ Ошибка суточной проверки для', uuid=user.uuid, error=e)
@@ -641,22 +740,29 @@ class TrafficMonitoringServiceV2:
         tasks = [check_user_daily_traffic(user) for user in users if user.uuid]
         results = await asyncio.gather(*tasks, return_exceptions=True)
 
-        for result in results:
-            if isinstance(result, TrafficViolation):
-                violations.append(result)
+        violations = [result for result in results if isinstance(result, TrafficViolation)]
+        return violations, len(users)
 
-        elapsed = (datetime.now(UTC) - start_time).total_seconds()
-        logger.info(
-            '✅ Суточная проверка завершена за с: пользователей, превышений',
-            elapsed=round(elapsed, 1),
-            users_count=len(users),
-            violations_count=len(violations),
-        )
-
-        # Отправляем уведомления
-        await self._send_violation_notifications(violations, bot)
+    def _build_daily_violation(self, user, total_bytes: int) -> TrafficViolation | None:
+        # Проверяем фильтр по нодам
+        user_traffic = user.user_traffic
+        last_node_uuid = user_traffic.last_connected_node_uuid if user_traffic else None
+        if not self.should_monitor_node(last_node_uuid):
+            return None
 
-        return violations
+        used_gb = round(total_bytes / (1024**3), 2)
+        node_name = self.get_node_name(last_node_uuid)
+        return TrafficViolation(
+            user_uuid=user.uuid,
+            telegram_id=user.telegram_id,
+            full_name=user.username,
+            username=None,
+            used_traffic_gb=used_gb,
+            threshold_gb=self.get_daily_threshold_gb(),
+            last_node_uuid=last_node_uuid,
+            last_node_name=node_name,
+            check_type='daily',
+        )
 
     # ============== Уведомления ==============
 
@@ -678,7 +784,7 @@ class TrafficMonitoringServiceV2:
             )
             violations = violations[:max_notifications]
 
-        for i, violation in enumerate(violations):
+        for violation in violations:
             try:
                 if not await self.should_send_notification(violation.user_uuid):
                     logger.info(
@@ -738,10 +844,6 @@ class TrafficMonitoringServiceV2:
 
                 logger.info('📨 Уведомление отправлено для', user_uuid=violation.user_uuid)
 
-                # Задержка между отправками (защита от flood)
-                if i < len(violations) - 1:
-                    await asyncio.sleep(0.5)
-
             except Exception as e:
                 logger.error('❌ Ошибка отправки уведомления для', user_uuid=violation.user_uuid, error=e)
 
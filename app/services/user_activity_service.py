@@ -0,0 +1,219 @@
+"""Write-behind трекер активности и профиля пользователей.
+
+AuthMiddleware раньше делал UPDATE строки users на каждый апдейт ради last_activity.
+Теперь изменения копятся в памяти процесса (последнее значение на пользователя)
+и раз в USER_ACTIVITY_FLUSH_INTERVAL_SECONDS сбрасываются пачкой:
+один UPDATE ... FROM (VALUES ...) на чанк для PostgreSQL, executemany для SQLite.
+При корректной остановке выполняется финальный flush.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+import structlog
+from sqlalchemy import DateTime, Integer, String, bindparam, column, update, values
+
+from app.config import settings
+from app.database.database import IS_SQLITE, AsyncSessionLocal
+from app.database.models import User
+
+
+logger = structlog.get_logger(__name__)
+
+FLUSH_CHUNK_SIZE = 1000
+
+# Core-таблица: ORM-синхронизация сессии для bulk UPDATE здесь не нужна
+users_table = User.__table__
+
+
+@dataclass(slots=True)
+class PendingProfile:
+    username: str | None
+    first_name: str | None
+    last_name: str | None
+    changed_at: datetime
+
+
+class UserActivityTracker:
+    """Копит last_activity и изменения профиля, сбрасывает их в БД фоновой задачей."""
+
+    def __init__(self):
+        self._activity: dict[int, datetime] = {}
+        self._profiles: dict[int, PendingProfile] = {}
+        self._task: asyncio.Task | None = None
+        self._running = False
+        self._flush_lock = asyncio.Lock()
+        self._last_flush_at: datetime | None = None
+        self._last_flush_rows = 0
+
+    @property
+    def flush_interval(self) -> float:
+        return max(1.0, float(settings.USER_ACTIVITY_FLUSH_INTERVAL_SECONDS))
+
+    def is_running(self) -> bool:
+        return self._running and self._task is not None and not self._task.done()
+
+    def touch(self, user_id: int, at: datetime | None = None) -> None:
+        self._activity[user_id] = at or datetime.now(UTC)
+
+    def record_profile(
+        self,
+        user_id: int,
+        username: str | None,
+        first_name: str | None,
+        last_name: str | None,
+    ) -> None:
+        self._profiles[user_id] = PendingProfile(username, first_name, last_name, datetime.now(UTC))
+
+    def get_pending_profile(self, user_id: int) -> PendingProfile | None:
+        """Ещё не записанный профиль — чтобы не считать его изменением повторно до flush."""
+        return self._profiles.get(user_id)
+
+    def pending_count(self) -> int:
+        return len(self._activity.keys() | self._profiles.keys())
+
+    async def start(self) -> None:
+        if self.is_running():
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._flush_loop())
+        logger.info('Трекер активности пользователей запущен', flush_interval=self.flush_interval)
+
+    async def stop(self) -> None:
+        self._running = False
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        flushed = await self.flush()
+        logger.info('Трекер активности пользователей остановлен, финальный flush', flushed=flushed)
+
+    async def _flush_loop(self) -> None:
+        while self._running:
+            try:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                logger.error('Ошибка flush активности пользователей', error=error)
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            activity, self._activity = self._activity, {}
+            profiles, self._profiles = self._profiles, {}
+            if not activity and not profiles:
+                return 0
+
+            try:
+                async with AsyncSessionLocal() as db:
+                    for chunk in _chunks(list(activity.items())):
+                        await db.execute(*_activity_statement(chunk))
+                    for chunk in _chunks(list(profiles.items())):
+                        await db.execute(*_profile_statement(chunk))
+                    await db.commit()
+            except Exception:
+                # Возвращаем несохранённое, не затирая более свежие значения
+                for user_id, at in activity.items():
+                    self._activity.setdefault(user_id, at)
+                for user_id, profile in profiles.items():
+                    self._profiles.setdefault(user_id, profile)
+                raise
+
+            self._last_flush_at = datetime.now(UTC)
+            self._last_flush_rows = len(activity.keys() | profiles.keys())
+            logger.debug('Активность пользователей записана', activity=len(activity), profiles=len(profiles))
+            return self._last_flush_rows
+
+    def get_status(self) -> dict:
+        return {
+            'running': self.is_running(),
+            'pending': self.pending_count(),
+            'flush_interval': self.flush_interval,
+            'last_flush_at': self._last_flush_at.isoformat() if self._last_flush_at else None,
+            'last_flush_rows': self._last_flush_rows,
+        }
+
+
+def _chunks(items: list, size: int = FLUSH_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _activity_statement(chunk: list[tuple[int, datetime]]) -> tuple:
+    if IS_SQLITE:
+        stmt = (
+            update(users_table)
+            .where(users_table.c.id == bindparam('b_id'))
+            .values(last_activity=bindparam('b_last_activity'), updated_at=users_table.c.updated_at)
+        )
+        return stmt, [{'b_id': user_id, 'b_last_activity': at} for user_id, at in chunk]
+
+    rows = values(
+        column('id', Integer),
+        column('last_activity', DateTime(timezone=True)),
+        name='v',
+    ).data(chunk)
+    # updated_at присваиваем самому себе, чтобы onupdate не считал активность изменением профиля
+    stmt = (
+        update(users_table)
+        .where(users_table.c.id == rows.c.id)
+        .values(last_activity=rows.c.last_activity, updated_at=users_table.c.updated_at)
+    )
+    return (stmt,)
+
+
+def _profile_statement(chunk: list[tuple[int, PendingProfile]]) -> tuple:
+    if IS_SQLITE:
+        stmt = (
+            update(users_table)
+            .where(users_table.c.id == bindparam('b_id'))
+            .values(
+                username=bindparam('b_username'),
+                first_name=bindparam('b_first_name'),
+                last_name=bindparam('b_last_name'),
+                updated_at=bindparam('b_updated_at'),
+            )
+        )
+        return stmt, [
+            {
+                'b_id': user_id,
+                'b_username': profile.username,
+                'b_first_name': profile.first_name,
+                'b_last_name': profile.last_name,
+                'b_updated_at': profile.changed_at,
+            }
+            for user_id, profile in chunk
+        ]
+
+    rows = values(
+        column('id', Integer),
+        column('username', String),
+        column('first_name', String),
+        column('last_name', String),
+        column('updated_at', DateTime(timezone=True)),
+        name='v',
+    ).data(
+        [
+            (user_id, profile.username, profile.first_name, profile.last_name, profile.changed_at)
+            for user_id, profile in chunk
+        ]
+    )
+    stmt = (
+        update(users_table)
+        .where(users_table.c.id == rows.c.id)
+        .values(
+            username=rows.c.username,
+            first_name=rows.c.first_name,
+            last_name=rows.c.last_name,
+            updated_at=rows.c.updated_at,
+        )
+    )
+    return (stmt,)
+
+
+user_activity_tracker = UserActivityTracker()
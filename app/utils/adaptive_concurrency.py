@@ -0,0 +1,105 @@
+"""AIMD-регулятор параллелизма запросов к внешнему API.
+
+Фиксированный семафор либо недогружает сильную панель, либо перегружает слабую.
+Регулятор ведёт себя как TCP congestion control:
+- успешный быстрый ответ — аддитивный рост лимита (+1 за «окно» ответов);
+- 429 / 5xx / таймаут — мультипликативное снижение вдвое;
+- ответ медленнее целевой задержки — мягкое снижение.
+Снижения не чаще одного раза за cooldown, чтобы пачка ошибок от одной волны
+запросов не обрушила лимит до минимума.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+
+class AIMDConcurrencyController:
+    def __init__(
+        self,
+        *,
+        initial: int = 5,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        latency_target: float = 1.0,
+        decrease_factor: float = 0.5,
+        slow_decrease_factor: float = 0.9,
+        cooldown: float | None = None,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.slow_decrease_factor = slow_decrease_factor
+        self.cooldown = latency_target if cooldown is None else cooldown
+
+        self._in_flight = 0
+        self._condition = asyncio.Condition()
+        self._last_decrease_at = 0.0
+
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.peak_limit = self.limit
+
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def record(self, latency: float, error: BaseException | None = None) -> None:
+        """Учитывает результат запроса и пересчитывает лимит."""
+        self.requests += 1
+
+        if error is not None and is_congestion_error(error):
+            self.errors += 1
+            if getattr(error, 'status_code', None) == 429:
+                self.throttled += 1
+            self._decrease(self.decrease_factor)
+        elif latency > self.latency_target:
+            self._decrease(self.slow_decrease_factor)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.peak_limit = max(self.peak_limit, self.limit)
+
+    def _decrease(self, factor: float) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease_at < self.cooldown:
+            return
+        self._last_decrease_at = now
+        self.limit = max(self.min_limit, self.limit * factor)
+
+    def get_stats(self) -> dict[str, float | int]:
+        return {
+            'limit': self.current_limit,
+            'peak_limit': int(self.peak_limit),
+            'requests': self.requests,
+            'errors': self.errors,
+            'throttled': self.throttled,
+        }
+
+
+def is_congestion_error(error: BaseException) -> bool:
+    """429, 5xx и сетевые таймауты — признак перегрузки панели; 4xx — ошибка данных."""
+    status_code = getattr(error, 'status_code', None)
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientError))
@@ -1,4 +1,5 @@
 import json
+from collections.abc import AsyncIterator
 from datetime import timedelta
 from typing import Any
 
@@ -188,6 +189,93 @@ class CacheService:
             logger.error('Ошибка получения хеша', name=name, error=e)
             return None
 
+    async def get_hash_fields(self, name: str, keys: list[str]) -> list[str | None]:
+        """HMGET: значения нескольких полей хеша за один запрос (None для отсутствующих)."""
+        if not self._connected or not keys:
+            return [None] * len(keys)
+
+        try:
+            values = await self.redis_client.hmget(name, keys)
+            return [value.decode() if value else None for value in values]
+        except Exception as e:
+            logger.error('Ошибка получения полей хеша', name=name, error=e)
+            return [None] * len(keys)
+
+    async def scan_hash_fields(self, name: str, count: int = 1000) -> AsyncIterator[list[str]]:
+        """HSCAN: имена полей хеша пачками, без загрузки всего хеша в память."""
+        if not self._connected:
+            return
+
+        cursor = 0
+        try:
+            while True:
+                cursor, data = await self.redis_client.hscan(name, cursor, count=count)
+                if data:
+                    yield [key.decode() if isinstance(key, bytes) else key for key in data]
+                if not cursor:
+                    break
+        except Exception as e:
+            logger.error('Ошибка обхода хеша', name=name, error=e)
+
+    async def delete_hash_fields(self, name: str, keys: list[str]) -> int:
+        """HDEL: удаляет поля хеша, возвращает число удалённых."""
+        if not self._connected or not keys:
+            return 0
+
+        try:
+            return await self.redis_client.hdel(name, *keys)
+        except Exception as e:
+            logger.error('Ошибка удаления полей хеша', name=name, error=e)
+            return 0
+
+    async def get_bytes(self, key: str) -> bytes | None:
+        """Сырое значение без JSON-десериализации (бинарные блобы)."""
+        if not self._connected:
+            return None
+
+        try:
+            return await self.redis_client.get(key)
+        except Exception as e:
+            logger.error('Ошибка получения бинарного значения', key=key, error=e)
+            return None
+
+    async def set_bytes(self, key: str, value: bytes, expire: int | timedelta = None) -> bool:
+        if not self._connected:
+            return False
+
+        try:
+            if isinstance(expire, timedelta):
+                expire = int(expire.total_seconds())
+            await self.redis_client.set(key, value, ex=expire)
+            return True
+        except Exception as e:
+            logger.error('Ошибка записи бинарного значения', key=key, error=e)
+            return False
+
+    async def append_bytes(self, key: str, value: bytes, expire: int = None) -> bool:
+        """APPEND к строковому ключу (создаёт ключ, если его нет)."""
+        if not self._connected:
+            return False
+
+        try:
+            await self.redis_client.append(key, value)
+            if expire:
+                await self.redis_client.expire(key, expire)
+            return True
+        except Exception as e:
+            logger.error('Ошибка дописывания значения', key=key, error=e)
+            return False
+
+    async def strlen(self, key: str) -> int | None:
+        if not self._connected:
+            return None
+
+        try:
+            return await self.redis_client.strlen(key)
+        except Exception as e:
+            logger.error('Ошибка получения длины значения', key=key, error=e)
+            return None
+
     async def lpush(self, key: str, value: Any) -> bool:
         """Добавить элемент в начало списка (очереди)."""
         if not self._connected:
@@ -0,0 +1,138 @@
+"""Ограниченный пул для CPU-тяжёлой работы вне event loop.
+
+Бот, вебхуки и кабинет делят один event loop (create_unified_app), а bcrypt при
+12 раундах занимает 100–300 мс — всё это время апдейты не обрабатывались. Сюда же
+относится генерация QR-кодов. Пул рассчитан на короткие задачи: долгие бекапы и архивы
+логов идут через asyncio.to_thread, иначе логины ждали бы их в очереди.
+
+Задачи уходят в отдельный ThreadPoolExecutor: bcrypt, zlib и hashlib отпускают GIL
+на время вычислений, так что цикл продолжает обслуживать апдейты. Очередь ограничена:
+с ``shed=True`` задача, пришедшая при заполненной очереди, сразу отклоняется
+``CpuExecutorOverloadedError`` (всплески логинов), без ``shed`` — ждёт свободный поток.
+
+По каждому виду задач считается время в очереди и время выполнения вне цикла.
+"""
+
+import asyncio
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from app.config import settings
+
+
+class CpuExecutorOverloadedError(RuntimeError):
+    """Очередь пула заполнена, задача отклонена."""
+
+
+@dataclass(slots=True)
+class _KindStats:
+    completed: int = 0
+    failed: int = 0
+    rejected: int = 0
+    wait_seconds: float = 0.0
+    run_seconds: float = 0.0
+    max_run_seconds: float = 0.0
+
+
+@dataclass(slots=True)
+class _CallTiming:
+    submitted: float
+    started: float | None = None
+    finished: float | None = None
+
+
+def _timed_call[T](func: Callable[..., T], args: tuple, kwargs: dict, timing: _CallTiming) -> T:
+    timing.started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        timing.finished = time.perf_counter()
+
+
+class CpuExecutor:
+    """Пул потоков с ограниченной очередью и метриками по видам задач."""
+
+    def __init__(self, max_workers: int, max_queue: int, thread_name_prefix: str = 'cpu') -> None:
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._thread_name_prefix = thread_name_prefix
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending = 0
+        self._stats: dict[str, _KindStats] = {}
+
+    @property
+    def pending(self) -> int:
+        """Задачи в пуле: выполняющиеся и ожидающие свободный поток."""
+        return self._pending
+
+    @property
+    def queued(self) -> int:
+        return max(0, self._pending - self.max_workers)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=self._thread_name_prefix,
+            )
+        return self._executor
+
+    async def run[T](self, kind: str, func: Callable[..., T], *args: Any, shed: bool = False, **kwargs: Any) -> T:
+        """
+        Выполняет func(*args, **kwargs) в пуле и возвращает результат.
+
+        shed=True — отклонить задачу, если очередь уже заполнена (для запросов,
+        которые клиент может повторить, например логин).
+        """
+        stats = self._stats.setdefault(kind, _KindStats())
+        if shed and self.queued >= self.max_queue:
+            stats.rejected += 1
+            raise CpuExecutorOverloadedError(f'CPU executor queue is full ({self.queued} waiting)')
+
+        loop = asyncio.get_running_loop()
+        timing = _CallTiming(submitted=time.perf_counter())
+        self._pending += 1
+        try:
+            result = await loop.run_in_executor(self._get_executor(), _timed_call, func, args, kwargs, timing)
+        except Exception:
+            stats.failed += 1
+            raise
+        finally:
+            self._pending -= 1
+            # При отмене ожидания задача может ещё выполняться — тогда время не учитываем
+            if timing.started is not None and timing.finished is not None:
+                elapsed = timing.finished - timing.started
+                stats.wait_seconds += timing.started - timing.submitted
+                stats.run_seconds += elapsed
+                stats.max_run_seconds = max(stats.max_run_seconds, elapsed)
+        stats.completed += 1
+        return result
+
+    def shutdown(self) -> None:
+        """Останавливает пул, не дожидаясь завершения уже запущенных задач."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+            'pending': self._pending,
+            'queued': self.queued,
+            'kinds': {kind: asdict(stats) for kind, stats in self._stats.items()},
+        }
+
+
+cpu_executor = CpuExecutor(
+    max_workers=settings.get_cpu_executor_max_workers(),
+    max_queue=settings.CPU_EXECUTOR_MAX_QUEUE,
+)
+
+
+async def run_cpu_bound[T](kind: str, func: Callable[..., T], *args: Any, shed: bool = False, **kwargs: Any) -> T:
+    """Выполняет CPU-тяжёлую функцию в общем пуле, не блокируя event loop."""
+    return await cpu_executor.run(kind, func, *args, shed=shed, **kwargs)
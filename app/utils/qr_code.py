@@ -0,0 +1,25 @@
+"""Генерация QR-кодов для платёжных ссылок вне event loop."""
+
+from io import BytesIO
+
+from app.utils.cpu_executor import run_cpu_bound
+
+
+def render_qr_png(data: str) -> bytes:
+    """Рисует QR-код и возвращает PNG. Синхронно — вызывать через render_qr_png_async."""
+    import qrcode
+
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color='black', back_color='white')
+
+    img_bytes = BytesIO()
+    img.save(img_bytes, format='PNG')
+    return img_bytes.getvalue()
+
+
+async def render_qr_png_async(data: str) -> bytes:
+    """PNG с QR-кодом, сгенерированный в пуле CPU-задач."""
+    return await run_cpu_bound('qr', render_qr_png, data)
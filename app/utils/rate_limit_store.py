@@ -0,0 +1,137 @@
+"""Хранилища скользящих окон для rate-limit (ThrottlingMiddleware).
+
+``hit(key, limit, window)`` атомарно проверяет, сколько раз ключ срабатывал за последние
+``window`` секунд, и если меньше ``limit`` — засчитывает вызов. Возвращает 0, если вызов
+разрешён, иначе — сколько секунд ждать. Отклонённые вызовы не засчитываются.
+
+- ``MemoryRateLimitStore`` — в памяти процесса, ограничен по числу ключей; истёкшие
+  ключи вычищаются колесом времени, а не полным проходом по словарю;
+- ``RedisRateLimitStore`` — Lua-скрипт по ZSET, общий для всех реплик; при недоступности
+  Redis работает через локальное хранилище.
+"""
+
+import time
+import uuid
+from collections import OrderedDict, deque
+
+import structlog
+from redis.exceptions import RedisError
+
+from app.utils.cache import cache
+
+
+logger = structlog.get_logger(__name__)
+
+
+class MemoryRateLimitStore:
+    """Ограниченное in-process хранилище с вытеснением по колесу времени."""
+
+    def __init__(self, maxsize: int = 100_000, tick: float = 1.0, slots: int = 128) -> None:
+        self.maxsize = max(1, maxsize)
+        self._tick = tick
+        self._slots: list[set[str]] = [set() for _ in range(max(2, slots))]
+        self._cursor: int | None = None
+        # key → (истекает_в, метки вызовов в окне); порядок словаря = давность обращения
+        self._entries: OrderedDict[str, tuple[float, deque[float]]] = OrderedDict()
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _schedule(self, key: str, expires_at: float) -> None:
+        self._slots[int(expires_at / self._tick) % len(self._slots)].add(key)
+
+    def _advance(self, now: float) -> None:
+        """Прокручивает колесо до текущего тика и удаляет истёкшие ключи пройденных слотов."""
+        current = int(now / self._tick)
+        if self._cursor is None:
+            self._cursor = current
+        # Слот тика T содержит ключи, истекающие в [T, T + tick), — он готов, когда тик T прошёл
+        steps = min(current - self._cursor, len(self._slots))
+        for offset in range(steps):
+            slot = self._slots[(self._cursor + offset) % len(self._slots)]
+            if not slot:
+                continue
+            slot_keys = list(slot)
+            slot.clear()
+            for key in slot_keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] <= now:
+                    del self._entries[key]
+                else:
+                    # Ключ продлён или окно длиннее оборота колеса — перепланируем
+                    self._schedule(key, entry[0])
+        self._cursor = max(self._cursor, current)
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        return self.hit_now(key, limit, window, time.monotonic())
+
+    def hit_now(self, key: str, limit: int, window: float, now: float) -> float:
+        self._advance(now)
+
+        entry = self._entries.get(key)
+        calls = entry[1] if entry is not None else deque(maxlen=max(1, limit))
+        while calls and now - calls[0] >= window:
+            calls.popleft()
+
+        if len(calls) >= limit:
+            retry_after = window - (now - calls[0])
+            self._entries.move_to_end(key)
+            return max(retry_after, 0.001)
+
+        calls.append(now)
+        expires_at = now + window
+        self._entries[key] = (expires_at, calls)
+        self._entries.move_to_end(key)
+        self._schedule(key, expires_at)
+
+        while len(self._entries) > self.maxsize:
+            # Самый давно не использованный ключ
+            self._entries.popitem(last=False)
+            self.evicted += 1
+        return 0.0
+
+
+# KEYS[1] — ключ окна; ARGV: now, window, limit, member
+_SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) >= limit then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return tostring(tonumber(oldest[2]) + window - now)
+end
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+return '0'
+"""
+
+
+class RedisRateLimitStore:
+    """Скользящее окно в Redis, общее для всех реплик бота."""
+
+    def __init__(self, prefix: str = 'throttle', fallback: MemoryRateLimitStore | None = None) -> None:
+        self._prefix = prefix
+        self._fallback = fallback or MemoryRateLimitStore()
+        self._script = None
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        client = cache.redis_client if cache._connected else None
+        if client is None:
+            return await self._fallback.hit(key, limit, window)
+
+        if self._script is None:
+            self._script = client.register_script(_SLIDING_WINDOW_SCRIPT)
+        now = time.time()
+        try:
+            result = await self._script(
+                keys=[f'{self._prefix}:{key}'],
+                args=[repr(now), repr(window), limit, uuid.uuid4().hex],
+            )
+        except RedisError as error:
+            logger.warning('Rate-limit через Redis недоступен, используется локальный', error=error)
+            return await self._fallback.hit(key, limit, window)
+        return max(float(result.decode() if isinstance(result, bytes) else result), 0.0)
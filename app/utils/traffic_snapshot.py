@@ -0,0 +1,150 @@
+"""Колоночный snapshot трафика для быстрой проверки.
+
+Вместо JSON-словаря {uuid: bytes} snapshot хранится двумя колонками:
+- стабильный индекс uuid → позиция (список uuid, новые только дописываются в конец);
+- упакованный массив int64 с использованным трафиком по позициям.
+
+В Redis индекс дописывается через APPEND только новыми uuid, значения пишутся
+одним бинарным блобом (8 байт на пользователя). Дельты считаются поэлементно
+над массивами (map/compress на C-уровне, без промежуточных словарей), а
+пользователи материализуются только для позиций выше порога.
+"""
+
+import sys
+from array import array
+from itertools import compress, count
+from operator import sub
+
+
+# Позиция без значения. Дельта «есть сейчас − не было раньше» получается >= 2**61,
+# «нет сейчас − было раньше» — отрицательной, поэтому обе отсекаются диапазоном.
+MISSING = -(1 << 62)
+DELTA_LIMIT = 1 << 61
+
+# Индекс перестраивается, когда пустых позиций (удалённые пользователи) больше половины
+COMPACT_RATIO = 0.5
+COMPACT_MIN_SIZE = 1024
+
+_NEEDS_BYTESWAP = sys.byteorder != 'little'
+
+
+class UuidIndex:
+    """Append-only отображение uuid → позиция, общее для соседних snapshot."""
+
+    __slots__ = ('persisted', 'persisted_bytes', 'positions', 'uuids')
+
+    def __init__(self, uuids: list[str] | None = None, persisted: int = 0, persisted_bytes: int = 0):
+        self.uuids = uuids if uuids is not None else []
+        self.positions = {uuid: position for position, uuid in enumerate(self.uuids)}
+        # Сколько uuid (и байт) уже лежит в Redis — дописываем только хвост
+        self.persisted = persisted
+        self.persisted_bytes = persisted_bytes
+
+    def __len__(self) -> int:
+        return len(self.uuids)
+
+    def position(self, uuid: str) -> int:
+        position = self.positions.get(uuid)
+        if position is None:
+            position = len(self.uuids)
+            self.uuids.append(uuid)
+            self.positions[uuid] = position
+        return position
+
+    def encode(self, start: int = 0) -> bytes:
+        return ''.join(f'{uuid}\n' for uuid in self.uuids[start:]).encode()
+
+    @classmethod
+    def decode(cls, blob: bytes) -> 'UuidIndex':
+        uuids = blob.decode().split('\n')
+        uuids.pop()  # хвост после последнего '\n'
+        return cls(uuids, persisted=len(uuids), persisted_bytes=len(blob))
+
+
+class TrafficSnapshot:
+    """Использованный трафик (байты) по позициям индекса."""
+
+    __slots__ = ('index', 'values')
+
+    def __init__(self, index: UuidIndex | None = None, values: array | None = None):
+        self.index = index if index is not None else UuidIndex()
+        self.values = values if values is not None else array('q', [MISSING]) * len(self.index)
+
+    def __len__(self) -> int:
+        return len(self.values) - self.values.count(MISSING)
+
+    def successor(self) -> 'TrafficSnapshot':
+        """Пустой snapshot на том же индексе — позиции пользователей не меняются."""
+        return TrafficSnapshot(self.index)
+
+    def set(self, uuid: str, used_bytes: int) -> None:
+        position = self.index.position(uuid)
+        values = self.values
+        if position >= len(values):
+            values.extend(array('q', [MISSING]) * (position + 1 - len(values)))
+        values[position] = used_bytes
+
+    def get(self, uuid: str) -> int | None:
+        position = self.index.positions.get(uuid)
+        if position is None or position >= len(self.values):
+            return None
+        value = self.values[position]
+        return None if value == MISSING else value
+
+    def to_dict(self) -> dict[str, int]:
+        return {uuid: value for uuid, value in zip(self.index.uuids, self.values, strict=False) if value != MISSING}
+
+    @classmethod
+    def from_mapping(cls, mapping: dict[str, float]) -> 'TrafficSnapshot':
+        snapshot = cls()
+        for uuid, used_bytes in mapping.items():
+            snapshot.set(uuid, int(used_bytes))
+        return snapshot
+
+    def delta_report(self, previous: 'TrafficSnapshot', threshold_bytes: int) -> tuple[int, list[tuple[str, int]]]:
+        """
+        Сравнивает с предыдущим snapshot.
+
+        Возвращает (число пользователей с ростом трафика, [(uuid, дельта)] для дельт >= порога).
+        Пользователи, которых не было в одном из snapshot, и сбросы трафика не учитываются.
+        """
+        # zip по кратчайшему: позиции, добавленные после previous, в сравнение не попадают
+        deltas = array('q', map(sub, self.values, previous.values))
+        grown = sum(map(range(1, DELTA_LIMIT).__contains__, deltas))
+        positions = compress(count(), map(range(max(1, threshold_bytes), DELTA_LIMIT).__contains__, deltas))
+        uuids = self.index.uuids
+        return grown, [(uuids[position], deltas[position]) for position in positions]
+
+    def needs_compaction(self) -> bool:
+        size = len(self.values)
+        return size >= COMPACT_MIN_SIZE and self.values.count(MISSING) > size * COMPACT_RATIO
+
+    def compacted(self) -> 'TrafficSnapshot':
+        """Новый snapshot без пустых позиций; индекс придётся записать заново."""
+        present = [
+            (uuid, value) for uuid, value in zip(self.index.uuids, self.values, strict=False) if value != MISSING
+        ]
+        return TrafficSnapshot(UuidIndex([uuid for uuid, _ in present]), array('q', (value for _, value in present)))
+
+    def pack_values(self) -> bytes:
+        if not _NEEDS_BYTESWAP:
+            return self.values.tobytes()
+        values = array('q', self.values)
+        values.byteswap()
+        return values.tobytes()
+
+    @classmethod
+    def unpack(cls, index: UuidIndex, blob: bytes) -> 'TrafficSnapshot | None':
+        """Собирает snapshot из индекса и блоба значений; None при рассогласовании."""
+        if len(blob) % 8:
+            return None
+        values = array('q')
+        values.frombytes(blob)
+        if _NEEDS_BYTESWAP:
+            values.byteswap()
+        if len(values) > len(index):
+            return None
+        if len(values) < len(index):
+            # Индекс дописан, а значения не успели записаться — хвост считаем пустым
+            values.extend(array('q', [MISSING]) * (len(index) - len(values)))
+        return cls(index, values)
@@ -0,0 +1,345 @@
+"""Двухуровневый кеш контекста пользователя (in-process LRU + Redis).
+
+AuthMiddleware на каждый апдейт загружал пользователя с пятью selectinload-запросами.
+Здесь хранится компактный снимок пользователя, подписки и промогруппы, которого
+достаточно для проверок статуса и для хендлеров, которые ничего не пишут в БД.
+
+Инвалидация:
+- ORM-изменения User / Subscription / UserPromoGroup ловятся слушателями сессии
+  и сбрасывают кеш после успешного commit;
+- bulk-операции в CRUD вызывают ``invalidate_user_context`` явно; она же оповещает
+  зависимые кеши, подписанные через ``add_invalidation_listener``.
+
+Локальный уровень живёт несколько секунд (другие реплики узнают об изменении
+только через Redis), Redis-уровень ограничен своим TTL.
+"""
+
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from typing import Any
+
+import structlog
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.utils.cache import cache, cache_key
+
+
+logger = structlog.get_logger(__name__)
+
+# Версия формата снимка: при изменении полей старые записи в Redis игнорируются
+SNAPSHOT_VERSION = 1
+
+# Колонки, попадающие в снимок: изменения остальных (last_activity и т.п.) кеш не сбрасывают
+_TRACKED_COLUMNS: dict[str, frozenset[str] | None] = {
+    'users': frozenset(
+        {
+            'telegram_id',
+            'status',
+            'language',
+            'username',
+            'first_name',
+            'last_name',
+            'balance_kopeks',
+            'remnawave_uuid',
+            'promo_group_id',
+        }
+    ),
+    'subscriptions': frozenset({'user_id', 'status', 'is_trial', 'end_date'}),
+    'user_promo_groups': None,
+}
+_PENDING_KEY = 'user_context_invalidations'
+
+
+@dataclass(frozen=True, slots=True)
+class UserContext:
+    """Неизменяемый снимок пользователя для read-only обработки апдейтов."""
+
+    user_id: int
+    telegram_id: int
+    status: str
+    language: str
+    username: str | None
+    first_name: str | None
+    last_name: str | None
+    balance_kopeks: int
+    remnawave_uuid: str | None
+    promo_group_id: int | None
+    subscription_id: int | None = None
+    subscription_status: str | None = None
+    subscription_is_trial: bool = False
+    subscription_end_date: datetime | None = None
+    version: int = SNAPSHOT_VERSION
+
+    @classmethod
+    def from_user(cls, user) -> 'UserContext':
+        subscription = user.__dict__.get('subscription')
+        return cls(
+            user_id=user.id,
+            telegram_id=user.telegram_id,
+            status=user.status,
+            language=user.language or settings.DEFAULT_LANGUAGE,
+            username=user.username,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            balance_kopeks=user.balance_kopeks or 0,
+            remnawave_uuid=user.remnawave_uuid,
+            promo_group_id=user.promo_group_id,
+            subscription_id=subscription.id if subscription else None,
+            subscription_status=subscription.status if subscription else None,
+            subscription_is_trial=bool(subscription.is_trial) if subscription else False,
+            subscription_end_date=subscription.end_date if subscription else None,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> 'UserContext | None':
+        if data.get('version') != SNAPSHOT_VERSION:
+            return None
+        try:
+            end_date = data.get('subscription_end_date')
+            if isinstance(end_date, str):
+                end_date = datetime.fromisoformat(end_date)
+            return cls(**{**data, 'subscription_end_date': end_date})
+        except (TypeError, ValueError):
+            return None
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        if self.subscription_end_date is not None:
+            data['subscription_end_date'] = self.subscription_end_date.isoformat()
+        return data
+
+    @property
+    def has_active_subscription(self) -> bool:
+        end = self.subscription_end_date
+        if end is None or self.subscription_status != 'active':
+            return False
+        if end.tzinfo is None:
+            end = end.replace(tzinfo=UTC)
+        return end > datetime.now(UTC)
+
+    def matches_profile(self, username: str | None, first_name: str | None, last_name: str | None) -> bool:
+        return self.username == username and self.first_name == first_name and self.last_name == last_name
+
+
+class UserContextCache:
+    """LRU в памяти процесса поверх Redis. Ключ — telegram_id."""
+
+    def __init__(self, maxsize: int, local_ttl: float, redis_ttl: int):
+        self.maxsize = maxsize
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self._local: OrderedDict[int, tuple[float, UserContext]] = OrderedDict()
+        self._user_ids: dict[int, int] = {}
+        # Поколение на пользователя: загрузка, начатая до инвалидации, не попадёт в кеш
+        self._generations: OrderedDict[int, int] = OrderedDict()
+        self._generation_counter = itertools.count(1)
+        self._background: set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.USER_CONTEXT_CACHE_ENABLED
+
+    @staticmethod
+    def _redis_key(telegram_id: int) -> str:
+        return cache_key('user_ctx', telegram_id)
+
+    @staticmethod
+    def _alias_key(user_id: int) -> str:
+        return cache_key('user_ctx', 'uid', user_id)
+
+    def generation(self, telegram_id: int) -> int:
+        return self._generations.get(telegram_id, 0)
+
+    def _get_local(self, telegram_id: int) -> UserContext | None:
+        entry = self._local.get(telegram_id)
+        if entry is None:
+            return None
+        expires_at, context = entry
+        if expires_at < time.monotonic():
+            self._local.pop(telegram_id, None)
+            return None
+        self._local.move_to_end(telegram_id)
+        return context
+
+    def _put_local(self, context: UserContext) -> None:
+        self._local[context.telegram_id] = (time.monotonic() + self.local_ttl, context)
+        self._local.move_to_end(context.telegram_id)
+        self._user_ids[context.user_id] = context.telegram_id
+        while len(self._local) > self.maxsize:
+            _, (_, evicted) = self._local.popitem(last=False)
+            self._user_ids.pop(evicted.user_id, None)
+
+    async def get(self, telegram_id: int) -> UserContext | None:
+        if not self.enabled:
+            return None
+
+        context = self._get_local(telegram_id)
+        if context is not None:
+            self.hits += 1
+            return context
+
+        generation = self.generation(telegram_id)
+        data = await cache.get(self._redis_key(telegram_id))
+        context = UserContext.from_dict(data) if isinstance(data, dict) else None
+        if context is None:
+            self.misses += 1
+            return None
+
+        if generation == self.generation(telegram_id):
+            self._put_local(context)
+        self.hits += 1
+        return context
+
+    async def set(self, context: UserContext, generation: int | None = None) -> None:
+        """Сохраняет снимок, если с момента начала загрузки не было инвалидации."""
+        if not self.enabled or context.telegram_id is None:
+            return
+        if generation is not None and generation != self.generation(context.telegram_id):
+            return
+
+        self._put_local(context)
+        await cache.set(self._redis_key(context.telegram_id), context.to_dict(), self.redis_ttl)
+        await cache.set(self._alias_key(context.user_id), context.telegram_id, self.redis_ttl)
+
+    def _drop_local(self, telegram_id: int) -> None:
+        self._generations[telegram_id] = next(self._generation_counter)
+        self._generations.move_to_end(telegram_id)
+        while len(self._generations) > self.maxsize:
+            self._generations.popitem(last=False)
+        entry = self._local.pop(telegram_id, None)
+        if entry is not None:
+            self._user_ids.pop(entry[1].user_id, None)
+
+    async def invalidate(self, telegram_ids=(), user_ids=()) -> None:
+        telegram_ids = {tg_id for tg_id in telegram_ids if tg_id is not None}
+        for user_id in user_ids:
+            tg_id = self._user_ids.get(user_id)
+            if tg_id is None:
+                tg_id = await cache.get(self._alias_key(user_id))
+            if tg_id is not None:
+                telegram_ids.add(int(tg_id))
+
+        for tg_id in telegram_ids:
+            self._drop_local(tg_id)
+            await cache.delete(self._redis_key(tg_id))
+
+    def invalidate_soon(self, telegram_ids=(), user_ids=()) -> None:
+        """Синхронная инвалидация из ORM-событий: локально сразу, в Redis — фоновой задачей."""
+        telegram_ids = set(telegram_ids)
+        unresolved = set()
+        for user_id in user_ids:
+            tg_id = self._user_ids.get(user_id)
+            if tg_id is None:
+                unresolved.add(user_id)
+            else:
+                telegram_ids.add(tg_id)
+        for tg_id in telegram_ids:
+            self._drop_local(tg_id)
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.invalidate(telegram_ids, unresolved))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def clear_local(self) -> None:
+        self._local.clear()
+        self._user_ids.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'local_size': len(self._local),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+user_context_cache = UserContextCache(
+    maxsize=settings.USER_CONTEXT_CACHE_LOCAL_MAXSIZE,
+    local_ttl=settings.USER_CONTEXT_CACHE_LOCAL_TTL_SECONDS,
+    redis_ttl=settings.USER_CONTEXT_CACHE_REDIS_TTL_SECONDS,
+)
+
+
+# Синхронные обработчики (telegram_ids, user_ids) для зависимых кешей, например кабинета
+_invalidation_listeners: list[Callable[[Iterable[int], Iterable[int]], None]] = []
+
+
+def add_invalidation_listener(listener: Callable[[Iterable[int], Iterable[int]], None]) -> None:
+    _invalidation_listeners.append(listener)
+
+
+async def invalidate_user_context(*, telegram_ids=(), user_ids=()) -> None:
+    """Явная инвалидация для bulk-операций, которые не проходят через ORM unit of work."""
+    telegram_ids = [tg_id for tg_id in telegram_ids if tg_id is not None]
+    user_ids = list(user_ids)
+    for listener in _invalidation_listeners:
+        listener(telegram_ids, user_ids)
+    await user_context_cache.invalidate(telegram_ids, user_ids)
+
+
+def mark_user_context_changed(session, *, telegram_id: int | None = None, user_id: int | None = None) -> None:
+    """Сбросить кеш пользователя после commit — для Core UPDATE, которые ORM-слушатели не видят."""
+    pending = session.info.setdefault(_PENDING_KEY, (set(), set()))
+    if telegram_id is not None:
+        pending[0].add(telegram_id)
+    elif user_id is not None:
+        pending[1].add(user_id)
+
+
+def _has_tracked_changes(obj, columns: frozenset[str] | None) -> bool:
+    if columns is None:
+        return True
+    attrs = inspect(obj).attrs
+    return any(attrs[column].history.has_changes() for column in columns)
+
+
+def _collect_identity(obj, check_changes: bool) -> tuple[int | None, int | None]:
+    table = getattr(obj, '__tablename__', None)
+    if table not in _TRACKED_COLUMNS:
+        return None, None
+    if check_changes and not _has_tracked_changes(obj, _TRACKED_COLUMNS[table]):
+        return None, None
+    if table == 'users':
+        return obj.__dict__.get('telegram_id'), None
+    user = obj.__dict__.get('user')
+    if user is not None:
+        return user.__dict__.get('telegram_id'), None
+    return None, obj.__dict__.get('user_id')
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_user_context_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, (set(), set()))
+    changed = [(obj, False) for obj in (*session.new, *session.deleted)]
+    changed.extend((obj, True) for obj in session.dirty)
+    for obj, check_changes in changed:
+        telegram_id, user_id = _collect_identity(obj, check_changes)
+        if telegram_id is not None:
+            pending[0].add(telegram_id)
+        elif user_id is not None:
+            pending[1].add(user_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending and (pending[0] or pending[1]):
+        user_context_cache.invalidate_soon(*pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
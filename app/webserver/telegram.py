@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import asyncio
+import time
+from collections import deque
 from typing import Any
 
 import structlog
@@ -27,8 +29,134 @@ class TelegramWebhookOverloadedError(TelegramWebhookProcessorError):
     """Очередь переполнена и не успевает обрабатывать новые обновления."""
 
 
+# Платёжные обновления обрабатываются вне общей очереди: на pre_checkout_query
+# Telegram ждёт ответа не дольше 10 секунд
+_PRIORITY_LANE = 'priority'
+_DEFAULT_LANE = 'default'
+
+
+def _is_priority_update(update: Update) -> bool:
+    if update.pre_checkout_query is not None:
+        return True
+    return update.message is not None and update.message.successful_payment is not None
+
+
+def _update_shard_key(update: Update) -> int:
+    """Ключ очереди: пользователь (или чат), чтобы его обновления шли строго по очереди."""
+    try:
+        event = update.event
+    except Exception:  # неизвестный тип обновления
+        return update.update_id
+
+    from_user = getattr(event, 'from_user', None)
+    if from_user is not None:
+        return from_user.id
+    chat = getattr(event, 'chat', None)
+    if chat is not None:
+        return chat.id
+    return update.update_id
+
+
+class _ShardStats:
+    __slots__ = ('failed', 'handle_max', 'handle_total', 'processed', 'wait_max', 'wait_total')
+
+    def __init__(self) -> None:
+        self.processed = 0
+        self.failed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.handle_total = 0.0
+        self.handle_max = 0.0
+
+    def record(self, wait: float, handle: float, *, failed: bool) -> None:
+        self.processed += 1
+        self.failed += int(failed)
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.handle_total += handle
+        self.handle_max = max(self.handle_max, handle)
+
+    def as_dict(self) -> dict[str, Any]:
+        processed = self.processed or 1
+        return {
+            'processed': self.processed,
+            'failed': self.failed,
+            'wait_avg_ms': round(self.wait_total / processed * 1000, 1),
+            'wait_max_ms': round(self.wait_max * 1000, 1),
+            'handle_avg_ms': round(self.handle_total / processed * 1000, 1),
+            'handle_max_ms': round(self.handle_max * 1000, 1),
+        }
+
+
+class _KeyedLane:
+    """
+    Очереди по ключу пользователя поверх общего пула воркеров.
+
+    Ключ попадает в очередь готовых не больше одного раза и возвращается туда только
+    после обработки текущего обновления этого ключа. Поэтому обновления одного
+    пользователя не выполняются одновременно, а медленный обработчик занимает один
+    воркер пула, не задерживая остальных пользователей.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.size = 0
+        self.pending: dict[int, deque[tuple[Update, float]]] = {}
+        self.ready: asyncio.Queue[int | object] = asyncio.Queue()
+        self.capacity = asyncio.Semaphore(maxsize)
+        self.stats = _ShardStats()
+
+    async def put(self, key: int, item: tuple[Update, float], timeout: float) -> None:
+        if timeout <= 0:
+            if self.capacity.locked():
+                raise asyncio.QueueFull
+            await self.capacity.acquire()
+        else:
+            await asyncio.wait_for(self.capacity.acquire(), timeout=timeout)
+
+        self.size += 1
+        items = self.pending.get(key)
+        if items is None:
+            self.pending[key] = deque([item])
+            self.ready.put_nowait(key)
+        else:
+            items.append(item)
+
+    def take(self, key: int) -> tuple[Update, float]:
+        return self.pending[key].popleft()
+
+    def done(self, key: int) -> None:
+        """Освобождает место и возвращает ключ в очередь, если у пользователя есть ещё обновления."""
+        self.size -= 1
+        self.capacity.release()
+        if self.pending[key]:
+            self.ready.put_nowait(key)
+        else:
+            del self.pending[key]
+        self.ready.task_done()
+
+    def drain(self) -> int:
+        drained = self.size
+        for _ in range(drained):
+            self.capacity.release()
+        self.size = 0
+        self.pending.clear()
+        while not self.ready.empty():
+            self.ready.get_nowait()
+            self.ready.task_done()
+        return drained
+
+
 class TelegramWebhookProcessor:
-    """Асинхронная очередь обработки Telegram webhook-ов."""
+    """
+    Асинхронная очередь обработки Telegram webhook-ов.
+
+    Обновления группируются по id пользователя (или чата) и разбираются общим пулом
+    воркеров: обновления одного пользователя (двойное нажатие кнопки) обрабатываются
+    строго по порядку, а разные пользователи — параллельно, и медленный обработчик
+    держит только своего пользователя. Платёжные обновления идут в отдельную
+    приоритетную очередь со своим воркером.
+    """
 
     def __init__(
         self,
@@ -46,12 +174,22 @@ class TelegramWebhookProcessor:
         self._worker_count = max(0, worker_count)
         self._enqueue_timeout = max(0.0, enqueue_timeout)
         self._shutdown_timeout = max(1.0, shutdown_timeout)
-        self._queue: asyncio.Queue[Update | object] = asyncio.Queue(maxsize=self._queue_maxsize)
+        self._lanes: dict[str, _KeyedLane] = self._create_lanes()
         self._workers: list[asyncio.Task[None]] = []
         self._running = False
         self._stop_sentinel: object = object()
         self._lifecycle_lock = asyncio.Lock()
 
+    def _create_lanes(self) -> dict[str, _KeyedLane]:
+        return {
+            _DEFAULT_LANE: _KeyedLane(self._queue_maxsize),
+            _PRIORITY_LANE: _KeyedLane(self._queue_maxsize),
+        }
+
+    def _lane_workers(self) -> tuple[tuple[str, int], ...]:
+        # Несколько воркеров приоритетной очереди: медленный платёж одного пользователя не держит остальных
+        return (_DEFAULT_LANE, self._worker_count), (_PRIORITY_LANE, max(2, self._worker_count // 2))
+
     @property
     def is_running(self) -> bool:
         return self._running
@@ -62,19 +200,19 @@ class TelegramWebhookProcessor:
                 return
 
             self._running = True
-            self._queue = asyncio.Queue(maxsize=self._queue_maxsize)
+            self._lanes = self._create_lanes()
             self._workers.clear()
 
-            for index in range(self._worker_count):
-                task = asyncio.create_task(
-                    self._worker_loop(index),
-                    name=f'telegram-webhook-worker-{index}',
-                )
-                self._workers.append(task)
-
             if self._worker_count:
+                for lane_name, workers in self._lane_workers():
+                    for index in range(workers):
+                        task = asyncio.create_task(
+                            self._worker_loop(lane_name), name=f'telegram-webhook-worker-{lane_name}-{index}'
+                        )
+                        self._workers.append(task)
+
                 logger.info(
-                    '🚀 Telegram webhook processor запущен: воркеров, очередь',
+                    '🚀 Telegram webhook processor запущен: общий пул воркеров с очередью по пользователю',
                     worker_count=self._worker_count,
                     queue_maxsize=self._queue_maxsize,
                 )
@@ -90,35 +228,24 @@ class TelegramWebhookProcessor:
 
             if self._worker_count > 0:
                 try:
-                    await asyncio.wait_for(self._queue.join(), timeout=self._shutdown_timeout)
+                    await asyncio.wait_for(self._join_all(), timeout=self._shutdown_timeout)
                 except TimeoutError:
                     logger.warning(
                         '⏱️ Не удалось дождаться завершения очереди Telegram webhook за секунд',
                         shutdown_timeout=self._shutdown_timeout,
                     )
             else:
-                drained = 0
-                while not self._queue.empty():
-                    try:
-                        self._queue.get_nowait()
-                    except asyncio.QueueEmpty:  # pragma: no cover - гонка состояния
-                        break
-                    else:
-                        drained += 1
-                        self._queue.task_done()
+                drained = sum(lane.drain() for lane in self._lanes.values())
                 if drained:
                     logger.warning(
                         'Очередь Telegram webhook остановлена без воркеров, потеряно обновлений', drained=drained
                     )
 
-            for _ in range(len(self._workers)):
-                try:
-                    self._queue.put_nowait(self._stop_sentinel)
-                except asyncio.QueueFull:
-                    # Очередь переполнена, подождём пока освободится место
-                    await self._queue.put(self._stop_sentinel)
-
             if self._workers:
+                for lane_name, workers in self._lane_workers():
+                    for _ in range(workers):
+                        self._lanes[lane_name].ready.put_nowait(self._stop_sentinel)
+
                 await asyncio.gather(*self._workers, return_exceptions=True)
             self._workers.clear()
             logger.info('🛑 Telegram webhook processor остановлен')
@@ -127,49 +254,70 @@ class TelegramWebhookProcessor:
         if not self._running:
             raise TelegramWebhookProcessorNotRunningError
 
+        lane = self._lanes[_PRIORITY_LANE if _is_priority_update(update) else _DEFAULT_LANE]
         try:
-            if self._enqueue_timeout <= 0:
-                self._queue.put_nowait(update)
-            else:
-                await asyncio.wait_for(self._queue.put(update), timeout=self._enqueue_timeout)
-        except asyncio.QueueFull as error:  # pragma: no cover - защитный сценарий
+            await lane.put(_update_shard_key(update), (update, time.monotonic()), self._enqueue_timeout)
+        except asyncio.QueueFull as error:
             raise TelegramWebhookOverloadedError from error
         except TimeoutError as error:
             raise TelegramWebhookOverloadedError from error
 
+    async def _join_all(self) -> None:
+        await asyncio.gather(*(lane.ready.join() for lane in self._lanes.values()))
+
     async def wait_until_drained(self, timeout: float | None = None) -> None:
         if not self._running or self._worker_count == 0:
             return
         if timeout is None:
-            await self._queue.join()
+            await self._join_all()
             return
-        await asyncio.wait_for(self._queue.join(), timeout=timeout)
-
-    async def _worker_loop(self, worker_id: int) -> None:
+        await asyncio.wait_for(self._join_all(), timeout=timeout)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Глубина очереди и задержки основной и приоритетной очередей."""
+        lanes = {
+            name: {'depth': lane.size, 'users': len(lane.pending), **lane.stats.as_dict()}
+            for name, lane in self._lanes.items()
+        }
+        return {
+            'running': self._running,
+            'workers': self._worker_count,
+            'queue_maxsize': self._queue_maxsize,
+            'queued': sum(lane.size for lane in self._lanes.values()),
+            'per_lane': lanes,
+        }
+
+    async def _worker_loop(self, lane_name: str) -> None:
+        lane = self._lanes[lane_name]
         try:
             while True:
                 try:
-                    item = await self._queue.get()
+                    key = await lane.ready.get()
                 except asyncio.CancelledError:  # pragma: no cover - остановка приложения
-                    logger.debug('Worker cancelled', worker_id=worker_id)
+                    logger.debug('Worker cancelled', lane=lane_name)
                     raise
 
-                if item is self._stop_sentinel:
-                    self._queue.task_done()
+                if key is self._stop_sentinel:
+                    lane.ready.task_done()
                     break
 
-                update = item
+                update, enqueued_at = lane.take(key)
+                started_at = time.monotonic()
+                failed = False
                 try:
                     await self._dispatcher.feed_update(self._bot, update)  # type: ignore[arg-type]
                 except asyncio.CancelledError:  # pragma: no cover - остановка приложения
-                    logger.debug('Worker cancelled during processing', worker_id=worker_id)
+                    logger.debug('Worker cancelled during processing', lane=lane_name)
                     raise
                 except Exception as error:  # pragma: no cover - логируем сбой обработчика
-                    logger.exception('Ошибка обработки Telegram update в worker', worker_id=worker_id, error=error)
+                    failed = True
+                    logger.exception('Ошибка обработки Telegram update в worker', lane=lane_name, error=error)
                 finally:
-                    self._queue.task_done()
+                    finished_at = time.monotonic()
+                    lane.stats.record(started_at - enqueued_at, finished_at - started_at, failed=failed)
+                    lane.done(key)
         finally:
-            logger.debug('Worker завершён', worker_id=worker_id)
+            logger.debug('Worker завершён', lane=lane_name)
 
 
 async def _dispatch_update(
@@ -234,15 +382,16 @@ def create_telegram_router(
 
     @router.get('/health/telegram-webhook')
     async def telegram_webhook_health() -> JSONResponse:
-        return JSONResponse(
-            {
-                'status': 'ok',
-                'mode': settings.get_bot_run_mode(),
-                'path': webhook_path,
-                'webhook_configured': bool(settings.get_telegram_webhook_url()),
-                'queue_maxsize': settings.get_webhook_queue_maxsize(),
-                'workers': settings.get_webhook_worker_count(),
-            }
-        )
+        payload: dict[str, Any] = {
+            'status': 'ok',
+            'mode': settings.get_bot_run_mode(),
+            'path': webhook_path,
+            'webhook_configured': bool(settings.get_telegram_webhook_url()),
+            'queue_maxsize': settings.get_webhook_queue_maxsize(),
+            'workers': settings.get_webhook_worker_count(),
+        }
+        if processor is not None:
+            payload['processor'] = processor.get_stats()
+        return JSONResponse(payload)
 
     return router
@@ -0,0 +1,434 @@
+"""Приём Telegram webhook-ов через Redis Streams (WEBHOOK_INGRESS=redis_stream).
+
+Webhook-эндпоинт любой реплики только дописывает сырое обновление в Redis Stream,
+а обрабатывают их воркеры всех реплик через общую consumer group:
+
+* обновления раскладываются по WEBHOOK_STREAM_PARTITIONS потокам по id пользователя;
+  каждый поток в любой момент читает ровно одна реплика (аренда в Redis), поэтому
+  обновления одного пользователя обрабатываются строго по порядку;
+* потоки делятся между живыми репликами поровну и перераспределяются при запуске
+  и остановке реплик;
+* запись подтверждается (XACK) только после обработки и только пока аренда потока
+  своя. Во время обработки аренда продлевается, а время простоя записей пачки
+  сбрасывается, поэтому медленный обработчик не отдаёт их другой реплике. Если реплика
+  упала, аренда истекает, и новый владелец потока забирает (XAUTOCLAIM) её
+  неподтверждённые записи, простоявшие дольше аренды;
+* платёжные обновления идут в отдельный поток, который читают все реплики сразу;
+* 503 отдаётся только когда необработанных записей больше WEBHOOK_STREAM_MAX_LAG.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import socket
+import time
+from typing import Any
+
+import redis.asyncio as redis
+import structlog
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from redis.exceptions import RedisError, ResponseError
+
+from .telegram import (
+    TelegramWebhookOverloadedError,
+    TelegramWebhookProcessorNotRunningError,
+    _is_priority_update,
+    _ShardStats,
+    _update_shard_key,
+)
+
+
+logger = structlog.get_logger(__name__)
+
+_GROUP_NAME = 'dispatcher'
+_READ_COUNT = 32
+_LAG_REFRESH_INTERVAL = 1.0
+
+# Продление и снятие аренды только своим владельцем
+_RENEW_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+# Подтверждение записи; для потока с арендой (KEYS[2]) — только её владельцем
+_ACK_SCRIPT = """
+if #KEYS > 1 and redis.call('get', KEYS[2]) ~= ARGV[1] then
+    return 0
+end
+redis.call('xack', KEYS[1], ARGV[2], ARGV[3])
+redis.call('xdel', KEYS[1], ARGV[3])
+return 1
+"""
+
+
+def _decode(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+class TelegramStreamIngress:
+    """
+    Очередь Telegram webhook-ов поверх Redis Streams с тем же интерфейсом,
+    что и TelegramWebhookProcessor: start/stop/enqueue/get_stats.
+    """
+
+    def __init__(
+        self,
+        *,
+        bot: Bot,
+        dispatcher: Dispatcher,
+        redis_url: str,
+        key_prefix: str,
+        partitions: int,
+        max_lag: int,
+        lease_seconds: float,
+        shutdown_timeout: float,
+    ) -> None:
+        self._bot = bot
+        self._dispatcher = dispatcher
+        self._redis_url = redis_url
+        self._prefix = key_prefix.rstrip(':')
+        self._partitions = max(1, partitions)
+        self._max_lag = max(1, max_lag)
+        self._lease_ms = max(3000, int(lease_seconds * 1000))
+        # Блокирующее чтение короче аренды, чтобы успевать её продлевать
+        self._block_ms = max(500, self._lease_ms // 3)
+        self._shutdown_timeout = max(1.0, shutdown_timeout)
+        self._consumer = f'{socket.gethostname()}:{os.getpid()}'
+        self._redis: redis.Redis | None = None
+        self._running = False
+        self._lag = 0
+        self._owned: dict[int, asyncio.Task[None]] = {}
+        self._surrender: set[int] = set()
+        self._tasks: list[asyncio.Task[None]] = []
+        self._stats: dict[str, _ShardStats] = {}
+        self._lifecycle_lock = asyncio.Lock()
+        self._renew_lease = None
+        self._release_lease = None
+        self._ack_entry = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def _stream_key(self, partition: int | None) -> str:
+        return f'{self._prefix}:priority' if partition is None else f'{self._prefix}:p{partition}'
+
+    def _lease_key(self, partition: int) -> str:
+        return f'{self._prefix}:lease:{partition}'
+
+    @property
+    def _consumers_key(self) -> str:
+        return f'{self._prefix}:consumers'
+
+    def _all_streams(self) -> list[str]:
+        return [self._stream_key(None)] + [self._stream_key(p) for p in range(self._partitions)]
+
+    async def start(self) -> None:
+        async with self._lifecycle_lock:
+            if self._running:
+                return
+
+            self._redis = redis.from_url(self._redis_url)
+            self._renew_lease = self._redis.register_script(_RENEW_LEASE_SCRIPT)
+            self._release_lease = self._redis.register_script(_RELEASE_LEASE_SCRIPT)
+            self._ack_entry = self._redis.register_script(_ACK_SCRIPT)
+            for stream in self._all_streams():
+                try:
+                    await self._redis.xgroup_create(stream, _GROUP_NAME, id='0', mkstream=True)
+                except ResponseError as error:
+                    if 'BUSYGROUP' not in str(error):
+                        raise
+
+            self._running = True
+            self._stats = {'priority': _ShardStats()}
+            self._tasks = [
+                asyncio.create_task(self._coordinator_loop(), name='telegram-stream-coordinator'),
+                asyncio.create_task(self._lag_monitor_loop(), name='telegram-stream-lag'),
+                asyncio.create_task(self._priority_loop(), name='telegram-stream-priority'),
+            ]
+            logger.info(
+                '🚀 Telegram webhook: приём через Redis Streams',
+                consumer=self._consumer,
+                partitions=self._partitions,
+                max_lag=self._max_lag,
+            )
+
+    async def stop(self) -> None:
+        async with self._lifecycle_lock:
+            if not self._running:
+                return
+
+            self._running = False
+            # Текущие записи дорабатываются, новые не читаются (циклы проверяют _running)
+            workers = [*self._tasks, *self._owned.values()]
+            _done, pending = await asyncio.wait(workers, timeout=self._shutdown_timeout + self._block_ms / 1000)
+            if pending:
+                logger.warning(
+                    '⏱️ Не удалось дождаться завершения обработки Telegram updates',
+                    shutdown_timeout=self._shutdown_timeout,
+                )
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+            self._tasks.clear()
+            self._owned.clear()
+            self._surrender.clear()
+            if self._redis is not None:
+                try:
+                    await self._redis.zrem(self._consumers_key, self._consumer)
+                except RedisError as error:
+                    logger.warning('Не удалось снять регистрацию обработчика Telegram updates', error=error)
+                await self._redis.aclose()
+                self._redis = None
+            logger.info('🛑 Telegram webhook: приём через Redis Streams остановлен')
+
+    def _partition_for(self, update: Update) -> int | None:
+        if _is_priority_update(update):
+            return None
+        return _update_shard_key(update) % self._partitions
+
+    async def enqueue(self, update: Update) -> None:
+        if not self._running or self._redis is None:
+            raise TelegramWebhookProcessorNotRunningError
+
+        if self._lag > self._max_lag:
+            raise TelegramWebhookOverloadedError(f'stream lag {self._lag} > {self._max_lag}')
+
+        fields = {
+            'update': update.model_dump_json(by_alias=True, exclude_unset=True),
+            'enqueued_at': repr(time.time()),
+        }
+        try:
+            await self._redis.xadd(self._stream_key(self._partition_for(update)), fields)
+        except RedisError as error:
+            # Telegram повторит доставку, обновление не потеряется
+            raise TelegramWebhookOverloadedError('redis unavailable') from error
+
+    async def wait_until_drained(self, timeout: float | None = None) -> None:
+        async def _wait() -> None:
+            while self._running and await self._fetch_lag() > 0:
+                await asyncio.sleep(0.05)
+
+        if timeout is None:
+            await _wait()
+            return
+        await asyncio.wait_for(_wait(), timeout=timeout)
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            'running': self._running,
+            'ingress': 'redis_stream',
+            'consumer': self._consumer,
+            'partitions': self._partitions,
+            'owned_partitions': sorted(self._owned),
+            'lag': self._lag,
+            'max_lag': self._max_lag,
+            'per_shard': {name: stats.as_dict() for name, stats in self._stats.items()},
+        }
+
+    async def _fetch_lag(self) -> int:
+        # Подтверждённые записи удаляются, поэтому длина потоков — это и есть отставание
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for stream in self._all_streams():
+                pipe.xlen(stream)
+            lengths = await pipe.execute()
+        return sum(int(length) for length in lengths)
+
+    async def _lag_monitor_loop(self) -> None:
+        while self._running:
+            try:
+                self._lag = await self._fetch_lag()
+            except RedisError as error:
+                logger.warning('Не удалось получить отставание потока Telegram updates', error=error)
+            await asyncio.sleep(_LAG_REFRESH_INTERVAL)
+
+    async def _live_consumers(self) -> int:
+        now_ms = int(time.time() * 1000)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(self._consumers_key, {self._consumer: now_ms})
+            pipe.zremrangebyscore(self._consumers_key, '-inf', now_ms - self._lease_ms)
+            pipe.zcard(self._consumers_key)
+            _, _, live = await pipe.execute()
+        return max(1, int(live))
+
+    async def _coordinator_loop(self) -> None:
+        """Держит долю потоков этой реплики равной ceil(partitions / живых реплик)."""
+        while self._running:
+            try:
+                await self._rebalance()
+            except RedisError as error:
+                logger.warning('Ошибка распределения потоков Telegram updates', error=error)
+            await asyncio.sleep(self._block_ms / 1000)
+
+    async def _rebalance(self) -> None:
+        for partition, task in list(self._owned.items()):
+            if task.done():
+                self._owned.pop(partition, None)
+                self._surrender.discard(partition)
+
+        live = await self._live_consumers()
+        fair_share = -(-self._partitions // live)
+
+        excess = len(self._owned) - len(self._surrender) - fair_share
+        for partition in sorted(self._owned, reverse=True):
+            if excess <= 0:
+                break
+            if partition not in self._surrender:
+                self._surrender.add(partition)
+                excess -= 1
+
+        for partition in range(self._partitions):
+            if len(self._owned) >= fair_share or not self._running:
+                break
+            if partition in self._owned:
+                continue
+            acquired = await self._redis.set(self._lease_key(partition), self._consumer, nx=True, px=self._lease_ms)
+            if acquired:
+                self._stats.setdefault(str(partition), _ShardStats())
+                self._owned[partition] = asyncio.create_task(
+                    self._partition_loop(partition), name=f'telegram-stream-p{partition}'
+                )
+
+    async def _partition_loop(self, partition: int) -> None:
+        stream = self._stream_key(partition)
+        lease_key = self._lease_key(partition)
+        stats = self._stats[str(partition)]
+        last_reclaim = 0.0
+        try:
+            while self._running and partition not in self._surrender:
+                if not await self._renew_lease(keys=[lease_key], args=[self._consumer, self._lease_ms]):
+                    logger.warning('Аренда потока Telegram updates потеряна', partition=partition)
+                    return
+                # Сначала дорабатываем то, что не подтвердил прежний владелец. Записи моложе
+                # аренды он ещё может обрабатывать, их забираем при следующей проверке
+                if time.monotonic() - last_reclaim >= self._lease_ms / 1000:
+                    last_reclaim = time.monotonic()
+                    entries = await self._claim_pending(stream, min_idle_ms=self._lease_ms)
+                    if not await self._process_entries(stream, entries, stats, lease_key=lease_key):
+                        return
+                response = await self._redis.xreadgroup(
+                    _GROUP_NAME, self._consumer, {stream: '>'}, count=_READ_COUNT, block=self._block_ms
+                )
+                for _stream, entries in response or []:
+                    if not await self._process_entries(stream, entries, stats, lease_key=lease_key):
+                        return
+        except RedisError as error:
+            logger.warning('Ошибка чтения потока Telegram updates', partition=partition, error=error)
+        finally:
+            try:
+                await self._release_lease(keys=[lease_key], args=[self._consumer])
+            except RedisError:
+                pass  # аренда истечёт сама
+
+    async def _priority_loop(self) -> None:
+        """Приоритетный поток читают все реплики: порядок там не нужен, важна задержка."""
+        stream = self._stream_key(None)
+        stats = self._stats['priority']
+        last_reclaim = 0.0
+        while self._running:
+            try:
+                if time.monotonic() - last_reclaim >= self._lease_ms / 1000:
+                    last_reclaim = time.monotonic()
+                    entries = await self._claim_pending(stream, min_idle_ms=self._lease_ms)
+                    await self._process_entries(stream, entries, stats)
+                response = await self._redis.xreadgroup(
+                    _GROUP_NAME, self._consumer, {stream: '>'}, count=_READ_COUNT, block=self._block_ms
+                )
+                for _stream, entries in response or []:
+                    await self._process_entries(stream, entries, stats)
+            except RedisError as error:
+                logger.warning('Ошибка чтения приоритетного потока Telegram updates', error=error)
+                await asyncio.sleep(1)
+
+    async def _claim_pending(self, stream: str, *, min_idle_ms: int) -> list[tuple[Any, dict]]:
+        claimed: list[tuple[Any, dict]] = []
+        cursor: Any = '0-0'
+        while True:
+            result = await self._redis.xautoclaim(
+                stream, _GROUP_NAME, self._consumer, min_idle_ms, start_id=cursor, count=_READ_COUNT
+            )
+            cursor, entries = result[0], result[1]
+            claimed.extend(entry for entry in entries if entry[1])
+            if _decode(cursor) == '0-0':
+                break
+        if claimed:
+            logger.info('Повторная доставка неподтверждённых Telegram updates', stream=stream, count=len(claimed))
+        return claimed
+
+    async def _process_entries(
+        self,
+        stream: str,
+        entries: list[tuple[Any, dict]],
+        stats: _ShardStats,
+        *,
+        lease_key: str | None = None,
+    ) -> bool:
+        """Обрабатывает пачку. False — аренда потока потеряна, остаток заберёт новый владелец."""
+        if not entries:
+            return True
+
+        in_flight = [entry_id for entry_id, _ in entries]
+        heartbeat = asyncio.create_task(self._heartbeat(stream, lease_key, in_flight))
+        try:
+            for entry_id, fields in entries:
+                await self._handle_entry(fields, stats)
+                in_flight.remove(entry_id)
+                # Сбой обработчика тоже подтверждаем: повтор того же update ничего не исправит
+                keys = [stream] if lease_key is None else [stream, lease_key]
+                if not await self._ack_entry(keys=keys, args=[self._consumer, _GROUP_NAME, entry_id]):
+                    logger.warning('Аренда потока Telegram updates потеряна во время обработки', stream=stream)
+                    return False
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+        return True
+
+    async def _heartbeat(self, stream: str, lease_key: str | None, in_flight: list[Any]) -> None:
+        """Пока пачка обрабатывается, продлевает аренду и сбрасывает время простоя её записей."""
+        while True:
+            await asyncio.sleep(self._block_ms / 1000)
+            try:
+                if lease_key is not None and not await self._renew_lease(
+                    keys=[lease_key], args=[self._consumer, self._lease_ms]
+                ):
+                    # Поток уже у другой реплики: записи пусть простаивают и достанутся ей
+                    return
+                if in_flight:
+                    # Запись, которую только что забрала другая реплика, не отнимаем обратно
+                    await self._redis.xclaim(
+                        stream, _GROUP_NAME, self._consumer, self._block_ms // 2, list(in_flight), justid=True
+                    )
+            except RedisError as error:
+                logger.warning('Не удалось продлить обработку Telegram updates', stream=stream, error=error)
+
+    async def _handle_entry(self, fields: dict, stats: _ShardStats) -> None:
+        values = {_decode(key): value for key, value in fields.items()}
+        started_at = time.time()
+        try:
+            enqueued_at = float(_decode(values.get('enqueued_at', started_at)))
+        except ValueError:
+            enqueued_at = started_at
+
+        failed = False
+        try:
+            payload = json.loads(_decode(values['update']))
+            update = Update.model_validate(payload, context={'bot': self._bot})
+            await self._dispatcher.feed_update(self._bot, update)
+        except asyncio.CancelledError:  # pragma: no cover - остановка приложения
+            raise
+        except Exception as error:  # pragma: no cover - логируем сбой обработчика
+            failed = True
+            logger.exception('Ошибка обработки Telegram update из потока', error=error)
+        finally:
+            stats.record(started_at - enqueued_at, time.time() - started_at, failed=failed)
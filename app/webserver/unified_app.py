@@ -12,10 +12,11 @@ from app.cabinet.routes import router as cabinet_router
 from app.config import settings
 from app.services.disposable_email_service import disposable_email_service
 from app.services.payment_service import PaymentService
+from app.utils.cpu_executor import cpu_executor
 from app.webapi.app import create_web_api_app
 from app.webapi.docs import add_redoc_endpoint
 
-from . import payments, telegram
+from . import payments, telegram, telegram_stream
 
 
 logger = structlog.get_logger(__name__)
@@ -133,14 +134,26 @@ def create_unified_app(
     }
 
     if enable_telegram_webhook:
-        telegram_processor = telegram.TelegramWebhookProcessor(
-            bot=bot,
-            dispatcher=dispatcher,
-            queue_maxsize=settings.get_webhook_queue_maxsize(),
-            worker_count=settings.get_webhook_worker_count(),
-            enqueue_timeout=settings.get_webhook_enqueue_timeout(),
-            shutdown_timeout=settings.get_webhook_shutdown_timeout(),
-        )
+        if settings.get_webhook_ingress() == 'redis_stream':
+            telegram_processor = telegram_stream.TelegramStreamIngress(
+                bot=bot,
+                dispatcher=dispatcher,
+                redis_url=settings.REDIS_URL,
+                key_prefix=settings.WEBHOOK_STREAM_KEY_PREFIX,
+                partitions=settings.WEBHOOK_STREAM_PARTITIONS,
+                max_lag=settings.WEBHOOK_STREAM_MAX_LAG,
+                lease_seconds=settings.WEBHOOK_STREAM_LEASE_SECONDS,
+                shutdown_timeout=settings.get_webhook_shutdown_timeout(),
+            )
+        else:
+            telegram_processor = telegram.TelegramWebhookProcessor(
+                bot=bot,
+                dispatcher=dispatcher,
+                queue_maxsize=settings.get_webhook_queue_maxsize(),
+                worker_count=settings.get_webhook_worker_count(),
+                enqueue_timeout=settings.get_webhook_enqueue_timeout(),
+                shutdown_timeout=settings.get_webhook_shutdown_timeout(),
+            )
         app.state.telegram_webhook_processor = telegram_processor
 
         @app.on_event('startup')
@@ -177,6 +190,7 @@ def create_unified_app(
             'url': settings.get_telegram_webhook_url(),
             'path': webhook_path,
             'secret_configured': bool(settings.WEBHOOK_SECRET_TOKEN),
+            'ingress': settings.get_webhook_ingress(),
             'queue_maxsize': settings.get_webhook_queue_maxsize(),
             'workers': settings.get_webhook_worker_count(),
         }
@@ -205,6 +219,7 @@ def create_unified_app(
                 'telegram_webhook': telegram_state,
                 'remnawave_webhook': remnawave_webhook_state,
                 'miniapp_static': miniapp_state,
+                'cpu_executor': cpu_executor.get_stats(),
             }
         )
 
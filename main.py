@@ -15,10 +15,12 @@ from app.config import settings
 from app.database.database import sync_postgres_sequences
 from app.database.migrations import run_alembic_upgrade
 from app.database.models import PaymentMethod
-from app.localization.loader import ensure_locale_templates
+from app.external.remnawave_api import remnawave_connection_pool
+from app.localization.loader import compile_locale_bundles, ensure_locale_templates
 from app.logging_config import setup_logging
 from app.services.backup_service import backup_service
 from app.services.ban_notification_service import ban_notification_service
+from app.services.blacklist_service import blacklist_service
 from app.services.broadcast_service import broadcast_service
 from app.services.contest_rotation_service import contest_rotation_service
 from app.services.daily_subscription_service import daily_subscription_service
@@ -39,9 +41,12 @@ from app.services.referral_contest_service import referral_contest_service
 from app.services.remnawave_sync_service import remnawave_sync_service
 from app.services.reporting_service import reporting_service
 from app.services.system_settings_service import bot_configuration_service
+from app.services.telegram_send_scheduler import telegram_send_scheduler
 from app.services.traffic_monitoring_service import traffic_monitoring_scheduler
+from app.services.user_activity_service import user_activity_tracker
 from app.services.version_service import version_service
 from app.services.web_api_token_service import ensure_default_web_api_token
+from app.utils.cpu_executor import cpu_executor
 from app.utils.log_handlers import ExcludePaymentFilter, LevelFilterHandler
 from app.utils.payment_logger import configure_payment_logger
 from app.utils.startup_timeline import StartupTimeline
@@ -160,6 +165,13 @@ async def main():
         except Exception as error:
             stage.warning(f'Не удалось подготовить шаблоны локализаций: {error}')
             logger.warning('Failed to prepare locale templates', error=error)
+        try:
+            compiled = compile_locale_bundles()
+            if compiled:
+                stage.log(f'Скомпилированы локали: {", ".join(compiled)}')
+        except Exception as error:
+            stage.warning(f'Не удалось скомпилировать локали: {error}')
+            logger.warning('Failed to compile locale bundles', error=error)
 
     killer = GracefulExit()
     signal.signal(signal.SIGINT, killer.exit_gracefully)
@@ -217,6 +229,27 @@ async def main():
             if not token_ok:
                 stage.warning('Не удалось создать/проверить дефолтный веб-API токен')
 
+        async with timeline.stage(
+            'Пул соединений RemnaWave',
+            '🔌',
+            success_message='Пул HTTP-соединений к панели настроен',
+        ) as stage:
+            remnawave_connection_pool.configure(
+                enabled=settings.REMNAWAVE_HTTP_POOL_ENABLED,
+                limit=settings.REMNAWAVE_HTTP_POOL_LIMIT,
+                limit_per_host=settings.REMNAWAVE_HTTP_POOL_LIMIT_PER_HOST,
+                keepalive_timeout=settings.REMNAWAVE_HTTP_KEEPALIVE_SECONDS,
+                dns_cache_ttl=settings.REMNAWAVE_HTTP_DNS_CACHE_SECONDS,
+            )
+            if remnawave_connection_pool.enabled:
+                stage.log(
+                    f'Соединений: {remnawave_connection_pool.limit}, '
+                    f'на хост: {remnawave_connection_pool.limit_per_host}, '
+                    f'keep-alive: {remnawave_connection_pool.keepalive_timeout:g}с'
+                )
+            else:
+                stage.skip('Пул отключен, сессия создаётся на каждый запрос')
+
         async with timeline.stage(
             'RBAC bootstrap',
             '🔐',
@@ -293,6 +326,8 @@ async def main():
         async with timeline.stage('Настройка бота', '🤖', success_message='Бот настроен') as stage:
             bot, dp = await setup_bot()
             stage.log('Кеш и FSM подготовлены')
+            if await bot_configuration_service.start_change_listener():
+                stage.log('Изменения настроек синхронизируются между репликами')
 
         monitoring_service.bot = bot
         maintenance_service.set_bot(bot)
@@ -609,6 +644,19 @@ async def main():
             else:
                 stage.skip('Режим webhook отключен')
 
+        async with timeline.stage(
+            'Очередь рассылок',
+            '📨',
+            success_message='Очередь рассылок готова',
+        ) as stage:
+            try:
+                resumed = await broadcast_service.start()
+                if resumed:
+                    stage.log(f'Продолжено незавершённых рассылок: {resumed}')
+            except Exception as e:
+                stage.warning(f'Ошибка запуска очереди рассылок: {e}')
+                logger.error('❌ Ошибка запуска очереди рассылок', error=e)
+
         async with timeline.stage(
             'Служба мониторинга',
             '📈',
@@ -672,6 +720,26 @@ async def main():
                 version_check_task = None
                 stage.skip('Проверка версий отключена настройками')
 
+        async with timeline.stage(
+            'Черный список',
+            '🚫',
+            success_message='Черный список загружен',
+        ) as stage:
+            if blacklist_service.is_blacklist_check_enabled():
+                await blacklist_service.start()
+                stage.log(f'Записей: {len(blacklist_service.blacklist_data)}')
+                stage.log(f'Интервал обновления: {blacklist_service.get_blacklist_update_interval_hours()}ч')
+            else:
+                stage.skip('Проверка черного списка отключена')
+
+        async with timeline.stage(
+            'Трекер активности',
+            '🕒',
+            success_message='Write-behind запись активности запущена',
+        ) as stage:
+            await user_activity_tracker.start()
+            stage.log(f'Интервал записи: {user_activity_tracker.flush_interval:g}с')
+
         async with timeline.stage(
             'Запуск polling',
             '🤖',
@@ -932,6 +1000,39 @@ async def main():
             except Exception as error:
                 logger.error('Ошибка остановки веб-API', error=error)
 
+        try:
+            await broadcast_service.stop()
+        except Exception as error:
+            logger.error('Ошибка остановки рассылок', error=error)
+
+        try:
+            await bot_configuration_service.stop_change_listener()
+        except Exception as error:
+            logger.error('Ошибка остановки синхронизации настроек', error=error)
+
+        try:
+            await blacklist_service.stop()
+        except Exception as error:
+            logger.error('Ошибка остановки обновления черного списка', error=error)
+
+        logger.info('ℹ️ Финальная запись активности пользователей...')
+        try:
+            await user_activity_tracker.stop()
+        except Exception as error:
+            logger.error('Ошибка финальной записи активности пользователей', error=error)
+
+        try:
+            await remnawave_connection_pool.close()
+        except Exception as error:
+            logger.error('Ошибка закрытия пула соединений RemnaWave', error=error)
+
+        try:
+            await telegram_send_scheduler.close()
+        except Exception as error:
+            logger.error('Ошибка остановки планировщика отправки Telegram', error=error)
+
+        cpu_executor.shutdown()
+
         if 'bot' in locals():
             try:
                 await bot.session.close()
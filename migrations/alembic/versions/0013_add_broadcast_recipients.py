@@ -0,0 +1,57 @@
+"""add broadcast_recipients job table and broadcast_history.selected_buttons
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-16
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = '0013'
+down_revision: Union[str, None] = '0012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    return column in [c['name'] for c in inspector.get_columns(table)]
+
+
+def _has_table(table: str) -> bool:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    return table in inspector.get_table_names()
+
+
+def upgrade() -> None:
+    if not _has_column('broadcast_history', 'selected_buttons'):
+        op.add_column('broadcast_history', sa.Column('selected_buttons', sa.JSON(), nullable=True))
+
+    if not _has_table('broadcast_recipients'):
+        op.create_table(
+            'broadcast_recipients',
+            sa.Column(
+                'broadcast_id',
+                sa.Integer(),
+                sa.ForeignKey('broadcast_history.id', ondelete='CASCADE'),
+                primary_key=True,
+            ),
+            sa.Column('telegram_id', sa.BigInteger(), primary_key=True),
+            sa.Column('state', sa.String(16), nullable=False, server_default='pending'),
+            sa.Column('claimed_by', sa.String(64), nullable=True),
+            sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Index('ix_broadcast_recipients_broadcast_state', 'broadcast_id', 'state'),
+        )
+
+
+def downgrade() -> None:
+    if _has_table('broadcast_recipients'):
+        op.drop_table('broadcast_recipients')
+
+    if _has_column('broadcast_history', 'selected_buttons'):
+        op.drop_column('broadcast_history', 'selected_buttons')
@@ -0,0 +1,38 @@
+"""add GIN index on subscriptions.connected_squads for squad membership queries
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-16
+
+Squad membership used to be matched with connected_squads::text LIKE '%"uuid"%'
+(a full scan per squad). Queries now use jsonb containment, served by this
+index. Building the index covers all existing rows; non-array values are
+normalized to [] so they behave like "no squads".
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = '0014'
+down_revision: Union[str, None] = '0013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        UPDATE subscriptions
+        SET connected_squads = '[]'::json
+        WHERE connected_squads IS NULL OR json_typeof(connected_squads) <> 'array'
+        """
+    )
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_subscriptions_connected_squads_gin '
+        'ON subscriptions USING gin ((connected_squads::jsonb) jsonb_path_ops)'
+    )
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS ix_subscriptions_connected_squads_gin')
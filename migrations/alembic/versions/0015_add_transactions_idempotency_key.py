@@ -0,0 +1,43 @@
+"""add idempotency_key to transactions for atomic balance changes
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-16
+
+Balance changes are applied with a single UPDATE ... RETURNING statement together
+with the transaction insert. A unique key per operation (payment, daily charge)
+makes a retried or concurrently duplicated operation a no-op.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = '0015'
+down_revision: Union[str, None] = '0014'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    return column in [c['name'] for c in inspector.get_columns(table)]
+
+
+def upgrade() -> None:
+    # Fresh DBs get the column from create_all in 0001
+    if not _has_column('transactions', 'idempotency_key'):
+        op.add_column('transactions', sa.Column('idempotency_key', sa.String(length=255), nullable=True))
+    op.create_index(
+        'ix_transactions_idempotency_key',
+        'transactions',
+        ['idempotency_key'],
+        unique=True,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transactions_idempotency_key', table_name='transactions')
+    op.drop_column('transactions', 'idempotency_key')
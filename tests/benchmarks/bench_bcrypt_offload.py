@@ -0,0 +1,79 @@
+"""
+Задержка event loop во время всплеска логинов: bcrypt в цикле против пула CPU-задач.
+
+Параллельно с --logins проверками пароля в цикле крутится «апдейт бота» — таймер
+на 10 мс; печатается p50/p99/max его опоздания и общее время всплеска.
+«До» — verify_password прямо в корутине, «после» — verify_password_async.
+Pytest этот файл не собирает (нет префикса test_), запуск вручную:
+
+    python -m tests.benchmarks.bench_bcrypt_offload --logins 20 --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+
+os.environ.setdefault('BOT_TOKEN', 'benchmark')
+
+from app.cabinet.auth.password_utils import hash_password, verify_password, verify_password_async
+from app.utils.cpu_executor import CpuExecutorOverloadedError, cpu_executor
+
+
+TICK = 0.01
+
+
+async def _ticker(stop: asyncio.Event, lags: list[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+
+
+async def _inline_login(password: str, password_hash: str) -> bool:
+    return verify_password(password, password_hash)
+
+
+async def _measure(check, password_hash: str, logins: int) -> tuple[list[float], float, int]:
+    stop = asyncio.Event()
+    lags: list[float] = []
+    ticker = asyncio.create_task(_ticker(stop, lags))
+    await asyncio.sleep(TICK * 3)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(check('secret', password_hash) for _ in range(logins)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await ticker
+    shed = sum(isinstance(result, CpuExecutorOverloadedError) for result in results)
+    return lags, elapsed, shed
+
+
+async def main(logins: int, workers: int, queue: int) -> None:
+    cpu_executor.max_workers = workers
+    cpu_executor.max_queue = queue
+    password_hash = hash_password('secret')
+
+    for label, check in (('до', _inline_login), ('после', verify_password_async)):
+        lags, elapsed, shed = await _measure(check, password_hash, logins)
+        lags_ms = sorted(lag * 1000 for lag in lags)
+        p99 = statistics.quantiles(lags_ms, n=100)[98] if len(lags_ms) > 1 else lags_ms[-1]
+        print(
+            f'{label:>6}: опоздание цикла p50 {statistics.median(lags_ms):7.1f} мс, p99 {p99:7.1f} мс, '
+            f'max {lags_ms[-1]:7.1f} мс; всплеск {elapsed * 1000:7.0f} мс, отклонено {shed}'
+        )
+
+    print('метрики пула:', cpu_executor.get_stats()['kinds'])
+    cpu_executor.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--logins', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--queue', type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.workers, args.queue))
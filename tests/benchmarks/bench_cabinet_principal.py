@@ -0,0 +1,146 @@
+"""
+Нагрузочный тест /cabinet/subscription: p50/p99 задержки до и после кеша принципалов.
+
+Поднимает FastAPI-приложение в процессе (httpx + ASGITransport) с маршрутом, который
+повторяет путь /cabinet/subscription: зависимость авторизации и загрузка пользователя
+с подпиской. БД заменена задержкой на каждую загрузку пользователя (--db-latency-ms,
+по умолчанию 5 запросов selectinload по 1 мс), JWT и initData — настоящие.
+
+«До» — get_current_cabinet_user с выключенным кешем (пользователь грузится дважды,
+initData и черный список проверяются на каждый запрос), «после» — get_cabinet_principal.
+Pytest этот файл не собирает (нет префикса test_), запуск вручную:
+
+    python -m tests.benchmarks.bench_cabinet_principal --requests 5000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import statistics
+import time
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+
+os.environ.setdefault('BOT_TOKEN', 'benchmark')
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from app.cabinet import dependencies
+from app.cabinet.auth.jwt_handler import create_access_token
+from app.cabinet.auth.principal_cache import cabinet_principal_cache
+from app.config import settings
+
+
+USER_ID = 1
+TELEGRAM_ID = 100500
+
+
+def _make_init_data(telegram_id: int) -> str:
+    fields = {
+        'auth_date': str(int(time.time())),
+        'query_id': 'benchmark',
+        'user': json.dumps({'id': telegram_id, 'first_name': 'Bench'}),
+    }
+    data_check_string = '\n'.join(f'{key}={value}' for key, value in sorted(fields.items()))
+    secret_key = hmac.new(b'WebAppData', settings.BOT_TOKEN.encode(), hashlib.sha256).digest()
+    fields['hash'] = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    return urlencode(fields)
+
+
+def _patch_database(db_latency: float) -> None:
+    user = SimpleNamespace(
+        id=USER_ID,
+        telegram_id=TELEGRAM_ID,
+        username='bench',
+        email=None,
+        email_verified=False,
+        status='active',
+        subscription=SimpleNamespace(id=1, status='active'),
+    )
+
+    async def get_user_by_id(db, user_id):
+        await asyncio.sleep(db_latency)
+        return user
+
+    dependencies.get_user_by_id = get_user_by_id
+
+
+def _build_app() -> FastAPI:
+    app = FastAPI()
+
+    async def fake_db():
+        yield None
+
+    app.dependency_overrides[dependencies.get_cabinet_db] = fake_db
+
+    # Маршрут повторяет get_subscription: авторизация + загрузка пользователя с подпиской
+    @app.get('/before/cabinet/subscription')
+    async def before(user=Depends(dependencies.get_current_cabinet_user), db=Depends(dependencies.get_cabinet_db)):
+        fresh_user = await dependencies.get_user_by_id(db, user.id)
+        return {'has_subscription': fresh_user.subscription is not None}
+
+    @app.get('/after/cabinet/subscription')
+    async def after(principal=Depends(dependencies.get_cabinet_principal), db=Depends(dependencies.get_cabinet_db)):
+        fresh_user = await dependencies.get_user_by_id(db, principal.user_id)
+        return {'has_subscription': fresh_user.subscription is not None}
+
+    return app
+
+
+async def _run(client: httpx.AsyncClient, path: str, headers: dict, requests: int, concurrency: int) -> list[float]:
+    latencies: list[float] = []
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def _percentile(values: list[float], percent: int) -> float:
+    return statistics.quantiles(values, n=100)[percent - 1] * 1000
+
+
+async def main(requests: int, concurrency: int, db_latency_ms: float) -> None:
+    _patch_database(db_latency_ms / 1000)
+    headers = {
+        'Authorization': f'Bearer {create_access_token(USER_ID, TELEGRAM_ID)}',
+        'X-Telegram-Init-Data': _make_init_data(TELEGRAM_ID),
+    }
+
+    transport = httpx.ASGITransport(app=_build_app())
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        for label, path, cache_enabled in (
+            ('до', '/before/cabinet/subscription', False),
+            ('после', '/after/cabinet/subscription', True),
+        ):
+            settings.CABINET_PRINCIPAL_CACHE_ENABLED = cache_enabled
+            cabinet_principal_cache.clear()
+            await _run(client, path, headers, min(requests, 200), concurrency)  # прогрев
+
+            started = time.perf_counter()
+            latencies = await _run(client, path, headers, requests, concurrency)
+            rate = requests / (time.perf_counter() - started)
+            print(
+                f'{label:>6}: p50 {_percentile(latencies, 50):7.2f} мс, '
+                f'p99 {_percentile(latencies, 99):7.2f} мс, {rate:9,.0f} запросов/сек'
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--db-latency-ms', type=float, default=5.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.db_latency_ms))
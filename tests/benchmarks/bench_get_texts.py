@@ -0,0 +1,60 @@
+"""
+Микробенчмарк get_texts(): сборка Texts на каждый вызов против общего экземпляра.
+
+«До» — прежнее поведение (новый Texts с копированием локали на каждый вызов),
+«после» — get_texts() из реестра. Печатает вызовы/сек и байты, выделенные на один
+апдейт (get_texts + пара обращений к ключам, как в middleware).
+Pytest этот файл не собирает (нет префикса test_), запуск вручную:
+
+    python -m tests.benchmarks.bench_get_texts --calls 2000 --language en
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+
+os.environ.setdefault('BOT_TOKEN', 'benchmark')
+
+from app.localization.texts import Texts, get_texts
+
+
+def _per_update(factory, language: str) -> None:
+    texts = factory(language)
+    texts.t('THROTTLING_MESSAGE_RATE_LIMIT', '')
+    texts.get('TRAFFIC_UNLIMITED')
+
+
+def _measure(factory, language: str, calls: int) -> tuple[float, float]:
+    _per_update(factory, language)  # прогрев: загрузка локали с диска
+
+    started = time.perf_counter()
+    for _ in range(calls):
+        _per_update(factory, language)
+    rate = calls / (time.perf_counter() - started)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    _per_update(factory, language)
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return rate, peak
+
+
+def main(calls: int, language: str) -> None:
+    results = {}
+    for label, factory in (('до', Texts), ('после', get_texts)):
+        rate, allocated = _measure(factory, language, calls)
+        results[label] = rate
+        print(f'{label:>6}: {rate:12,.0f} апдейтов/сек, {allocated / 1024:10.1f} КБ на апдейт')
+    print(f'{"ускорение":>6}: {results["после"] / results["до"]:12,.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--language', default='en')
+    args = parser.parse_args()
+    main(args.calls, args.language)
@@ -0,0 +1,72 @@
+"""
+Микробенчмарк локалей: разбор JSON при запуске против скомпилированных бандлов.
+
+Каждый замер идёт в отдельном процессе (как новый воркер), который загружает
+все доступные языки и возвращает время загрузки и прирост RSS:
+
+- json — прежний путь: разбор JSON, слияние, отдельный словарь fallback на язык;
+- bundle — marshal-бандлы с уже подставленным fallback (первый прогон их собирает).
+
+Pytest этот файл не собирает (нет префикса test_), запуск вручную:
+
+    python -m tests.benchmarks.bench_locale_bundles --runs 3
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+os.environ.setdefault('BOT_TOKEN', 'benchmark')
+
+
+def _rss_kb() -> int:
+    with open('/proc/self/statm', encoding='ascii') as handle:
+        return int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def _worker(mode: str) -> tuple[float, int, int]:
+    from app.localization import loader
+
+    languages = sorted({lang.lower() for lang in loader.settings.get_available_languages()} | {loader.DEFAULT_LANGUAGE})
+    rss_before = _rss_kb()
+    started = time.perf_counter()
+    kept = []
+    for language in languages:
+        if mode == 'json':
+            values = dict(loader.load_locale(language))
+            fallback = loader.load_locale(loader.DEFAULT_LANGUAGE)
+            kept.append((values, {key: value for key, value in fallback.items() if key not in values}))
+        else:
+            kept.append(loader.load_locale_bundle(language))
+    elapsed = time.perf_counter() - started
+    return elapsed * 1000, _rss_kb() - rss_before, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _run_worker(mode: str) -> tuple[float, int, int]:
+    # spawn, а не fork: процесс не наследует уже загруженные локали родителя
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(_worker, mode).result()
+
+
+def main(runs: int) -> None:
+    os.environ['LOCALE_BUNDLES_PATH'] = tempfile.mkdtemp(prefix='locale_bundles_')
+    # Первый запуск собирает бандлы — его в замер не включаем
+    _run_worker('bundle')
+
+    for mode in ('json', 'bundle'):
+        samples = [_run_worker(mode) for _ in range(runs)]
+        load_ms = min(sample[0] for sample in samples)
+        rss_mb = min(sample[1] for sample in samples) / 1024
+        max_rss_mb = min(sample[2] for sample in samples) / 1024
+        print(f'{mode:>7}: загрузка {load_ms:7.1f} мс, +RSS {rss_mb:6.1f} МБ, пик RSS воркера {max_rss_mb:6.1f} МБ')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=3)
+    main(parser.parse_args().runs)
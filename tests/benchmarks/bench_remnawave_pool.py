@@ -0,0 +1,76 @@
+"""
+Микробенчмарк RemnaWaveAPI: сессия на каждый запрос против общего пула соединений.
+
+Поднимает локальную заглушку панели на 127.0.0.1 и меряет вызовы/сек для типичного
+паттерна ``async with RemnaWaveAPI(...) as api: await api.get_system_stats()``.
+Pytest этот файл не собирает (нет префикса test_), запуск вручную:
+
+    python -m tests.benchmarks.bench_remnawave_pool --calls 2000 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+
+os.environ.setdefault('BOT_TOKEN', 'benchmark')
+
+import structlog
+from aiohttp import web
+
+from app.external.remnawave_api import RemnaWaveAPI, remnawave_connection_pool
+
+
+async def _stats_handler(request: web.Request) -> web.Response:
+    return web.json_response({'response': {'users': {'totalUsers': 1}}})
+
+
+async def _start_stub_panel() -> tuple[web.AppRunner, str]:
+    app = web.Application()
+    app.router.add_get('/api/system/stats', _stats_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f'http://127.0.0.1:{port}'
+
+
+async def _run(base_url: str, calls: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_call():
+        async with semaphore:
+            async with RemnaWaveAPI(base_url, 'benchmark-key') as api:
+                await api.get_system_stats()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_call() for _ in range(calls)))
+    return calls / (time.perf_counter() - started)
+
+
+async def main(calls: int, concurrency: int) -> None:
+    runner, base_url = await _start_stub_panel()
+    try:
+        results = {}
+        for label, enabled in (('без пула', False), ('с пулом', True)):
+            remnawave_connection_pool.configure(enabled=enabled)
+            await _run(base_url, min(calls, 100), concurrency)  # прогрев
+            results[label] = await _run(base_url, calls, concurrency)
+            await remnawave_connection_pool.close()
+            print(f'{label:>10}: {results[label]:8.0f} вызовов/сек')
+        print(f'{"ускорение":>10}: {results["с пулом"] / results["без пула"]:8.2f}x')
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    # Отладочные логи клиента на каждый вызов искажают замер
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.concurrency))
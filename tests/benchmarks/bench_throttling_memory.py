@@ -0,0 +1,55 @@
+"""
+Микробенчмарк памяти ThrottlingMiddleware: 1M разных пользователей.
+
+Прогоняет синтетическую нагрузку через MemoryRateLimitStore (каждый апдейт — новый
+пользователь, виртуальное время) и печатает число живых ключей и пик памяти
+по чекпойнтам. При постоянной нагрузке оба значения должны выйти на плато.
+Pytest этот файл не собирает (нет префикса test_), запуск вручную:
+
+    python -m tests.benchmarks.bench_throttling_memory --users 1000000 --rate 2000
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+
+os.environ.setdefault('BOT_TOKEN', 'benchmark')
+
+from app.utils.rate_limit_store import MemoryRateLimitStore
+
+
+def main(users: int, rate: float, maxsize: int, checkpoints: int) -> None:
+    store = MemoryRateLimitStore(maxsize=maxsize)
+    step = 1.0 / rate
+    now = 0.0
+    report_every = max(1, users // checkpoints)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    for user_id in range(1, users + 1):
+        now += step
+        store.hit_now(f'any:{user_id}', 1, 0.5, now)
+        if user_id % 7 == 0:
+            store.hit_now(f'cmd:start:{user_id}', 3, 60.0, now)
+        if user_id % report_every == 0:
+            current, peak = tracemalloc.get_traced_memory()
+            print(
+                f'{user_id:>9} польз.: ключей {len(store):>7}, '
+                f'память {current / 1024 / 1024:7.1f} МБ (пик {peak / 1024 / 1024:7.1f} МБ), '
+                f'вытеснено {store.evicted}'
+            )
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+    print(f'{users / elapsed:,.0f} проверок/сек (с учётом накладных расходов tracemalloc)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--rate', type=float, default=2000.0, help='апдейтов в секунду виртуального времени')
+    parser.add_argument('--maxsize', type=int, default=100_000)
+    parser.add_argument('--checkpoints', type=int, default=10)
+    args = parser.parse_args()
+    main(args.users, args.rate, args.maxsize, args.checkpoints)
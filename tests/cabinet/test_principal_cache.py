@@ -0,0 +1,74 @@
+"""
+Тесты кеша проверенных принципалов кабинета.
+"""
+
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.cabinet.auth.principal_cache import CabinetPrincipal, CabinetPrincipalCache, make_principal_key
+from app.config import settings
+from app.utils.user_context_cache import invalidate_user_context
+
+
+@pytest.fixture(autouse=True)
+def _enabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, 'CABINET_PRINCIPAL_CACHE_ENABLED', True, raising=False)
+
+
+def _principal(user_id: int = 1, telegram_id: int | None = 100) -> CabinetPrincipal:
+    return CabinetPrincipal(user_id=user_id, telegram_id=telegram_id, username='user', verified_email=None)
+
+
+def test_key_depends_on_token_and_init_data() -> None:
+    payload = {'sub': '1', 'jti': 'abc'}
+
+    assert make_principal_key(1, payload, 'token', None) == (1, 'abc', '')
+    assert make_principal_key(1, payload, 'token', 'a=1') != make_principal_key(1, payload, 'token', 'a=2')
+    # Токены, выпущенные до появления jti, различаются по хешу
+    assert make_principal_key(1, {'sub': '1'}, 'one', None) != make_principal_key(1, {'sub': '1'}, 'two', None)
+
+
+def test_entries_expire_and_are_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = CabinetPrincipalCache(maxsize=2, ttl=10)
+    now = [1000.0]
+    monkeypatch.setattr('app.cabinet.auth.principal_cache.time.monotonic', lambda: now[0])
+
+    for user_id in (1, 2, 3):
+        cache.set((user_id, 'jti', ''), _principal(user_id, telegram_id=user_id * 100))
+
+    assert cache.get((1, 'jti', '')) is None
+    assert cache.get((3, 'jti', '')) == _principal(3, telegram_id=300)
+
+    now[0] += 11
+    assert cache.get((3, 'jti', '')) is None
+    assert len(cache) == 1
+
+
+def test_invalidation_drops_all_sessions_and_blocks_stale_checks() -> None:
+    cache = CabinetPrincipalCache(maxsize=10, ttl=60)
+    cache.set((1, 'phone', ''), _principal())
+    cache.set((1, 'desktop', 'hash'), _principal())
+    generation = cache.generation(1)
+
+    cache.invalidate(telegram_ids=[100])
+
+    assert cache.get((1, 'phone', '')) is None
+    assert cache.get((1, 'desktop', 'hash')) is None
+    # Проверка, начатая до инвалидации, не должна вернуть устаревший принципал в кеш
+    cache.set((1, 'phone', ''), _principal(), generation)
+    assert cache.get((1, 'phone', '')) is None
+
+
+@pytest.mark.anyio
+async def test_invalidate_user_context_notifies_principal_cache() -> None:
+    from app.cabinet.auth.principal_cache import cabinet_principal_cache
+
+    cabinet_principal_cache.set((7, 'jti', ''), _principal(7, telegram_id=700))
+
+    with patch('app.utils.user_context_cache.cache') as mock_cache:
+        mock_cache.get = AsyncMock(return_value=None)
+        mock_cache.delete = AsyncMock(return_value=True)
+        await invalidate_user_context(telegram_ids=[700])
+
+    assert cabinet_principal_cache.get((7, 'jti', '')) is None
@@ -28,6 +28,16 @@ sys.modules.setdefault('aiosqlite', types.ModuleType('aiosqlite'))
 if 'redis.asyncio' not in sys.modules:
     redis_module = types.ModuleType('redis')
     redis_async_module = types.ModuleType('redis.asyncio')
+    redis_exceptions_module = types.ModuleType('redis.exceptions')
+
+    class _RedisError(Exception):
+        pass
+
+    class _ResponseError(_RedisError):
+        pass
+
+    redis_exceptions_module.RedisError = _RedisError
+    redis_exceptions_module.ResponseError = _ResponseError
 
     class _FakeRedisClient:
         async def ping(self):
@@ -65,6 +75,7 @@ if 'redis.asyncio' not in sys.modules:
     redis_async_module.Redis = _FakeRedisClient
     sys.modules['redis'] = redis_module
     sys.modules['redis.asyncio'] = redis_async_module
+    sys.modules['redis.exceptions'] = redis_exceptions_module
 
 # Минимальная реализация SDK YooKassa, чтобы импорт сервисов не падал.
 if 'yookassa' not in sys.modules:
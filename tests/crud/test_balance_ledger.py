@@ -0,0 +1,138 @@
+"""
+Tests for atomic balance changes
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+
+from app.database.crud import balance_ledger, user as user_crud
+from app.database.crud.balance_ledger import (
+    BalanceChange,
+    LedgerEntry,
+    build_balance_change_statement,
+    change_balance,
+)
+from app.database.models import PaymentMethod, TransactionType
+
+
+def _compile(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}))
+
+
+def _db(row=None) -> MagicMock:
+    result = MagicMock()
+    result.one_or_none.return_value = row
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+    db.scalar = AsyncMock(return_value=False)
+    db.rollback = AsyncMock()
+    return db
+
+
+@pytest.fixture(autouse=True)
+def _postgres(monkeypatch):
+    monkeypatch.setattr(balance_ledger, 'IS_SQLITE', False)
+
+
+def test_withdrawal_is_one_guarded_statement_with_transaction_insert():
+    sql = _compile(
+        build_balance_change_statement(
+            5,
+            -300,
+            require_funds=True,
+            entry=LedgerEntry(TransactionType.SUBSCRIPTION_PAYMENT, 'day', PaymentMethod.MANUAL),
+            idempotency_key='daily:1:first',
+        )
+    )
+
+    assert sql.startswith('WITH balance_update AS')
+    assert 'SET balance_kopeks=(users.balance_kopeks + -300)' in sql
+    assert 'users.balance_kopeks >= 300' in sql
+    assert "NOT (EXISTS (SELECT * \nFROM transactions \nWHERE transactions.idempotency_key = 'daily:1:first'))" in sql
+    assert 'INSERT INTO transactions' in sql
+    assert 'RETURNING users.id, users.balance_kopeks' in sql
+    assert 'FOR UPDATE' not in sql
+
+
+def test_deposit_checks_daily_resume_in_same_statement():
+    sql = _compile(build_balance_change_statement(5, 1000, check_daily_resume=True))
+
+    assert 'users.balance_kopeks >=' not in sql
+    assert 'INSERT INTO transactions' not in sql
+    assert "subscriptions.status = 'disabled'" in sql
+    assert 'tariffs.daily_price_kopeks <= balance_update.balance_kopeks' in sql
+
+
+async def test_change_balance_returns_new_balance():
+    db = _db(row=(1500, 42, True))
+
+    change = await change_balance(db, 5, 1000, entry=LedgerEntry(TransactionType.DEPOSIT, 'top-up'))
+
+    assert change.applied
+    assert change.balance_kopeks == 1500
+    assert change.transaction_id == 42
+    assert change.resume_daily
+    db.rollback.assert_not_awaited()
+
+
+async def test_change_balance_reports_duplicate_key():
+    db = _db(row=None)
+    db.scalar.return_value = True
+
+    change = await change_balance(
+        db, 5, 1000, entry=LedgerEntry(TransactionType.DEPOSIT, 'top-up'), idempotency_key='stars:abc'
+    )
+
+    assert not change.applied
+    assert change.duplicate
+
+
+async def test_change_balance_insufficient_funds_is_not_duplicate():
+    db = _db(row=None)
+
+    change = await change_balance(db, 5, -1000, require_funds=True)
+
+    assert not change.applied
+    assert not change.duplicate
+    db.scalar.assert_not_awaited()
+
+
+async def test_concurrent_duplicate_rolls_back():
+    db = _db()
+    db.execute.side_effect = IntegrityError('INSERT', {}, Exception('duplicate key'))
+
+    change = await change_balance(
+        db, 5, 1000, entry=LedgerEntry(TransactionType.DEPOSIT, 'top-up'), idempotency_key='tribute:1'
+    )
+
+    assert change.duplicate
+    db.rollback.assert_awaited_once()
+
+
+async def test_credit_reraises_db_error_after_rollback(monkeypatch):
+    monkeypatch.setattr(user_crud, 'change_balance', AsyncMock(side_effect=RuntimeError('connection lost')))
+    user = SimpleNamespace(id=5, telegram_id=100, email=None, balance_kopeks=0)
+    db = _db()
+
+    # Платёжный webhook должен отличать сбой от повтора и ответить ошибкой
+    with pytest.raises(RuntimeError):
+        await user_crud.credit_user_balance(db, user, 1000, idempotency_key='tribute:1')
+    db.rollback.assert_awaited_once()
+
+    assert await user_crud.add_user_balance(db, user, 1000, idempotency_key='tribute:1') is False
+
+
+async def test_credit_reports_duplicate_without_commit(monkeypatch):
+    monkeypatch.setattr(user_crud, 'change_balance', AsyncMock(return_value=BalanceChange(False, duplicate=True)))
+    user = SimpleNamespace(id=5, telegram_id=100, email=None, balance_kopeks=0)
+    db = _db()
+    db.commit = AsyncMock()
+
+    change = await user_crud.credit_user_balance(db, user, 1000, idempotency_key='tribute:1')
+
+    assert change.duplicate
+    db.commit.assert_not_awaited()
@@ -0,0 +1,88 @@
+"""
+Tests for SQL-compiled broadcast audience segments
+"""
+
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql
+
+from app.database.crud.broadcast_audience import (
+    build_audience_filter,
+    count_audience,
+    get_audience_telegram_ids,
+)
+from app.database.models import User
+
+
+NOW = datetime(2026, 1, 10, 12, 0, tzinfo=UTC)
+
+
+def _compile(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}))
+
+
+def _where(stmt) -> str:
+    return _compile(stmt).split('WHERE', 1)[1]
+
+
+@pytest.mark.parametrize(
+    'target',
+    ['all', 'active', 'no', 'expired', 'trial_ending', 'autopay_failed', 'inactive_60d', 'tariff_3', 'custom_week'],
+)
+def test_count_and_recipients_share_predicate(target):
+    audience_filter = build_audience_filter(target, NOW)
+
+    count_sql = _where(select(func.count(User.id)).where(audience_filter))
+    recipients_sql = _where(select(User.telegram_id).where(audience_filter))
+
+    assert count_sql == recipients_sql
+    assert "users.status = 'active'" in count_sql
+    assert 'users.telegram_id IS NOT NULL' in count_sql
+
+
+def test_subscription_segments_use_correlated_exists():
+    sql = _compile(select(User.telegram_id).where(build_audience_filter('tariff_3', NOW)))
+
+    assert sql.startswith('SELECT users.telegram_id \nFROM users \n')
+    assert 'EXISTS (SELECT *' in sql
+    assert 'subscriptions.user_id = users.id' in sql
+    assert 'subscriptions.tariff_id = 3' in sql
+    assert "subscriptions.end_date > '2026-01-10 12:00:00+00:00'" in sql
+    assert 'JOIN' not in sql
+
+
+def test_unknown_targets_have_no_filter():
+    assert build_audience_filter('unknown', NOW) is None
+    assert build_audience_filter('custom_unknown', NOW) is None
+    assert build_audience_filter('tariff_x', NOW) is None
+
+
+async def test_unknown_target_does_not_query_database():
+    db = MagicMock()
+    db.scalar = AsyncMock()
+    db.stream_scalars = AsyncMock()
+
+    assert await count_audience(db, 'unknown') == 0
+    assert await get_audience_telegram_ids(db, 'unknown') == []
+    db.scalar.assert_not_awaited()
+    db.stream_scalars.assert_not_awaited()
+
+
+async def test_recipients_are_streamed_in_partitions():
+    async def partitions():
+        yield [101, 102]
+        yield [103]
+
+    result = MagicMock()
+    result.partitions = partitions
+    db = MagicMock()
+    db.stream_scalars = AsyncMock(return_value=result)
+
+    assert await get_audience_telegram_ids(db, 'all') == [101, 102, 103]
+
+    stmt = db.stream_scalars.await_args.args[0]
+    assert stmt.get_execution_options()['yield_per'] > 0
+    assert [column.name for column in stmt.selected_columns] == ['telegram_id']
@@ -0,0 +1,69 @@
+"""
+Tests for the durable broadcast recipient queue
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+from app.database.crud.broadcast_recipient import (
+    ack_broadcast_recipients,
+    claim_broadcast_recipients,
+    materialize_broadcast_recipients,
+)
+
+
+def _compile(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}))
+
+
+def _db(result=None) -> MagicMock:
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result or MagicMock())
+    db.scalar = AsyncMock(return_value=3)
+    return db
+
+
+async def test_materialize_inserts_from_audience_select_idempotently():
+    db = _db()
+
+    total = await materialize_broadcast_recipients(db, 7, 'all')
+
+    sql = _compile(db.execute.await_args.args[0])
+    assert total == 3
+    assert sql.startswith('INSERT INTO broadcast_recipients (broadcast_id, telegram_id, state) SELECT 7')
+    assert 'FROM users' in sql
+    assert 'ON CONFLICT (broadcast_id, telegram_id) DO NOTHING' in sql
+
+
+async def test_materialize_unknown_target_inserts_nothing():
+    db = _db()
+
+    await materialize_broadcast_recipients(db, 7, 'unknown_target')
+
+    db.execute.assert_not_awaited()
+
+
+async def test_claim_skips_rows_locked_by_other_replicas():
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = [30, 10, 20]
+    db = _db(result)
+
+    claimed = await claim_broadcast_recipients(db, 7, 'host:1', limit=100, lease_seconds=300)
+
+    sql = _compile(db.execute.await_args.args[0])
+    assert claimed == [10, 20, 30]
+    assert 'FOR UPDATE SKIP LOCKED' in sql
+    assert "SET state='claimed', claimed_by='host:1'" in sql
+    assert 'LIMIT 100' in sql
+
+
+async def test_ack_groups_updates_by_state_and_checks_owner():
+    db = _db()
+
+    await ack_broadcast_recipients(db, 7, 'host:1', {1: 'sent', 2: 'blocked', 3: 'sent'})
+
+    statements = [_compile(call.args[0]) for call in db.execute.await_args_list]
+    assert len(statements) == 2
+    assert all("broadcast_recipients.claimed_by = 'host:1'" in sql for sql in statements)
+    assert any("state='sent'" in sql and 'IN (1, 3)' in sql for sql in statements)
@@ -0,0 +1,71 @@
+"""
+Tests for squad membership queries over subscriptions.connected_squads
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.database.crud import server_squad
+from app.database.crud.server_squad import count_active_users_by_squad, subscription_in_squad
+from app.database.models import Subscription
+
+
+def _compile(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+@pytest.fixture
+def _postgres(monkeypatch):
+    monkeypatch.setattr(server_squad, 'IS_SQLITE', False)
+
+
+@pytest.fixture
+def _sqlite(monkeypatch):
+    monkeypatch.setattr(server_squad, 'IS_SQLITE', True)
+
+
+@pytest.mark.usefixtures('_postgres')
+def test_membership_uses_jsonb_containment_instead_of_like():
+    sql = _compile(select(Subscription.id).where(subscription_in_squad('squad-1')))
+
+    assert 'CAST(subscriptions.connected_squads AS JSONB) @>' in sql
+    assert 'LIKE' not in sql
+
+
+@pytest.mark.usefixtures('_postgres')
+async def test_counts_per_squad_in_single_group_by():
+    result = MagicMock()
+    result.all.return_value = [('squad-1', 3), ('squad-2', 1)]
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+
+    counts = await count_active_users_by_squad(db)
+
+    sql = _compile(db.execute.await_args.args[0])
+    assert counts == {'squad-1': 3, 'squad-2': 1}
+    assert db.execute.await_count == 1
+    assert 'jsonb_array_elements_text' in sql
+    assert 'GROUP BY squad.value' in sql
+
+
+@pytest.mark.usefixtures('_sqlite')
+def test_membership_falls_back_to_like_outside_postgres():
+    sql = str(select(Subscription.id).where(subscription_in_squad('squad-1')).compile(dialect=sqlite.dialect()))
+
+    assert 'LIKE' in sql
+    assert 'JSONB' not in sql
+
+
+@pytest.mark.usefixtures('_sqlite')
+async def test_counts_per_squad_outside_postgres():
+    result = MagicMock()
+    result.all.return_value = [(['squad-1', 'squad-2'],), (['squad-1', 'squad-1'],), (None,)]
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+
+    counts = await count_active_users_by_squad(db)
+
+    assert counts == {'squad-1': 2, 'squad-2': 1}
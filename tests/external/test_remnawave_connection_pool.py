@@ -0,0 +1,44 @@
+"""
+Тесты общего пула HTTP-сессий RemnaWaveAPI.
+"""
+
+import pytest
+
+from app.external.remnawave_api import RemnaWaveAPI, RemnaWaveConnectionPool
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = RemnaWaveConnectionPool()
+    pool.configure(enabled=True, limit_per_host=7)
+    monkeypatch.setattr('app.external.remnawave_api.remnawave_connection_pool', pool)
+    return pool
+
+
+async def test_clients_share_pooled_session(pool):
+    async with RemnaWaveAPI('https://panel.example.com', 'key') as first:
+        session = first.session
+    async with RemnaWaveAPI('https://panel.example.com', 'key') as second:
+        assert second.session is session
+
+    assert not session.closed
+    assert session.connector.limit_per_host == 7
+    await pool.close()
+    assert session.closed
+
+
+async def test_different_credentials_get_separate_sessions(pool):
+    async with RemnaWaveAPI('https://panel.example.com', 'key-a') as first:
+        async with RemnaWaveAPI('https://panel.example.com', 'key-b') as second:
+            assert first.session is not second.session
+    await pool.close()
+
+
+async def test_disabled_pool_closes_own_session(pool):
+    pool.configure(enabled=False)
+
+    async with RemnaWaveAPI('https://panel.example.com', 'key') as api:
+        session = api.session
+
+    assert session.closed
+    assert pool.stats() == []
@@ -0,0 +1,50 @@
+from datetime import UTC, datetime
+
+import pytest
+
+from app.config import settings
+from app.services.blacklist_service import BlacklistService, _BlacklistIndex
+
+
+@pytest.fixture
+def service(monkeypatch: pytest.MonkeyPatch) -> BlacklistService:
+    monkeypatch.setattr(settings, 'BLACKLIST_CHECK_ENABLED', True, raising=False)
+    monkeypatch.setattr(settings, 'BLACKLIST_IGNORE_ADMINS', False, raising=False)
+    service = BlacklistService()
+    service._index = _BlacklistIndex.build(
+        [
+            (111, '@Spammer', 'перепродажа подписок'),
+            (222, '', 'Занесен в черный список'),
+        ]
+    )
+    service.last_update = datetime.now(UTC)
+    return service
+
+
+@pytest.mark.anyio
+async def test_lookup_by_id_and_normalized_username(service: BlacklistService) -> None:
+    assert await service.is_user_blacklisted(111) == (True, 'перепродажа подписок')
+    assert await service.is_user_blacklisted(333, ' spammer ') == (True, 'перепродажа подписок')
+    assert await service.is_user_blacklisted(444, 'someone') == (False, None)
+    assert await service.get_user_by_username('SPAMMER') == (111, '@Spammer', 'перепродажа подписок')
+    assert await service.get_user_by_telegram_id(222) == (222, '', 'Занесен в черный список')
+
+
+@pytest.mark.anyio
+async def test_check_cache_is_bounded(service: BlacklistService) -> None:
+    service._cache_maxsize = 2
+
+    for telegram_id in (1, 2, 3):
+        await service.is_user_blacklisted(telegram_id)
+
+    assert list(service._check_cache) == [2, 3]
+
+
+@pytest.mark.anyio
+async def test_stale_list_does_not_block_check(service: BlacklistService, monkeypatch: pytest.MonkeyPatch) -> None:
+    service.last_update = None
+    scheduled: list[bool] = []
+    monkeypatch.setattr(service, '_schedule_refresh', lambda: scheduled.append(True))
+
+    assert await service.is_user_blacklisted(111) == (True, 'перепродажа подписок')
+    assert scheduled == [True]
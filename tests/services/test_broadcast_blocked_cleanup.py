@@ -0,0 +1,52 @@
+"""
+Тесты пакетной очистки пользователей, заблокировавших бота после рассылки.
+"""
+
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services import broadcast_service as module
+
+
+def _session_factory():
+    session = MagicMock()
+    session.commit = AsyncMock()
+
+    @asynccontextmanager
+    async def factory():
+        yield session
+
+    return factory, session
+
+
+async def test_cleanup_runs_bulk_statements_per_chunk_and_disables_in_panel():
+    factory, session = _session_factory()
+    blocked = [[(1, 101, 'uuid-1'), (2, 102, None)], [(3, 103, 'uuid-3')]]
+    api = MagicMock()
+    api.disable_user = AsyncMock(side_effect=[None, Exception('User already disabled')])
+
+    @asynccontextmanager
+    async def api_client():
+        yield api
+
+    service = MagicMock()
+    service.get_api_client = api_client
+
+    with (
+        patch.object(module, 'AsyncSessionLocal', factory),
+        patch.object(module, '_BLOCKED_CLEANUP_CHUNK_SIZE', 2),
+        patch.object(module, 'block_users_by_telegram_ids', AsyncMock(side_effect=blocked)) as block_mock,
+        patch.object(module, 'get_user_ids_with_active_paid_subscription', AsyncMock(side_effect=[{2}, set()])),
+        patch.object(module, 'disable_active_subscriptions_for_users', AsyncMock(side_effect=[[1], [3]])) as disable,
+        patch.object(module, 'invalidate_user_context', AsyncMock()),
+        patch('app.services.subscription_service.SubscriptionService', return_value=service),
+        patch.object(module.AIMDConcurrencyController, 'record', autospec=True) as record,
+    ):
+        await module.cleanup_blocked_broadcast_users([101, 102, 101, 103])
+
+    assert [call.args[1] for call in block_mock.await_args_list] == [[101, 102], [103]]
+    assert [call.args[1] for call in disable.await_args_list] == [[1], [3]]
+    assert session.commit.await_count == 2
+    assert sorted(call.args[0] for call in api.disable_user.await_args_list) == ['uuid-1', 'uuid-3']
+    # Уже отключённый в панели пользователь — успех, а не сигнал перегрузки
+    assert [len(call.args) for call in record.call_args_list] == [2, 2]
@@ -0,0 +1,97 @@
+"""
+Тесты суточного списания: отметка списания фиксируется вместе со списанием.
+"""
+
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.database.crud.balance_ledger import BalanceChange
+from app.services import daily_subscription_service as daily_module
+from app.services.daily_subscription_service import DailySubscriptionService
+
+
+def _subscription():
+    user = SimpleNamespace(id=1, telegram_id=100, email=None, balance_kopeks=1000, language='ru')
+    tariff = SimpleNamespace(id=3, name='Daily', daily_price_kopeks=300)
+    last_charge = datetime.now(UTC) - timedelta(days=1)
+    return SimpleNamespace(
+        id=7,
+        user_id=1,
+        user=user,
+        tariff=tariff,
+        created_at=last_charge - timedelta(days=10),
+        last_daily_charge_at=last_charge,
+        end_date=last_charge + timedelta(days=1),
+    )
+
+
+@pytest.fixture
+def db():
+    session = MagicMock()
+    session.commit = AsyncMock()
+    session.rollback = AsyncMock()
+    session.refresh = AsyncMock()
+    return session
+
+
+@pytest.fixture(autouse=True)
+def _no_remnawave(monkeypatch):
+    monkeypatch.setattr(
+        'app.services.subscription_service.SubscriptionService',
+        lambda: SimpleNamespace(create_remnawave_user=AsyncMock()),
+    )
+
+
+async def test_charge_advances_mark_before_debit_commit(monkeypatch, db):
+    subscription = _subscription()
+    previous_charge = subscription.last_daily_charge_at
+    seen_marks = []
+
+    async def debit(_db, _user, amount, *_args, idempotency_key, **_kwargs):
+        # debit_user_balance делает commit: отметка к этому моменту уже сдвинута
+        seen_marks.append(subscription.last_daily_charge_at)
+        assert idempotency_key == f'daily:7:{previous_charge.isoformat()}'
+        return BalanceChange(applied=True, balance_kopeks=700)
+
+    monkeypatch.setattr(daily_module, 'debit_user_balance', debit)
+
+    result = await DailySubscriptionService()._process_single_charge(db, subscription)
+
+    assert result == 'charged'
+    assert seen_marks[0] > previous_charge
+    assert subscription.end_date > seen_marks[0]
+
+
+async def test_duplicate_charge_only_advances_mark(monkeypatch, db):
+    subscription = _subscription()
+    previous_charge = subscription.last_daily_charge_at
+    monkeypatch.setattr(
+        daily_module, 'debit_user_balance', AsyncMock(return_value=BalanceChange(applied=False, duplicate=True))
+    )
+    notify_mock = AsyncMock()
+
+    service = DailySubscriptionService()
+    service.set_bot(MagicMock())
+    monkeypatch.setattr(service, '_notify_daily_charge', notify_mock)
+
+    # День уже списан прошлым прогоном, отметка не сохранилась — подписка не должна застрять в 'error'
+    result = await service._process_single_charge(db, subscription)
+
+    assert result == 'charged'
+    assert subscription.last_daily_charge_at > previous_charge
+    db.commit.assert_awaited()
+    notify_mock.assert_not_awaited()
+
+
+async def test_failed_debit_discards_advanced_mark(monkeypatch, db):
+    subscription = _subscription()
+    monkeypatch.setattr(daily_module, 'debit_user_balance', AsyncMock(return_value=BalanceChange(applied=False)))
+
+    result = await DailySubscriptionService()._process_single_charge(db, subscription)
+
+    assert result == 'error'
+    db.rollback.assert_awaited_once()
+    db.commit.assert_not_awaited()
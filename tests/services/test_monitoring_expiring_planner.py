@@ -0,0 +1,92 @@
+"""
+Тесты set-based планировщика уведомлений об истекающих подписках.
+"""
+
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.monitoring_service import MonitoringService
+
+
+def _subscription(sub_id: int, user_id: int, telegram_id: int | None = 100):
+    user = SimpleNamespace(id=user_id, telegram_id=telegram_id)
+    return SimpleNamespace(id=sub_id, user_id=user_id, user=user, end_date=datetime.now(UTC) + timedelta(hours=5))
+
+
+def test_pick_most_urgent_keeps_one_window_per_user():
+    first = _subscription(1, user_id=10)
+    second = _subscription(2, user_id=10)
+    already_sent = _subscription(3, user_id=20)
+    fresh = _subscription(4, user_id=30)
+
+    plan = MonitoringService._pick_most_urgent(
+        [
+            (first, 3, None),
+            (second, 1, None),
+            (already_sent, 1, 77),
+            (fresh, 3, None),
+        ]
+    )
+
+    assert plan == [(second, 1), (fresh, 3)]
+
+
+def test_candidates_query_joins_sent_notifications_once():
+    stmt = MonitoringService._expiring_candidates_query([1, 3], datetime.now(UTC))
+
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+    assert sql.count('CASE WHEN') == 2  # в списке колонок и в условии join
+    assert 'LEFT OUTER JOIN sent_notifications' in sql
+    assert 'LEFT OUTER JOIN users' in sql
+    assert 'tariffs.is_daily IS false' in sql
+
+
+async def test_check_expiring_records_only_delivered_notifications():
+    service = MonitoringService(bot=MagicMock())
+    delivered = _subscription(1, user_id=10)
+    failed = _subscription(2, user_id=20)
+    plan = [(delivered, 1), (failed, 3)]
+    db = MagicMock()
+
+    send_mock = AsyncMock(side_effect=lambda user, subscription, days: subscription is delivered)
+    with (
+        patch.object(service, '_plan_expiring_notifications', AsyncMock(return_value=plan)),
+        patch.object(service, '_send_subscription_expiring_notification', send_mock),
+        patch.object(service, '_log_monitoring_event', AsyncMock()) as log_mock,
+        patch('app.services.monitoring_service.record_notifications', AsyncMock()) as record_mock,
+    ):
+        await service._check_expiring_subscriptions(db)
+
+    assert send_mock.await_count == 2
+    record_mock.assert_awaited_once_with(db, [(10, 1, 'expiring', 1)])
+    log_mock.assert_awaited_once()
+
+
+async def test_deliver_in_batches_yields_each_batch_without_pause():
+    service = MonitoringService()
+    send = AsyncMock(side_effect=[True, False, True])
+
+    with (
+        patch('app.services.monitoring_service.NOTIFICATION_BATCH_SIZE', 2),
+        patch('app.services.monitoring_service.asyncio.sleep', AsyncMock()) as sleep_mock,
+    ):
+        batches = [batch async for batch in service._deliver_in_batches([1, 2, 3], send)]
+
+    assert batches == [[(1, True), (2, False)], [(3, True)]]
+    sleep_mock.assert_not_awaited()
+
+
+async def test_check_expiring_propagates_errors_to_scheduler():
+    service = MonitoringService(bot=MagicMock())
+
+    # Ошибка должна дойти до планировщика: он откатит сессию и запишет сбой задачи
+    with (
+        patch.object(service, '_plan_expiring_notifications', AsyncMock(side_effect=RuntimeError('db down'))),
+        pytest.raises(RuntimeError, match='db down'),
+    ):
+        await service._check_expiring_subscriptions(MagicMock())
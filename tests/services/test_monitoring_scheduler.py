@@ -0,0 +1,135 @@
+"""
+Тесты планировщика задач мониторинга.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services.monitoring_scheduler import MonitoringJob, MonitoringJobScheduler
+
+
+class FakeSessionFactory:
+    def __init__(self):
+        self.sessions = []
+
+    def __call__(self):
+        session = MagicMock()
+        session.commit = AsyncMock()
+        session.rollback = AsyncMock()
+        session.__aenter__ = AsyncMock(return_value=session)
+        session.__aexit__ = AsyncMock(return_value=False)
+        self.sessions.append(session)
+        return session
+
+
+def _job(name, func, group=None, timeout=5.0):
+    return MonitoringJob(name, func, interval=lambda: 60, timeout=lambda: timeout, group=group)
+
+
+async def test_independent_jobs_run_concurrently_and_groups_serialize():
+    factory = FakeSessionFactory()
+    scheduler = MonitoringJobScheduler(factory, max_concurrency=lambda: 4)
+    active = {'grouped': 0, 'total': 0}
+    peaks = {'grouped': 0, 'total': 0}
+
+    def make(grouped: bool):
+        async def func(db):
+            active['total'] += 1
+            active['grouped'] += grouped
+            peaks['total'] = max(peaks['total'], active['total'])
+            peaks['grouped'] = max(peaks['grouped'], active['grouped'])
+            await asyncio.sleep(0.01)
+            active['total'] -= 1
+            active['grouped'] -= grouped
+            return 1
+
+        return func
+
+    scheduler.register(_job('a', make(True), group='subscriptions'))
+    scheduler.register(_job('b', make(True), group='subscriptions'))
+    scheduler.register(_job('c', make(False)))
+    scheduler.register(_job('d', make(False)))
+
+    await scheduler.run_once()
+
+    assert peaks['grouped'] == 1
+    assert peaks['total'] >= 2
+    assert len(factory.sessions) == 4  # у каждой задачи своя сессия
+    status = scheduler.get_status()
+    assert all(job['runs'] == 1 and job['last_rows'] == 1 for job in status.values())
+
+
+async def test_timeout_rolls_back_only_the_slow_job():
+    factory = FakeSessionFactory()
+    on_failure = AsyncMock()
+    scheduler = MonitoringJobScheduler(factory, max_concurrency=lambda: 2, on_failure=on_failure)
+
+    async def slow(db):
+        await asyncio.sleep(1)
+
+    async def fast(db):
+        return 3
+
+    scheduler.register(_job('slow', slow, timeout=0.01))
+    scheduler.register(_job('fast', fast))
+
+    await scheduler.run_once()
+
+    status = scheduler.get_status()
+    assert status['slow']['timeouts'] == 1
+    assert status['slow']['failures'] == 1
+    assert status['fast']['failures'] == 0
+    assert status['fast']['last_rows'] == 3
+    slow_session, fast_session = factory.sessions
+    slow_session.rollback.assert_awaited_once()
+    slow_session.commit.assert_not_called()
+    fast_session.commit.assert_awaited_once()
+    on_failure.assert_awaited_once()
+    assert on_failure.call_args[0][0] == 'slow'
+
+
+async def test_run_stops_when_flag_is_cleared(monkeypatch):
+    monkeypatch.setattr('app.services.monitoring_scheduler.MAX_TICK_SECONDS', 0.01)
+    scheduler = MonitoringJobScheduler(FakeSessionFactory(), max_concurrency=lambda: 1)
+    calls = []
+
+    async def job(db):
+        calls.append(db)
+
+    scheduler.register(_job('only', job))
+    running = True
+
+    async def stop_soon():
+        nonlocal running
+        await asyncio.sleep(0.05)
+        running = False
+
+    await asyncio.wait_for(asyncio.gather(scheduler.run(lambda: running), stop_soon()), timeout=10)
+
+    assert len(calls) == 1
+
+
+async def test_first_run_delay_postpones_daily_job(monkeypatch):
+    monkeypatch.setattr('app.services.monitoring_scheduler.MAX_TICK_SECONDS', 0.01)
+    scheduler = MonitoringJobScheduler(FakeSessionFactory(), max_concurrency=lambda: 2)
+    calls = []
+
+    async def job(db):
+        calls.append(db)
+
+    scheduler.register(_job('now', job))
+    scheduler.register(
+        MonitoringJob('daily', job, interval=lambda: 86400, timeout=lambda: 5, first_run_delay=lambda: 3600)
+    )
+    running = True
+
+    async def stop_soon():
+        nonlocal running
+        await asyncio.sleep(0.05)
+        running = False
+
+    await asyncio.wait_for(asyncio.gather(scheduler.run(lambda: running), stop_soon()), timeout=10)
+
+    status = scheduler.get_status()
+    assert status['now']['runs'] == 1
+    assert status['daily']['runs'] == 0
@@ -216,6 +216,13 @@ async def test_process_mulenpay_callback_success(monkeypatch: pytest.MonkeyPatch
     monkeypatch.setattr(payment_service_module, 'get_user_by_id', fake_get_user)
     monkeypatch.setattr(type(settings), 'format_price', lambda self, amount: f'{amount / 100:.2f}₽', raising=False)
 
+    # Баланс меняется атомарным UPDATE в БД, которой у FakeSession нет
+    async def fake_add_user_balance(db, user, amount_kopeks, description, **kwargs):
+        user.balance_kopeks += amount_kopeks
+        return True
+
+    monkeypatch.setattr(payment_service_module, 'add_user_balance', fake_add_user_balance)
+
     referral_mock = SimpleNamespace(process_referral_topup=AsyncMock())
     monkeypatch.setitem(sys.modules, 'app.services.referral_service', referral_mock)
 
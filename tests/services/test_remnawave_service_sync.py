@@ -1,9 +1,11 @@
 import sys
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import AsyncMock
 from zoneinfo import ZoneInfo
 
+import pytest
 from sqlalchemy.exc import IntegrityError
 
 
@@ -11,7 +13,12 @@ ROOT_DIR = Path(__file__).resolve().parents[2]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from app.services.remnawave_service import RemnaWaveService
+from app.services.remnawave_service import (
+    PANEL_PAYLOAD_HASH_TTL_SECONDS,
+    RemnaWavePanelSortingError,
+    RemnaWaveService,
+)
+from app.utils.adaptive_concurrency import AIMDConcurrencyController
 
 
 def _create_service() -> RemnaWaveService:
@@ -117,3 +124,206 @@ async def test_get_or_create_user_creates_new(monkeypatch):
         last_name=None,
         language='ru',
     )
+
+
+async def test_sync_page_skips_duplicates_already_applied_on_previous_page(monkeypatch):
+    service = _create_service()
+    db = AsyncMock()
+    newer = _make_panel_user(900, datetime(2025, 5, 1, tzinfo=UTC).isoformat())
+    older = _make_panel_user(900, datetime(2025, 1, 1, tzinfo=UTC).isoformat())
+    panel_ranks = {}
+    stats = {'created': 0, 'updated': 0, 'errors': 0, 'deleted': 0}
+
+    load_mock = AsyncMock(return_value=[])
+    monkeypatch.setattr(service, '_load_page_users', load_mock)
+
+    await service._sync_panel_page(db, [newer], 'update_only', panel_ranks, stats)
+    await service._sync_panel_page(db, [older], 'update_only', panel_ranks, stats)
+
+    assert load_mock.await_count == 1
+    assert panel_ranks[900] == service._panel_user_rank(newer)
+
+
+async def test_sync_page_counts_errors_only_when_retry_fails(monkeypatch):
+    service = _create_service()
+    db = AsyncMock()
+    db.commit.side_effect = [IntegrityError('COMMIT', {}, Exception('conflict')), None]
+    stats = {'created': 0, 'updated': 0, 'errors': 0, 'deleted': 0}
+
+    monkeypatch.setattr(service, '_load_page_users', AsyncMock(return_value=[]))
+
+    await service._sync_panel_page(
+        db, [_make_panel_user(901, datetime(2025, 5, 1, tzinfo=UTC).isoformat())], 'update_only', {}, stats
+    )
+
+    assert db.commit.await_count == 2
+    assert stats['errors'] == 0
+
+    db.commit.side_effect = IntegrityError('COMMIT', {}, Exception('conflict'))
+    await service._sync_panel_page(
+        db, [_make_panel_user(902, datetime(2025, 5, 1, tzinfo=UTC).isoformat())], 'update_only', {}, stats
+    )
+
+    assert stats['errors'] == 1
+
+
+async def test_sync_users_from_panel_streams_pages_and_reports_progress(monkeypatch):
+    service = _create_service()
+    db = AsyncMock()
+    pages = [
+        [_make_panel_user(1, datetime(2025, 1, 1, tzinfo=UTC).isoformat())],
+        [_make_panel_user(2, datetime(2025, 1, 1, tzinfo=UTC).isoformat())],
+    ]
+    seen_progress = []
+
+    class DummyClient:
+        async def __aenter__(self):
+            return object()
+
+        async def __aexit__(self, *args):
+            return False
+
+    async def fake_pages(api):
+        for page in pages:
+            yield page, 2
+
+    async def fake_sync_page(db, page, sync_type, panel_ranks, stats):
+        panel_ranks[page[0]['telegramId']] = (0.0, True)
+        stats['updated'] += 1
+
+    async def fake_deactivate(db, panel_telegram_ids, stats):
+        seen_progress.append(dict(service.sync_progress))
+        assert set(panel_telegram_ids) == {1, 2}
+
+    monkeypatch.setattr(service, 'get_api_client', DummyClient)
+    monkeypatch.setattr(service, '_iter_panel_user_pages', fake_pages)
+    monkeypatch.setattr(service, '_sync_panel_page', fake_sync_page)
+    monkeypatch.setattr(service, '_deactivate_users_missing_in_panel', fake_deactivate)
+
+    stats = await service.sync_users_from_panel(db, 'all')
+
+    assert stats == {'created': 0, 'updated': 2, 'errors': 0, 'deleted': 0}
+    assert seen_progress[0]['processed'] == 2
+    assert seen_progress[0]['total'] == 2
+    assert service.sync_progress['phase'] == 'done'
+
+
+def _changed_panel_user(telegram_id, updated_at):
+    return SimpleNamespace(
+        uuid=f'uuid-{telegram_id}',
+        short_uuid='short',
+        username='user',
+        status=SimpleNamespace(value='ACTIVE'),
+        telegram_id=telegram_id,
+        email=None,
+        expire_at=datetime(2026, 1, 1, tzinfo=UTC),
+        traffic_limit_bytes=0,
+        used_traffic_bytes=0,
+        hwid_device_limit=1,
+        subscription_url='',
+        happ_crypto_link='',
+        active_internal_squads=[],
+        updated_at=updated_at,
+    )
+
+
+async def test_changed_panel_users_stop_at_high_water_mark():
+    service = _create_service()
+    since = datetime(2025, 1, 1, 12, 0, tzinfo=UTC)
+    panel_user = _changed_panel_user
+
+    api = SimpleNamespace(
+        get_all_users=AsyncMock(
+            return_value={
+                'users': [
+                    panel_user(1, since + timedelta(minutes=2)),
+                    panel_user(2, since + timedelta(minutes=1)),
+                    panel_user(3, since - timedelta(minutes=1)),
+                ],
+                'total': 1000,
+            }
+        )
+    )
+
+    pages = [page async for page in service._iter_changed_panel_users(api, since, size=3)]
+
+    assert [user['telegramId'] for user in pages[0]] == [1, 2]
+    assert len(pages) == 1
+    api.get_all_users.assert_awaited_once()
+    assert api.get_all_users.await_args.kwargs['sorting'] == [{'id': 'updatedAt', 'desc': True}]
+
+
+async def test_changed_panel_users_reject_unsorted_panel():
+    service = _create_service()
+    since = datetime(2025, 1, 1, 12, 0, tzinfo=UTC)
+    api = SimpleNamespace(
+        get_all_users=AsyncMock(
+            return_value={
+                'users': [
+                    _changed_panel_user(1, since + timedelta(minutes=1)),
+                    _changed_panel_user(2, since + timedelta(minutes=5)),
+                    _changed_panel_user(3, since + timedelta(minutes=2)),
+                ],
+                'total': 1000,
+            }
+        )
+    )
+
+    with pytest.raises(RemnaWavePanelSortingError):
+        [page async for page in service._iter_changed_panel_users(api, since, size=3)]
+
+    api.get_all_users.assert_awaited_once()
+
+
+async def test_push_batch_skips_subscriptions_with_unchanged_payload(monkeypatch):
+    service = _create_service()
+    service._build_panel_user_payload = lambda sub: {
+        'expire_at': None,
+        'active_internal_squads': list(sub.connected_squads),
+        'traffic_limit_bytes': sub.traffic_limit_gb,
+    }
+
+    def make_sub(sub_id, squads):
+        user = SimpleNamespace(remnawave_uuid=f'uuid-{sub_id}', telegram_id=sub_id)
+        return SimpleNamespace(id=sub_id, user=user, end_date=None, connected_squads=squads, traffic_limit_gb=10)
+
+    unchanged = make_sub(1, ['b', 'a'])
+    changed = make_sub(2, ['a'])
+    stored = {'1': service._panel_payload_hash(make_sub(1, ['a', 'b'])), '2': 'stale'}
+
+    cache_mock = SimpleNamespace(
+        get_hash_fields=AsyncMock(side_effect=lambda name, keys: [stored.get(key) for key in keys]),
+        set_hash=AsyncMock(return_value=True),
+    )
+    monkeypatch.setattr('app.services.remnawave_service.cache', cache_mock)
+    push_mock = AsyncMock(side_effect=lambda api, sub: ('updated', sub, None))
+    monkeypatch.setattr(service, '_push_subscription_to_panel', push_mock)
+
+    stats = {'created': 0, 'updated': 0, 'errors': 0, 'unchanged': 0}
+    controller = AIMDConcurrencyController(initial=2)
+    await service._push_subscriptions_batch(object(), [unchanged, changed], controller, stats)
+
+    assert stats == {'created': 0, 'updated': 1, 'errors': 0, 'unchanged': 1}
+    push_mock.assert_awaited_once()
+    cache_mock.set_hash.assert_awaited_once_with(
+        'remnawave:panel_payload_hash',
+        {'2': service._panel_payload_hash(changed)},
+        expire=PANEL_PAYLOAD_HASH_TTL_SECONDS,
+    )
+
+
+async def test_prune_removes_hashes_of_deleted_subscriptions(monkeypatch):
+    service = _create_service()
+
+    async def scan(name):
+        yield ['1', '2', '3']
+
+    cache_mock = SimpleNamespace(scan_hash_fields=scan, delete_hash_fields=AsyncMock(return_value=2))
+    monkeypatch.setattr('app.services.remnawave_service.cache', cache_mock)
+    result = SimpleNamespace(scalars=lambda: iter([2]))
+    db = SimpleNamespace(execute=AsyncMock(return_value=result))
+
+    removed = await service._prune_panel_payload_hashes(db)
+
+    assert removed == 2
+    cache_mock.delete_hash_fields.assert_awaited_once_with('remnawave:panel_payload_hash', ['1', '3'])
@@ -0,0 +1,79 @@
+import json
+import sys
+from pathlib import Path
+from types import MappingProxyType, SimpleNamespace
+
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.config import settings
+from app.services.system_settings_service import bot_configuration_service
+
+
+def _patch_session(monkeypatch, rows):
+    class DummyResult:
+        def scalars(self):
+            return self
+
+        def all(self):
+            return rows
+
+    class DummySession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, exc_type, exc, tb):
+            return False
+
+        async def execute(self, query):
+            return DummyResult()
+
+    monkeypatch.setattr('app.services.system_settings_service.AsyncSessionLocal', DummySession)
+
+
+async def test_reload_keys_swaps_snapshot_and_reverts_deleted(monkeypatch):
+    bot_configuration_service.initialize_definitions()
+    monkeypatch.setattr(bot_configuration_service, '_env_override_keys', set())
+
+    monkeypatch.setattr(settings, 'SUPPORT_USERNAME', 'old')
+    monkeypatch.setattr(settings, 'SUPPORT_MENU_ENABLED', False)
+    original_values = dict(bot_configuration_service._original_values)
+    original_values['SUPPORT_MENU_ENABLED'] = True
+    monkeypatch.setattr(bot_configuration_service, '_original_values', original_values)
+    previous = MappingProxyType({'SUPPORT_MENU_ENABLED': 'false'})
+    monkeypatch.setattr(bot_configuration_service, '_overrides_raw', previous)
+
+    _patch_session(monkeypatch, [SimpleNamespace(key='SUPPORT_USERNAME', value='new')])
+
+    await bot_configuration_service.reload_keys(['SUPPORT_USERNAME', 'SUPPORT_MENU_ENABLED'])
+
+    assert settings.SUPPORT_USERNAME == 'new'
+    assert settings.SUPPORT_MENU_ENABLED is True
+    assert dict(bot_configuration_service._overrides_raw) == {'SUPPORT_USERNAME': 'new'}
+    # Старый снимок не изменился — его можно было читать без блокировок
+    assert dict(previous) == {'SUPPORT_MENU_ENABLED': 'false'}
+
+
+async def test_change_message_reloads_only_changed_keys_or_everything_after_gap(monkeypatch):
+    calls = []
+
+    async def fake_reload_keys(keys):
+        calls.append(('keys', keys))
+
+    async def fake_initialize():
+        calls.append(('all', None))
+
+    monkeypatch.setattr(bot_configuration_service, 'reload_keys', fake_reload_keys)
+    monkeypatch.setattr(bot_configuration_service, 'initialize', fake_initialize)
+    monkeypatch.setattr(bot_configuration_service, '_snapshot_version', 4)
+
+    await bot_configuration_service._handle_change_message(
+        json.dumps({'version': 5, 'keys': ['SUPPORT_USERNAME'], 'origin': 'other'})
+    )
+    await bot_configuration_service._handle_change_message(json.dumps({'version': 5, 'keys': ['X'], 'origin': 'other'}))
+    await bot_configuration_service._handle_change_message(json.dumps({'version': 8, 'keys': ['Y'], 'origin': 'other'}))
+
+    assert calls == [('keys', ['SUPPORT_USERNAME']), ('all', None)]
+    assert bot_configuration_service._snapshot_version == 8
@@ -0,0 +1,103 @@
+"""
+Тесты общего планировщика исходящих сообщений Telegram.
+"""
+
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+
+from app.services.telegram_send_scheduler import TelegramSendScheduler, TokenBucket
+
+
+def _scheduler(**overrides):
+    options = {'rate': 1000, 'workers': 4, 'chat_interval': 0.0, 'group_interval': 0.0, 'max_retries': 2}
+    options.update(overrides)
+    return TelegramSendScheduler(**options)
+
+
+async def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+
+    started = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+
+    assert time.monotonic() - started >= 0.09
+
+
+async def test_deliver_reports_result_per_chat():
+    scheduler = _scheduler()
+
+    async def send(chat_id):
+        if chat_id == 2:
+            raise TelegramForbiddenError(method=MagicMock(), message='bot was blocked by the user')
+        return chat_id
+
+    try:
+        results = {
+            chat_id: error
+            async for chat_id, error in scheduler.deliver([1, 2, 3], lambda chat_id: lambda: send(chat_id))
+        }
+    finally:
+        await scheduler.close()
+
+    assert set(results) == {1, 2, 3}
+    assert results[1] is None and results[3] is None
+    assert isinstance(results[2], TelegramForbiddenError)
+    assert scheduler.sent == 2
+    assert scheduler.failed == 1
+
+
+async def test_flood_wait_pauses_all_senders_and_retries():
+    scheduler = _scheduler()
+    calls = []
+
+    async def send(chat_id):
+        calls.append((chat_id, time.monotonic()))
+        if len(calls) == 1:
+            raise TelegramRetryAfter(method=MagicMock(), message='flood', retry_after=0)
+        return chat_id
+
+    try:
+        first = await scheduler.send(1, lambda: send(1))
+        second = await scheduler.send(2, lambda: send(2))
+    finally:
+        await scheduler.close()
+
+    assert (first, second) == (1, 2)
+    assert scheduler.flood_waits == 1
+    # retry_after + 1 секунда паузы применяется ко всем отправкам
+    assert calls[1][1] - calls[0][1] >= 0.9
+
+
+async def test_retries_exhausted_raise_last_error():
+    scheduler = _scheduler(max_retries=0)
+
+    async def send():
+        raise TelegramRetryAfter(method=MagicMock(), message='flood', retry_after=0)
+
+    try:
+        with pytest.raises(TelegramRetryAfter):
+            await scheduler.send(1, send)
+    finally:
+        await scheduler.close()
+
+
+async def test_messages_to_same_chat_are_spaced():
+    scheduler = _scheduler(chat_interval=0.1)
+    sent_at = []
+
+    async def send():
+        sent_at.append(time.monotonic())
+
+    try:
+        await asyncio.gather(*(scheduler.send(7, send) for _ in range(3)))
+    finally:
+        await scheduler.close()
+
+    sent_at.sort()
+    assert sent_at[1] - sent_at[0] >= 0.09
+    assert sent_at[2] - sent_at[1] >= 0.09
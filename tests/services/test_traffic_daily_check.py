@@ -0,0 +1,110 @@
+"""
+Тесты суточной проверки трафика по статистике нод.
+"""
+
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.external.remnawave_api import RemnaWaveAPIError
+from app.services.traffic_monitoring_service import TrafficMonitoringServiceV2
+
+
+GB = 1024**3
+
+
+def _panel_user(uuid: str):
+    return SimpleNamespace(
+        uuid=uuid,
+        telegram_id=1,
+        username=f'user-{uuid}',
+        user_traffic=SimpleNamespace(last_connected_node_uuid='node-a'),
+    )
+
+
+@pytest.fixture
+def api():
+    client = MagicMock()
+    client.get_all_nodes = AsyncMock(return_value=[SimpleNamespace(uuid='node-a'), SimpleNamespace(uuid='node-b')])
+    client.get_user_by_uuid = AsyncMock(side_effect=_panel_user)
+    client.get_bandwidth_stats_user = AsyncMock(return_value={'total': 0})
+    return client
+
+
+@pytest.fixture
+def service(api):
+    service = TrafficMonitoringServiceV2()
+
+    @asynccontextmanager
+    async def api_client():
+        yield api
+
+    service.remnawave_service = MagicMock()
+    service.remnawave_service.get_api_client = api_client
+    return service
+
+
+def _run_patches(service):
+    return (
+        patch.object(service, 'is_daily_check_enabled', return_value=True),
+        patch.object(service, 'get_daily_threshold_gb', return_value=10.0),
+        patch.object(service, '_load_nodes_cache', AsyncMock()),
+        patch.object(service, '_send_violation_notifications', AsyncMock()),
+    )
+
+
+async def test_daily_check_aggregates_usage_across_nodes(service, api):
+    api.get_bandwidth_stats_node_users_legacy = AsyncMock(
+        side_effect=lambda node_uuid, start, end: {
+            'node-a': [
+                {'userUuid': 'heavy', 'nodeUuid': 'node-a', 'total': 6 * GB},
+                {'userUuid': 'light', 'nodeUuid': 'node-a', 'total': 1 * GB},
+            ],
+            'node-b': [{'userUuid': 'heavy', 'nodeUuid': 'node-b', 'total': 5 * GB}],
+        }[node_uuid]
+    )
+
+    enabled, threshold, nodes_cache, notify = _run_patches(service)
+    with enabled, threshold, nodes_cache, notify:
+        violations = await service.run_daily_check(bot=None)
+
+    assert [(v.user_uuid, v.used_traffic_gb) for v in violations] == [('heavy', 11.0)]
+    assert api.get_bandwidth_stats_node_users_legacy.await_count == 2
+    api.get_user_by_uuid.assert_awaited_once_with('heavy')
+    api.get_bandwidth_stats_user.assert_not_called()
+
+
+async def test_daily_check_falls_back_to_per_user_stats(service, api):
+    api.get_bandwidth_stats_node_users_legacy = AsyncMock(side_effect=RemnaWaveAPIError('Not Found', 404))
+    api.get_bandwidth_stats_user = AsyncMock(side_effect=lambda uuid, start, end: {'total': 12 * GB})
+
+    enabled, threshold, nodes_cache, notify = _run_patches(service)
+    with (
+        enabled,
+        threshold,
+        nodes_cache,
+        notify,
+        patch.object(service, 'get_all_users_with_traffic', AsyncMock(return_value=[_panel_user('u1')])),
+    ):
+        violations = await service.run_daily_check(bot=None)
+
+    assert [v.user_uuid for v in violations] == ['u1']
+    api.get_bandwidth_stats_user.assert_awaited_once()
+
+
+async def test_daily_check_skips_failing_node(service, api):
+    def node_users(node_uuid, start, end):
+        if node_uuid == 'node-b':
+            raise RemnaWaveAPIError('Bad Gateway', 502)
+        return [{'userUuid': 'heavy', 'nodeUuid': 'node-a', 'total': 12 * GB}]
+
+    api.get_bandwidth_stats_node_users_legacy = AsyncMock(side_effect=node_users)
+
+    enabled, threshold, nodes_cache, notify = _run_patches(service)
+    with enabled, threshold, nodes_cache, notify:
+        violations = await service.run_daily_check(bot=None)
+
+    assert [(v.user_uuid, v.used_traffic_gb) for v in violations] == [('heavy', 12.0)]
+    api.get_bandwidth_stats_user.assert_not_called()
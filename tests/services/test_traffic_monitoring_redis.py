@@ -8,10 +8,12 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
 from app.services.traffic_monitoring_service import (
-    TRAFFIC_SNAPSHOT_KEY,
+    TRAFFIC_SNAPSHOT_INDEX_KEY,
     TRAFFIC_SNAPSHOT_TIME_KEY,
+    TRAFFIC_SNAPSHOT_VALUES_KEY,
     TrafficMonitoringServiceV2,
 )
+from app.utils.traffic_snapshot import TrafficSnapshot
 
 
 @pytest.fixture
@@ -26,6 +28,11 @@ def mock_cache():
     with patch('app.services.traffic_monitoring_service.cache') as mock:
         mock.set = AsyncMock(return_value=True)
         mock.get = AsyncMock(return_value=None)
+        mock.set_bytes = AsyncMock(return_value=True)
+        mock.append_bytes = AsyncMock(return_value=True)
+        mock.get_bytes = AsyncMock(return_value=None)
+        mock.strlen = AsyncMock(return_value=None)
+        mock.exists = AsyncMock(return_value=False)
         yield mock
 
 
@@ -39,38 +46,68 @@ def sample_snapshot():
     }
 
 
+def _redis_blobs(snapshot: dict) -> dict:
+    """Содержимое Redis после записи snapshot: индекс uuid и упакованные значения."""
+    packed = TrafficSnapshot.from_mapping(snapshot)
+    return {
+        TRAFFIC_SNAPSHOT_INDEX_KEY: packed.index.encode(),
+        TRAFFIC_SNAPSHOT_VALUES_KEY: packed.pack_values(),
+    }
+
+
+def _serve_blobs(mock_cache, snapshot: dict):
+    blobs = _redis_blobs(snapshot)
+    mock_cache.get_bytes = AsyncMock(side_effect=blobs.get)
+    mock_cache.strlen = AsyncMock(side_effect=lambda key: len(blobs[key]))
+
+
 # ============== Тесты сохранения snapshot в Redis ==============
 
 
 async def test_save_snapshot_to_redis_success(service, mock_cache, sample_snapshot):
     """Тест успешного сохранения snapshot в Redis."""
-    mock_cache.set = AsyncMock(return_value=True)
-
-    result = await service._save_snapshot_to_redis(sample_snapshot)
+    result = await service._save_snapshot_to_redis(TrafficSnapshot.from_mapping(sample_snapshot))
 
     assert result is True
-    assert mock_cache.set.call_count == 2  # snapshot + time
+    # Индекс uuid и значения — бинарными блобами, время — JSON
+    saved = {call[0][0]: call[0][1] for call in mock_cache.set_bytes.call_args_list}
+    assert saved == _redis_blobs(sample_snapshot)
+    mock_cache.set.assert_called_once()
+    assert mock_cache.set.call_args[0][0] == TRAFFIC_SNAPSHOT_TIME_KEY
+
+
+async def test_save_snapshot_appends_only_new_uuids(service, mock_cache, sample_snapshot):
+    """Повторная запись дописывает в индекс только новые uuid."""
+    snapshot = TrafficSnapshot.from_mapping(sample_snapshot)
+    await service._save_snapshot_to_redis(snapshot)
+    index_size = len(_redis_blobs(sample_snapshot)[TRAFFIC_SNAPSHOT_INDEX_KEY])
+    mock_cache.strlen = AsyncMock(return_value=index_size)
+    mock_cache.set_bytes.reset_mock()
+
+    successor = snapshot.successor()
+    successor.set('uuid-1', 2)
+    successor.set('uuid-4', 1)
+    assert await service._save_snapshot_to_redis(successor) is True
 
-    # Проверяем что сохранён snapshot
-    first_call = mock_cache.set.call_args_list[0]
-    assert first_call[0][0] == TRAFFIC_SNAPSHOT_KEY
-    assert first_call[0][1] == sample_snapshot
+    mock_cache.append_bytes.assert_awaited_once()
+    assert mock_cache.append_bytes.call_args[0][:2] == (TRAFFIC_SNAPSHOT_INDEX_KEY, b'uuid-4\n')
+    assert [call[0][0] for call in mock_cache.set_bytes.call_args_list] == [TRAFFIC_SNAPSHOT_VALUES_KEY]
 
 
 async def test_save_snapshot_to_redis_failure(service, mock_cache, sample_snapshot):
     """Тест неудачного сохранения snapshot в Redis."""
-    mock_cache.set = AsyncMock(return_value=False)
+    mock_cache.set_bytes = AsyncMock(return_value=False)
 
-    result = await service._save_snapshot_to_redis(sample_snapshot)
+    result = await service._save_snapshot_to_redis(TrafficSnapshot.from_mapping(sample_snapshot))
 
     assert result is False
 
 
 async def test_save_snapshot_to_redis_exception(service, mock_cache, sample_snapshot):
     """Тест обработки исключения при сохранении."""
-    mock_cache.set = AsyncMock(side_effect=Exception('Redis error'))
+    mock_cache.set_bytes = AsyncMock(side_effect=Exception('Redis error'))
 
-    result = await service._save_snapshot_to_redis(sample_snapshot)
+    result = await service._save_snapshot_to_redis(TrafficSnapshot.from_mapping(sample_snapshot))
 
     assert result is False
 
@@ -80,17 +117,29 @@ async def test_save_snapshot_to_redis_exception(service, mock_cache, sample_snap
 
 async def test_load_snapshot_from_redis_success(service, mock_cache, sample_snapshot):
     """Тест успешной загрузки snapshot из Redis."""
-    mock_cache.get = AsyncMock(return_value=sample_snapshot)
+    _serve_blobs(mock_cache, sample_snapshot)
 
     result = await service._load_snapshot_from_redis()
 
-    assert result == sample_snapshot
-    mock_cache.get.assert_called_once_with(TRAFFIC_SNAPSHOT_KEY)
+    assert result.to_dict() == sample_snapshot
+    assert result.get('uuid-2') == 2147483648
+
+
+async def test_load_snapshot_reuses_known_index(service, mock_cache, sample_snapshot):
+    """Если индекс в Redis не менялся, повторно он не скачивается."""
+    _serve_blobs(mock_cache, sample_snapshot)
+    await service._load_snapshot_from_redis()
+    mock_cache.get_bytes.reset_mock()
+
+    result = await service._load_snapshot_from_redis()
+
+    assert result.to_dict() == sample_snapshot
+    mock_cache.get_bytes.assert_awaited_once_with(TRAFFIC_SNAPSHOT_VALUES_KEY)
 
 
 async def test_load_snapshot_from_redis_empty(service, mock_cache):
     """Тест загрузки когда snapshot отсутствует."""
-    mock_cache.get = AsyncMock(return_value=None)
+    mock_cache.get_bytes = AsyncMock(return_value=None)
 
     result = await service._load_snapshot_from_redis()
 
@@ -98,8 +147,10 @@ async def test_load_snapshot_from_redis_empty(service, mock_cache):
 
 
 async def test_load_snapshot_from_redis_invalid_data(service, mock_cache):
-    """Тест загрузки невалидных данных."""
-    mock_cache.get = AsyncMock(return_value='not a dict')
+    """Тест загрузки значений, не согласованных с индексом."""
+    blobs = _redis_blobs({'uuid-1': 1})
+    blobs[TRAFFIC_SNAPSHOT_VALUES_KEY] *= 2
+    mock_cache.get_bytes = AsyncMock(side_effect=blobs.get)
 
     result = await service._load_snapshot_from_redis()
 
@@ -108,7 +159,7 @@ async def test_load_snapshot_from_redis_invalid_data(service, mock_cache):
 
 async def test_load_snapshot_from_redis_exception(service, mock_cache):
     """Тест обработки исключения при загрузке."""
-    mock_cache.get = AsyncMock(side_effect=Exception('Redis error'))
+    mock_cache.get_bytes = AsyncMock(side_effect=Exception('Redis error'))
 
     result = await service._load_snapshot_from_redis()
 
@@ -143,11 +194,12 @@ async def test_get_snapshot_time_from_redis_empty(service, mock_cache):
 
 async def test_has_snapshot_redis_exists(service, mock_cache, sample_snapshot):
     """Тест has_snapshot когда snapshot есть в Redis."""
-    mock_cache.get = AsyncMock(return_value=sample_snapshot)
+    mock_cache.exists = AsyncMock(return_value=1)
 
     result = await service.has_snapshot()
 
     assert result is True
+    mock_cache.get_bytes.assert_not_called()
 
 
 async def test_has_snapshot_memory_fallback(service, mock_cache):
@@ -155,7 +207,7 @@ async def test_has_snapshot_memory_fallback(service, mock_cache):
     mock_cache.get = AsyncMock(return_value=None)
 
     # Устанавливаем данные в память
-    service._memory_snapshot = {'uuid-1': 1000.0}
+    service._memory_snapshot = TrafficSnapshot.from_mapping({'uuid-1': 1000.0})
     service._memory_snapshot_time = datetime.now(UTC)
 
     result = await service.has_snapshot()
@@ -165,8 +217,7 @@ async def test_has_snapshot_memory_fallback(service, mock_cache):
 
 async def test_has_snapshot_none(service, mock_cache):
     """Тест has_snapshot когда snapshot нет нигде."""
-    mock_cache.get = AsyncMock(return_value=None)
-    service._memory_snapshot = {}
+    service._memory_snapshot = None
     service._memory_snapshot_time = None
 
     result = await service.has_snapshot()
@@ -213,27 +264,25 @@ async def test_get_snapshot_age_minutes_no_snapshot(service, mock_cache):
 
 async def test_save_snapshot_redis_success(service, mock_cache, sample_snapshot):
     """Тест сохранения snapshot в Redis успешно."""
-    mock_cache.set = AsyncMock(return_value=True)
-
     # Заполняем память чтобы проверить что она очистится
-    service._memory_snapshot = {'old': 123.0}
+    service._memory_snapshot = TrafficSnapshot.from_mapping({'old': 123.0})
     service._memory_snapshot_time = datetime.now(UTC)
 
-    result = await service._save_snapshot(sample_snapshot)
+    result = await service._save_snapshot(TrafficSnapshot.from_mapping(sample_snapshot))
 
     assert result is True
-    assert service._memory_snapshot == {}  # Память очищена
+    assert service._memory_snapshot is None  # Память очищена
     assert service._memory_snapshot_time is None
 
 
 async def test_save_snapshot_fallback_to_memory(service, mock_cache, sample_snapshot):
     """Тест fallback на память когда Redis недоступен."""
-    mock_cache.set = AsyncMock(return_value=False)
+    mock_cache.set_bytes = AsyncMock(return_value=False)
 
-    result = await service._save_snapshot(sample_snapshot)
+    result = await service._save_snapshot(TrafficSnapshot.from_mapping(sample_snapshot))
 
     assert result is True
-    assert service._memory_snapshot == sample_snapshot
+    assert service._memory_snapshot.to_dict() == sample_snapshot
     assert service._memory_snapshot_time is not None
 
 
@@ -242,21 +291,20 @@ async def test_save_snapshot_fallback_to_memory(service, mock_cache, sample_snap
 
 async def test_get_current_snapshot_from_redis(service, mock_cache, sample_snapshot):
     """Тест получения snapshot из Redis."""
-    mock_cache.get = AsyncMock(return_value=sample_snapshot)
+    _serve_blobs(mock_cache, sample_snapshot)
 
     result = await service._get_current_snapshot()
 
-    assert result == sample_snapshot
+    assert result.to_dict() == sample_snapshot
 
 
 async def test_get_current_snapshot_fallback_to_memory(service, mock_cache, sample_snapshot):
     """Тест fallback на память."""
-    mock_cache.get = AsyncMock(return_value=None)
-    service._memory_snapshot = sample_snapshot
+    service._memory_snapshot = TrafficSnapshot.from_mapping(sample_snapshot)
 
     result = await service._get_current_snapshot()
 
-    assert result == sample_snapshot
+    assert result.to_dict() == sample_snapshot
 
 
 # ============== Тесты уведомлений ==============
@@ -339,12 +387,8 @@ async def test_record_notification_fallback_to_memory(service, mock_cache):
 
 async def test_create_initial_snapshot_uses_existing_redis(service, mock_cache, sample_snapshot):
     """Тест что create_initial_snapshot использует существующий snapshot из Redis."""
-    mock_cache.get = AsyncMock(
-        side_effect=[
-            sample_snapshot,  # _load_snapshot_from_redis
-            (datetime.now(UTC) - timedelta(minutes=10)).isoformat(),  # _get_snapshot_time_from_redis
-        ]
-    )
+    _serve_blobs(mock_cache, sample_snapshot)
+    mock_cache.get = AsyncMock(return_value=(datetime.now(UTC) - timedelta(minutes=10)).isoformat())
 
     with patch.object(service, 'get_all_users_with_traffic', new_callable=AsyncMock) as mock_get_users:
         result = await service.create_initial_snapshot()
@@ -356,9 +400,6 @@ async def test_create_initial_snapshot_uses_existing_redis(service, mock_cache,
 
 async def test_create_initial_snapshot_creates_new(service, mock_cache):
     """Тест создания нового snapshot когда в Redis пусто."""
-    mock_cache.get = AsyncMock(return_value=None)
-    mock_cache.set = AsyncMock(return_value=True)
-
     # Мокаем пользователей из API
     mock_user = MagicMock()
     mock_user.uuid = 'uuid-1'
@@ -391,3 +432,40 @@ async def test_cleanup_notification_cache_removes_old(service, mock_cache):
 
     assert 'uuid-old' not in service._memory_notification_cache
     assert 'uuid-recent' in service._memory_notification_cache
+
+
+# ============== Тесты run_fast_check ==============
+
+
+async def test_run_fast_check_reports_only_users_over_threshold(service, mock_cache, sample_snapshot):
+    """Быстрая проверка считает дельты по snapshot и создаёт нарушения только выше порога."""
+    _serve_blobs(mock_cache, sample_snapshot)
+    mock_cache.exists = AsyncMock(return_value=1)
+
+    def panel_user(uuid, used_bytes):
+        user = MagicMock()
+        user.uuid = uuid
+        user.user_traffic.used_traffic_bytes = used_bytes
+        user.user_traffic.last_connected_node_uuid = None
+        return user
+
+    users = [
+        panel_user('uuid-1', 1073741824 + 1024),
+        panel_user('uuid-2', 2147483648 + 10 * 1073741824),
+        panel_user('uuid-new', 50 * 1073741824),
+    ]
+
+    with (
+        patch.object(service, 'get_all_users_with_traffic', AsyncMock(return_value=users)),
+        patch.object(service, '_load_nodes_cache', AsyncMock()),
+        patch.object(service, '_send_violation_notifications', AsyncMock()),
+        patch.object(service, 'is_fast_check_enabled', return_value=True),
+        patch.object(service, 'get_fast_check_threshold_gb', return_value=5.0),
+        patch.object(service, 'get_excluded_user_uuids', return_value=[]),
+    ):
+        violations = await service.run_fast_check(bot=None)
+
+    assert [violation.user_uuid for violation in violations] == ['uuid-2']
+    assert violations[0].used_traffic_gb == 10.0
+    values_call = mock_cache.set_bytes.call_args_list[-1]
+    assert values_call[0][0] == TRAFFIC_SNAPSHOT_VALUES_KEY
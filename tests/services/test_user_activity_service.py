@@ -0,0 +1,94 @@
+"""
+Тесты write-behind трекера активности пользователей.
+"""
+
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.user_activity_service import (
+    PendingProfile,
+    UserActivityTracker,
+    _activity_statement,
+    _profile_statement,
+)
+
+
+def _session_factory(session):
+    factory = MagicMock()
+    factory.return_value.__aenter__ = AsyncMock(return_value=session)
+    factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    return factory
+
+
+@pytest.fixture
+def session():
+    db = MagicMock()
+    db.execute = AsyncMock()
+    db.commit = AsyncMock()
+    return db
+
+
+async def test_touch_coalesces_to_latest_value(session):
+    tracker = UserActivityTracker()
+    first = datetime(2026, 1, 1, tzinfo=UTC)
+    tracker.touch(1, first)
+    tracker.touch(1, first + timedelta(seconds=5))
+    tracker.touch(2, first)
+
+    assert tracker.pending_count() == 2
+
+    with patch('app.services.user_activity_service.AsyncSessionLocal', _session_factory(session)):
+        flushed = await tracker.flush()
+
+    assert flushed == 2
+    assert session.execute.await_count == 1
+    session.commit.assert_awaited_once()
+    assert tracker.pending_count() == 0
+
+
+async def test_flush_without_changes_skips_database(session):
+    tracker = UserActivityTracker()
+
+    with patch('app.services.user_activity_service.AsyncSessionLocal', _session_factory(session)):
+        assert await tracker.flush() == 0
+
+    session.execute.assert_not_called()
+
+
+async def test_failed_flush_keeps_newer_values(session):
+    tracker = UserActivityTracker()
+    old = datetime(2026, 1, 1, tzinfo=UTC)
+    tracker.touch(1, old)
+    tracker.record_profile(1, 'name', 'First', None)
+
+    async def fail_and_touch(*args, **kwargs):
+        tracker.touch(1, old + timedelta(minutes=1))
+        raise RuntimeError('db down')
+
+    session.execute = AsyncMock(side_effect=fail_and_touch)
+
+    with patch('app.services.user_activity_service.AsyncSessionLocal', _session_factory(session)):
+        with pytest.raises(RuntimeError):
+            await tracker.flush()
+
+    assert tracker._activity[1] == old + timedelta(minutes=1)
+    assert tracker.get_pending_profile(1).username == 'name'
+
+
+def test_statements_use_single_values_update():
+    now = datetime.now(UTC)
+
+    with patch('app.services.user_activity_service.IS_SQLITE', False):
+        (activity_stmt,) = _activity_statement([(1, now), (2, now)])
+        (profile_stmt,) = _profile_statement([(1, PendingProfile('u', 'F', None, now))])
+
+    activity_sql = str(activity_stmt.compile(dialect=postgresql.dialect()))
+    profile_sql = str(profile_stmt.compile(dialect=postgresql.dialect()))
+
+    assert 'FROM (VALUES' in activity_sql
+    assert 'updated_at=users.updated_at' in activity_sql
+    assert 'FROM (VALUES' in profile_sql
+    assert 'username=v.username' in profile_sql
@@ -0,0 +1,59 @@
+import pytest
+
+from app.config import settings
+from app.localization import loader
+from app.localization.texts import get_texts
+
+
+def test_get_texts_returns_shared_instance_until_locale_cache_cleared() -> None:
+    texts = get_texts('en')
+
+    assert get_texts('en') is texts
+    assert get_texts(None) is get_texts(loader.DEFAULT_LANGUAGE)
+    assert get_texts(' EN ') is texts
+
+    loader.clear_locale_cache()
+
+    assert get_texts('en') is not texts
+
+
+def test_shared_texts_are_read_only_and_follow_current_prices(monkeypatch: pytest.MonkeyPatch) -> None:
+    texts = get_texts('en')
+
+    with pytest.raises(AttributeError):
+        texts.language = 'ru'
+
+    monkeypatch.setattr(settings, 'PRICE_TRAFFIC_UNLIMITED', 12300)
+    assert f'📊 Unlimited - {settings.format_price(12300)}' == texts.TRAFFIC_UNLIMITED
+
+
+def test_locale_bundle_resolves_fallback_at_compile_time(monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+    monkeypatch.setattr(settings, 'LOCALE_BUNDLES_PATH', str(tmp_path), raising=False)
+    loader.clear_locale_cache()
+
+    _version, _fingerprint, own, fallback_keys = loader.compile_locale_bundle('en')
+    default_locale = loader.load_locale(loader.DEFAULT_LANGUAGE)
+
+    assert (tmp_path / 'en.bundle').exists()
+    assert set(fallback_keys) == set(default_locale) - set(own)
+
+    bundle = loader.load_locale_bundle('en')
+    default_bundle = loader.load_locale_bundle(loader.DEFAULT_LANGUAGE)
+    for key in fallback_keys:
+        # Строки языка по умолчанию не копируются, а разделяются между языками
+        assert bundle[key] is default_bundle[key]
+    loader.clear_locale_cache()
+
+
+def test_unknown_language_maps_to_default_before_touching_disk(monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+    bundles_dir = tmp_path / 'bundles'
+    monkeypatch.setattr(settings, 'LOCALE_BUNDLES_PATH', str(bundles_dir), raising=False)
+    loader.clear_locale_cache()
+
+    assert loader.resolve_language('../evil') == loader.DEFAULT_LANGUAGE
+    assert loader.resolve_language('EN-us') == 'en'
+    assert get_texts('../evil') is get_texts(loader.DEFAULT_LANGUAGE)
+    assert get_texts('xx-unknown') is get_texts(loader.DEFAULT_LANGUAGE)
+
+    assert [path.name for path in tmp_path.rglob('*.bundle')] == [f'{loader.DEFAULT_LANGUAGE}.bundle']
+    loader.clear_locale_cache()
@@ -0,0 +1,55 @@
+"""
+Тесты AIMD-регулятора параллелизма.
+"""
+
+import asyncio
+
+from app.external.remnawave_api import RemnaWaveAPIError
+from app.utils.adaptive_concurrency import AIMDConcurrencyController
+
+
+def test_fast_responses_grow_limit_additively():
+    controller = AIMDConcurrencyController(initial=4, max_limit=10, latency_target=1.0)
+
+    for _ in range(3):
+        controller.record(0.1)
+    assert controller.current_limit == 4
+
+    for _ in range(3):
+        controller.record(0.1)
+    assert controller.current_limit == 5
+
+
+def test_throttling_halves_limit_once_per_cooldown():
+    controller = AIMDConcurrencyController(initial=16, latency_target=1.0, cooldown=60)
+    throttled = RemnaWaveAPIError('Too Many Requests', 429)
+
+    controller.record(0.1, throttled)
+    controller.record(0.1, throttled)
+
+    assert controller.current_limit == 8
+    assert controller.get_stats()['throttled'] == 2
+
+
+def test_client_errors_do_not_reduce_limit():
+    controller = AIMDConcurrencyController(initial=8, latency_target=1.0, cooldown=0)
+
+    controller.record(0.1, RemnaWaveAPIError('Bad Request', 400))
+
+    assert controller.current_limit == 8
+
+
+async def test_slot_caps_in_flight_requests():
+    controller = AIMDConcurrencyController(initial=2, max_limit=2)
+    peak = 0
+
+    async def worker():
+        nonlocal peak
+        async with controller.slot():
+            peak = max(peak, controller.in_flight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(worker() for _ in range(6)))
+
+    assert peak == 2
+    assert controller.in_flight == 0
@@ -0,0 +1,67 @@
+"""
+Тесты пула CPU-задач.
+"""
+
+import threading
+import time
+
+import pytest
+
+from app.utils.cpu_executor import CpuExecutor, CpuExecutorOverloadedError
+
+
+@pytest.mark.anyio
+async def test_runs_off_loop_and_records_metrics() -> None:
+    executor = CpuExecutor(max_workers=1, max_queue=1)
+    loop_thread = threading.get_ident()
+
+    worker_thread = await executor.run('hash', threading.get_ident)
+
+    assert worker_thread != loop_thread
+    stats = executor.get_stats()
+    assert stats['kinds']['hash']['completed'] == 1
+    assert stats['pending'] == 0
+    executor.shutdown()
+
+
+@pytest.mark.anyio
+async def test_errors_are_reraised_and_counted() -> None:
+    executor = CpuExecutor(max_workers=1, max_queue=1)
+
+    with pytest.raises(ValueError):
+        await executor.run('bcrypt', int, 'not a number')
+
+    assert executor.get_stats()['kinds']['bcrypt']['failed'] == 1
+    executor.shutdown()
+
+
+@pytest.mark.anyio
+async def test_sheds_only_when_queue_is_full() -> None:
+    executor = CpuExecutor(max_workers=1, max_queue=0)
+    executor._pending = 1  # единственный поток занят
+
+    with pytest.raises(CpuExecutorOverloadedError):
+        await executor.run('bcrypt', len, 'x', shed=True)
+    # Без shed задача ждёт свободный поток, а не отклоняется
+    assert await executor.run('qr', len, 'xy') == 2
+
+    assert executor.get_stats()['kinds']['bcrypt']['rejected'] == 1
+    executor.shutdown()
+
+
+@pytest.mark.anyio
+async def test_failed_task_time_is_still_recorded() -> None:
+    executor = CpuExecutor(max_workers=1, max_queue=1)
+
+    def slow_failure() -> None:
+        time.sleep(0.01)
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        await executor.run('qr', slow_failure)
+
+    stats = executor.get_stats()['kinds']['qr']
+    assert stats['failed'] == 1
+    assert stats['completed'] == 0
+    assert stats['run_seconds'] >= 0.01
+    executor.shutdown()
@@ -0,0 +1,37 @@
+from app.utils.rate_limit_store import MemoryRateLimitStore
+
+
+def test_sliding_window_counts_only_allowed_calls() -> None:
+    store = MemoryRateLimitStore()
+
+    assert [store.hit_now('cmd:start:1', 3, 60.0, 100.0 + i) for i in range(3)] == [0.0, 0.0, 0.0]
+    assert store.hit_now('cmd:start:1', 3, 60.0, 103.0) == 57.0
+    # Отклонённый вызов не продлевает окно
+    assert store.hit_now('cmd:start:1', 3, 60.0, 160.0) == 0.0
+
+
+def test_time_wheel_evicts_expired_keys() -> None:
+    store = MemoryRateLimitStore(maxsize=1_000_000)
+
+    now = 0.0
+    for user_id in range(50_000):
+        now += 0.001
+        store.hit_now(f'any:{user_id}', 1, 0.5, now)
+
+    # Живут только ключи последних ~1.5 сек (окно + тик колеса), вытеснять по размеру не пришлось
+    assert len(store) <= 1_600
+    assert store.evicted == 0
+
+
+def test_size_bound_evicts_least_recently_used() -> None:
+    store = MemoryRateLimitStore(maxsize=2)
+
+    store.hit_now('a', 5, 60.0, 1.0)
+    store.hit_now('b', 5, 60.0, 1.0)
+    store.hit_now('a', 5, 60.0, 1.1)
+    store.hit_now('c', 5, 60.0, 1.2)
+
+    assert len(store) == 2
+    assert store.evicted == 1
+    assert store.hit_now('a', 1, 60.0, 1.3) > 0
+    assert store.hit_now('b', 1, 60.0, 1.3) == 0.0
@@ -1,14 +1,14 @@
 import asyncio
 from collections import deque
-from datetime import UTC, datetime, time as time_cls
+from datetime import UTC, datetime, time as time_cls, timedelta
 from types import SimpleNamespace
 from unittest.mock import AsyncMock
 
 import pytest
 
 from app.config import settings
-from app.services.remnawave_service import RemnaWaveConfigurationError
-from app.services.remnawave_sync_service import RemnaWaveAutoSyncService
+from app.services.remnawave_service import RemnaWaveConfigurationError, RemnaWavePanelSortingError
+from app.services.remnawave_sync_service import DELTA_OVERLAP, RemnaWaveAutoSyncService
 
 
 @pytest.mark.parametrize(
@@ -129,3 +129,118 @@ def test_perform_sync_rebuilds_service_on_each_run(monkeypatch):
 
     assert not services
     cache_mock.delete_pattern.assert_awaited_once_with('available_countries*')
+
+
+def test_delta_sync_advances_marks_and_reports_lag(monkeypatch):
+    panel_mark = datetime(2024, 1, 1, 12, 0, tzinfo=UTC)
+    bot_mark = datetime(2024, 1, 1, 12, 5, tzinfo=UTC)
+
+    class StubService:
+        is_configured = True
+        configuration_error = None
+
+        def __init__(self):
+            self.pull_since = None
+            self.push_kwargs = None
+
+        async def sync_changed_users_from_panel(self, session, since):
+            self.pull_since = since
+            return {'changed': 2, 'errors': 0}, panel_mark + timedelta(minutes=1), {7}
+
+        async def sync_changed_subscriptions_to_panel(self, session, since, **kwargs):
+            self.push_kwargs = kwargs
+            return {'changed': 3, 'errors': 1}, bot_mark + timedelta(minutes=1)
+
+    stub = StubService()
+
+    class DummySession:
+        async def __aenter__(self):
+            return SimpleNamespace()
+
+        async def __aexit__(self, exc_type, exc, tb):
+            return False
+
+    cache_mock = SimpleNamespace(get=AsyncMock(return_value=None), set=AsyncMock(return_value=True))
+    monkeypatch.setattr('app.services.remnawave_sync_service.AsyncSessionLocal', DummySession)
+    monkeypatch.setattr('app.services.remnawave_sync_service.cache', cache_mock)
+
+    async def runner():
+        service = RemnaWaveAutoSyncService(service_factory=lambda: stub)
+        service._delta_marks = {'panel': panel_mark, 'bot': bot_mark}
+
+        result = await service.run_delta_sync_now()
+
+        assert result['started'] is True
+        assert stub.push_kwargs == {'exclude_user_ids': {7}}
+        assert stub.pull_since == panel_mark - DELTA_OVERLAP
+        # Прогон с ошибками не сдвигает отметку своего направления
+        assert service._delta_marks == {'panel': panel_mark + timedelta(minutes=1), 'bot': bot_mark}
+        stats = service.get_status().last_delta_stats
+        assert stats['delta_size'] == 5
+        assert stats['lag_seconds'] > 0
+
+    asyncio.run(runner())
+
+
+def test_delta_sync_disables_pull_for_unsorted_panel(monkeypatch):
+    panel_mark = datetime(2024, 1, 1, 12, 0, tzinfo=UTC)
+    bot_mark = datetime(2024, 1, 1, 12, 5, tzinfo=UTC)
+
+    class StubService:
+        is_configured = True
+        configuration_error = None
+
+        def __init__(self):
+            self.sync_changed_users_from_panel = AsyncMock(side_effect=RemnaWavePanelSortingError())
+            self.sync_changed_subscriptions_to_panel = AsyncMock(
+                return_value=({'changed': 1, 'errors': 0}, bot_mark + timedelta(minutes=1))
+            )
+
+    stub = StubService()
+
+    class DummySession:
+        async def __aenter__(self):
+            return SimpleNamespace()
+
+        async def __aexit__(self, exc_type, exc, tb):
+            return False
+
+    cache_mock = SimpleNamespace(get=AsyncMock(return_value=None), set=AsyncMock(return_value=True))
+    monkeypatch.setattr('app.services.remnawave_sync_service.AsyncSessionLocal', DummySession)
+    monkeypatch.setattr('app.services.remnawave_sync_service.cache', cache_mock)
+
+    async def runner():
+        service = RemnaWaveAutoSyncService(service_factory=lambda: stub)
+        service._delta_marks = {'panel': panel_mark, 'bot': bot_mark}
+
+        await service.run_delta_sync_now()
+        await service.run_delta_sync_now()
+
+        # Панель опрашивается один раз, отметка панели остаётся для полной синхронизации
+        stub.sync_changed_users_from_panel.assert_awaited_once()
+        assert stub.sync_changed_subscriptions_to_panel.await_count == 2
+        assert stub.sync_changed_subscriptions_to_panel.await_args.kwargs == {'exclude_user_ids': set()}
+        assert service._delta_marks['panel'] == panel_mark
+        assert service.get_status().last_delta_stats['panel_pull_disabled'] is True
+
+    asyncio.run(runner())
+
+
+@pytest.mark.parametrize(('errors', 'panel_advanced'), [(0, True), (2, False)])
+def test_full_sync_advances_only_panel_mark_without_errors(monkeypatch, errors, panel_advanced):
+    old_mark = datetime(2024, 1, 1, 12, 0, tzinfo=UTC)
+    cache_mock = SimpleNamespace(get=AsyncMock(return_value=None), set=AsyncMock(return_value=True))
+    monkeypatch.setattr('app.services.remnawave_sync_service.cache', cache_mock)
+
+    async def runner():
+        service = RemnaWaveAutoSyncService(service_factory=SimpleNamespace)
+        service._delta_marks = {'panel': old_mark, 'bot': old_mark}
+        service._perform_sync = AsyncMock(return_value=({'errors': errors}, {}))
+
+        result = await service.run_sync_now()
+
+        assert result['success'] is True
+        assert service._delta_marks['bot'] == old_mark
+        assert (service._delta_marks['panel'] > old_mark) is panel_advanced
+
+    asyncio.run(runner())
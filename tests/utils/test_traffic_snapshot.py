@@ -0,0 +1,59 @@
+"""
+Тесты колоночного snapshot трафика.
+"""
+
+from app.utils.traffic_snapshot import COMPACT_MIN_SIZE, TrafficSnapshot, UuidIndex
+
+
+GB = 1024**3
+
+
+def test_delta_report_skips_new_missing_and_reset_users():
+    previous = TrafficSnapshot.from_mapping({'grown': 1 * GB, 'heavy': 1 * GB, 'reset': 5 * GB, 'gone': 1 * GB})
+    current = previous.successor()
+    current.set('grown', 1 * GB + 10)
+    current.set('heavy', 4 * GB)
+    current.set('reset', 0)
+    current.set('new', 100 * GB)
+
+    grown, exceeding = current.delta_report(previous, 2 * GB)
+
+    assert grown == 2
+    assert exceeding == [('heavy', 3 * GB)]
+
+
+def test_successor_keeps_positions_stable():
+    previous = TrafficSnapshot.from_mapping({'a': 1, 'b': 2})
+    current = previous.successor()
+    current.set('c', 3)
+    current.set('a', 5)
+
+    assert current.index is previous.index
+    assert current.index.uuids == ['a', 'b', 'c']
+    assert current.to_dict() == {'a': 5, 'c': 3}
+    assert previous.get('c') is None
+
+
+def test_pack_unpack_roundtrip_pads_appended_index():
+    snapshot = TrafficSnapshot.from_mapping({'a': 1, 'b': 2})
+    blob = snapshot.pack_values()
+    index = UuidIndex.decode(snapshot.index.encode() + b'c\n')
+
+    restored = TrafficSnapshot.unpack(index, blob)
+
+    assert restored.to_dict() == {'a': 1, 'b': 2}
+    assert index.persisted == 3
+    assert TrafficSnapshot.unpack(UuidIndex(['a']), blob) is None
+
+
+def test_sparse_snapshot_is_compacted():
+    previous = TrafficSnapshot.from_mapping({f'u{i}': i for i in range(COMPACT_MIN_SIZE * 2)})
+    current = previous.successor()
+    for i in range(COMPACT_MIN_SIZE // 2):
+        current.set(f'u{i}', i + 1)
+
+    assert current.needs_compaction()
+    compacted = current.compacted()
+    assert compacted.to_dict() == current.to_dict()
+    assert len(compacted.index) == COMPACT_MIN_SIZE // 2
+    assert compacted.index.persisted == 0
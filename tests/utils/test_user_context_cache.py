@@ -0,0 +1,109 @@
+"""
+Тесты двухуровневого кеша контекста пользователя.
+"""
+
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.utils.user_context_cache import SNAPSHOT_VERSION, UserContext, UserContextCache
+
+
+@pytest.fixture
+def mock_cache():
+    with patch('app.utils.user_context_cache.cache') as mock:
+        mock.get = AsyncMock(return_value=None)
+        mock.set = AsyncMock(return_value=True)
+        mock.delete = AsyncMock(return_value=True)
+        yield mock
+
+
+def _context(telegram_id: int = 100, user_id: int = 1, **overrides) -> UserContext:
+    values = {
+        'user_id': user_id,
+        'telegram_id': telegram_id,
+        'status': 'active',
+        'language': 'ru',
+        'username': 'user',
+        'first_name': 'Ivan',
+        'last_name': None,
+        'balance_kopeks': 1000,
+        'remnawave_uuid': None,
+        'promo_group_id': 1,
+        'subscription_id': 5,
+        'subscription_status': 'active',
+        'subscription_end_date': datetime.now(UTC) + timedelta(days=3),
+    }
+    values.update(overrides)
+    return UserContext(**values)
+
+
+def test_context_roundtrip_through_dict():
+    context = _context()
+
+    restored = UserContext.from_dict(context.to_dict())
+
+    assert restored == context
+    assert restored.has_active_subscription is True
+
+
+def test_context_with_other_version_is_ignored():
+    data = _context().to_dict()
+    data['version'] = SNAPSHOT_VERSION + 1
+
+    assert UserContext.from_dict(data) is None
+
+
+async def test_local_hit_skips_redis(mock_cache):
+    store = UserContextCache(maxsize=10, local_ttl=60, redis_ttl=300)
+    context = _context()
+
+    await store.set(context)
+    result = await store.get(context.telegram_id)
+
+    assert result == context
+    mock_cache.get.assert_not_called()
+
+
+async def test_redis_hit_populates_local_tier(mock_cache):
+    store = UserContextCache(maxsize=10, local_ttl=60, redis_ttl=300)
+    context = _context()
+    mock_cache.get = AsyncMock(return_value=context.to_dict())
+
+    assert await store.get(context.telegram_id) == context
+    assert await store.get(context.telegram_id) == context
+    assert mock_cache.get.await_count == 1
+
+
+async def test_lru_evicts_oldest_entry(mock_cache):
+    store = UserContextCache(maxsize=2, local_ttl=60, redis_ttl=300)
+
+    for telegram_id in (1, 2, 3):
+        await store.set(_context(telegram_id=telegram_id, user_id=telegram_id))
+
+    assert await store.get(1) is None
+    assert (await store.get(3)).telegram_id == 3
+
+
+async def test_set_is_skipped_after_concurrent_invalidation(mock_cache):
+    store = UserContextCache(maxsize=10, local_ttl=60, redis_ttl=300)
+    context = _context()
+
+    generation = store.generation(context.telegram_id)
+    await store.invalidate(telegram_ids=[context.telegram_id])
+    await store.set(context, generation)
+
+    mock_cache.set.assert_not_called()
+    assert await store.get(context.telegram_id) is None
+
+
+async def test_invalidate_by_user_id_uses_local_alias(mock_cache):
+    store = UserContextCache(maxsize=10, local_ttl=60, redis_ttl=300)
+    context = _context()
+    await store.set(context)
+
+    await store.invalidate(user_ids=[context.user_id])
+
+    mock_cache.delete.assert_awaited_once_with(f'user_ctx:{context.telegram_id}')
+    assert await store.get(context.telegram_id) is None
@@ -1,8 +1,10 @@
+import asyncio
 import json
 from typing import Any
 from unittest.mock import AsyncMock
 
 import pytest
+from aiogram.types import Update
 from fastapi import HTTPException
 from starlette.requests import Request
 
@@ -334,3 +336,186 @@ async def test_health_endpoint(monkeypatch: pytest.MonkeyPatch) -> None:
     assert payload['webhook_configured'] is True
     assert payload['queue_maxsize'] == 42
     assert payload['workers'] == 2
+
+
+def _callback_update(update_id: int, user_id: int) -> Update:
+    return Update.model_validate(
+        {
+            'update_id': update_id,
+            'callback_query': {
+                'id': str(update_id),
+                'from': {'id': user_id, 'is_bot': False, 'first_name': 'User'},
+                'chat_instance': 'ci',
+                'data': 'tap',
+            },
+        }
+    )
+
+
+@pytest.mark.anyio
+async def test_processor_keeps_per_user_order_and_runs_users_in_parallel() -> None:
+    bot = AsyncMock()
+    dispatcher = AsyncMock()
+    events: list[tuple[str, int]] = []
+    release_slow = asyncio.Event()
+
+    async def feed_update(_bot, update):
+        events.append(('start', update.update_id))
+        if update.update_id == 1:
+            await release_slow.wait()
+        events.append(('end', update.update_id))
+
+    dispatcher.feed_update = feed_update
+
+    processor = TelegramWebhookProcessor(
+        bot=bot,
+        dispatcher=dispatcher,
+        queue_maxsize=16,
+        worker_count=4,
+        enqueue_timeout=0.0,
+        shutdown_timeout=1.0,
+    )
+    await processor.start()
+
+    # 1 и 2 — двойное нажатие одного пользователя, 3 — другой пользователь
+    await processor.enqueue(_callback_update(1, user_id=100))
+    await processor.enqueue(_callback_update(2, user_id=100))
+    await processor.enqueue(_callback_update(3, user_id=101))
+    await asyncio.sleep(0.05)
+
+    assert ('end', 3) in events
+    assert ('start', 2) not in events
+
+    release_slow.set()
+    await processor.wait_until_drained(timeout=1.0)
+
+    assert events.index(('end', 1)) < events.index(('start', 2))
+    stats = processor.get_stats()
+    assert sum(lane['processed'] for lane in stats['per_lane'].values()) == 3
+
+    await processor.stop()
+
+
+@pytest.mark.anyio
+async def test_processor_slow_handler_holds_only_its_user() -> None:
+    bot = AsyncMock()
+    dispatcher = AsyncMock()
+    finished: list[int] = []
+    release_slow = asyncio.Event()
+
+    async def feed_update(_bot, update):
+        if update.update_id == 1:
+            await release_slow.wait()
+        finished.append(update.update_id)
+
+    dispatcher.feed_update = feed_update
+
+    processor = TelegramWebhookProcessor(
+        bot=bot,
+        dispatcher=dispatcher,
+        queue_maxsize=16,
+        worker_count=2,
+        enqueue_timeout=0.0,
+        shutdown_timeout=1.0,
+    )
+    await processor.start()
+
+    # При шардировании по модулю 100, 102 и 104 попали бы к одному воркеру
+    await processor.enqueue(_callback_update(1, user_id=100))
+    for update_id, user_id in ((2, 102), (3, 104), (4, 102)):
+        await processor.enqueue(_callback_update(update_id, user_id=user_id))
+    await asyncio.sleep(0.05)
+
+    assert finished == [2, 3, 4]
+    assert processor.get_stats()['per_lane']['default']['depth'] == 1
+
+    release_slow.set()
+    await processor.wait_until_drained(timeout=1.0)
+    await processor.stop()
+
+
+@pytest.mark.anyio
+async def test_processor_routes_payments_to_priority_lane() -> None:
+    bot = AsyncMock()
+    dispatcher = AsyncMock()
+    dispatcher.feed_update = AsyncMock()
+
+    processor = TelegramWebhookProcessor(
+        bot=bot,
+        dispatcher=dispatcher,
+        queue_maxsize=1,
+        worker_count=0,
+        enqueue_timeout=0.0,
+        shutdown_timeout=1.0,
+    )
+    await processor.start()
+
+    await processor.enqueue(_callback_update(1, user_id=100))
+    await processor.enqueue(
+        Update.model_validate(
+            {
+                'update_id': 2,
+                'pre_checkout_query': {
+                    'id': 'pcq',
+                    'from': {'id': 100, 'is_bot': False, 'first_name': 'User'},
+                    'currency': 'XTR',
+                    'total_amount': 100,
+                    'invoice_payload': 'payload',
+                },
+            }
+        )
+    )
+
+    stats = processor.get_stats()
+    assert stats['per_lane']['priority']['depth'] == 1
+    assert stats['queued'] == 2
+
+    await processor.stop()
+
+
+@pytest.mark.anyio
+async def test_processor_priority_lane_has_several_workers() -> None:
+    bot = AsyncMock()
+    dispatcher = AsyncMock()
+    started: list[int] = []
+    release_slow = asyncio.Event()
+
+    async def feed_update(_bot, update):
+        started.append(update.update_id)
+        await release_slow.wait()
+
+    dispatcher.feed_update = feed_update
+
+    processor = TelegramWebhookProcessor(
+        bot=bot,
+        dispatcher=dispatcher,
+        queue_maxsize=16,
+        worker_count=1,
+        enqueue_timeout=0.0,
+        shutdown_timeout=1.0,
+    )
+    await processor.start()
+
+    for update_id, user_id in ((1, 100), (2, 101)):
+        await processor.enqueue(
+            Update.model_validate(
+                {
+                    'update_id': update_id,
+                    'pre_checkout_query': {
+                        'id': f'pcq-{update_id}',
+                        'from': {'id': user_id, 'is_bot': False, 'first_name': 'User'},
+                        'currency': 'XTR',
+                        'total_amount': 100,
+                        'invoice_payload': 'payload',
+                    },
+                }
+            )
+        )
+    await asyncio.sleep(0.05)
+
+    # Платежи разных пользователей обрабатываются параллельно даже при одном общем воркере
+    assert sorted(started) == [1, 2]
+
+    release_slow.set()
+    await processor.wait_until_drained(timeout=1.0)
+    await processor.stop()
@@ -0,0 +1,153 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.types import Update
+
+from app.webserver.telegram import (
+    TelegramWebhookOverloadedError,
+    TelegramWebhookProcessorNotRunningError,
+    _ShardStats,
+)
+from app.webserver.telegram_stream import TelegramStreamIngress
+
+
+def _make_ingress(dispatcher=None, *, partitions: int = 4, max_lag: int = 10) -> TelegramStreamIngress:
+    ingress = TelegramStreamIngress(
+        bot=AsyncMock(),
+        dispatcher=dispatcher or AsyncMock(),
+        redis_url='redis://localhost:6379/0',
+        key_prefix='test:updates',
+        partitions=partitions,
+        max_lag=max_lag,
+        lease_seconds=15,
+        shutdown_timeout=1.0,
+    )
+    ingress._redis = MagicMock()
+    ingress._redis.xadd = AsyncMock()
+    ingress._running = True
+    return ingress
+
+
+def _message_update(update_id: int, user_id: int, **extra) -> Update:
+    return Update.model_validate(
+        {
+            'update_id': update_id,
+            'message': {
+                'message_id': update_id,
+                'date': 0,
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': {'id': user_id, 'is_bot': False, 'first_name': 'User'},
+                **extra,
+            },
+        }
+    )
+
+
+@pytest.mark.anyio
+async def test_enqueue_partitions_by_user_and_prioritizes_payments() -> None:
+    ingress = _make_ingress()
+
+    await ingress.enqueue(_message_update(1, user_id=6))
+    await ingress.enqueue(
+        _message_update(
+            2,
+            user_id=6,
+            successful_payment={
+                'currency': 'XTR',
+                'total_amount': 100,
+                'invoice_payload': 'payload',
+                'telegram_payment_charge_id': 'tg',
+                'provider_payment_charge_id': 'provider',
+            },
+        )
+    )
+
+    streams = [call.args[0] for call in ingress._redis.xadd.await_args_list]
+    assert streams == ['test:updates:p2', 'test:updates:priority']
+    stored = json.loads(ingress._redis.xadd.await_args_list[0].args[1]['update'])
+    assert stored['update_id'] == 1
+
+
+@pytest.mark.anyio
+async def test_enqueue_rejects_only_when_lag_exceeds_threshold() -> None:
+    ingress = _make_ingress(max_lag=10)
+
+    ingress._lag = 10
+    await ingress.enqueue(_message_update(1, user_id=1))
+
+    ingress._lag = 11
+    with pytest.raises(TelegramWebhookOverloadedError):
+        await ingress.enqueue(_message_update(2, user_id=1))
+
+    ingress._running = False
+    with pytest.raises(TelegramWebhookProcessorNotRunningError):
+        await ingress.enqueue(_message_update(3, user_id=1))
+
+
+@pytest.mark.anyio
+async def test_entries_are_acked_after_processing_even_if_handler_fails() -> None:
+    dispatcher = AsyncMock()
+    dispatcher.feed_update = AsyncMock(side_effect=[RuntimeError('boom'), None])
+    ingress = _make_ingress(dispatcher)
+
+    ingress._ack_entry = AsyncMock(return_value=1)
+
+    entries = [
+        (b'1-0', {b'update': _message_update(1, user_id=5).model_dump_json(), b'enqueued_at': b'0'}),
+        (b'2-0', {b'update': _message_update(2, user_id=5).model_dump_json(), b'enqueued_at': b'0'}),
+    ]
+    stats = _ShardStats()
+    await ingress._process_entries('test:updates:p1', entries, stats)
+
+    assert [call.args[1].update_id for call in dispatcher.feed_update.await_args_list] == [1, 2]
+    assert [call.kwargs['args'][2] for call in ingress._ack_entry.await_args_list] == [b'1-0', b'2-0']
+    assert stats.processed == 2
+    assert stats.failed == 1
+
+
+@pytest.mark.anyio
+async def test_entries_are_not_acked_after_lease_is_lost() -> None:
+    dispatcher = AsyncMock()
+    ingress = _make_ingress(dispatcher)
+    ingress._ack_entry = AsyncMock(return_value=0)
+
+    entries = [
+        (b'1-0', {b'update': _message_update(1, user_id=5).model_dump_json(), b'enqueued_at': b'0'}),
+        (b'2-0', {b'update': _message_update(2, user_id=5).model_dump_json(), b'enqueued_at': b'0'}),
+    ]
+    owned = await ingress._process_entries('test:updates:p1', entries, _ShardStats(), lease_key='test:updates:lease:1')
+
+    assert owned is False
+    # Второе обновление достанется новому владельцу потока, здесь его не запускаем
+    assert dispatcher.feed_update.await_count == 1
+    assert ingress._ack_entry.await_args.kwargs['keys'] == ['test:updates:p1', 'test:updates:lease:1']
+
+
+@pytest.mark.anyio
+async def test_heartbeat_renews_lease_and_refreshes_in_flight_entries() -> None:
+    release = asyncio.Event()
+
+    async def slow_handler(_bot, _update):
+        await release.wait()
+
+    dispatcher = AsyncMock()
+    dispatcher.feed_update = slow_handler
+    ingress = _make_ingress(dispatcher)
+    ingress._block_ms = 10
+    ingress._ack_entry = AsyncMock(return_value=1)
+    ingress._renew_lease = AsyncMock(return_value=1)
+    ingress._redis.xclaim = AsyncMock()
+
+    entries = [(b'1-0', {b'update': _message_update(1, user_id=5).model_dump_json(), b'enqueued_at': b'0'})]
+    task = asyncio.create_task(
+        ingress._process_entries('test:updates:p1', entries, _ShardStats(), lease_key='test:updates:lease:1')
+    )
+    await asyncio.sleep(0.05)
+    release.set()
+
+    assert await task is True
+    assert ingress._renew_lease.await_count >= 1
+    assert ingress._redis.xclaim.await_args.args[4] == [b'1-0']
+    assert ingress._redis.xclaim.await_args.kwargs['justid'] is True